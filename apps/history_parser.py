@@ -18,6 +18,9 @@ sys.path.append(os.getcwd())
 from systems.parser.vacancy_analyzer.scorer import VacancyScorer
 from systems.parser.vacancy_analyzer.contact_extractor import ContactExtractor
 from systems.parser.vacancy_db import VacancyDatabase
+from systems.parser.history_checkpoints import ChatCheckpointStore, ResumableChatScanner
+from core.database.sqlite_pool import close_all_pools
+from core.ai_engine.http_pool import close_http_clients
 from core.config.settings import settings
 
 # Загрузка переменных окружения
@@ -73,6 +76,11 @@ class TelegramHistoryParser:
         # Основная база данных
         self.db = VacancyDatabase()
 
+        # Чекпоинты по чатам: повторный запуск дочитывает только необработанные диапазоны
+        self.raw_db_path = str(settings.DB_DIR / "history_raw_messages.db")
+        self.checkpoints = ChatCheckpointStore(self.raw_db_path)
+        self.scanner = ResumableChatScanner(self.client, self.checkpoints, self.stop_date)
+
         self.seen_messages = set()
         
         self.stats = {
@@ -116,6 +124,8 @@ class TelegramHistoryParser:
     async def initialize(self):
         await self.client.start()
         await self.db.init_db()
+        # Сканирование за 2 года — сотни тысяч строк: пишем пачками (group commit)
+        self.db.enable_write_batching()
         print("✅ Машина времени подключена (Pyrogram, UNIFIED_DB)")
     
     async def parse_history(self):
@@ -136,30 +146,36 @@ class TelegramHistoryParser:
         
         async def process_chat(dialog, index):
             async with semaphore:
-                chat_name = dialog.name or "Unknown"
-                msg_count = 0
+                chat_name = dialog.chat.title or dialog.chat.first_name or "Unknown"
+                progress = {'count': 0}
                 
-                try:
-                    async for message in self.client.get_chat_history(d.chat.id, limit=None):
+                async def handle_page(messages):
+                    for message in messages:
                         if not message.text: continue
-                        if message.date < self.stop_date: break
-                        
-                        msg_count += 1
+                        progress['count'] += 1
                         self.stats['total_messages'] += 1
                         
                         # Сохраняем и анализируем
                         await self._process_message(message, chat_name)
                         
-                        if msg_count % 1000 == 0:
-                            print(f"[{index}] ⏳ {chat_name}: {msg_count} сообщений... (Дата: {message.date.date()})")
-
-                    if msg_count > 0:
-                        print(f"[{index}] ✅ Успешно: {chat_name} ({msg_count} сообщений)")
+                        if progress['count'] % 1000 == 0:
+                            print(f"[{index}] ⏳ {chat_name}: {progress['count']} сообщений... (Дата: {message.date.date()})")
+                    # Чекпоинт сохраняется после страницы — строки должны быть уже в БД
+                    await self.db.flush_writes()
+                
+                try:
+                    await self.scanner.scan(dialog.chat.id, chat_name, handle_page)
+                    if progress['count'] > 0:
+                        print(f"[{index}] ✅ Успешно: {chat_name} ({progress['count']} новых сообщений)")
                     else:
-                        print(f"[{index}] ⚪ Пусто: {chat_name}")
+                        print(f"[{index}] ⚪ Нет новых: {chat_name}")
                         
                 except Exception as e:
                     print(f"[{index}] ❌ Ошибка в {chat_name}: {e}")
+        
+        await asyncio.gather(*(process_chat(d, i) for i, d in enumerate(target_dialogs, 1)))
+        print(f"\n🏁 Сканирование завершено: {self.stats['total_messages']} сообщений, {self.stats['total_leads']} лидов")
+
     async def _process_message(self, message, chat_name):
         text = message.text
         if not text: return
@@ -169,7 +185,7 @@ class TelegramHistoryParser:
             return
 
         # 2. Анализ через LeadFilterAdvanced (LLM + BERT)
-        result = await self.lead_filter.analyze(text, message_id=message.id, chat_id=message.chat_id, source=chat_name)
+        result = await self.lead_filter.analyze(text, message_id=message.id, chat_id=message.chat.id, source=chat_name)
         
         if result['is_lead']:
             self.stats['total_leads'] += 1
@@ -197,7 +213,12 @@ class TelegramHistoryParser:
 
 async def main():
     parser = TelegramHistoryParser()
-    await parser.parse_history()
+    try:
+        await parser.parse_history()
+    finally:
+        await parser.db.close()
+        await close_all_pools()
+        await close_http_clients()
 
 if __name__ == "__main__":
     asyncio.run(main())
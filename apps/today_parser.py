@@ -6,9 +6,12 @@ import asyncio
 import json
 import os
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import partial
 from pathlib import Path
 from pyrogram import Client
+from pyrogram.enums import ChatType
 from pyrogram.errors import FloodWait
 from dotenv import load_dotenv
 
@@ -22,10 +25,14 @@ from systems.parser.vacancy_analyzer.scorer import VacancyScorer
 from systems.parser.vacancy_analyzer.contact_extractor import ContactExtractor
 from systems.parser.vacancy_analyzer.niche_detector import NicheDetector
 from systems.parser.vacancy_db import VacancyDatabase
+from systems.parser.scan_pipeline import (
+    FloodWaitLimiter, PipelineMetrics, analyze_in_process, analyze_payload, create_cpu_executor,
+)
 from core.config.settings import settings
 from core.database.connection import async_session
 from core.database.models import Lead, MessageLog
-from sqlalchemy import select, or_
+from sqlalchemy import select
+from core.telegram.peer_cache import lead_filter
 
 # Загрузка переменных окружения
 load_dotenv()
@@ -78,6 +85,9 @@ class TelegramVacancyParser:
         # deque с ограничением не даёт расти множеству бесконечно (был unbounded set)
         self.seen_messages = deque(maxlen=10000)
         self._contacted_today = set()
+        self._monitored_chat_ids = []
+        # Общий на все fetch-воркеры: интервал между запросами + пауза после FloodWait
+        self.limiter = FloodWaitLimiter(min_interval=settings.PARSER_REQUEST_INTERVAL)
         self.db = VacancyDatabase()
         self.results = {
             'parsed_at': datetime.now().isoformat(),
@@ -92,62 +102,123 @@ class TelegramVacancyParser:
         """Инициализация Telegram клиента (Pyrogram)"""
         await self.client.start()
         await self.db.init_db()
+        # add_accepted/add_rejected пишутся пачками (group commit)
+        self.db.enable_write_batching()
         print("✅ Pyrogram клиент подключен")
     
     async def parse_dialogs(self, hours_ago: int = 24):
         """
         Парсит все группы и каналы пользователя за последние N часов.
+        Чаты сканируются конвейером (см. systems/parser/scan_pipeline.py).
         """
         await self.initialize()
+        try:
+            print(f"\n📅 Ищем сообщения во всех чатах за последние {hours_ago} часов...")
         
-        print(f"\n📅 Ищем сообщения во всех чатах за последние {hours_ago} часов...")
+            # Pyrogram: итерируем диалоги через async for
+            target_dialogs = []
+            async for dialog in self.client.get_dialogs():
+                chat = dialog.chat
+                if chat.type in (ChatType.SUPERGROUP, ChatType.GROUP, ChatType.CHANNEL, ChatType.BOT):
+                    target_dialogs.append(dialog)
+            # Чаты для Стратегии 3 smart_send_message (поиск участников) — без повторного get_dialogs на каждый лид
+            self._monitored_chat_ids = [
+                d.chat.id for d in target_dialogs
+                if d.chat.type in (ChatType.CHANNEL, ChatType.SUPERGROUP, ChatType.GROUP)
+            ][:200]
         
-        # Pyrogram: итерируем диалоги через async for
-        target_dialogs = []
-        async for dialog in self.client.get_dialogs():
-            chat = dialog.chat
-            from pyrogram.enums import ChatType
-            if chat.type in (ChatType.SUPERGROUP, ChatType.GROUP, ChatType.CHANNEL, ChatType.BOT):
-                target_dialogs.append(dialog)
+            self.results['total_chats_scanned'] = len(target_dialogs)
+            print(f"🎯 Найдено подходящих источников (каналы, группы, боты): {len(target_dialogs)}\n")
         
-        self.results['total_chats_scanned'] = len(target_dialogs)
-        print(f"🎯 Найдено подходящих источников (каналы, группы, боты): {len(target_dialogs)}\n")
+            # Временная граница (делаем наивной для совместимости)
+            time_threshold = datetime.now() - timedelta(hours=hours_ago)
+            await self._run_pipeline(target_dialogs, time_threshold)
         
-        for i, dialog in enumerate(target_dialogs, 1):
+            # Сортируем по приоритету
+            self.results['relevant_vacancies'].sort(
+                key=lambda x: (
+                    0 if x['priority'] == 'HIGH' else (1 if x['priority'] == 'MEDIUM' else 2),
+                    -x['analysis']['relevance_score']
+                )
+            )
+        finally:
+            # Дописать очередь write batching и остановить её задачу — и при ошибке цикла, и при остановке
+            await self.db.close()
+            if self.client.is_connected:
+                await self.client.disconnect()
+        print("\n✅ Парсинг завершен!")
+
+    async def _run_pipeline(self, dialogs, time_threshold: datetime):
+        """fetch → cpu → db → outreach на ограниченных очередях; ждёт, пока все стадии опустеют."""
+        chats_q = asyncio.Queue()
+        for i, dialog in enumerate(dialogs, 1):
+            chats_q.put_nowait((i, dialog, 0))
+        raw_q = asyncio.Queue(maxsize=settings.PARSER_QUEUE_SIZE)
+        scored_q = asyncio.Queue(maxsize=settings.PARSER_QUEUE_SIZE)
+        outreach_q = asyncio.Queue(maxsize=settings.PARSER_QUEUE_SIZE)
+
+        metrics = PipelineMetrics()
+        fetch_m = metrics.stage("fetch", chats_q)
+        cpu_m = metrics.stage("cpu", raw_q)
+        db_m = metrics.stage("db", scored_q)
+        outreach_m = metrics.stage("outreach", outreach_q)
+
+        executor = create_cpu_executor(settings.PARSER_CPU_EXECUTOR, settings.PARSER_CPU_WORKERS)
+        total = len(dialogs)
+        fetchers = [
+            asyncio.create_task(self._fetch_worker(chats_q, raw_q, total, time_threshold, fetch_m))
+            for _ in range(max(1, settings.PARSER_FETCH_CONCURRENCY))
+        ]
+        workers = [
+            asyncio.create_task(self._cpu_worker(raw_q, scored_q, executor, cpu_m))
+            for _ in range(max(1, settings.PARSER_CPU_WORKERS))
+        ]
+        workers.append(asyncio.create_task(self._db_worker(scored_q, outreach_q, db_m)))
+        workers += [
+            asyncio.create_task(self._outreach_worker(outreach_q, outreach_m))
+            for _ in range(max(1, settings.PARSER_OUTREACH_CONCURRENCY))
+        ]
+        workers.append(asyncio.create_task(metrics.report_periodically(settings.PARSER_METRICS_INTERVAL)))
+
+        try:
+            # Сетевая ошибка в любом fetch-воркере прерывает цикл (как и раньше — для перезапуска клиента)
+            await asyncio.gather(*fetchers)
+            await raw_q.join()
+            await scored_q.join()
+            await outreach_q.join()
+        finally:
+            for task in fetchers + workers:
+                task.cancel()
+            await asyncio.gather(*fetchers, *workers, return_exceptions=True)
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.results['pipeline_metrics'] = {
+                **metrics.snapshot(),
+                'flood_waits': self.limiter.flood_waits,
+            }
+            print(f"\n📈 Конвейер: {metrics.format()} | FloodWait: {self.limiter.flood_waits}")
+
+    async def _fetch_worker(self, chats_q: asyncio.Queue, raw_q: asyncio.Queue, total: int,
+                            time_threshold: datetime, metrics):
+        """Берёт чаты из общей очереди, пока она не опустеет."""
+        while True:
+            try:
+                i, dialog, attempt = chats_q.get_nowait()
+            except asyncio.QueueEmpty:
+                return
             chat_name = (dialog.chat.title or dialog.chat.first_name) if dialog.chat else "Без названия"
-            print(f"[{i}/{len(target_dialogs)}] 🔍 Анализируем: {chat_name}")
+            print(f"[{i}/{total}] 🔍 Анализируем: {chat_name}")
             
             try:
-                # Временная граница (делаем наивной для совместимости)
-                time_threshold = datetime.now() - timedelta(hours=hours_ago)
-                
-                messages_count = 0
-                async for message in self.client.get_chat_history(dialog.chat.id, limit=100):
-                    if not message.text:
-                        continue
-                    
-                    # Проверка времени (убеждаемся что оба naive)
-                    msg_date = message.date.replace(tzinfo=None) if message.date.tzinfo else message.date
-                    if msg_date < time_threshold:
-                        break
-                    
-                    messages_count += 1
-                    self.results['total_messages_scanned'] += 1
-                    
-                    # Анализ сообщения
-                    await self._analyze_message(message, chat_name)
-                
-                if messages_count > 0:
-                    print(f"   ✓ Обработано сообщений: {messages_count}")
-                    # Помечаем чат как прочитанный, чтобы не копились уведомления
-                    try:
-                        await self.client.read_chat_history(dialog.chat.id)
-                    except Exception as e:
-                        print(f"   ⚠️ Не удалось пометить как прочитанное: {e}")
-                    
+                with metrics.track():
+                    await self._fetch_chat(dialog, chat_name, raw_q, time_threshold)
             except FloodWait as e:
-                print(f"   ⏳ FloodWait: ждём {e.value} сек перед следующим чатом...")
-                await asyncio.sleep(e.value + 3)
+                # Пауза общая для всех воркеров; чат возвращаем в очередь один раз
+                self.limiter.report_flood_wait(e.value)
+                if attempt == 0:
+                    print(f"   ⏳ FloodWait {e.value} сек: все чаты на паузе, {chat_name} повторим позже")
+                    chats_q.put_nowait((i, dialog, attempt + 1))
+                else:
+                    print(f"   ⏳ FloodWait {e.value} сек повторно, пропускаем {chat_name}")
             except (ConnectionError, BrokenPipeError) as e:
                 print(f"   🚨 Сетевая ошибка (socket/connection): {e}. Прерываем цикл для перезапуска.")
                 raise e
@@ -157,20 +228,86 @@ class TelegramVacancyParser:
                     print(f"   🚨 Критическая сетевая ошибка обнаружена: {e}. Перезапуск...")
                     raise e
                 print(f"   ❌ Ошибка при парсинге {chat_name}: {e}")
+
+    async def _fetch_chat(self, dialog, chat_name: str, raw_q: asyncio.Queue, time_threshold: datetime):
+        await self.limiter.acquire()
+        messages_count = 0
+        async for message in self.client.get_chat_history(dialog.chat.id, limit=100):
+            if not message.text:
+                continue
             
-            # Пауза между чатами: 0.5 сек базово (защита от 429)
-            await asyncio.sleep(0.5)
-        
-        # Сортируем по приоритету
-        self.results['relevant_vacancies'].sort(
-            key=lambda x: (
-                0 if x['priority'] == 'HIGH' else (1 if x['priority'] == 'MEDIUM' else 2),
-                -x['analysis']['relevance_score']
-            )
-        )
+            # Проверка времени (убеждаемся что оба naive)
+            msg_date = message.date.replace(tzinfo=None) if message.date.tzinfo else message.date
+            if msg_date < time_threshold:
+                break
+            
+            messages_count += 1
+            self.results['total_messages_scanned'] += 1
+            
+            payload = await self._prepare_message(message, chat_name)
+            if payload is not None:
+                await raw_q.put(payload)
         
-        await self.client.disconnect()
-        print("\n✅ Парсинг завершен!")
+        if messages_count > 0:
+            print(f"   ✓ {chat_name}: обработано сообщений: {messages_count}")
+            # Помечаем чат как прочитанный, чтобы не копились уведомления
+            try:
+                await self.limiter.acquire()
+                await self.client.read_chat_history(dialog.chat.id)
+            except Exception as e:
+                print(f"   ⚠️ Не удалось пометить как прочитанное: {e}")
+
+    async def _cpu_worker(self, raw_q: asyncio.Queue, scored_q: asyncio.Queue, executor, metrics):
+        loop = asyncio.get_running_loop()
+        if isinstance(executor, ThreadPoolExecutor):
+            analyze = partial(analyze_payload, self.scorer, self.contact_extractor, self.niche_detector)
+        else:
+            analyze = analyze_in_process
+        while True:
+            payload = await raw_q.get()
+            try:
+                with metrics.track():
+                    # Дедупликатор VacancyScorer — в event loop, до пула (см. analyze_payload)
+                    if self.scorer.deduplicator.is_duplicate(payload['text'], payload['date']):
+                        scored = {'analysis': self.scorer._negative_result("Дубликат")}
+                    else:
+                        scored = await loop.run_in_executor(executor, analyze, payload)
+                await scored_q.put((payload, scored))
+            except Exception as e:
+                print(f"      ❌ Ошибка при анализе сообщения: {e}")
+                import traceback
+                traceback.print_exc()
+            finally:
+                raw_q.task_done()
+
+    async def _db_worker(self, scored_q: asyncio.Queue, outreach_q: asyncio.Queue, metrics):
+        """Забирает из очереди всё накопившееся (до VACANCY_WRITE_BATCH_SIZE) и пишет пачкой."""
+        while True:
+            batch = [await scored_q.get()]
+            while len(batch) < settings.VACANCY_WRITE_BATCH_SIZE and not scored_q.empty():
+                batch.append(scored_q.get_nowait())
+            try:
+                metrics.observe_queue()
+                for payload, scored in batch:
+                    try:
+                        with metrics.track():
+                            await self._store_result(payload, scored, outreach_q)
+                    except Exception as e:
+                        print(f"      ❌ Ошибка при сохранении сообщения: {e}")
+            finally:
+                for _ in batch:
+                    scored_q.task_done()
+
+    async def _outreach_worker(self, outreach_q: asyncio.Queue, metrics):
+        while True:
+            contact_link, text, direction = await outreach_q.get()
+            try:
+                with metrics.track():
+                    await self._send_outreach_to_lead(contact_link, text, direction)
+            except Exception as e:
+                print(f"   ❌ Ошибка отправки лиду {contact_link}: {e}")
+            finally:
+                outreach_q.task_done()
 
     def _get_message_hash(self, text: str) -> str:
         """Генерирует простой хеш для дедупликации (игнорируя пробелы и регистр)"""
@@ -178,22 +315,25 @@ class TelegramVacancyParser:
         clean_text = "".join(text.lower().split())
         return hashlib.md5(clean_text.encode()).hexdigest()
 
-    async def _analyze_message(self, message, channel_name: str):
-        """Анализирует одно сообщение"""
+    async def _prepare_message(self, message, channel_name: str):
+        """
+        Дедупликация и извлечение всего нужного из Message в простой dict
+        (его можно передать в пул процессов). None — сообщение пропускаем.
+        """
         text = message.text or ""
         
         # Дедупликация по тексту (в рамках текущего запуска)
         msg_hash = self._get_message_hash(text)
         if msg_hash in self.seen_messages:
             print(f"      ⏭ Дубликат в текущем цикле (hash: {msg_hash})")
-            return # Пропускаем дубликат в рамках текущего запуска
+            return None # Пропускаем дубликат в рамках текущего запуска
         self.seen_messages.append(msg_hash)
         
         # Проверка в базе данных (пропускаем ранее обработанные)
         is_processed = await self.db.is_processed(text)
         if is_processed:
             print(f"      ⏭ Уже обработано ранее в БД")
-            return  # Вакансия уже была обработана ранее
+            return None  # Вакансия уже была обработана ранее
         
         print(f"      📡 Анализируем новое сообщение (длина: {len(text)})")
         
@@ -209,120 +349,115 @@ class TelegramVacancyParser:
                     else:
                         buttons_text += f"• {button.text} (инлайн/кнопка)\n"
         
-        try:
-            # Поиск Google Forms
-            has_google_form = "docs.google.com/forms" in text or "forms.gle" in text or "forms.gle" in buttons_text
+        # Получаем информацию о пересланном сообщении
+        fwd_from = None
+        if message.forward_from:
+            fwd_from = {
+                'from_id': message.forward_from.id,
+                'from_username': message.forward_from.username,
+                'channel_id': None # В Pyrogram это forward_from_chat
+            }
+        elif message.forward_from_chat:
+            fwd_from = {
+                'from_id': None,
+                'from_username': message.forward_from_chat.username,
+                'channel_id': message.forward_from_chat.id
+            }
+        
+        return {
+            'channel': channel_name,
+            'message_id': message.id,
+            'chat_id': message.chat.id,
+            'date': message.date,
+            'text': text,
+            'buttons_text': buttons_text,
+            'sender_id': message.from_user.id if message.from_user else None,
+            'sender_username': message.from_user.username if message.from_user else None,
+            'sender_is_user': message.from_user is not None,
+            'fwd_from': fwd_from,
+        }
+
+    async def _store_result(self, payload: dict, scored: dict, outreach_q: asyncio.Queue):
+        """Запись результата анализа в БД и отчёт; вакансии с контактом уходят в outreach-очередь."""
+        text = payload['text']
+        channel_name = payload['channel']
+        date_iso = payload['date'].isoformat()
+        analysis = scored['analysis']
+        
+        # Поиск Google Forms
+        has_google_form = "docs.google.com/forms" in text or "forms.gle" in text or "forms.gle" in payload['buttons_text']
+        
+        vacancy_data = {
+            'channel': channel_name,
+            'message_id': payload['message_id'],
+            'date': date_iso,
+            'text': text[:500],  # Обрезаем для компактности
+            'full_text': text,
+            'sender_id': payload['sender_id'],
+            'analysis': analysis,
+            'has_form': has_google_form
+        }
+        
+        if analysis['is_vacancy']:
+            contact_data = scored['contact']
             
-            # Анализ релевантности
-            analysis = self.scorer.analyze_message(text, message.date)
+            vacancy_data['contact'] = contact_data
+            vacancy_data['niche'] = scored['niche']
+            vacancy_data['priority'] = self._calculate_priority(analysis, contact_data, has_google_form)
+            vacancy_data['budget'] = analysis.get('budget')
             
-            vacancy_data = {
-                'channel': channel_name,
-                'message_id': message.id,
-                'date': message.date.isoformat(),
-                'text': text[:500],  # Обрезаем для компактности
-                'full_text': text,
-                'sender_id': message.from_user.id if message.from_user else None,
-                'analysis': analysis,
-                'has_form': has_google_form
-            }
+            # Сохраняем в базу данных как принятую с направлением и контактом
+            direction = analysis.get('specialization', 'Не определено')
+            contact_link = contact_data.get('contact_link')
+            await self.db.add_accepted(
+                text=text, 
+                source=channel_name, 
+                direction=direction, 
+                contact_link=contact_link, 
+                date=date_iso,
+                message_id=payload['message_id'],
+                chat_id=payload['chat_id']
+            )
             
-            if analysis['is_vacancy']:
-                # Получаем информацию о пересланном сообщении
-                fwd_from = None
-                if message.forward_from:
-                    from_id = message.forward_from.id
-                    
-                    fwd_from = {
-                        'from_id': from_id,
-                        'from_username': message.forward_from.username,
-                        'channel_id': None # В Pyrogram это forward_from_chat
-                    }
-                elif message.forward_from_chat:
-                    fwd_from = {
-                        'from_id': None,
-                        'from_username': message.forward_from_chat.username,
-                        'channel_id': message.forward_from_chat.id
-                    }
-                
-                sender_username = None
-                sender_is_user = False
-                if message.from_user:
-                    sender_username = message.from_user.username
-                    sender_is_user = True
-                
-                # Извлекаем контакт
-                contact_data = self.contact_extractor.extract_contact({
-                    'text': text,
-                    'buttons': buttons_text,
-                    'sender_id': message.from_user.id if sender_is_user else None,
-                    'fwd_from': fwd_from,
-                    'sender_username': sender_username
+            # Первое сообщение лиду — отдельной стадией, сканирование не ждёт отправки
+            if contact_link:
+                await outreach_q.put((contact_link, text, direction))
+            
+            self.results['relevant_vacancies'].append(vacancy_data)
+            
+            status_icon = "📝 ФОРМА!" if has_google_form else "✅ Найдено!"
+            print(f"   {status_icon} Score: {analysis['relevance_score']}, Spec: {analysis['specialization']}")
+        else:
+            # Сохраняем только краткую информацию о нерелевантных
+            if analysis.get('rejection_reason'):
+                self.results['irrelevant_messages'].append({
+                    'channel': channel_name,
+                    'message_id': payload['message_id'],
+                    'rejection_reason': analysis.get('rejection_reason'),
+                    'score': analysis['relevance_score']
                 })
-                
-                # Определяем нишу
-                niche_data = self.niche_detector.detect_niche(text)
-                
-                vacancy_data['contact'] = contact_data
-                vacancy_data['niche'] = niche_data
-                vacancy_data['priority'] = self._calculate_priority(analysis, contact_data, has_google_form)
-                vacancy_data['budget'] = analysis.get('budget')
-                
-                # Сохраняем в базу данных как принятую с направлением и контактом
-                direction = analysis.get('specialization', 'Не определено')
-                contact_link = contact_data.get('contact_link')
-                await self.db.add_accepted(
-                    text=text, 
-                    source=channel_name, 
-                    direction=direction, 
-                    contact_link=contact_link, 
-                    date=message.date.isoformat(),
-                    message_id=message.id,
-                    chat_id=message.chat.id
-                )
-                
-                # Немедленная отправка первого сообщения лиду
-                await self._send_outreach_to_lead(contact_link, text, direction)
-                
-                self.results['relevant_vacancies'].append(vacancy_data)
-                
-                status_icon = "📝 ФОРМА!" if has_google_form else "✅ Найдено!"
-                print(f"   {status_icon} Score: {analysis['relevance_score']}, Spec: {analysis['specialization']}")
-            else:
-                # Сохраняем только краткую информацию о нерелевантных
-                if analysis.get('rejection_reason'):
-                    self.results['irrelevant_messages'].append({
-                        'channel': channel_name,
-                        'message_id': message.id,
-                        'rejection_reason': analysis.get('rejection_reason'),
-                        'score': analysis['relevance_score']
-                    })
-                
-                # Сохраняем в базу данных как отклонённую
-                if analysis.get('rejection_reason'):
-                    await self.db.add_rejected(
-                        text=text,
-                        source=channel_name,
-                        reason=analysis.get('rejection_reason'),
-                        date=message.date.isoformat(),
-                        message_id=message.id,
-                        chat_id=message.chat.id
-                    )
             
-            # Сохраняем ВООБЩЕ ВСЕ для полного дампа
-            self.results['all_messages'].append({
-                'channel': channel_name,
-                'message_id': message.id,
-                'date': message.date.isoformat(),
-                'full_text': text,
-                'is_relevant': analysis['is_vacancy'],
-                'relevance_score': analysis['relevance_score'],
-                'rejection_reason': analysis.get('rejection_reason')
-            })
-        except Exception as e:
-            print(f"      ❌ Ошибка при анализе сообщения: {e}")
-            import traceback
-            traceback.print_exc()
+            # Сохраняем в базу данных как отклонённую
+            if analysis.get('rejection_reason'):
+                await self.db.add_rejected(
+                    text=text,
+                    source=channel_name,
+                    reason=analysis.get('rejection_reason'),
+                    date=date_iso,
+                    message_id=payload['message_id'],
+                    chat_id=payload['chat_id']
+                )
+        
+        # Сохраняем ВООБЩЕ ВСЕ для полного дампа
+        self.results['all_messages'].append({
+            'channel': channel_name,
+            'message_id': payload['message_id'],
+            'date': date_iso,
+            'full_text': text,
+            'is_relevant': analysis['is_vacancy'],
+            'relevance_score': analysis['relevance_score'],
+            'rejection_reason': analysis.get('rejection_reason')
+        })
 
     async def _send_outreach_to_lead(self, contact_link: str, vacancy_text: str, specialization: str):
         """
@@ -337,17 +472,27 @@ class TelegramVacancyParser:
             print(f"   ⏭ Уже написали {contact_link} в этом цикле, пропускаем")
             return
         
+        # Резерв до первого await: параллельные outreach-воркеры не напишут одному контакту дважды
+        self._contacted_today.add(contact_link)
+        sent = False
+        try:
+            sent = await self._book_and_send(contact_link, vacancy_text, specialization)
+        finally:
+            if not sent:
+                self._contacted_today.discard(contact_link)
+        if sent:
+            import random
+            # Пауза после отправки (антиспам)
+            await asyncio.sleep(random.uniform(30, 60))
+
+    async def _book_and_send(self, contact_link: str, vacancy_text: str, specialization: str) -> bool:
+        """Бронирует лида в БД, генерирует отклик и отправляет. True — сообщение доставлено."""
         # Проверка по базе данных (чтобы не писать повторно спустя время)
         try:
             async with async_session() as session:
                 clean_contact = contact_link.replace('@', '')
                 # Ищем по username или ID (если это число)
-                stmt = select(Lead).where(
-                    or_(
-                        Lead.username == clean_contact,
-                        Lead.telegram_id.cast(Lead.telegram_id.type.__class__) == clean_contact
-                    )
-                )
+                stmt = select(Lead).where(lead_filter(clean_contact))
                 res = await session.execute(stmt)
                 lead = res.scalars().first()
                 
@@ -358,13 +503,13 @@ class TelegramVacancyParser:
                     last_outreach = lead.last_outreach_at.replace(tzinfo=None) if lead.last_outreach_at and lead.last_outreach_at.tzinfo else lead.last_outreach_at
                     if last_outreach and (now - last_outreach).total_seconds() < 86400:
                         print(f"   ⏭ Лид {contact_link} уже получил сообщение недавно (last_outreach_at), пропускаем")
-                        return
+                        return False
                     
                     # Проверяем last_interaction (с приведением к naive)
                     last_interaction = lead.last_interaction.replace(tzinfo=None) if lead.last_interaction and lead.last_interaction.tzinfo else lead.last_interaction
                     if last_interaction and (now - last_interaction).total_seconds() < 86400:
                         print(f"   ⏭ Лид {contact_link} уже есть в базе и с ним было общение, пропускаем")
-                        return
+                        return False
                     
                     # ПРЕДВАРИТЕЛЬНОЕ РЕЗЕРВИРОВАНИЕ (Бронируем лида ПЕРЕД генерацией)
                     lead.last_outreach_at = now
@@ -382,7 +527,7 @@ class TelegramVacancyParser:
                     
         except Exception as e:
             print(f"   ⚠️ Ошибка при проверке/бронировании лида {contact_link}: {e}")
-            return # Безопасность: если не смогли забронировать, не пишем
+            return False  # Безопасность: если не смогли забронировать, не пишем
         
         try:
             from core.ai_engine.llm_client import llm_client
@@ -401,14 +546,14 @@ class TelegramVacancyParser:
             
             if not text:
                 print(f"   ❌ LLM не сгенерировал текст для {contact_link}")
-                return
+                return False
             
             # Имитация человеческой задержки перед отправкой (3-10 сек)
             delay = random.uniform(3, 10)
             await asyncio.sleep(delay)
             
-            # ✨ Умная отправка: пробуем по username, потом по ID (InputPeerUser hack), потом через участников чатов
-            from core.utils.smart_sender import smart_send_message
+            # ✨ Умная отправка через основной аккаунт пула (сессии SESSION_POOL_ACCOUNTS держит процесс alexey)
+            from core.telegram.session_pool import get_session_pool
             
             # Определяем получателя: число → int, иначе строка без @
             if clean_contact.isdigit():
@@ -417,34 +562,25 @@ class TelegramVacancyParser:
                 recipient_key = clean_contact
             
             # Собираем ID мониторируемых чатов для Стратегии 3 (поиск участников)
-            chat_ids = []
-            try:
-                # В Pyrogram get_dialogs — это асинхронный генератор
-                async for dialog in self.client.get_dialogs(limit=200):
-                    if dialog.chat.type in (ChatType.CHANNEL, ChatType.SUPERGROUP, ChatType.GROUP):
-                        chat_ids.append(dialog.chat.id)
-            except Exception:
-                pass
+            chat_ids = list(self._monitored_chat_ids)
             
-            sent = await smart_send_message(
-                client=self.client,
-                recipient=recipient_key,
-                text=text,
+            sent = await get_session_pool(self.client, pool_accounts=False).send(
+                recipient_key,
+                text,
                 simulate_typing=True,
                 typing_duration=random.uniform(2, 5),
                 monitored_chats_ids=chat_ids
             )
             
-            if sent:
-                self._contacted_today.add(contact_link)
-                print(f"   📤 Отправлено сообщение лиду: {contact_link}")
-                # Пауза после отправки (антиспам)
-                await asyncio.sleep(random.uniform(30, 60))
-            else:
+            if not sent:
                 print(f"   ❌ Не удалось отправить сообщение лиду {contact_link} (все стратегии провалились)")
+                return False
+            print(f"   📤 Отправлено сообщение лиду: {contact_link}")
+            return True
             
         except Exception as e:
             print(f"   ❌ Ошибка отправки лиду {contact_link}: {e}")
+            return False
 
 
     def _calculate_priority(self, analysis: dict, contact: dict, has_form: bool = False) -> str:
@@ -0,0 +1,119 @@
+"""
+Общий пул HTTP-соединений к LLM-провайдерам (OpenRouter, Ollama).
+
+Один долгоживущий httpx.AsyncClient на origin (схема + хост + порт): TCP/TLS
+рукопожатие платится один раз, дальше запросы идут по keep-alive (или
+мультиплексируются в одном HTTP/2-соединении, если установлен пакет h2).
+Лимиты соединений — на каждый хост отдельно, таймауты раздельные
+(connect/read/write/pool).
+
+    client = get_http_client("https://openrouter.ai/api/v1/chat/completions")
+    response = await client.post(url, json=payload)
+    ...
+    await close_http_clients()   # при остановке приложения
+
+Клиенты привязаны к event loop, в котором созданы: у каждого loop свой набор.
+Когда asyncio.run завершает loop и отменяет его задачи, клиенты этого loop
+закрываются в нём же (сторожевая задача), сокеты не остаются висеть.
+"""
+
+import asyncio
+from typing import Dict, Optional
+
+import httpx
+
+from core.config.settings import settings
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import h2  # noqa: F401
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+
+def default_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=settings.LLM_HTTP_CONNECT_TIMEOUT,
+        read=settings.LLM_HTTP_READ_TIMEOUT,
+        write=settings.LLM_HTTP_WRITE_TIMEOUT,
+        pool=settings.LLM_HTTP_POOL_TIMEOUT,
+    )
+
+
+def default_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_HTTP_MAX_CONNECTIONS_PER_HOST,
+        max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_PER_HOST,
+        keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _origin(url: str) -> str:
+    parsed = httpx.URL(url)
+    return f"{parsed.scheme}://{parsed.host}:{parsed.port or (443 if parsed.scheme == 'https' else 80)}"
+
+
+_clients: Dict[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]] = {}
+_guards: Dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+
+
+def _loop_clients(loop: asyncio.AbstractEventLoop) -> Dict[str, httpx.AsyncClient]:
+    for old_loop in [l for l in _clients if l is not loop and l.is_closed()]:
+        # Loop закрыли без отмены задач (не asyncio.run) — закрыть клиентов в нём уже нельзя
+        logger.warning("llm_http_clients_orphaned", clients=len(_clients[old_loop]))
+        del _clients[old_loop]
+        _guards.pop(old_loop, None)
+    guard = _guards.get(loop)
+    if guard is None or guard.done():
+        _guards[loop] = loop.create_task(_close_on_shutdown(loop))
+    return _clients.setdefault(loop, {})
+
+
+async def _close_on_shutdown(loop: asyncio.AbstractEventLoop):
+    """Ждёт отмены (asyncio.run отменяет задачи перед закрытием loop) и закрывает клиентов loop."""
+    try:
+        await loop.create_future()
+    except asyncio.CancelledError:
+        await _close_loop_clients(loop)
+        raise
+
+
+async def _close_loop_clients(loop: asyncio.AbstractEventLoop):
+    for client in list(_clients.pop(loop, {}).values()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.error("llm_http_client_close_failed", error=str(e))
+
+
+def get_http_client(url: str, **client_kwargs) -> httpx.AsyncClient:
+    """
+    Общий клиент для origin адреса url в текущем loop. client_kwargs (verify,
+    headers, ...) учитываются только при создании клиента.
+    """
+    clients = _loop_clients(asyncio.get_running_loop())
+    origin = _origin(url)
+    client = clients.get(origin)
+    if client is None or client.is_closed:
+        http2 = settings.LLM_HTTP2 and H2_AVAILABLE
+        client = httpx.AsyncClient(
+            http2=http2,
+            limits=client_kwargs.pop("limits", None) or default_limits(),
+            timeout=client_kwargs.pop("timeout", None) or default_timeout(),
+            **client_kwargs,
+        )
+        clients[origin] = client
+        logger.info("llm_http_client_created", origin=origin, http2=http2)
+    return client
+
+
+async def close_http_clients():
+    """Закрывает все клиенты текущего loop (при остановке приложения)."""
+    loop = asyncio.get_running_loop()
+    guard = _guards.pop(loop, None)
+    if guard is not None and guard is not asyncio.current_task():
+        guard.cancel()
+    await _close_loop_clients(loop)
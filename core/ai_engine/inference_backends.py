@@ -0,0 +1,199 @@
+"""
+CPU-бэкенды инференса для backbone rubert-tiny (settings.MODEL_INFERENCE_BACKEND):
+
+- torch — float32 как есть;
+- int8  — динамическая INT8-квантизация nn.Linear (torch.ao.quantization.quantize_dynamic),
+          веса линейных слоёв в 4 раза меньше, на CPU быстрее без заметной потери качества;
+- onnx  — экспорт BertModel в ONNX и инференс через onnxruntime (нужны пакеты
+          onnx и onnxruntime из requirements_onnx.txt; без них — откат на torch
+          с предупреждением).
+
+Бэкенд применяется к одному общему backbone в model_registry, поэтому
+эмбеддинги дедупа и BERT-классификатор переключаются вместе. Проверка
+качества против float-модели — compare_backends() и
+scripts/benchmarks/bench_inference_backends.py.
+"""
+
+import hashlib
+import importlib.util
+import inspect
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.config.settings import settings
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+# Проверяем наличие без импорта: onnxruntime тяжёлый, а модуль импортируется на старте
+ONNXRUNTIME_AVAILABLE = all(importlib.util.find_spec(pkg) is not None for pkg in ("onnx", "onnxruntime"))
+
+BACKENDS = ("torch", "int8", "onnx")
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Имя бэкенда из настроек с откатом на torch, если он недоступен."""
+    backend = (backend or settings.MODEL_INFERENCE_BACKEND).lower()
+    if backend not in BACKENDS:
+        logger.warning("unknown_inference_backend", backend=backend, fallback="torch")
+        return "torch"
+    if backend == "onnx" and not ONNXRUNTIME_AVAILABLE:
+        logger.warning("onnx_backend_unavailable", fallback="torch")
+        return "torch"
+    return backend
+
+
+def quantize_int8(model):
+    """Динамическая INT8-квантизация всех nn.Linear модели (in place)."""
+    import torch
+    model.eval()
+    torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def _export_onnx(backbone, path: Path):
+    import torch
+
+    class _Export(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            out = self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids)
+            return out.last_hidden_state, out.pooler_output
+
+    dummy = torch.ones(2, 8, dtype=torch.long)
+    axes = {0: "batch", 1: "sequence"}
+    kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    torch.onnx.export(
+        _Export(backbone.eval()), (dummy, dummy, torch.zeros_like(dummy)), str(path),
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state", "pooler_output"],
+        dynamic_axes={"input_ids": axes, "attention_mask": axes, "token_type_ids": axes,
+                      "last_hidden_state": axes, "pooler_output": {0: "batch"}},
+        opset_version=14, **kwargs,
+    )
+
+
+def _make_onnx_backbone(backbone, name: str):
+    import onnxruntime
+    import torch
+    from transformers.modeling_outputs import BaseModelOutputWithPooling
+
+    class OnnxBackbone(torch.nn.Module):
+        """Замена BertModel: тот же вызов и выход, вычисления в onnxruntime."""
+
+        def __init__(self, session, config):
+            super().__init__()
+            self.session = session
+            self.config = config
+            self.register_buffer("_device_anchor", torch.zeros(0), persistent=False)
+
+        def forward(self, input_ids=None, attention_mask=None, token_type_ids=None, return_dict=None, **kwargs):
+            if attention_mask is None:
+                attention_mask = torch.ones_like(input_ids)
+            if token_type_ids is None:
+                token_type_ids = torch.zeros_like(input_ids)
+            hidden, pooled = self.session.run(None, {
+                "input_ids": input_ids.cpu().numpy().astype(np.int64),
+                "attention_mask": attention_mask.cpu().numpy().astype(np.int64),
+                "token_type_ids": token_type_ids.cpu().numpy().astype(np.int64),
+            })
+            hidden, pooled = torch.from_numpy(hidden), torch.from_numpy(pooled)
+            if return_dict is False:
+                return hidden, pooled
+            return BaseModelOutputWithPooling(last_hidden_state=hidden, pooler_output=pooled)
+
+    # Отпечаток весов в имени файла: дообученный чекпоинт по тому же пути экспортируется заново
+    first_weight = next(backbone.parameters()).detach().flatten()[:4096]
+    digest = hashlib.sha1(f"{name}|{float(first_weight.double().sum()):.10e}".encode("utf-8")).hexdigest()[:12]
+    path = settings.DATA_DIR / "onnx" / f"{digest}.onnx"
+    if not path.exists():
+        _export_onnx(backbone, path)
+        logger.info("onnx_exported", model=name, path=str(path))
+    options = onnxruntime.SessionOptions()
+    if settings.TORCH_NUM_THREADS > 0:
+        options.intra_op_num_threads = settings.TORCH_NUM_THREADS
+    session = onnxruntime.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+    return OnnxBackbone(session, backbone.config)
+
+
+def _replace_child(root, old, new) -> bool:
+    """Подменяет подмодуль old на new внутри root (где бы он ни висел)."""
+    for module in root.modules():
+        for child_name, child in module.named_children():
+            if child is old:
+                setattr(module, child_name, new)
+                return True
+    return False
+
+
+def apply_backend(root, backbone, backend: str, name: str):
+    """
+    Переводит backbone, висящий внутри root (SentenceTransformer или
+    *ForSequenceClassification), на бэкенд. Возвращает новый backbone.
+    """
+    if backend == "int8":
+        return quantize_int8(backbone)
+    if backend == "onnx":
+        replacement = _make_onnx_backbone(backbone, name)
+        if not _replace_child(root, backbone, replacement):
+            raise RuntimeError(f"backbone of {name} not found for ONNX replacement")
+        return replacement
+    return backbone
+
+
+# ---------- проверка качества ----------
+
+def load_holdout(db_path: str = None, every: int = 5, limit: int = 2000) -> Tuple[List[str], List[int]]:
+    """
+    Отложенная выборка из vacancies.db: размеченные вручную (manual_label)
+    строки с id % every == 0 — детерминированно и не пересекается с
+    обучением, если тренировка берёт остальные.
+    """
+    conn = sqlite3.connect(str(db_path or settings.VACANCY_DB_PATH))
+    try:
+        rows = conn.execute("""
+            SELECT text, manual_label FROM vacancies
+            WHERE manual_label IS NOT NULL AND text IS NOT NULL AND text != '' AND id % ? = 0
+            ORDER BY id LIMIT ?
+        """, (every, limit)).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        conn.close()
+    return [row[0] for row in rows], [int(row[1]) for row in rows]
+
+
+def compare_backends(
+    reference_embeddings: np.ndarray,
+    candidate_embeddings: np.ndarray,
+    reference_confidences: Sequence[float],
+    candidate_confidences: Sequence[float],
+    labels: Optional[Sequence[int]] = None,
+) -> Dict[str, Any]:
+    """Насколько бэкенд расходится с float-моделью (и точность по manual_label, если есть)."""
+    ref = np.asarray(reference_embeddings, dtype=np.float32)
+    cand = np.asarray(candidate_embeddings, dtype=np.float32)
+    norms = np.linalg.norm(ref, axis=1) * np.linalg.norm(cand, axis=1)
+    cosine = np.sum(ref * cand, axis=1) / np.where(norms == 0, 1.0, norms)
+    ref_conf = np.asarray(reference_confidences)
+    cand_conf = np.asarray(candidate_confidences)
+    report = {
+        "texts": len(ref),
+        "embedding_cosine_mean": float(cosine.mean()) if len(cosine) else 1.0,
+        "embedding_cosine_min": float(cosine.min()) if len(cosine) else 1.0,
+        "confidence_max_abs_diff": float(np.abs(ref_conf - cand_conf).max()) if len(ref_conf) else 0.0,
+        "decision_agreement": float(np.mean((ref_conf > 0.5) == (cand_conf > 0.5))) if len(ref_conf) else 1.0,
+    }
+    if labels is not None and len(labels):
+        y = np.asarray(labels)
+        report["reference_accuracy"] = float(np.mean((ref_conf > 0.5) == (y == 1)))
+        report["candidate_accuracy"] = float(np.mean((cand_conf > 0.5) == (y == 1)))
+        report["accuracy_drop"] = report["reference_accuracy"] - report["candidate_accuracy"]
+    return report
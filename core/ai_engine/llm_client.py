@@ -1,9 +1,14 @@
 import httpx
 import json
 import re
-from typing import Optional
+from typing import Optional, Tuple
 from core.config.settings import settings
 from core.utils.logger import logger
+from core.ai_engine.http_pool import get_http_client
+from core.utils.llm_cache import llm_cache, make_cache_key
+
+# System prompt структурированных вызовов фильтра лидов (call_api / call_ollama)
+LEAD_FILTER_SYSTEM_PROMPT = "Ты — экспертный фильтр лидов. Отвечай только СТРОГО валидным JSON."
 
 class LLMClient:
     """
@@ -21,11 +26,43 @@ class LLMClient:
             "X-Title": "Telegram AI Assistant"
         }
 
-    async def generate_response(self, prompt: str, system_prompt: str = "You are a helpful assistant.") -> Optional[str]:
+    async def generate_response(
+        self,
+        prompt: str,
+        system_prompt: str = "You are a helpful assistant.",
+        cache_namespace: Optional[str] = None,
+        cache_ttl: Optional[float] = None,
+    ) -> Optional[str]:
         """
         Generate a response using OpenRouter API.
         Automatically switches to fallback models on failure.
+        cache_namespace — кэшировать ответ (llm_cache) под этим namespace; None — без кэша.
         """
+        if cache_namespace is None:
+            return await self._generate_with_fallback(prompt, system_prompt)
+        key = make_cache_key(cache_namespace, self.model, system_prompt, prompt)
+        answered_by = []
+
+        async def compute():
+            model_name, content = await self._generate_with_model(prompt, system_prompt)
+            answered_by.append(model_name)
+            return content
+
+        # Ключ — основная модель: ответ fallback-модели под ним не кэшируем
+        return await llm_cache.get_or_compute(
+            key,
+            compute,
+            ttl=cache_ttl,
+            namespace=cache_namespace,
+            cacheable=lambda content: content is not None and answered_by == [self.model],
+        )
+
+    async def _generate_with_fallback(self, prompt: str, system_prompt: str) -> Optional[str]:
+        _, content = await self._generate_with_model(prompt, system_prompt)
+        return content
+
+    async def _generate_with_model(self, prompt: str, system_prompt: str) -> Tuple[Optional[str], Optional[str]]:
+        """(модель, ответ) — какая модель из цепочки fallback ответила; (None, None), если никакая."""
         # Formulate list of models: Primary -> Fallback List
         models_to_try = [self.model] + settings.FALLBACK_MODELS
         models_to_try = list(dict.fromkeys(models_to_try))  # Dedup
@@ -44,7 +81,7 @@ class LLMClient:
                     if model_name != self.model:
                         logger.warning(f"⚠️ [GWEN NOTICE] Successfully used fallback model: {model_name}")
                     
-                    return content
+                    return model_name, content
                 
             except Exception as e:
                 logger.error(f"❌ Model {model_name} failed: {e}")
@@ -52,7 +89,7 @@ class LLMClient:
                 # Continue to next model...
         
         logger.error("🔥 All LLM models failed to generate a response.")
-        return None
+        return None, None
 
     async def _generate_openrouter(self, model_name: str, prompt: str, system_prompt: str) -> Optional[str]:
         payload = {
@@ -65,35 +102,56 @@ class LLMClient:
             "max_tokens": 8000
         }
         
-        async with httpx.AsyncClient(timeout=45.0) as client:
-            response = await client.post(
-                self.base_url,
-                headers=self.headers,
-                json=payload
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"HTTP {response.status_code}: {response.text}")
-                
-            data = response.json()
+        # Общий клиент с keep-alive/HTTP2 вместо нового соединения (TCP+TLS) на каждый запрос
+        client = get_http_client(self.base_url)
+        response = await client.post(
+            self.base_url,
+            headers=self.headers,
+            json=payload
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
             
-            if "error" in data:
-                error_msg = data.get("error", {}).get("message", str(data))
-                raise Exception(f"Provider Error: {error_msg}")
+        data = response.json()
+        
+        if "error" in data:
+            error_msg = data.get("error", {}).get("message", str(data))
+            raise Exception(f"Provider Error: {error_msg}")
 
-            if "choices" in data and len(data["choices"]) > 0:
-                return self._validate_content(data["choices"][0]["message"]["content"], model_name)
-            
-            return None
+        if "choices" in data and len(data["choices"]) > 0:
+            return self._validate_content(data["choices"][0]["message"]["content"], model_name)
+        
+        return None
 
     async def call_api(self, model: str, prompt: str, text: str, timeout: float = 10.0) -> dict:
         """Structured call to OpenRouter with integrated parsing."""
-        system_prompt = "Ты — экспертный фильтр лидов. Отвечай только СТРОГО валидным JSON."
+        system_prompt = LEAD_FILTER_SYSTEM_PROMPT
         full_prompt = f"{prompt}\n\nТЕКСТ СООБЩЕНИЯ:\n{text}"
         
         response = await self._generate_openrouter(model, full_prompt, system_prompt)
         return self._parse_json_safe(response)
 
+    async def call_ollama(self, prompt: str, text: str, timeout: float = 10.0) -> dict:
+        """Тот же структурированный вызов через локальный Ollama (/api/chat)."""
+        system_prompt = LEAD_FILTER_SYSTEM_PROMPT
+        url = f"{settings.OLLAMA_URL.rstrip('/')}/api/chat"
+        payload = {
+            "model": settings.OLLAMA_MODEL,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"{prompt}\n\nТЕКСТ СООБЩЕНИЯ:\n{text}"}
+            ],
+            "stream": False,
+            "options": {"temperature": 0.3}
+        }
+        client = get_http_client(url)
+        response = await client.post(url, json=payload, timeout=httpx.Timeout(timeout, connect=2.0))
+        if response.status_code != 200:
+            raise Exception(f"Ollama HTTP {response.status_code}: {response.text[:200]}")
+        content = response.json().get("message", {}).get("content")
+        return self._parse_json_safe(self._validate_content(content, settings.OLLAMA_MODEL))
+
     def _parse_json_safe(self, text: Optional[str]) -> dict:
         """Безопасное извлечение JSON из текста ответа."""
         if not text:
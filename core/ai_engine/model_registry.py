@@ -0,0 +1,223 @@
+"""
+Реестр локальных моделей (rubert-tiny и др.): одна копия весов на процесс.
+
+Раньше один и тот же rubert-tiny загружался несколько раз: SentenceTransformer
+в DuplicateDetector, AutoModelForSequenceClassification в BERTLeadClassifier
+(при импорте модуля), плюс NER-pipeline в bert_ner. Реестр владеет
+токенайзерами и backbone-моделями и отдаёт их по имени:
+
+    encoder = model_registry.sentence_encoder(settings.ENCODER_MODEL)   # эмбеддинги дедупа
+    tokenizer, backbone = model_registry.backbone(settings.ENCODER_MODEL)  # тот же BertModel
+    model_registry.memory_report()   # {"sentence:cointegrated/rubert-tiny": {"params_mb": ..., ...}}
+
+- загрузка ленивая: импорт модуля ничего не грузит, модель поднимается при
+  первом обращении (под блокировкой — параллельные потоки ждут одну загрузку);
+- backbone() берётся из того же SentenceTransformer, поэтому эмбеддинги
+  дедупа и голова классификатора работают на одном наборе весов;
+- set_num_threads() (или settings.TORCH_NUM_THREADS) применяется до первой загрузки;
+- бэкенд инференса (torch | int8 | onnx, settings.MODEL_INFERENCE_BACKEND)
+  применяется к backbone при загрузке — см. inference_backends.py.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core.ai_engine.inference_backends import apply_backend, resolve_backend
+from core.config.settings import settings
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+_MB = 1024 * 1024
+
+
+def _rss_bytes() -> int:
+    """Текущий RSS процесса (Linux /proc; иначе пиковый RSS из getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return 0
+
+
+def _tensor_bytes(model) -> int:
+    """Размер весов torch-модели по state_dict (учитывает упакованные INT8-веса; 0 — не nn.Module)."""
+    state_dict = getattr(model, "state_dict", None)
+    if state_dict is None:
+        return 0
+    total = 0
+    seen = set()
+
+    def add(value):
+        nonlocal total
+        if isinstance(value, (tuple, list)):
+            for item in value:
+                add(item)
+        elif hasattr(value, "data_ptr") and value.data_ptr() not in seen:
+            seen.add(value.data_ptr())
+            total += value.numel() * value.element_size()
+
+    for value in state_dict().values():
+        add(value)
+    return total
+
+
+class ModelRegistry:
+    """Ленивая загрузка и общий доступ к локальным моделям."""
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._info: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._num_threads: Optional[int] = None
+        self._device = None
+
+    # ---------- torch ----------
+
+    def set_num_threads(self, num_threads: int):
+        """Число потоков intra-op torch (0 — не трогать дефолт torch)."""
+        self._num_threads = num_threads
+        if num_threads and num_threads > 0:
+            import torch
+            torch.set_num_threads(num_threads)
+            logger.info("torch_threads_set", num_threads=num_threads)
+
+    def _prepare_torch(self):
+        if self._num_threads is None:
+            self.set_num_threads(settings.TORCH_NUM_THREADS)
+
+    @property
+    def device(self):
+        if self._device is None:
+            import torch
+            self._device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        return self._device
+
+    # ---------- загрузка ----------
+
+    def _load(self, key: str, loader: Callable[[], Any], memory_of: Callable[[Any], Any] = None) -> Any:
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+            self._prepare_torch()
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - start
+            params = _tensor_bytes(memory_of(model) if memory_of else model)
+            self._info[key] = {
+                "load_seconds": round(load_seconds, 3),
+                "params_mb": round(params / _MB, 1),
+                "rss_delta_mb": round(max(0, _rss_bytes() - rss_before) / _MB, 1),
+            }
+            self._models[key] = model
+            logger.info("model_loaded", key=key, device=str(self.device), **self._info[key])
+            return model
+
+    @staticmethod
+    def _key(kind: str, name: str, backend: str) -> str:
+        return f"{kind}:{name}" if backend == "torch" else f"{kind}:{name}@{backend}"
+
+    def sentence_encoder(self, name: str, backend: Optional[str] = None):
+        """
+        SentenceTransformer (эмбеддинги); его backbone переиспользует backbone().
+        backend — torch | int8 | onnx (по умолчанию settings.MODEL_INFERENCE_BACKEND).
+        """
+        backend = resolve_backend(backend)
+
+        def loader():
+            from sentence_transformers import SentenceTransformer
+            encoder = SentenceTransformer(name, device=str(self.device))
+            apply_backend(encoder, encoder[0].auto_model, backend, name)
+            return encoder
+        return self._load(self._key("sentence", name, backend), loader)
+
+    def backbone(self, name: str, backend: Optional[str] = None) -> Tuple[Any, Any]:
+        """(tokenizer, BertModel) — те же веса (и бэкенд), что у sentence_encoder(name)."""
+        backend = resolve_backend(backend)
+        encoder = self.sentence_encoder(name, backend)  # грузим заранее, чтобы не учесть его память дважды
+
+        def loader():
+            transformer = encoder[0]
+            tokenizer = getattr(transformer, "tokenizer", None)
+            if tokenizer is None:
+                from transformers import AutoTokenizer
+                tokenizer = AutoTokenizer.from_pretrained(name)
+            return tokenizer, transformer.auto_model
+        key = self._key("backbone", name, backend)
+        pair = self._load(key, loader, memory_of=lambda p: None)
+        self._info[key]["shared_with"] = self._key("sentence", name, backend)
+        return pair
+
+    def sequence_classifier(self, name: str, num_labels: int = 2, backend: Optional[str] = None) -> Tuple[Any, Any]:
+        """(tokenizer, AutoModelForSequenceClassification) для дообученных чекпоинтов."""
+        backend = resolve_backend(backend)
+
+        def loader():
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+            model = AutoModelForSequenceClassification.from_pretrained(name, num_labels=num_labels)
+            model.to(self.device)
+            model.eval()
+            apply_backend(model, model.base_model, backend, name)
+            return AutoTokenizer.from_pretrained(name), model
+        return self._load(self._key("classifier", name, backend), loader, memory_of=lambda pair: pair[1])
+
+    def pipeline(self, task: str, name: str, **kwargs):
+        """transformers.pipeline(task, model=name) — один экземпляр на (task, name)."""
+        def loader():
+            from transformers import pipeline
+            device = 0 if self.device.type == "cuda" else -1
+            return pipeline(task, model=name, tokenizer=name, device=device, **kwargs)
+        return self._load(f"pipeline:{task}:{name}", loader, memory_of=lambda p: p.model)
+
+    def is_fine_tuned_classifier(self, name: str) -> bool:
+        """True, если чекпоинт уже содержит обученную голову классификации."""
+        try:
+            from transformers import AutoConfig
+            architectures = AutoConfig.from_pretrained(name).architectures or []
+        except Exception:
+            return False
+        return any(arch.endswith("ForSequenceClassification") for arch in architectures)
+
+    def embedding_dim(self, name: str, default: int = 312) -> int:
+        """Размерность эмбеддингов без загрузки весов (по config.json)."""
+        encoder = self._models.get(f"sentence:{name}")
+        if encoder is not None:
+            return encoder.get_sentence_embedding_dimension() or default
+        try:
+            from transformers import AutoConfig
+            return AutoConfig.from_pretrained(name).hidden_size
+        except Exception:
+            return default
+
+    # ---------- наблюдаемость ----------
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self._models
+
+    def memory_report(self) -> Dict[str, Dict[str, Any]]:
+        """Память по загруженным моделям: params_mb (веса), rss_delta_mb (прирост RSS при загрузке)."""
+        return {key: dict(info) for key, info in self._info.items()}
+
+    def clear(self):
+        """Выгружает все модели (тесты, смена конфигурации)."""
+        with self._lock:
+            self._models.clear()
+            self._info.clear()
+
+
+# Глобальный реестр
+model_registry = ModelRegistry()
@@ -4,7 +4,8 @@ Resilient LLM Client с Circuit Breaker pattern для защиты от API fai
 """
 
 from pybreaker import CircuitBreaker
-from core.ai_engine.llm_client import LLMClient
+from core.ai_engine.llm_client import LEAD_FILTER_SYSTEM_PROMPT, LLMClient
+from core.utils.llm_cache import llm_cache, make_cache_key
 from core.utils.structured_logger import get_logger
 import time
 import asyncio
@@ -12,6 +13,17 @@ import asyncio
 logger = get_logger(__name__)
 
 
+PRIMARY_MODEL = "deepseek/deepseek-chat"
+
+
+def _is_primary_result(result: dict) -> bool:
+    """
+    Кэшируем только разобранные ответы primary-модели: ключ построен по
+    PRIMARY_MODEL, и ответ Ollama под ним выдавался бы за ответ OpenRouter.
+    """
+    return result.get("method") == "openrouter" and result.get("role") not in ("ERROR", "PARSE_ERROR")
+
+
 class ResilientLLMClient:
     """
     LLM клиент с защитой от сбоев через Circuit Breaker pattern.
@@ -80,8 +92,30 @@ class ResilientLLMClient:
     ) -> dict:
         """
         Multi-level fallback для максимальной надежности.
+        Ответы OpenRouter кэшируются (llm_cache, namespace "lead_analysis");
+        Ollama, эвристический fallback и ошибки парсинга — нет.
         """
         start_time = time.time()
+        key = make_cache_key(
+            "lead_analysis", PRIMARY_MODEL,
+            LEAD_FILTER_SYSTEM_PROMPT, prompt, text=text
+        )
+        hits = []
+        result = await llm_cache.get_or_compute(
+            key,
+            lambda: self._call_providers(prompt, text, timeout),
+            namespace="lead_analysis",
+            cacheable=_is_primary_result,
+            on_hit=lambda: hits.append(True),
+        )
+        # Ожидавший чужой запрос (single-flight) получает свежий ответ, а не кэш
+        if hits:
+            result["method"] = f"{result.get('method')}_cached"
+            result["latency_ms"] = int((time.time() - start_time) * 1000)
+        return result
+
+    async def _call_providers(self, prompt: str, text: str, timeout: int) -> dict:
+        start_time = time.time()
         
         # Попытка 1: OpenRouter
         try:
@@ -133,7 +167,7 @@ class ResilientLLMClient:
     async def _call_openrouter(self, prompt: str, text: str, timeout: int) -> dict:
         with self.openrouter_breaker.calling():
             return await self.primary_client.call_api(
-                model="deepseek/deepseek-chat",
+                model=PRIMARY_MODEL,
                 prompt=prompt,
                 text=text,
                 timeout=timeout
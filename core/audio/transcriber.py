@@ -1,7 +1,6 @@
 
 import os
 import asyncio
-import whisper
 from core.utils.logger import logger
 from core.config.settings import settings
 
@@ -26,6 +25,7 @@ class Transcriber:
              # Можно вынести в настройки: settings.WHISPER_MODEL
             logger.info(f"⏳ Loading Whisper model '{model_name}'...")
             try:
+                import whisper  # тянет torch — только при первой транскрибации
                 self._model = whisper.load_model(model_name)
                 logger.info(f"✅ Whisper model '{model_name}' loaded successfully.")
             except Exception as e:
@@ -84,6 +84,25 @@ class Settings(BaseSettings):
     
     OPENAI_API_KEY: str = ""  # For Whisper STT (optional)
 
+    # Локальный Ollama (fallback для ResilientLLMClient)
+    OLLAMA_URL: str = "http://localhost:11434"
+    OLLAMA_MODEL: str = "llama3.1:8b"
+
+    # Общий HTTP-пул к LLM-провайдерам (core/ai_engine/http_pool.py); HTTP/2 — если установлен h2
+    LLM_HTTP2: bool = True
+    LLM_HTTP_MAX_CONNECTIONS_PER_HOST: int = 20
+    LLM_HTTP_MAX_KEEPALIVE_PER_HOST: int = 10
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_HTTP_CONNECT_TIMEOUT: float = 5.0
+    LLM_HTTP_READ_TIMEOUT: float = 45.0
+    LLM_HTTP_WRITE_TIMEOUT: float = 10.0
+    LLM_HTTP_POOL_TIMEOUT: float = 10.0
+
+    # Кэш ответов LLM (core/utils/llm_cache.py): LRU в памяти + SQLite data/db/llm_cache.db
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MEMORY_SIZE: int = 2048
+    LLM_CACHE_TTL_HOURS: float = 24.0
+
     # Database
     @property
     def DATABASE_PATH(self) -> Path:
@@ -101,9 +120,92 @@ class Settings(BaseSettings):
     @property
     def VACANCY_DB_PATH(self) -> Path:
         return self.DB_DIR / "vacancies.db"
+
+    @property
+    def ML_ONLINE_MODEL_PATH(self) -> Path:
+        return self.DATA_DIR / "models" / "ml_online.pkl"
     
+    # Векторный индекс дедупликации: numpy (плотная матрица) | hnsw (нужен hnswlib)
+    DEDUP_INDEX_BACKEND: str = "numpy"
+
+    # Локальные модели (core/ai_engine/model_registry.py): общий энкодер дедупа и BERT-классификатора
+    ENCODER_MODEL: str = "cointegrated/rubert-tiny"
+    BERT_CLASSIFIER_MODEL: str = "cointegrated/rubert-tiny"  # или путь к дообученному чекпоинту
+    TORCH_NUM_THREADS: int = 0  # 0 — дефолт torch (все ядра)
+    # Бэкенд инференса backbone: torch (float32) | int8 (динамическая квантизация) | onnx (нужен onnxruntime)
+    MODEL_INFERENCE_BACKEND: str = "torch"
+
+    # BERT micro-batching: сколько ждать попутчиков и максимальный размер батча
+    BERT_BATCH_WAIT_MS: float = 5.0
+    BERT_MAX_BATCH_SIZE: int = 32
+
+    # ML-классификатор (systems/parser/ml_classifier.py): online — HashingVectorizer + SGD partial_fit
+    # на каждой ручной разметке; false — TF-IDF + LogisticRegression с полным переобучением
+    ML_ONLINE_LEARNING: bool = True
+    ML_HASHING_FEATURES: int = 2 ** 18
+    ML_CHECKPOINT_EVERY: int = 25  # сохранять online-модель на диск каждые N обновлений
+
+    # Change feed vacancies.db (systems/parser/change_feed.py): проверка PRAGMA data_version,
+    # страховочный пересмотр очереди подписчиками без событий и срок хранения outbox
+    CHANGE_FEED_POLL_MS: int = 200
+    CHANGE_FEED_RESCAN_SEC: int = 300
+    CHANGE_FEED_RETENTION_DAYS: int = 7
+
+    # Детектор блокировок event loop (core/utils/loop_monitor.py): колбэки дольше порога пишутся в лог
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_SLOW_CALLBACK_MS: float = 50.0
+
+    # Пул соединений SQLite (vacancies.db): один writer + N readers
+    SQLITE_POOL_READERS: int = 4
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 16384
+
+    # Group commit для add_accepted/add_rejected в парсерах
+    VACANCY_WRITE_BATCH_SIZE: int = 500
+    VACANCY_WRITE_MAX_DELAY_MS: float = 500.0
+    VACANCY_WRITE_MAX_PENDING: int = 5000
+
+    # Индекс «уже видели» перед is_processed: Bloom по hash + MinHash/LSH
+    SEEN_BLOOM_CAPACITY: int = 2_000_000
+    SEEN_BLOOM_ERROR_RATE: float = 0.001
+    SEEN_INDEX_SYNC_SECONDS: float = 5.0
+    SEEN_INDEX_SAVE_SECONDS: float = 60.0
+
+    # Конвейер today_parser: fetch (N чатов) → cpu (пул thread|process) → db → outreach
+    PARSER_FETCH_CONCURRENCY: int = 4
+    PARSER_CPU_EXECUTOR: str = "thread"
+    PARSER_CPU_WORKERS: int = 2
+    PARSER_OUTREACH_CONCURRENCY: int = 1
+    PARSER_QUEUE_SIZE: int = 500
+    PARSER_REQUEST_INTERVAL: float = 0.25  # мин. интервал между запросами истории (общий на аккаунт)
+    PARSER_METRICS_INTERVAL: float = 30.0
+
+    # Потоковый авто-outreach (systems/alexey/vacancy_stream.py): on_channel_message → очередь → воркеры;
+    # пропуски дочитываются get_chat_history не дальше GAP_LIMIT сообщений и GAP_MAX_AGE_HOURS на чат
+    VACANCY_STREAM_QUEUE_SIZE: int = 1000
+    VACANCY_STREAM_WORKERS: int = 2
+    VACANCY_STREAM_GAP_LIMIT: int = 200
+    VACANCY_STREAM_GAP_MAX_AGE_HOURS: float = 24.0
+
+    # Кэш разрешения peer'ов Telegram (core/telegram/peer_cache.py): LRU + data/db/peer_cache.db
+    PEER_CACHE_TTL_HOURS: float = 24.0
+    PEER_CACHE_NEGATIVE_TTL_HOURS: float = 1.0  # «username не существует» — не спрашиваем повторно
+    PEER_CACHE_MEMORY_SIZE: int = 4096
+    PEER_CACHE_DIALOG_SCAN_COOLDOWN_MINUTES: float = 5.0  # неизвестное название чата — диалоги не чаще раза в N минут
+
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Общие лимиты отправки для всех процессов аккаунта (systems/alexey/rate_limit_backend.py):
+    # auto — Redis, при недоступности SQLite-файл в DB_DIR; redis | sqlite | local (только процесс)
+    RATE_LIMIT_BACKEND: str = "auto"
+    RATE_LIMIT_ACCOUNT: str = "alexey"  # префикс ключей: процессы одного аккаунта делят buckets
+
+    # Пул аккаунтов для исходящих (core/telegram/session_pool.py): дополнительные сессии через запятую
+    # (data/sessions/<имя>_pyrogram.txt или <имя>.session); основной аккаунт входит в пул всегда
+    SESSION_POOL_ACCOUNTS: str = ""
+    SESSION_POOL_REPLICAS: int = 64  # виртуальных узлов аккаунта на кольце консистентного хеширования
+    SESSION_POOL_FLOOD_COOLDOWN: int = 3600  # сколько аккаунт не берёт новых лидов после PeerFlood, сек
     
     # Supervisor Bot (для уведомлений об ошибках)
     SUPERVISOR_BOT_TOKEN: Optional[str] = None
@@ -138,6 +240,12 @@ class Settings(BaseSettings):
             return []
         return [x.strip().lstrip('@').lower() for x in self.BLACKLISTED_USERNAMES.split(",") if x.strip()]
     
+    @property
+    def session_pool_accounts(self) -> List[str]:
+        if not self.SESSION_POOL_ACCOUNTS:
+            return []
+        return [x.strip() for x in self.SESSION_POOL_ACCOUNTS.split(",") if x.strip()]
+
     @property
     def admin_ids(self) -> List[int]:
         if not self.ADMIN_IDS:
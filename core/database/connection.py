@@ -1,5 +1,5 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy import event
+from sqlalchemy import event, text
 from core.config.settings import settings
 from core.database.models import Base
 
@@ -23,6 +23,8 @@ async def init_db():
     """Initialize database and create all tables."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all не добавляет индексы в уже существующие таблицы
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_leads_username ON leads (username)"))
 
 async def get_session():
     """Dependency for getting database session."""
@@ -37,7 +37,7 @@ class Lead(Base, TimestampMixin):
     
     id: Mapped[int] = mapped_column(primary_key=True)
     telegram_id: Mapped[int] = mapped_column(Integer, unique=True)
-    username: Mapped[Optional[str]] = mapped_column(String(100))
+    username: Mapped[Optional[str]] = mapped_column(String(100), index=True)
     full_name: Mapped[Optional[str]] = mapped_column(String(255))
     last_interaction: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     lead_score: Mapped[float] = mapped_column(Float, default=0.0)
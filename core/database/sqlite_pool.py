@@ -0,0 +1,180 @@
+"""
+Пул долгоживущих соединений aiosqlite.
+
+Один writer (все записи сериализуются через asyncio.Lock — SQLite всё равно
+допускает только одного писателя) и N readers, которые в WAL-режиме читают
+параллельно с записью. Соединения открываются один раз на процесс, получают
+настроенные PRAGMA и кэш подготовленных выражений sqlite3 (cached_statements),
+поэтому повторные запросы с одинаковым SQL не парсятся заново.
+
+    pool = get_pool(path, init_fn=create_schema)
+    async with pool.reader() as db: ...
+    async with pool.writer() as db: ...   # commit при выходе, rollback при ошибке
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import aiosqlite
+
+from core.config.settings import settings
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+# Размер LRU-кэша подготовленных выражений на соединение (у sqlite3 по умолчанию 128)
+STATEMENT_CACHE_SIZE = 256
+
+
+def default_pragmas() -> Dict[str, object]:
+    return {
+        "synchronous": "NORMAL",
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,  # отрицательное значение — в KiB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    }
+
+
+class SQLitePool:
+    """
+    Пул соединений к одному файлу БД.
+
+    Очередь читателей и lock писателя привязаны к текущему event loop и
+    пересоздаются при его смене; сами соединения aiosqlite от loop не зависят.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        readers: Optional[int] = None,
+        pragmas: Optional[Dict[str, object]] = None,
+        init_fn: Optional[Callable[[aiosqlite.Connection], Awaitable[None]]] = None,
+    ):
+        self.db_path = str(db_path)
+        self.in_memory = self.db_path == ":memory:"
+        # У каждого соединения к :memory: своя база — читаем через writer
+        self.reader_count = 0 if self.in_memory else (
+            readers if readers is not None else settings.SQLITE_POOL_READERS
+        )
+        self.pragmas = pragmas if pragmas is not None else default_pragmas()
+        self.init_fn = init_fn
+
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._open_lock: Optional[asyncio.Lock] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._opened = False
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._open_lock = asyncio.Lock()
+            self._write_lock = asyncio.Lock()
+            self._idle = asyncio.Queue()
+            for conn in self._readers:
+                self._idle.put_nowait(conn)
+
+    async def _connect(self, read_only: bool) -> aiosqlite.Connection:
+        conn = aiosqlite.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
+        # Поток соединения живёт весь процесс: делаем его daemon, чтобы незакрытый
+        # пул не блокировал выход интерпретатора (в aiosqlite < 0.20 Connection сам — Thread)
+        getattr(conn, "_thread", conn).daemon = True
+        await conn
+        for name, value in self.pragmas.items():
+            await conn.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            await conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    async def open(self):
+        """Открывает соединения и один раз выполняет init_fn (схема/миграции)."""
+        self._bind_loop()
+        if self._opened:
+            return
+        async with self._open_lock:
+            if self._opened:
+                return
+            writer = await self._connect(read_only=False)
+            if not self.in_memory:
+                # Курсор PRAGMA возвращает строку: незакрытый держит блокировку и не даёт открыть readers
+                async with writer.execute("PRAGMA journal_mode=WAL"):
+                    pass
+            if self.init_fn is not None:
+                await self.init_fn(writer)
+                await writer.commit()
+            self._writer = writer
+
+            for _ in range(self.reader_count):
+                conn = await self._connect(read_only=True)
+                self._readers.append(conn)
+                self._idle.put_nowait(conn)
+
+            self._opened = True
+            logger.info("sqlite_pool_opened", db=self.db_path, readers=self.reader_count)
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Соединение только для чтения из пула."""
+        await self.open()
+        if not self._readers:
+            async with self._write_lock:
+                yield self._writer
+            return
+
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Единственное пишущее соединение; транзакция коммитится на выходе."""
+        await self.open()
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            else:
+                await self._writer.commit()
+
+    async def close(self):
+        if not self._opened:
+            return
+        for conn in self._readers:
+            await conn.close()
+        await self._writer.close()
+        self._readers = []
+        self._writer = None
+        self._opened = False
+        self._loop = None
+
+
+_pools: Dict[str, SQLitePool] = {}
+
+
+def get_pool(db_path: str, **kwargs) -> SQLitePool:
+    """Общий пул на файл БД для всего процесса (kwargs учитываются при первом вызове)."""
+    key = str(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = SQLitePool(key, **kwargs)
+        _pools[key] = pool
+    return pool
+
+
+async def close_all_pools():
+    """Закрывает все пулы (при остановке приложения)."""
+    for key in list(_pools):
+        pool = _pools.pop(key)
+        try:
+            await pool.close()
+        except Exception as e:
+            logger.error("sqlite_pool_close_failed", db=key, error=str(e))
@@ -0,0 +1,389 @@
+"""
+peer_cache.py — Кэш разрешения идентичностей Telegram.
+
+username ↔ user_id, названия чатов → chat_id и признаки peer'а (бот, тип чата)
+хранятся в таблице peers (data/db/peer_cache.db, индексы по username и title)
+с LRU в памяти перед ней. Запись старше PEER_CACHE_TTL_HOURS перезапрашивается
+при следующем обращении; если Telegram недоступен — отдаётся устаревшая.
+Ненайденные username запоминаются на PEER_CACHE_NEGATIVE_TTL_HOURS, чтобы не
+повторять заведомо пустой запрос. Параллельные разрешения одного peer'а
+объединяются в один вызов API.
+
+    peer = await peer_cache.resolve_user(client, "username")   # get_users только при промахе
+    chat_id = await peer_cache.resolve_chat_title(client, "Вакансии SEO")
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+import aiosqlite
+from sqlalchemy import or_
+
+from core.config.settings import settings
+from core.database.sqlite_pool import get_pool
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+PeerRef = Union[str, int]
+
+# Ошибки Telegram, после которых peer считается несуществующим (негативный кэш)
+_MISSING_ERRORS = ("USERNAME_NOT_OCCUPIED", "USERNAME_INVALID", "PEER_ID_INVALID")
+
+# ChatType Pyrogram → kind: личный диалог — это пользователь
+_CHAT_KINDS = {"private": "user", "bot": "bot", "group": "group", "supergroup": "supergroup", "channel": "channel"}
+_GROUP_KINDS = {"group", "supergroup", "channel"}
+
+
+async def _init_schema(db: aiosqlite.Connection):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS peers (
+            peer_id INTEGER PRIMARY KEY,
+            username TEXT,
+            title TEXT,
+            kind TEXT NOT NULL,
+            is_bot INTEGER DEFAULT 0,
+            resolved_at REAL NOT NULL,
+            last_used_at REAL
+        )
+    """)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_peers_username ON peers(username COLLATE NOCASE)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_peers_title ON peers(title)")
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS peer_misses (
+            ref TEXT PRIMARY KEY,
+            expires_at REAL NOT NULL
+        )
+    """)
+
+
+def normalize_ref(ref: PeerRef) -> str:
+    """Ключ обращения: id:<число> или @<username в нижнем регистре>."""
+    value = str(ref).strip()
+    if value.lstrip("-").isdigit():
+        return f"id:{int(value)}"
+    if "t.me/" in value:
+        value = value.rstrip("/").split("/")[-1]
+    return "@" + value.lstrip("@").lower()
+
+
+def lead_filter(ref: PeerRef):
+    """
+    Условие поиска лида по username или telegram_id. Без CAST telegram_id — оба
+    сравнения идут по индексам leads (telegram_id unique, ix_leads_username).
+    """
+    from core.database.models import Lead
+
+    value = str(ref).strip().lstrip("@")
+    if value.isdigit():
+        return or_(Lead.telegram_id == int(value), Lead.username == value)
+    return Lead.username == value
+
+
+@dataclass
+class Peer:
+    peer_id: int
+    username: Optional[str]
+    title: Optional[str]
+    kind: str  # user | bot | group | supergroup | channel
+    is_bot: bool
+    resolved_at: float
+
+    @property
+    def is_person(self) -> bool:
+        """Живой пользователь: не бот, не группа/канал."""
+        return not self.is_bot and self.kind not in _GROUP_KINDS
+
+
+def peer_from_user(user) -> Peer:
+    """Pyrogram User (или raw User из GetBlocked) → Peer."""
+    is_bot = bool(getattr(user, "is_bot", None) or getattr(user, "bot", None))
+    title = " ".join(filter(None, [getattr(user, "first_name", None), getattr(user, "last_name", None)])) or None
+    return Peer(user.id, getattr(user, "username", None), title, "bot" if is_bot else "user", is_bot, time.time())
+
+
+def peer_from_chat(chat) -> Peer:
+    """Pyrogram Chat → Peer (для личных диалогов title — имя собеседника)."""
+    chat_type = getattr(getattr(chat, "type", None), "name", "chat").lower()
+    kind = _CHAT_KINDS.get(chat_type, chat_type)
+    title = getattr(chat, "title", None) or getattr(chat, "first_name", None)
+    return Peer(chat.id, getattr(chat, "username", None), title, kind, kind == "bot", time.time())
+
+
+class PeerCache:
+    """Двухуровневый кэш peer'ов: LRU в памяти → SQLite → Telegram API."""
+
+    def __init__(self, db_path: Optional[str] = None, memory_size: Optional[int] = None,
+                 ttl_hours: Optional[float] = None, negative_ttl_hours: Optional[float] = None,
+                 scan_cooldown_minutes: Optional[float] = None):
+        # Путь к БД резолвится лениво — импорт модуля не создаёт каталогов
+        self._db_path = db_path
+        self.memory_size = memory_size or settings.PEER_CACHE_MEMORY_SIZE
+        self.ttl = (ttl_hours if ttl_hours is not None else settings.PEER_CACHE_TTL_HOURS) * 3600
+        self.negative_ttl = (negative_ttl_hours if negative_ttl_hours is not None
+                             else settings.PEER_CACHE_NEGATIVE_TTL_HOURS) * 3600
+        self.scan_cooldown = (scan_cooldown_minutes if scan_cooldown_minutes is not None
+                              else settings.PEER_CACHE_DIALOG_SCAN_COOLDOWN_MINUTES) * 60
+        self._memory: "OrderedDict[str, Optional[Peer]]" = OrderedDict()
+        self._miss_expires: Dict[str, float] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._dialogs_scanned_at = 0.0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "negative_hits": 0, "api_calls": 0,
+                      "refreshes": 0, "coalesced": 0, "errors": 0}
+
+    @property
+    def db_path(self) -> str:
+        if self._db_path is None:
+            self._db_path = str(settings.DB_DIR / "peer_cache.db")
+        return self._db_path
+
+    async def _pool(self):
+        pool = get_pool(self.db_path, readers=1, init_fn=_init_schema)
+        await pool.open()
+        return pool
+
+    def _remember(self, key: str, peer: Optional[Peer]):
+        self._memory[key] = peer
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _fresh(self, peer: Peer) -> bool:
+        return time.time() - peer.resolved_at < self.ttl
+
+    # ---------- чтение ----------
+
+    async def get(self, ref: PeerRef, count_hit: bool = True) -> Optional[Peer]:
+        """Peer из кэша (возможно устаревший по TTL) или None; count_hit=False — без учёта в stats."""
+        key = normalize_ref(ref)
+        peer = self._memory.get(key)
+        if peer is not None:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += count_hit
+            return peer
+
+        if key.startswith("id:"):
+            query, arg = "SELECT peer_id, username, title, kind, is_bot, resolved_at FROM peers WHERE peer_id = ?", int(key[3:])
+        else:
+            query, arg = ("SELECT peer_id, username, title, kind, is_bot, resolved_at FROM peers "
+                          "WHERE username = ? COLLATE NOCASE ORDER BY resolved_at DESC LIMIT 1", key[1:])
+        row = None
+        try:
+            pool = await self._pool()
+            async with pool.reader() as db:
+                async with db.execute(query, (arg,)) as cursor:
+                    row = await cursor.fetchone()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("peer_cache_read_failed", error=str(e))
+        if row is None:
+            return None
+        peer = Peer(row[0], row[1], row[2], row[3], bool(row[4]), row[5])
+        self._remember(key, peer)
+        self.stats["disk_hits"] += count_hit
+        return peer
+
+    async def _is_known_missing(self, key: str) -> bool:
+        expires = self._miss_expires.get(key)
+        if expires is None:
+            try:
+                pool = await self._pool()
+                async with pool.reader() as db:
+                    async with db.execute("SELECT expires_at FROM peer_misses WHERE ref = ?", (key,)) as cursor:
+                        row = await cursor.fetchone()
+            except Exception:
+                row = None
+            if row is None:
+                return False
+            expires = self._miss_expires[key] = row[0]
+        return expires > time.time()
+
+    # ---------- запись ----------
+
+    async def put(self, peer: Peer):
+        """Сохраняет peer под id и username (название чата — в таблице для поиска по title)."""
+        await self.put_many([peer])
+
+    async def put_many(self, peers: List[Peer]):
+        """Как put, но все peer'ы одной транзакцией writer'а."""
+        if not peers:
+            return
+        now = time.time()
+        for peer in peers:
+            self._remember(f"id:{peer.peer_id}", peer)
+            if peer.username:
+                username_key = "@" + peer.username.lower()
+                self._remember(username_key, peer)
+                self._miss_expires.pop(username_key, None)
+        try:
+            pool = await self._pool()
+            async with pool.writer() as db:
+                await db.executemany("""
+                    INSERT OR REPLACE INTO peers (peer_id, username, title, kind, is_bot, resolved_at, last_used_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [(p.peer_id, p.username, p.title, p.kind, int(p.is_bot), p.resolved_at, now) for p in peers])
+                misses = [("@" + p.username.lower(),) for p in peers if p.username]
+                if misses:
+                    await db.executemany("DELETE FROM peer_misses WHERE ref = ?", misses)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("peer_cache_write_failed", error=str(e))
+
+    async def remember_user(self, user) -> Peer:
+        peer = peer_from_user(user)
+        await self.put(peer)
+        return peer
+
+    async def remember_chat(self, chat) -> Peer:
+        """
+        Сохраняет чат из диалогов. Запись пользователя из get_users не
+        перезаписывается: в ней точнее имя и признак бота, и свой TTL.
+        """
+        peer = peer_from_chat(chat)
+        if peer.kind in ("user", "bot"):
+            known = await self.get(peer.peer_id, count_hit=False)
+            if known is not None and known.kind in ("user", "bot"):
+                return peer
+        await self.put(peer)
+        return peer
+
+    async def _mark_missing(self, key: str):
+        expires_at = time.time() + self.negative_ttl
+        self._miss_expires[key] = expires_at
+        try:
+            pool = await self._pool()
+            async with pool.writer() as db:
+                await db.execute("INSERT OR REPLACE INTO peer_misses (ref, expires_at) VALUES (?, ?)", (key, expires_at))
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("peer_cache_write_failed", error=str(e))
+
+    # ---------- разрешение через Telegram ----------
+
+    async def resolve_user(self, client, ref: PeerRef) -> Optional[Peer]:
+        """
+        Peer по username/id: кэш, иначе client.get_users. Устаревшая запись
+        обновляется, а при ошибке API отдаётся как есть; None — peer не найден.
+        """
+        key = normalize_ref(ref)
+        cached = await self.get(ref)
+        if cached is not None and self._fresh(cached):
+            return cached
+        if cached is None and await self._is_known_missing(key):
+            self.stats["negative_hits"] += 1
+            return None
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            peer = await self._fetch_user(client, ref, key, cached)
+            future.set_result(peer)
+            return peer
+        finally:
+            if not future.done():
+                future.set_result(cached)
+            self._inflight.pop(key, None)
+
+    async def _fetch_user(self, client, ref: PeerRef, key: str, cached: Optional[Peer]) -> Optional[Peer]:
+        self.stats["api_calls"] += 1
+        if cached is not None:
+            self.stats["refreshes"] += 1
+        lookup = int(key[3:]) if key.startswith("id:") else key[1:]
+        try:
+            user = await client.get_users(lookup)
+        except Exception as e:
+            logger.debug("peer_cache_resolve_failed", ref=str(ref), error=str(e)[:200])
+            if cached is None and any(code in str(e).upper() for code in _MISSING_ERRORS):
+                await self._mark_missing(key)
+            return cached
+        if isinstance(user, list):
+            user = user[0] if user else None
+        if user is None:
+            await self._mark_missing(key)
+            return None
+        peer = await self.remember_user(user)
+        if key.startswith("@") and (peer.username or "").lower() != key[1:]:
+            self._remember(key, peer)  # обращение по старому/альтернативному username
+        return peer
+
+    async def resolve_chat_title(self, client, title: str) -> Optional[int]:
+        """
+        chat_id по экранному имени. При промахе диалоги перечитываются не чаще
+        раза в scan_cooldown, и в кэш попадают все чаты сразу — следующие
+        промахи бесплатны, а новый чат находится через несколько минут.
+        """
+        if not title:
+            return None
+        key = "title:" + title
+        peer = self._memory.get(key)
+        if peer is not None:
+            self.stats["memory_hits"] += 1
+            return peer.peer_id
+        try:
+            pool = await self._pool()
+            async with pool.reader() as db:
+                async with db.execute(
+                    "SELECT peer_id, username, title, kind, is_bot, resolved_at FROM peers "
+                    "WHERE title = ? ORDER BY resolved_at DESC LIMIT 1", (title,)
+                ) as cursor:
+                    row = await cursor.fetchone()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("peer_cache_read_failed", error=str(e))
+            row = None
+        if row is not None:
+            peer = Peer(row[0], row[1], row[2], row[3], bool(row[4]), row[5])
+            self._remember(key, peer)
+            self.stats["disk_hits"] += 1
+            return peer.peer_id
+
+        if time.time() - self._dialogs_scanned_at < self.scan_cooldown:
+            return None  # диалоги только что перечитывались — такого чата нет
+        self._dialogs_scanned_at = time.time()
+        self.stats["api_calls"] += 1
+        peers = [peer_from_chat(dialog.chat) async for dialog in client.get_dialogs()]
+        await self._remember_dialogs(peers)
+        for peer in peers:
+            if peer.title:
+                self._remember("title:" + peer.title, peer)
+        return next((peer.peer_id for peer in peers if peer.title == title), None)
+
+    async def _remember_dialogs(self, peers: List[Peer]):
+        """Сохраняет чаты из диалогов одной записью; известных пользователей не трогает (как remember_chat)."""
+        private_ids = [peer.peer_id for peer in peers if peer.kind in ("user", "bot")]
+        known = set()
+        if private_ids:
+            try:
+                pool = await self._pool()
+                async with pool.reader() as db:
+                    for i in range(0, len(private_ids), 500):  # лимит параметров SQLite
+                        chunk = private_ids[i:i + 500]
+                        async with db.execute(
+                            f"SELECT peer_id FROM peers WHERE kind IN ('user', 'bot') "
+                            f"AND peer_id IN ({', '.join('?' * len(chunk))})", chunk
+                        ) as cursor:
+                            known.update(row[0] for row in await cursor.fetchall())
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning("peer_cache_read_failed", error=str(e))
+        for peer_id in private_ids:
+            cached = self._memory.get(f"id:{peer_id}")
+            if cached is not None and cached.kind in ("user", "bot"):
+                known.add(peer_id)
+        await self.put_many([peer for peer in peers if peer.peer_id not in known])
+
+    def get_stats(self) -> dict:
+        served = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["negative_hits"]
+        return {**self.stats, "memory_entries": len(self._memory),
+                "hit_rate": served / (served + self.stats["api_calls"]) if served + self.stats["api_calls"] else 0.0}
+
+
+peer_cache = PeerCache()
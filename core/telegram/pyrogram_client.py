@@ -13,18 +13,20 @@ from core.config.settings import settings
 from core.utils.logger import logger
 
 
-def get_userbot_client(session_name: str = "alexey_session") -> Client:
+def get_userbot_client(session_name: str = "alexey_session", strict: bool = False) -> Client:
     """
     Создаёт Pyrogram userbot клиент.
     Пытается использовать StringSession из файла, иначе создаёт новую сессию.
+    strict — только файлы этой сессии, без общих session_string (аккаунты пула).
     """
     # Пробуем прочитать сохранённую session string
     session_str = None
-    session_paths = [
-        f"data/sessions/{session_name}_pyrogram.txt",
-        f"data/sessions/session_string_pyrogram.txt",
-        "data/sessions/pyrogram_session.txt"
-    ]
+    session_paths = [f"data/sessions/{session_name}_pyrogram.txt"]
+    if not strict:
+        session_paths += [
+            f"data/sessions/session_string_pyrogram.txt",
+            "data/sessions/pyrogram_session.txt"
+        ]
     for path in session_paths:
         try:
             with open(path, "r") as f:
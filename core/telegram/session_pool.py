@@ -0,0 +1,316 @@
+"""
+session_pool.py — Пул аккаунтов Pyrogram для исходящих сообщений.
+
+Один аккаунт упирается в порог PeerFlood на новые контакты, поэтому исходящие
+распределяются по N сессиям из data/sessions (settings.SESSION_POOL_ACCOUNTS):
+
+- лид закрепляется за аккаунтом консистентным хешированием — при добавлении
+  или потере аккаунта переезжает только ~1/N лидов;
+- первое доставленное сообщение закрепляет диалог (affinity): follow-up и ответы
+  идут с того же аккаунта, закрепления хранятся в data/db/session_pool.db;
+- у каждого аккаунта свой TelegramRateLimiter (общий backend, свой префикс) и
+  состояние здоровья; после PeerFlood новый лид уходит на следующий аккаунт
+  кольца, а закреплённый диалог ждёт свой аккаунт.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from core.config.settings import settings
+from core.utils.logger import logger
+from systems.alexey.rate_limiter import PRIORITY_NORMAL, TelegramRateLimiter, get_rate_limiter
+
+
+def lead_key(recipient: Union[str, int]) -> str:
+    """Ключ лида для кольца и affinity: username без @ в нижнем регистре или id строкой."""
+    return str(recipient).strip().lstrip("@").lower()
+
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+@dataclass
+class PoolAccount:
+    """Аккаунт пула: клиент, его limiter и здоровье."""
+    name: str
+    client: Any
+    limiter: TelegramRateLimiter
+    owned: bool = False  # клиент запускает и останавливает пул
+    healthy: bool = True
+    limited_until: float = 0.0
+    sent: int = 0
+    failed: int = 0
+    flood_events: int = 0
+
+    def available(self, now: float) -> bool:
+        return self.healthy and self.limited_until <= now
+
+
+class SessionPool:
+    """
+    Маршрутизация исходящих по аккаунтам.
+
+    send() выбирает аккаунт лида, отправляет через smart_send_message с limiter
+    этого аккаунта и при отказе из-за flood-лимита переходит к следующему
+    аккаунту кольца (только для ещё не закреплённых лидов).
+    """
+
+    def __init__(
+        self,
+        replicas: Optional[int] = None,
+        flood_cooldown: Optional[float] = None,
+        affinity_path: Optional[str] = None,
+        clock: Optional[Callable[[], float]] = None,
+        sender: Optional[Callable[..., Awaitable[bool]]] = None,
+    ):
+        self.replicas = replicas or settings.SESSION_POOL_REPLICAS
+        self.flood_cooldown = flood_cooldown if flood_cooldown is not None else settings.SESSION_POOL_FLOOD_COOLDOWN
+        self.affinity_path = str(affinity_path or settings.DB_DIR / "session_pool.db")
+        self._clock = clock or time.monotonic
+        self._sender = sender
+        self.accounts: Dict[str, PoolAccount] = {}
+        self._ring: List[Tuple[int, str]] = []
+        self._affinity: Dict[str, str] = {}
+        self._loaded = False
+        self._started = False
+
+    # ---------- состав пула ----------
+
+    def add_account(self, name: str, client: Any, limiter: Optional[TelegramRateLimiter] = None,
+                    owned: bool = False) -> PoolAccount:
+        """
+        Добавляет аккаунт и его виртуальные узлы на кольцо. Для уже известного
+        имени с новым объектом клиента (переподключение) подменяет клиента:
+        место на кольце, limiter и закрепления остаются.
+        """
+        if name in self.accounts:
+            account = self.accounts[name]
+            if account.client is not client:
+                account.client = client
+                account.owned = owned
+                account.healthy = True
+                logger.info(f"[SessionPool] 🔄 Аккаунт {name}: новый клиент")
+            return account
+        account = PoolAccount(name, client, limiter or self._make_limiter(name), owned=owned)
+        self.accounts[name] = account
+        for i in range(self.replicas):
+            bisect.insort(self._ring, (_ring_hash(f"{name}#{i}"), name))
+        return account
+
+    @staticmethod
+    def _make_limiter(name: str) -> TelegramRateLimiter:
+        # Основной аккаунт делит limiter с Гвен и остальными отправителями процесса
+        if name == settings.RATE_LIMIT_ACCOUNT:
+            return get_rate_limiter()
+        from systems.alexey.rate_limit_backend import get_bucket_backend
+
+        return TelegramRateLimiter(backend=get_bucket_backend(), account=name)
+
+    def name_of(self, client: Any) -> Optional[str]:
+        for account in self.accounts.values():
+            if account.client is client:
+                return account.name
+        return None
+
+    async def start(self):
+        """Запускает клиентов пула и поднимает сохранённые закрепления."""
+        self._started = True
+        await self.load_affinity()
+        for account in self.accounts.values():
+            if not account.owned or getattr(account.client, "is_connected", False):
+                continue
+            try:
+                await account.client.start()
+                logger.info(f"[SessionPool] ✅ Аккаунт {account.name} подключен")
+            except Exception as e:
+                account.healthy = False
+                logger.error(f"[SessionPool] ❌ Аккаунт {account.name} не запустился: {e}")
+
+    async def stop(self):
+        for account in self.accounts.values():
+            if account.owned and getattr(account.client, "is_connected", False):
+                try:
+                    await account.client.stop()
+                except Exception as e:
+                    logger.warning(f"[SessionPool] Ошибка остановки {account.name}: {e}")
+
+    # ---------- маршрутизация ----------
+
+    def ring_order(self, recipient: Union[str, int]) -> List[str]:
+        """Аккаунты в порядке обхода кольца от позиции лида (первый — его «родной»)."""
+        if not self._ring:
+            return []
+        start = bisect.bisect_left(self._ring, (_ring_hash(lead_key(recipient)),))
+        order: List[str] = []
+        for i in range(len(self._ring)):
+            name = self._ring[(start + i) % len(self._ring)][1]
+            if name not in order:
+                order.append(name)
+                if len(order) == len(self.accounts):
+                    break
+        return order
+
+    def account_for(self, recipient: Union[str, int], exclude: Optional[Set[str]] = None) -> Optional[PoolAccount]:
+        """
+        Аккаунт для лида: закреплённый (пока он жив), иначе первый доступный по кольцу.
+        Если все ограничены — тот, что освободится раньше.
+        """
+        exclude = exclude or set()
+        bound = self._affinity.get(lead_key(recipient))
+        if bound in self.accounts and self.accounts[bound].healthy:
+            return None if bound in exclude else self.accounts[bound]
+
+        now = self._clock()
+        candidates = [self.accounts[name] for name in self.ring_order(recipient)
+                      if name not in exclude and self.accounts[name].healthy]
+        for account in candidates:
+            if account.available(now):
+                return account
+        if candidates and not exclude:
+            return min(candidates, key=lambda a: a.limited_until)
+        return None
+
+    def client_for(self, recipient: Union[str, int]) -> Any:
+        account = self.account_for(recipient)
+        if account is None:
+            raise RuntimeError("SessionPool: нет живых аккаунтов")
+        return account.client
+
+    # ---------- affinity ----------
+
+    async def bind(self, recipient: Union[str, int], account: Union[str, Any]) -> None:
+        """Закрепляет диалог с лидом за аккаунтом (имя или клиент)."""
+        name = account if isinstance(account, str) else self.name_of(account)
+        key = lead_key(recipient)
+        if name is None or not key or self._affinity.get(key) == name:
+            return
+        self._affinity[key] = name
+        try:
+            await asyncio.to_thread(self._save_affinity, key, name)
+        except Exception as e:
+            logger.warning(f"[SessionPool] Не удалось сохранить закрепление {key} → {name}: {e}")
+
+    async def load_affinity(self) -> None:
+        if self._loaded:
+            return
+        try:
+            self._affinity.update(await asyncio.to_thread(self._read_affinity))
+        except Exception as e:
+            logger.warning(f"[SessionPool] Не удалось загрузить закрепления: {e}")
+        self._loaded = True
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.affinity_path, timeout=5.0)
+        conn.execute("CREATE TABLE IF NOT EXISTS lead_affinity (lead TEXT PRIMARY KEY, account TEXT NOT NULL, bound_at REAL NOT NULL)")
+        return conn
+
+    def _save_affinity(self, key: str, name: str):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO lead_affinity (lead, account, bound_at) VALUES (?, ?, ?)",
+                             (key, name, time.time()))
+        finally:
+            conn.close()
+
+    def _read_affinity(self) -> Dict[str, str]:
+        conn = self._connect()
+        try:
+            return dict(conn.execute("SELECT lead, account FROM lead_affinity").fetchall())
+        finally:
+            conn.close()
+
+    # ---------- отправка ----------
+
+    async def send(self, recipient: Union[str, int], text: str, priority: int = PRIORITY_NORMAL, **kwargs) -> bool:
+        """
+        Отправляет сообщение лиду с его аккаунта (kwargs — параметры smart_send_message).
+
+        Returns:
+            True если доставлено; диалог закрепляется за отправившим аккаунтом
+        """
+        if self._sender is None:
+            from core.utils.smart_sender import smart_send_message
+            self._sender = smart_send_message
+        if not self._started:
+            await self.start()
+
+        tried: Set[str] = set()
+        while True:
+            account = self.account_for(recipient, exclude=tried)
+            if account is None:
+                logger.warning(f"[SessionPool] Нет свободного аккаунта для {recipient}")
+                return False
+            tried.add(account.name)
+
+            floods = account.limiter.stats['flood_events']
+            sent = await self._sender(account.client, recipient, text, priority=priority,
+                                      limiter=account.limiter, **kwargs)
+            if sent:
+                account.sent += 1
+                await self.bind(recipient, account.name)
+                return True
+
+            account.failed += 1
+            if account.limiter.stats['flood_events'] == floods:
+                return False  # бот, приватность, блок — другой аккаунт не поможет
+            self._mark_limited(account)
+            if self._affinity.get(lead_key(recipient)) == account.name:
+                return False  # закреплённый диалог не переносим на чужой аккаунт
+            logger.info(f"[SessionPool] 🔀 {account.name} ограничен — {recipient} на следующий аккаунт")
+
+    def _mark_limited(self, account: PoolAccount):
+        account.flood_events += 1
+        account.limited_until = max(account.limited_until, self._clock() + self.flood_cooldown)
+        logger.warning(f"[SessionPool] ⏳ {account.name}: flood-лимит, новых лидов не берёт {self.flood_cooldown:.0f} сек")
+
+    def get_stats(self) -> dict:
+        now = self._clock()
+        return {
+            name: {
+                "healthy": account.healthy,
+                "available": account.available(now),
+                "limited_for_s": max(0.0, account.limited_until - now),
+                "sent": account.sent,
+                "failed": account.failed,
+                "flood_events": account.flood_events,
+                "bound_leads": sum(1 for bound in self._affinity.values() if bound == name),
+                "queue_depth": account.limiter.queue_depth(),
+            }
+            for name, account in self.accounts.items()
+        }
+
+
+# Singleton instance
+_session_pool: Optional[SessionPool] = None
+
+
+def get_session_pool(primary_client: Any = None, pool_accounts: bool = True) -> SessionPool:
+    """
+    Пул процесса: основной клиент (под именем settings.RATE_LIMIT_ACCOUNT)
+    плюс аккаунты из settings.SESSION_POOL_ACCOUNTS.
+
+    pool_accounts=False — только основной аккаунт: для процессов, которые не
+    должны поднимать сессии пула (их держит процесс alexey).
+    """
+    global _session_pool
+    if _session_pool is None:
+        _session_pool = SessionPool()
+        if primary_client is not None:
+            _session_pool.add_account(settings.RATE_LIMIT_ACCOUNT, primary_client)
+        if pool_accounts and settings.session_pool_accounts:
+            from core.telegram.pyrogram_client import get_userbot_client
+
+            for name in settings.session_pool_accounts:
+                if name != settings.RATE_LIMIT_ACCOUNT:
+                    _session_pool.add_account(name, get_userbot_client(name, strict=True), owned=True)
+    elif primary_client is not None and _session_pool.name_of(primary_client) is None:
+        # Новый клиент основного аккаунта (например, очередной цикл today_parser) заменяет прежний
+        _session_pool.add_account(settings.RATE_LIMIT_ACCOUNT, primary_client)
+    return _session_pool
@@ -1,73 +1,236 @@
 """
 LLM Cache для экономии API calls.
-Кэширует результаты LLM анализа для одинаковых запросов.
+
+Два уровня: LRU в памяти перед одной таблицей SQLite (WAL, индекс по
+expires_at). Ключ — sha256 от полного содержимого запроса (namespace, модель,
+system prompt, prompt и параметры), так что разные промпты не сталкиваются.
+Одинаковые параллельные запросы объединяются (single-flight): LLM вызывается
+один раз, остальные получают тот же результат.
+
+    key = make_cache_key("direction", model, system_prompt, prompt)
+    raw = await llm_cache.get_or_compute(key, lambda: call_llm(...), namespace="direction")
 """
 
+import asyncio
 import hashlib
 import json
-from pathlib import Path
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import aiosqlite
+
+from core.config.settings import settings
+from core.database.sqlite_pool import get_pool
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+# Как часто (в записях) чистить просроченные строки из SQLite
+_PURGE_EVERY = 500
+
+
+def make_cache_key(namespace: str, model: str, system_prompt: str, prompt: str, **params) -> str:
+    """sha256 от полного содержимого запроса (без обрезки текста)."""
+    payload = json.dumps(
+        [namespace, model, system_prompt, prompt, params],
+        ensure_ascii=False, sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def _init_schema(db: aiosqlite.Connection):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            namespace TEXT,
+            value TEXT NOT NULL,
+            created_at REAL,
+            expires_at REAL NOT NULL
+        )
+    """)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache(expires_at)")
+
+
+def _is_cacheable(value: Any) -> bool:
+    return value is not None
+
 
 class LLMCache:
     """
     Кэш для LLM ответов чтобы не тратить API calls на одинаковые запросы.
+    Значения должны сериализоваться в JSON (строки, dict, list).
     """
-    
-    def __init__(self, cache_dir: Path, ttl_hours: int = 24):
-        self.cache_dir = cache_dir
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
-        self.ttl = timedelta(hours=ttl_hours)
-    
-    def _get_cache_key(self, prompt: str, text: str) -> str:
-        """Генерация cache key из промпта и текста."""
-        content = f"{prompt[:200]}||{text[:500]}"
-        return hashlib.md5(content.encode()).hexdigest()
-    
-    def get(self, prompt: str, text: str) -> Optional[Dict[Any, Any]]:
-        """Получить кэшированный результат."""
-        key = self._get_cache_key(prompt, text)
-        cache_file = self.cache_dir / f"{key}.json"
-        
-        if not cache_file.exists():
-            return None
-        
-        # Проверка TTL
-        mtime = datetime.fromtimestamp(cache_file.stat().st_mtime)
-        if datetime.now() - mtime > self.ttl:
-            cache_file.unlink()
-            return None
-        
+
+    def __init__(self, db_path: Optional[str] = None, memory_size: Optional[int] = None,
+                 ttl_hours: Optional[float] = None):
+        # Путь к БД резолвится лениво — импорт модуля не создаёт каталогов
+        self._db_path = db_path
+        self.memory_size = memory_size or settings.LLM_CACHE_MEMORY_SIZE
+        self.ttl = (ttl_hours if ttl_hours is not None else settings.LLM_CACHE_TTL_HOURS) * 3600
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._sets_since_purge = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "sets": 0, "errors": 0}
+        self.namespace_stats: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def db_path(self) -> str:
+        if self._db_path is None:
+            self._db_path = str(settings.DB_DIR / "llm_cache.db")
+        return self._db_path
+
+    async def _pool(self):
+        pool = get_pool(self.db_path, init_fn=_init_schema)
+        await pool.open()
+        return pool
+
+    def _count(self, namespace: str, event: str):
+        self.stats[event] += 1
+        ns = self.namespace_stats.setdefault(namespace or "default", {"hits": 0, "misses": 0})
+        if event in ("memory_hits", "disk_hits", "coalesced"):
+            ns["hits"] += 1
+        elif event == "misses":
+            ns["misses"] += 1
+
+    def _remember(self, key: str, expires_at: float, raw: str):
+        self._memory[key] = (expires_at, raw)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str, namespace: str = "", _record_miss: bool = True) -> Optional[Any]:
+        """Получить кэшированный результат (None — промах или запись устарела)."""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._memory.move_to_end(key)
+                self._count(namespace, "memory_hits")
+                return json.loads(entry[1])
+            del self._memory[key]
+
+        row = None
         try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
+            pool = await self._pool()
+            async with pool.reader() as db:
+                async with db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ) as cursor:
+                    row = await cursor.fetchone()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("llm_cache_read_failed", error=str(e))
+
+        if row is None:
+            if _record_miss:
+                self._count(namespace, "misses")
             return None
-    
-    def set(self, prompt: str, text: str, result: Dict[Any, Any]):
-        """Сохранить результат в кэш."""
-        key = self._get_cache_key(prompt, text)
-        cache_file = self.cache_dir / f"{key}.json"
-        
+        self._remember(key, row[1], row[0])
+        self._count(namespace, "disk_hits")
+        return json.loads(row[0])
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None, namespace: str = ""):
+        """Сохранить результат в кэш (ttl в секундах)."""
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+        raw = json.dumps(value, ensure_ascii=False)
+        self._remember(key, expires_at, raw)
+        self.stats["sets"] += 1
         try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
-    
-    def clear_old(self) -> int:
-        """Очистка устаревших записей."""
-        cleared = 0
-        for cache_file in self.cache_dir.glob("*.json"):
-            try:
-                mtime = datetime.fromtimestamp(cache_file.stat().st_mtime)
-                if datetime.now() - mtime > self.ttl:
-                    cache_file.unlink()
-                    cleared += 1
-            except Exception:
-                continue
-        return cleared
+            pool = await self._pool()
+            async with pool.writer() as db:
+                await db.execute("""
+                    INSERT OR REPLACE INTO llm_cache (key, namespace, value, created_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (key, namespace, raw, now, expires_at))
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("llm_cache_write_failed", error=str(e))
+            return
+
+        self._sets_since_purge += 1
+        if self._sets_since_purge >= _PURGE_EVERY:
+            self._sets_since_purge = 0
+            await self.clear_old()
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        namespace: str = "",
+        cacheable: Callable[[Any], bool] = _is_cacheable,
+        on_hit: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        """
+        Значение из кэша или результат compute(). Параллельные вызовы с тем же
+        ключом ждут один вызов compute. В кэш попадает только то, что прошло
+        cacheable (по умолчанию — не None); исключения не кэшируются.
+        on_hit вызывается, только если значение взято из кэша.
+        """
+        if not settings.LLM_CACHE_ENABLED:
+            return await compute()
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            cached = await self.get(key, namespace, _record_miss=False)
+            if cached is not None:
+                if on_hit is not None:
+                    on_hit()
+                return cached
+            inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._count(namespace, "coalesced")
+            value = await asyncio.shield(inflight)
+            return json.loads(json.dumps(value, ensure_ascii=False))
+
+        self._count(namespace, "misses")
+        future = asyncio.get_running_loop().create_future()
+        # Исключение, которое никто не ждал, не должно попадать в лог asyncio
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            value = await compute()
+            future.set_result(value)
+            if cacheable(value):
+                await self.set(key, value, ttl, namespace)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def clear_old(self) -> int:
+        """Очистка устаревших записей (по индексу expires_at)."""
+        now = time.time()
+        for key in [k for k, (expires_at, _) in self._memory.items() if expires_at <= now]:
+            del self._memory[key]
+        try:
+            pool = await self._pool()
+            async with pool.writer() as db:
+                cursor = await db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+                return cursor.rowcount
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("llm_cache_purge_failed", error=str(e))
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["coalesced"]
+        total = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory),
+            "inflight": len(self._inflight),
+            "namespaces": {ns: dict(v) for ns, v in self.namespace_stats.items()},
+        }
+
 
 # Глобальный инстанс
-from core.config.settings import settings
-llm_cache = LLMCache(settings.BASE_DIR / "cache" / "llm", ttl_hours=24)
+llm_cache = LLMCache()
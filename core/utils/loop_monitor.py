@@ -0,0 +1,123 @@
+"""
+Детектор блокировок event loop.
+
+Каждый колбэк loop (в т.ч. шаг корутины между двумя await) выполняется через
+asyncio.events.Handle._run. Монитор оборачивает этот метод, замеряет время
+выполнения и логирует колбэки дольше порога (settings.LOOP_SLOW_CALLBACK_MS):
+для шага задачи — имя корутины и строку, на которой она снова отдала
+управление (блокирующий код находится прямо перед ней). Фоновый heartbeat
+дополнительно меряет фактическое запаздывание loop.
+
+В отличие от loop.set_debug(True) не включает отладочный режим asyncio целиком:
+накладные расходы — один perf_counter на колбэк.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from core.config.settings import settings
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def describe_callback(handle: asyncio.Handle) -> str:
+    """Человекочитаемое имя колбэка: корутина задачи с файлом и строкой или qualname функции."""
+    callback = handle._callback
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        code = getattr(coro, "cr_code", None)
+        if code is None:
+            return f"{owner.get_name()}: {coro!r}"
+        frame = getattr(coro, "cr_frame", None)
+        line = frame.f_lineno if frame is not None else code.co_firstlineno
+        return f"{owner.get_name()}: {code.co_qualname} ({code.co_filename}:{line})"
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+class LoopLatencyMonitor:
+    """Замеряет длительность колбэков event loop и запаздывание heartbeat."""
+
+    def __init__(self, threshold_ms: Optional[float] = None, heartbeat_interval: float = 1.0, history: int = 50):
+        self.threshold = (threshold_ms if threshold_ms is not None else settings.LOOP_SLOW_CALLBACK_MS) / 1000
+        self.heartbeat_interval = heartbeat_interval
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.stats = {"slow_callbacks": 0, "max_callback_ms": 0.0, "max_lag_ms": 0.0}
+        self._original_run = None
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    @property
+    def installed(self) -> bool:
+        return self._original_run is not None
+
+    def install(self):
+        """Оборачивает Handle._run (действует на все loop процесса)."""
+        if self.installed:
+            return
+        original = asyncio.events.Handle._run
+        monitor = self
+
+        def _run(handle):
+            start = time.perf_counter()
+            try:
+                return original(handle)
+            finally:
+                elapsed = time.perf_counter() - start
+                if elapsed >= monitor.threshold:
+                    monitor._report(handle, elapsed)
+
+        self._original_run = original
+        asyncio.events.Handle._run = _run
+
+    def uninstall(self):
+        if not self.installed:
+            return
+        asyncio.events.Handle._run = self._original_run
+        self._original_run = None
+
+    def start(self):
+        """install() + heartbeat-задача в текущем loop."""
+        self.install()
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.create_task(self._run_heartbeat(), name="loop_monitor_heartbeat")
+        logger.info("loop_monitor_started", threshold_ms=self.threshold * 1000)
+
+    async def stop(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+        self.uninstall()
+
+    def _report(self, handle: asyncio.Handle, elapsed: float):
+        try:
+            callback = describe_callback(handle)
+        except Exception:
+            callback = repr(handle)
+        duration_ms = round(elapsed * 1000, 1)
+        self.stats["slow_callbacks"] += 1
+        self.stats["max_callback_ms"] = max(self.stats["max_callback_ms"], duration_ms)
+        self.recent.append({"callback": callback, "duration_ms": duration_ms, "at": time.time()})
+        logger.warning("loop_slow_callback", callback=callback, duration_ms=duration_ms)
+
+    async def _run_heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.heartbeat_interval
+            await asyncio.sleep(self.heartbeat_interval)
+            lag_ms = max(0.0, loop.time() - expected) * 1000
+            self.stats["max_lag_ms"] = max(self.stats["max_lag_ms"], round(lag_ms, 1))
+
+    def slowest(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Самые долгие колбэки из последних зафиксированных."""
+        return sorted(self.recent, key=lambda item: item["duration_ms"], reverse=True)[:limit]
+
+
+# Синглтон процесса: Handle._run один на все loop
+loop_monitor = LoopLatencyMonitor()
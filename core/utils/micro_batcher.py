@@ -0,0 +1,98 @@
+"""
+Micro-batching для синхронных batch-функций (инференс моделей).
+
+Конкурентные вызовы submit() копятся несколько миллисекунд (или до max_batch_size),
+затем batch_fn вызывается один раз в рабочем потоке, и каждый вызывающий
+получает свой результат через future.
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class MicroBatcher:
+    """
+    Async фронт к batch_fn(items) -> results (len(results) == len(items)).
+
+    Очередь и воркер привязаны к текущему event loop и пересоздаются,
+    если loop сменился (например, между asyncio.run в скриптах).
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        name: str = "micro_batcher",
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.stats = {"batches": 0, "items": 0, "max_batch": 0}
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """Ставит элемент в ближайший батч и ждёт его результат."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await asyncio.to_thread(self.batch_fn, items)
+            except Exception as e:
+                logger.error(f"{self.name}_batch_failed", error=str(e)[:200], size=len(items))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.stats["batches"] += 1
+            self.stats["items"] += len(items)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(items))
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
@@ -10,13 +10,14 @@ smart_sender.py — Умная отправка сообщений через Py
 import asyncio
 from typing import Optional, Union
 from pyrogram import Client
-from pyrogram.types import User
 from pyrogram.enums import ChatAction
 from pyrogram.errors import (
     UserIsBlocked, InputUserDeactivated, PeerFlood,
     UserPrivacyRestricted, FloodWait, BadRequest
 )
 from core.utils.logger import logger
+from core.telegram.peer_cache import peer_cache
+from systems.alexey.rate_limiter import PRIORITY_NORMAL, TelegramRateLimiter, get_rate_limiter
 
 
 async def smart_send_message(
@@ -26,7 +27,9 @@ async def smart_send_message(
     simulate_typing: bool = True,
     typing_duration: float = 2.0,
     phone: Optional[str] = None,
-    monitored_chats_ids: Optional[list] = None  # Оставляем для совместимости API
+    monitored_chats_ids: Optional[list] = None,  # Оставляем для совместимости API
+    priority: int = PRIORITY_NORMAL,
+    limiter: Optional[TelegramRateLimiter] = None
 ) -> bool:
     """
     Умная отправка сообщения лиду.
@@ -42,6 +45,8 @@ async def smart_send_message(
         typing_duration: Время имитации набора, секунды
         phone: Опциональный номер телефона (+7XXXXXXXXXX) — для поиска через ImportContacts
         monitored_chats_ids: Не используется в Pyrogram (оставлен для совместимости)
+        priority: Приоритет в очереди отправки (PRIORITY_HOT раньше PRIORITY_FOLLOWUP)
+        limiter: Limiter аккаунта client (SessionPool); по умолчанию — основного аккаунта
 
     Returns:
         True если сообщение отправлено, False — если все попытки провалились
@@ -50,6 +55,10 @@ async def smart_send_message(
     if not await _is_valid_user(client, recipient):
         return False
 
+    # Очередь отправки: лимиты получателя и аккаунта, HOT-лиды вперёд
+    limiter = limiter or get_rate_limiter()
+    await limiter.acquire_pm(recipient, priority=priority)
+
     try:
         if simulate_typing:
             try:
@@ -78,15 +87,17 @@ async def smart_send_message(
         return False
 
     except PeerFlood:
-        logger.warning(f"[SmartSender] 🚨 PeerFlood — слишком много запросов, пауза 60 сек")
-        await asyncio.sleep(60)
+        # Пауза и снижение темпа применяются ко всем отправкам через limiter
+        logger.warning(f"[SmartSender] 🚨 PeerFlood — слишком много запросов, пауза {limiter.PEER_FLOOD_COOLDOWN} сек")
+        limiter.report_peer_flood()
         return False
 
     except FloodWait as e:
         logger.warning(f"[SmartSender] ⏳ FloodWait {e.value} секунд для {recipient}")
-        await asyncio.sleep(e.value + 5)
-        # Повторная попытка после ожидания
+        limiter.report_flood_wait(e.value + 5)
+        # Повторная попытка после ожидания (очередь отпустит по окончании паузы)
         try:
+            await limiter.acquire_pm(recipient, priority=priority)
             await client.send_message(recipient, text)
             return True
         except Exception:
@@ -104,20 +115,17 @@ async def smart_send_message(
 async def _is_valid_user(client: Client, recipient: Union[str, int]) -> bool:
     """
     Проверяет что получатель — живой пользователь (не бот, не канал/группа).
-    Pyrogram позволяет получить информацию по integer ID напрямую.
+    Тип берётся из peer_cache: get_users только при промахе или устаревшей записи.
     """
-    try:
-        user = await client.get_users(recipient)
-        if isinstance(user, User):
-            if user.is_bot:
-                logger.info(f"[SmartSender] ⏭ Пропуск бота: {recipient}")
-                return False
-            return True
-        return False
-    except Exception as e:
+    peer = await peer_cache.resolve_user(client, recipient)
+    if peer is None:
         # Если вообще не можем получить инфо — пробуем отправить всё равно
-        logger.debug(f"[SmartSender] Не удалось проверить тип {recipient}: {e}, пробуем отправить")
+        logger.debug(f"[SmartSender] Не удалось проверить тип {recipient}, пробуем отправить")
         return True  # Оптимистично пробуем
+    if peer.is_bot:
+        logger.info(f"[SmartSender] ⏭ Пропуск бота: {recipient}")
+        return False
+    return peer.is_person
 
 
 async def _try_send_via_import_contact(
@@ -0,0 +1,68 @@
+"""
+Бенчмарк пропускной способности BERTLeadClassifier по размеру батча.
+
+Запуск: python scripts/benchmarks/bench_bert_batching.py [--texts N]
+Печатает texts/sec для батчей 1, 8, 32, 64 и для micro-batching фронта
+(N конкурентных predict_async).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+SAMPLE_TEXTS = [
+    "Нужен специалист по SEO для продвижения интернет-магазина. Бюджет 50000 руб. Срочно!",
+    "Привет! Я таргетолог, настрою вам рекламу. Пишите в ЛС.",
+    "Нужен спец по авито, бюджет 5к",
+    "Ищем подрядчика на настройку Яндекс Директ для сети стоматологий, ТЗ есть, созвон на этой неделе.",
+    "Требуется разработка лендинга на Tilda под запуск курса, дизайн готов, нужна вёрстка и интеграция с CRM.",
+    "Открыта вакансия в нашу дружную команду: менеджер маркетплейсов, зп от 60к, официальное трудоустройство.",
+]
+
+
+def _make_texts(n: int):
+    rng = random.Random(42)
+    return [" ".join(rng.choice(SAMPLE_TEXTS) for _ in range(rng.randint(1, 4))) for _ in range(n)]
+
+
+def bench_batches(classifier, texts, batch_sizes=(1, 8, 32, 64)):
+    classifier.predict_batch(texts[:8])  # прогрев
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            classifier.predict_batch(texts[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        print(f"batch={batch_size:>3}: {len(texts) / elapsed:8.1f} texts/sec")
+
+
+async def bench_micro_batching(classifier, texts):
+    start = time.perf_counter()
+    await asyncio.gather(*(classifier.predict_async(t) for t in texts))
+    elapsed = time.perf_counter() - start
+    stats = classifier.batcher.stats
+    avg_batch = stats["items"] / stats["batches"] if stats["batches"] else 0
+    print(f"micro-batching: {len(texts) / elapsed:8.1f} texts/sec "
+          f"(batches={stats['batches']}, avg={avg_batch:.1f}, max={stats['max_batch']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=512)
+    args = parser.parse_args()
+
+    from systems.parser.bert_classifier import get_bert_classifier
+    bert_classifier = get_bert_classifier()
+
+    texts = _make_texts(args.texts)
+    print(f"=== BERT batching benchmark ({args.texts} texts, device={bert_classifier.device}) ===")
+    bench_batches(bert_classifier, texts)
+    asyncio.run(bench_micro_batching(bert_classifier, texts))
+
+
+if __name__ == "__main__":
+    main()
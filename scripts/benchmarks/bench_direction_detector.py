@@ -0,0 +1,84 @@
+"""
+detect_direction: поштучная проверка ключевиков против скомпилированного DirectionEngine.
+
+Запуск: python scripts/benchmarks/bench_direction_detector.py [--db data/db/vacancies.db]
+        [--texts N] [--repeat 3]
+
+Корпус — тексты из vacancies.db (если есть), иначе синтетические сообщения из
+ключевиков ниш, сигналов запроса и отрицаний. Печатает мкс/текст для эталона,
+для движка без мемоизации и с тёплой мемоизацией, а также число расхождений.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from core.config.settings import settings
+from systems.parser.lead_filter_advanced import (
+    DIRECTION_KEYWORDS, _REQUEST_SIGNALS, _detect_direction_reference, _get_direction_engine, detect_direction,
+)
+
+FILLER = ["привет", "проект", "срочно", "бюджет 50к", "пишите в лс", "не нужен", "без", "у нас есть", "команда"]
+
+
+def load_texts(db_path: str, limit: int):
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT text FROM vacancies WHERE text IS NOT NULL AND text != '' LIMIT ?",
+                            (limit,)).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+
+def synthetic_texts(n: int):
+    rng = random.Random(42)
+    keywords = [kw for kws in DIRECTION_KEYWORDS.values() for kw in kws]
+    pool = keywords + list(_REQUEST_SIGNALS) + FILLER * 20
+    return [" ".join(rng.choice(pool) for _ in range(rng.randint(5, 60))) for _ in range(n)]
+
+
+def timed(fn, texts, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=str(settings.VACANCY_DB_PATH))
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_texts(args.db, args.texts)
+    source = f"vacancies.db ({len(texts)})"
+    if not texts:
+        texts, source = synthetic_texts(args.texts), f"синтетика ({args.texts})"
+    engine = _get_direction_engine()
+    print(f"корпус: {source}, средняя длина {sum(map(len, texts)) / len(texts):.0f} символов")
+
+    mismatches = sum(detect_direction(t) != _detect_direction_reference(t) for t in texts)
+    reference_us = timed(_detect_direction_reference, texts, 1)
+    engine_us = timed(lambda t: engine._detect(t.lower()), texts, args.repeat)
+    memo_us = timed(detect_direction, texts, args.repeat)
+
+    print(f"reference      {reference_us:10.1f} us/text")
+    print(f"engine         {engine_us:10.1f} us/text  (x{reference_us / engine_us:.0f})")
+    print(f"engine + memo  {memo_us:10.1f} us/text  (повторный текст)")
+    print(f"mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Извлечение признаков уровня 0: исходная реализация (regex компилируется на
+каждый вызов, генератор для CAPS) против normalize_and_extract_features и
+extract_features_batch.
+
+Запуск: python scripts/benchmarks/bench_feature_extraction.py [--db data/db/vacancies.db] [--texts N]
+
+Корпус — тексты из vacancies.db, иначе синтетические сообщения. Печатает
+мкс/текст и число расхождений с исходной реализацией.
+"""
+
+import argparse
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from core.config.settings import settings
+from systems.parser.lead_filter_advanced import (
+    _UNICODE_HOMOGLYPHS, extract_features_batch, normalize_and_extract_features,
+)
+
+SAMPLE = [
+    "Нужен специалист по SEO для интернет-магазина. Бюджет 50000 руб. Срочно!",
+    "🔥🔥 ПРОДАМ БАЗУ 🔥 пишите @seller_bot #реклама #продажа",
+    "Смотрите https://example.com/page и http://t.me/joinchat — 100$",
+    "Ищем таргетолога, оплата 300 usd, ТЗ есть",
+]
+
+
+def legacy_features(text: str):
+    """Исходная normalize_and_extract_features (до прекомпиляции), только числовые поля."""
+    text = unicodedata.normalize('NFC', text).translate(_UNICODE_HOMOGLYPHS)
+    text_lower = text.lower()
+    urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', text)
+    emoji_pattern = re.compile("["
+        u"\U0001F600-\U0001F64F"
+        u"\U0001F300-\U0001F5FF"
+        u"\U0001F680-\U0001F6FF"
+        u"\U0001F1E0-\U0001F1FF"
+        u"\U00002702-\U000027B0"
+        u"\U000024C2-\U0001F251"
+        "]+", flags=re.UNICODE)
+    emoji_count = len(emoji_pattern.findall(text))
+    hashtags = re.findall(r'#\w+', text_lower)
+    mentions = re.findall(r'@\w+', text)
+    word_count = len(re.sub(r'[^\w\s]', '', text_lower).split())
+    caps_ratio = sum(1 for c in text if c.isupper()) / len(text) if len(text) > 0 else 0
+    budget_values = [int(re.findall(r'\d+', m)[0])
+                     for m in re.findall(r'(\d+[\s]*(?:₽|руб|rub|\$|usd|евро|eur))', text_lower)]
+    avg_budget = sum(budget_values) / len(budget_values) if budget_values else 0
+    return (word_count, emoji_count / word_count if word_count else 0, caps_ratio, bool(budget_values),
+            avg_budget, len(urls), len(hashtags), len(mentions))
+
+
+def load_texts(db_path: str, limit: int):
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT text FROM vacancies WHERE text IS NOT NULL LIMIT ?", (limit,)).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=str(settings.VACANCY_DB_PATH))
+    parser.add_argument("--texts", type=int, default=20000)
+    args = parser.parse_args()
+
+    texts = load_texts(args.db, args.texts)
+    if not texts:
+        rng = random.Random(1)
+        texts = [" ".join(rng.choice(SAMPLE) for _ in range(rng.randint(1, 6))) for _ in range(args.texts)]
+    print(f"{len(texts)} текстов, средняя длина {sum(map(len, texts)) / len(texts):.0f} символов")
+
+    start = time.perf_counter()
+    legacy = [legacy_features(t) for t in texts]
+    legacy_us = (time.perf_counter() - start) / len(texts) * 1e6
+
+    start = time.perf_counter()
+    for t in texts:
+        normalize_and_extract_features(t)
+    single_us = (time.perf_counter() - start) / len(texts) * 1e6
+
+    extract_features_batch(texts[:10])  # таблица флагов символов строится один раз на процесс
+    start = time.perf_counter()
+    batch = extract_features_batch(texts)
+    batch_us = (time.perf_counter() - start) / len(texts) * 1e6
+
+    fields = batch.dtype.names
+    mismatches = sum(
+        any(abs(float(row[f]) - float(ref)) > 1e-4 * max(1.0, abs(float(ref))) for f, ref in zip(fields, expected))
+        for row, expected in zip(batch, legacy)
+    )
+    print(f"legacy                          {legacy_us:8.1f} us/text")
+    print(f"normalize_and_extract_features  {single_us:8.1f} us/text  (x{legacy_us / single_us:.1f})")
+    print(f"extract_features_batch          {batch_us:8.1f} us/text  (x{legacy_us / batch_us:.1f})")
+    print(f"mismatches vs legacy: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
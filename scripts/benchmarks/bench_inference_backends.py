@@ -0,0 +1,137 @@
+"""
+Бэкенды инференса rubert-tiny на CPU: torch (float32) vs int8 vs onnx.
+
+Запуск: python scripts/benchmarks/bench_inference_backends.py [--model NAME] [--synthetic]
+        [--db data/db/vacancies.db] [--texts N] [--batch-size 32]
+
+Для каждого доступного бэкенда печатает:
+- латентность p50/p99 одного текста (эмбеддинг дедупа + BERT-классификатор);
+- пропускную способность батчами --batch-size;
+- размер весов и прирост RSS при загрузке (model_registry.memory_report);
+- расхождение с float-моделью на отложенной выборке из vacancies.db
+  (manual_label, id % 5 == 0): косинус эмбеддингов, совпадение решений
+  классификатора и точность по ручной разметке.
+Если размеченных строк нет, берутся синтетические тексты (без точности).
+Код выхода 1, если точность бэкенда по manual_label ниже float-модели больше
+чем на --max-accuracy-drop.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from core.ai_engine.inference_backends import BACKENDS, ONNXRUNTIME_AVAILABLE, compare_backends, load_holdout
+from core.ai_engine.model_registry import model_registry
+from core.config.settings import settings
+from systems.parser.bert_classifier import BERTLeadClassifier
+
+SAMPLE_TEXTS = [
+    "Нужен специалист по SEO для продвижения интернет-магазина. Бюджет 50000 руб. Срочно!",
+    "Привет! Я таргетолог, настрою вам рекламу. Пишите в ЛС.",
+    "Нужен спец по авито, бюджет 5к",
+    "Ищем подрядчика на настройку Яндекс Директ для сети стоматологий, ТЗ есть, созвон на этой неделе.",
+    "Требуется разработка лендинга на Tilda под запуск курса, дизайн готов, нужна вёрстка и интеграция с CRM.",
+    "Открыта вакансия в нашу дружную команду: менеджер маркетплейсов, зп от 60к, официальное трудоустройство.",
+]
+
+
+def _synthetic_texts(n: int):
+    rng = random.Random(42)
+    return [" ".join(rng.choice(SAMPLE_TEXTS) for _ in range(rng.randint(1, 4))) for _ in range(n)]
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def run_backend(model: str, backend: str, texts, batch_size: int, latency_texts: int):
+    encoder = model_registry.sentence_encoder(model, backend)
+    classifier = BERTLeadClassifier(model, backend=backend)
+    classifier.predict_batch(texts[:4])  # загрузка + прогрев
+    encoder.encode(texts[:4])
+
+    latencies = []
+    for text in texts[:latency_texts]:
+        start = time.perf_counter()
+        encoder.encode(text)
+        classifier.predict(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    embeddings, confidences = [], []
+    for i in range(0, len(texts), batch_size):
+        batch = texts[i:i + batch_size]
+        embeddings.append(encoder.encode(batch, batch_size=batch_size))
+        confidences.extend(r["confidence"] for r in classifier.predict_batch(batch))
+    throughput = len(texts) / (time.perf_counter() - start)
+    return _percentiles(latencies), throughput, np.vstack(embeddings), confidences
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=settings.ENCODER_MODEL)
+    parser.add_argument("--synthetic", action="store_true", help="случайный BERT размеров rubert-tiny (без сети)")
+    parser.add_argument("--db", default=None, help="vacancies.db для отложенной выборки (по умолчанию settings)")
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--latency-texts", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01,
+                        help="допустимая потеря точности против torch на holdout")
+    args = parser.parse_args()
+    failed = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            from bench_model_registry import build_synthetic_model
+            args.model = build_synthetic_model(os.path.join(tmp, "rubert-tiny"))
+
+        texts, labels = load_holdout(args.db, limit=args.texts)
+        source = f"holdout из vacancies.db ({len(texts)} размеченных)"
+        if not texts:
+            texts, labels, source = _synthetic_texts(args.texts), None, "синтетические тексты (нет manual_label)"
+        print(f"model={args.model}  texts: {source}  torch threads: {__import__('torch').get_num_threads()}")
+
+        backends = [b for b in BACKENDS if b != "onnx" or ONNXRUNTIME_AVAILABLE]
+        if "onnx" not in backends:
+            print("onnx: пропущен (нужны пакеты onnx и onnxruntime)")
+
+        reference = None
+        for backend in backends:
+            (p50, p99), throughput, embeddings, confidences = run_backend(
+                args.model, backend, texts, args.batch_size, args.latency_texts
+            )
+            key = model_registry._key("sentence", args.model, backend)
+            info = model_registry.memory_report()[key]
+            print(f"{backend:<6} p50={p50:7.2f} ms  p99={p99:7.2f} ms  {throughput:8.1f} texts/s  "
+                  f"weights={info['params_mb']:6.1f} MB  rss+={info['rss_delta_mb']:6.1f} MB")
+            if reference is None:
+                reference = (embeddings, confidences)
+                if labels:
+                    ref = compare_backends(embeddings, embeddings, confidences, confidences, labels)
+                    print(f"       accuracy vs manual_label: {ref['reference_accuracy']:.4f}")
+                continue
+            report = compare_backends(reference[0], embeddings, reference[1], confidences, labels)
+            line = (f"       vs torch: cosine mean={report['embedding_cosine_mean']:.4f} "
+                    f"min={report['embedding_cosine_min']:.4f}  decisions agree={report['decision_agreement']:.4f}  "
+                    f"max |Δconf|={report['confidence_max_abs_diff']:.4f}")
+            if labels:
+                line += f"  accuracy={report['candidate_accuracy']:.4f} (torch {report['reference_accuracy']:.4f})"
+                if report["accuracy_drop"] > args.max_accuracy_drop:
+                    failed.append(backend)
+            print(line)
+
+    if failed:
+        print(f"FAIL: точность {', '.join(failed)} ниже torch больше чем на {args.max_accuracy_drop:.2%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Латентность вызова LLM: новый httpx.AsyncClient на запрос vs общий пул (http_pool).
+
+Запуск: python scripts/benchmarks/bench_llm_http_pool.py [--requests N] [--concurrency C] [--no-tls]
+Поднимает локальную заглушку OpenRouter (HTTPS с самоподписанным сертификатом,
+если доступен openssl, keep-alive) с задержкой ответа --delay-ms и печатает
+p50/p99 для LLMClient._generate_openrouter в обоих режимах, последовательно и
+с C параллельными запросами.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from core.ai_engine.http_pool import close_http_clients, get_http_client
+from core.ai_engine.llm_client import LLMClient
+
+RESPONSE = json.dumps({"choices": [{"message": {"content": "SEO"}}]}).encode()
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float):
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            headers = {}
+            for line in head.decode("latin-1").split("\r\n")[1:]:
+                if ":" in line:
+                    key, value = line.split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+            await reader.readexactly(int(headers.get("content-length", 0)))
+            await asyncio.sleep(delay)
+            close = headers.get("connection", "").lower() == "close"
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(RESPONSE)}\r\nConnection: {'close' if close else 'keep-alive'}\r\n\r\n".encode()
+                + RESPONSE
+            )
+            await writer.drain()
+            if close:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+        pass
+    finally:
+        writer.close()
+
+
+def _make_tls(tmp: str):
+    """Самоподписанный сертификат через openssl: (server_ctx, client_ctx) или (None, None)."""
+    if not shutil.which("openssl"):
+        return None, None
+    cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+    subprocess.run([
+        "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+        "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+        "-keyout", key, "-out", cert,
+    ], check=True, capture_output=True)
+    server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_ctx.load_cert_chain(cert, key)
+    client_ctx = ssl.create_default_context(cafile=cert)
+    return server_ctx, client_ctx
+
+
+class PerRequestClient(LLMClient):
+    """Прежнее поведение: новый AsyncClient (TCP + TLS) на каждый запрос."""
+
+    def __init__(self, url: str, verify):
+        super().__init__()
+        self.base_url = url
+        self.verify = verify
+
+    async def _generate_openrouter(self, model_name, prompt, system_prompt):
+        payload = {"model": model_name, "messages": [{"role": "user", "content": prompt}]}
+        async with httpx.AsyncClient(timeout=45.0, verify=self.verify) as client:
+            response = await client.post(self.base_url, headers=self.headers, json=payload)
+            return response.json()["choices"][0]["message"]["content"]
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+async def _measure(llm: LLMClient, requests: int, concurrency: int):
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await llm._generate_openrouter("stub/model", f"prompt {i}", "system")
+            samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return _percentiles(samples), requests / (time.perf_counter() - start)
+
+
+async def run(requests: int, concurrency: int, delay_ms: float, tls: bool):
+    with tempfile.TemporaryDirectory() as tmp:
+        server_ctx, client_ctx = _make_tls(tmp) if tls else (None, None)
+        server = await asyncio.start_server(
+            lambda r, w: _handle(r, w, delay_ms / 1000), "127.0.0.1", 0, ssl=server_ctx
+        )
+        port = server.sockets[0].getsockname()[1]
+        url = f"{'https' if server_ctx else 'http'}://127.0.0.1:{port}/api/v1/chat/completions"
+        print(f"stub: {url} (delay {delay_ms} ms)")
+
+        pooled = LLMClient()
+        pooled.base_url = url
+        get_http_client(url, verify=client_ctx or True)  # создаём общий клиент с нужным verify
+        per_request = PerRequestClient(url, client_ctx or True)
+        for llm in (pooled, per_request):
+            llm.headers["Authorization"] = "Bearer stub"
+
+        for conc in (1, concurrency):
+            for label, llm in (("client per request", per_request), ("shared pool", pooled)):
+                await _measure(llm, min(20, requests), conc)  # прогрев
+                (p50, p99), rps = await _measure(llm, requests, conc)
+                print(f"concurrency={conc:<3} {label:<19} p50={p50:7.2f} ms  p99={p99:7.2f} ms  {rps:8.1f} req/s")
+
+        await close_http_clients()
+        server.close()
+        await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--delay-ms", type=float, default=2.0)
+    parser.add_argument("--no-tls", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.delay_ms, not args.no_tls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+MLLeadClassifier: полное переобучение TF-IDF + LogisticRegression против
+online-обновления HashingVectorizer + SGD partial_fit на одной разметке.
+
+Запуск: python scripts/benchmarks/bench_ml_online.py [--sizes 1000,5000,20000]
+
+Для каждого размера таблицы строит синтетическую vacancies.db во временной
+папке и печатает время train_from_database (legacy), время потокового
+bootstrap и среднее время одного partial_fit — последнее не должно расти с
+размером таблицы.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from systems.parser.ml_classifier import MLLeadClassifier
+
+LEAD = ["нужен таргетолог на проект", "ищем SEO специалиста, бюджет 30к", "требуется разработка лендинга",
+        "кто настроит яндекс директ? оплата сразу", "нужен дизайнер карточек для wildberries"]
+NOISE = ["продам аккаунт недорого", "всем привет, как дела", "подписывайтесь на канал с кейсами",
+         "я таргетолог, пишите в лс", "открыта вакансия в штат, официальное трудоустройство"]
+
+
+def build_db(path: str, n: int):
+    rng = random.Random(n)
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE vacancies (id INTEGER PRIMARY KEY, text TEXT, status TEXT, manual_label INTEGER)")
+        rows = []
+        for i in range(n):
+            is_lead = rng.random() < 0.4
+            words = [rng.choice(LEAD if is_lead else NOISE) for _ in range(rng.randint(1, 4))]
+            rows.append((f"{' '.join(words)} #{i}", "accepted" if is_lead else "rejected"))
+        conn.executemany("INSERT INTO vacancies (text, status) VALUES (?, ?)", rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,5000,20000")
+    parser.add_argument("--updates", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in map(int, args.sizes.split(",")):
+            db_path = os.path.join(tmp, f"vacancies_{n}.db")
+            build_db(db_path, n)
+
+            legacy = MLLeadClassifier(os.path.join(tmp, "legacy.pkl"), online=False)
+            start = time.perf_counter()
+            legacy.train_from_database(db_path)
+            legacy_s = time.perf_counter() - start
+
+            online = MLLeadClassifier(os.path.join(tmp, f"online_{n}.pkl"), online=True)
+            start = time.perf_counter()
+            metrics = online.bootstrap_from_database(db_path)
+            bootstrap_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for i in range(args.updates):
+                online.partial_fit([f"{LEAD[i % len(LEAD)]} новый заказ {i}"], [1], checkpoint=False)
+            update_ms = (time.perf_counter() - start) / args.updates * 1e3
+
+            acc = "—" if metrics["test_score"] is None else f"{metrics['test_score']:.3f}"
+            print(f"{n:7d} строк  full retrain {legacy_s:7.2f} s  bootstrap {bootstrap_s:7.2f} s  "
+                  f"partial_fit {update_ms:6.2f} ms/label  prequential acc {acc}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Старт и память стека моделей: раздельная загрузка (как было) vs model_registry.
+
+Запуск: python scripts/benchmarks/bench_model_registry.py [--model NAME] [--synthetic] [--threads N]
+Каждый режим — в отдельном процессе (чистый RSS):
+
+- legacy   — SentenceTransformer для дедупа + AutoModelForSequenceClassification
+             для BERT + NER pipeline (как в старых __init__ / singleton при импорте);
+- registry — model_registry: один rubert-tiny на дедуп и классификатор, NER
+             не грузится, пока к нему не обратились.
+
+Печатает время загрузки моделей, объём загруженных весов, RSS процесса и
+прирост RSS на модели (после импорта библиотек), латентность первого
+предсказания и memory_report() реестра. RSS для safetensors-чекпоинтов
+занижен: веса отображаются через mmap и попадают в RSS только при чтении.
+--synthetic собирает случайный BERT с размерами rubert-tiny во временном
+каталоге (без сети).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+TEXTS = [
+    "Нужен специалист по SEO для продвижения интернет-магазина. Бюджет 50000 руб.",
+    "Ищем подрядчика на настройку Яндекс Директ для сети стоматологий.",
+]
+
+
+def build_synthetic_model(path: str) -> str:
+    """Случайный BERT с конфигурацией rubert-tiny (312 hidden, 3 слоя, словарь 29564)."""
+    from transformers import BertConfig, BertForPreTraining, BertTokenizerFast
+
+    os.makedirs(path, exist_ok=True)
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    vocab += list("абвгдеёжзийклмнопрстуфхцчшщъыьэюяabcdefghijklmnopqrstuvwxyz0123456789")
+    vocab += [f"##{i}" for i in range(29564 - len(vocab))]
+    with open(os.path.join(path, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab))
+    BertTokenizerFast(vocab_file=os.path.join(path, "vocab.txt")).save_pretrained(path)
+    config = BertConfig(vocab_size=len(vocab), hidden_size=312, num_hidden_layers=3,
+                        num_attention_heads=12, intermediate_size=600, max_position_embeddings=512)
+    BertForPreTraining(config).save_pretrained(path)
+    return path
+
+
+def _rss_mb() -> float:
+    from core.ai_engine.model_registry import _rss_bytes
+    return _rss_bytes() / (1024 * 1024)
+
+
+def child(mode: str, model: str, ner_model: str, threads: int):
+    # Библиотеки импортируем в обоих режимах одинаково — сравниваем только модели
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+    from core.ai_engine.model_registry import _tensor_bytes, model_registry
+    from systems.parser.bert_classifier import BERTLeadClassifier
+    from systems.parser.bert_ner import BERTEntityExtractor
+
+    rss_start = _rss_mb()
+    start = time.perf_counter()
+    report = {}
+    if mode == "legacy":
+        if threads:
+            torch.set_num_threads(threads)
+        encoder = SentenceTransformer(model)
+        tokenizer = AutoTokenizer.from_pretrained(model)
+        classifier = AutoModelForSequenceClassification.from_pretrained(model, num_labels=2).eval()
+        ner = pipeline("ner", model=ner_model, tokenizer=ner_model, aggregation_strategy="simple")
+        load = time.perf_counter() - start
+
+        first = time.perf_counter()
+        encoder.encode(TEXTS)
+        with torch.inference_mode():
+            classifier(**tokenizer(TEXTS, return_tensors="pt", padding="longest", truncation=True))
+        first = time.perf_counter() - first
+        weights = _tensor_bytes(encoder) + _tensor_bytes(classifier) + _tensor_bytes(ner.model)
+    else:
+        if threads:
+            model_registry.set_num_threads(threads)
+        classifier = BERTLeadClassifier(model)
+        BERTEntityExtractor(ner_model).extract_all(TEXTS[0])  # NER-модель не грузится
+        model_registry.sentence_encoder(model)
+        classifier._ensure_model()
+        load = time.perf_counter() - start
+
+        first = time.perf_counter()
+        model_registry.sentence_encoder(model).encode(TEXTS)
+        classifier.predict_batch(TEXTS)
+        first = time.perf_counter() - first
+        report = model_registry.memory_report()
+        weights = sum(info["params_mb"] for info in report.values()) * 1024 * 1024
+        weights += _tensor_bytes(classifier.model.classifier)
+
+    print(json.dumps({
+        "load_s": load, "first_predict_ms": first * 1000, "weights_mb": weights / (1024 * 1024),
+        "rss_mb": _rss_mb(), "rss_models_mb": _rss_mb() - rss_start, "report": report,
+    }))
+
+
+def run_child(mode: str, args) -> dict:
+    cmd = [sys.executable, __file__, "--child", mode, "--model", args.model,
+           "--ner-model", args.ner_model, "--threads", str(args.threads)]
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"{mode} failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="cointegrated/rubert-tiny")
+    parser.add_argument("--ner-model", default="cointegrated/rubert-tiny2")
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--child", choices=["legacy", "registry"])
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.model, args.ner_model, args.threads)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            args.model = build_synthetic_model(os.path.join(tmp, "rubert-tiny"))
+            args.ner_model = build_synthetic_model(os.path.join(tmp, "rubert-tiny2"))
+        print(f"model={args.model} ner={args.ner_model} threads={args.threads or 'default'}")
+        for mode in ("legacy", "registry"):
+            result = run_child(mode, args)
+            print(f"{mode:<9} load={result['load_s']:6.2f} s  first predict={result['first_predict_ms']:7.1f} ms  "
+                  f"weights={result['weights_mb']:6.1f} MB  rss={result['rss_mb']:7.1f} MB "
+                  f"(+{result['rss_models_mb']:.1f} MB on models)")
+            for key, info in result["report"].items():
+                print(f"          {key}: {info}")
+
+
+if __name__ == "__main__":
+    main()
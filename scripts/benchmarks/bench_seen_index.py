@@ -0,0 +1,149 @@
+"""
+is_processed: Bloom + MinHash/LSH против прежнего пути (hash lookup + линейный Жаккар).
+
+Запуск: python scripts/benchmarks/bench_seen_index.py [--rows N] [--window M] [--queries Q]
+На временной базе с N вакансиями (M принятых за последние 3 дня) печатает:
+- латентность is_processed (mean/p50/p99) для новых текстов, точных и почти-дубликатов;
+- наблюдаемую и теоретическую долю ложных срабатываний Bloom-фильтра;
+- совпадение ответа LSH с точным перебором (recall по near-duplicates).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from core.database.sqlite_pool import close_all_pools
+from systems.parser.vacancy_db import VacancyDatabase
+
+WORDS = (
+    "нужен требуется ищу специалист seo продвижение сайт директ авито таргет реклама магазин "
+    "бюджет срочно проект задача настройка аудит маркетплейс wildberries ozon лендинг тильда "
+    "разработка дизайн контент smm копирайтер crm битрикс аналитика метрика кампания лиды "
+    "клиника стоматология недвижимость школа курс салон доставка ремонт юрист стройка"
+).split()
+
+
+def _text(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(15, 40))) + f" #{rng.randint(0, 10**9)}"
+
+
+def _near_duplicate(text: str, rng: random.Random) -> str:
+    words = text.split()
+    i = rng.randrange(len(words))
+    words[i] = rng.choice(WORDS)
+    return " ".join(words) + "!"
+
+
+class ScanVacancyDatabase(VacancyDatabase):
+    """Прежний is_processed: lookup по hash и перебор окна с Жаккаром."""
+
+    async def is_processed(self, text: str, fuzzy: bool = True) -> bool:
+        async with self.pool.reader() as db:
+            async with db.execute("SELECT id FROM vacancies WHERE hash = ?", (self._generate_hash(text),)) as cursor:
+                if await cursor.fetchone():
+                    return True
+        return fuzzy and await self.find_similar(text) is not None
+
+    async def find_similar(self, text: str, threshold: float = 0.7, days: int = 3):
+        cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
+        async with self.pool.reader() as db:
+            async with db.execute("""
+                SELECT id, text, last_seen, source FROM vacancies
+                WHERE status = 'accepted' AND last_seen > ?
+            """, (cutoff_date,)) as cursor:
+                rows = await cursor.fetchall()
+        for row in rows:
+            if self._get_similarity(text, row[1]) >= threshold:
+                return {'id': row[0]}
+        return None
+
+
+async def _seed(db: VacancyDatabase, rows: int, window: int, rng: random.Random):
+    now = datetime.now()
+    texts = [_text(rng) for _ in range(rows)]
+    data = []
+    for i, text in enumerate(texts):
+        recent = i >= rows - window
+        seen = now - (timedelta(hours=rng.uniform(0, 70)) if recent else timedelta(days=rng.uniform(4, 700)))
+        data.append((hashlib.md5("".join(text.lower().split()).encode()).hexdigest(),
+                     "accepted" if recent or i % 3 == 0 else "rejected", text, "bench",
+                     seen.isoformat(), seen.isoformat()))
+    async with db.pool.writer() as conn:
+        await conn.executemany("""
+            INSERT OR IGNORE INTO vacancies (hash, status, text, source, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, data)
+    return texts[rows - window:]
+
+
+async def _latency(db, texts):
+    samples = []
+    for text in texts:
+        start = time.perf_counter()
+        await db.is_processed(text)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+
+async def run(rows: int, window: int, queries: int):
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "seen.db")
+        indexed = VacancyDatabase(path)
+        await indexed.init_db()
+        recent = await _seed(indexed, rows, window, rng)
+
+        start = time.perf_counter()
+        await indexed.seen_index.ensure_loaded(indexed.pool)
+        print(f"index build: {(time.perf_counter() - start) * 1000:.0f} ms "
+              f"({indexed.seen_index.get_stats()['hashes']} hashes, {len(indexed.seen_index.lsh)} LSH entries)")
+
+        workloads = {
+            "new": [_text(rng) for _ in range(queries)],
+            "exact dup": [rng.choice(recent) for _ in range(queries)],
+            "near dup": [_near_duplicate(rng.choice(recent), rng) for _ in range(queries)],
+        }
+        scan = ScanVacancyDatabase(path)
+        for name, texts in workloads.items():
+            old = await _latency(scan, texts)
+            new = await _latency(indexed, texts)
+            print(f"{name:<10} scan mean/p50/p99 = {old[0]:7.3f}/{old[1]:7.3f}/{old[2]:7.3f} ms   "
+                  f"index = {new[0]:7.3f}/{new[1]:7.3f}/{new[2]:7.3f} ms")
+
+        # Точность: ложные срабатывания Bloom и recall LSH
+        bloom = indexed.seen_index.bloom
+        absent = [hashlib.md5(os.urandom(16)).hexdigest() for _ in range(200_000)]
+        fp = sum(1 for h in absent if h in bloom)
+        print(f"bloom: observed FP rate {fp / len(absent):.5f}, expected {bloom.expected_fp_rate:.5f} "
+              f"({bloom.count} items, {len(bloom.bits) / 1024 / 1024:.1f} MiB)")
+
+        agree = 0
+        for text in workloads["near dup"]:
+            exact = await scan.find_similar(text)
+            approx = await indexed.find_similar(text)
+            agree += (exact is None) == (approx is None)
+        print(f"lsh: agrees with exact scan on {agree}/{len(workloads['near dup'])} near-duplicate queries")
+        await close_all_pools()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--window", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.window, args.queries))
+
+
+if __name__ == "__main__":
+    main()
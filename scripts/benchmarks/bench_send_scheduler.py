@@ -0,0 +1,146 @@
+"""
+Очередь отправки TelegramRateLimiter против прежнего global lock на виртуальных часах.
+
+Запуск: python scripts/benchmarks/bench_send_scheduler.py [--recipients 1000] [--messages 3]
+
+N получателей одновременно шлют по M сообщений (лимит 1 msg/s на получателя,
+30 msg/s на аккаунт); 10% получателей — HOT-лиды, 30% — follow-up. Время
+виртуальное: event loop перескакивает ожидания, поэтому прогон на тысячи
+«секунд» занимает доли реальной секунды. Печатает достигнутый throughput
+(потолок — 30 msg/s), индекс справедливости Джайна по среднему ожиданию
+получателей одного приоритета и p50/p99 ожидания HOT и follow-up.
+Опция --flood-at имитирует FloodWait на заданной секунде.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from systems.alexey.rate_limiter import (
+    PRIORITY_FOLLOWUP, PRIORITY_HOT, PRIORITY_WARM, TelegramRateLimiter, TokenBucket,
+)
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Loop с виртуальным временем: если готовых событий нет, время сдвигается на таймаут select."""
+
+    def __init__(self):
+        super().__init__()
+        self._virtual_now = 0.0
+        select = self._selector.select
+
+        def fast_select(timeout=None):
+            events = select(0)
+            if not events and timeout:
+                self._virtual_now += timeout
+            return events
+
+        self._selector.select = fast_select
+
+    def time(self) -> float:
+        return self._virtual_now
+
+
+class LegacyLockLimiter:
+    """Прежний acquire_pm: global lock, внутри которого спят на лимите получателя."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.global_bucket = TokenBucket(30, 30.0, clock=clock)
+        self.user_buckets = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire_pm(self, user_id, priority=PRIORITY_WARM):
+        async with self._lock:
+            for bucket in (self.global_bucket, self.user_buckets.setdefault(user_id, TokenBucket(1, 1.0, clock=self.clock))):
+                ok, wait = bucket.consume()
+                if not ok:
+                    await asyncio.sleep(wait)
+                    bucket.consume()
+
+
+def jain(values):
+    values = [v for v in values if v is not None]
+    if not values or not any(values):
+        return 1.0
+    return sum(values) ** 2 / (len(values) * sum(v * v for v in values))
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def run(make_limiter, recipients: int, messages: int, flood_at: float):
+    loop = asyncio.get_running_loop()
+    limiter = make_limiter(loop.time)
+    rng = random.Random(42)
+    priorities = {uid: rng.choices([PRIORITY_HOT, PRIORITY_WARM, PRIORITY_FOLLOWUP], [0.1, 0.6, 0.3])[0]
+                  for uid in range(recipients)}
+    waits = {uid: [] for uid in range(recipients)}
+    start = loop.time()
+
+    async def recipient(uid):
+        for _ in range(messages):
+            requested = loop.time()
+            await limiter.acquire_pm(uid, priority=priorities[uid])
+            waits[uid].append(loop.time() - requested)
+
+    async def flood():
+        await asyncio.sleep(flood_at)
+        limiter.report_flood_wait(10)
+
+    extra = [asyncio.create_task(flood())] if flood_at and hasattr(limiter, "report_flood_wait") else []
+    await asyncio.gather(*(recipient(uid) for uid in range(recipients)))
+    makespan = loop.time() - start
+    for task in extra:
+        task.cancel()
+    if hasattr(limiter, "close"):
+        await limiter.close()
+
+    by_priority = {}
+    for uid, items in waits.items():
+        by_priority.setdefault(priorities[uid], []).append(statistics.mean(items))
+    return {
+        "makespan": makespan,
+        "throughput": recipients * messages / makespan if makespan else float("inf"),
+        "fairness": statistics.mean(jain(v) for v in by_priority.values()),
+        "hot": [w for uid in waits if priorities[uid] == PRIORITY_HOT for w in waits[uid]],
+        "followup": [w for uid in waits if priorities[uid] == PRIORITY_FOLLOWUP for w in waits[uid]],
+        "scale": getattr(limiter, "_rate_scale", 1.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipients", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=3)
+    parser.add_argument("--flood-at", type=float, default=0.0)
+    args = parser.parse_args()
+
+    variants = {
+        "legacy global lock": lambda clock: LegacyLockLimiter(clock),
+        "priority scheduler": lambda clock: TelegramRateLimiter(clock=clock),
+    }
+    for name, factory in variants.items():
+        loop = VirtualClockLoop()
+        wall = time.perf_counter()
+        try:
+            result = loop.run_until_complete(run(factory, args.recipients, args.messages, args.flood_at))
+        finally:
+            loop.close()
+        wall = time.perf_counter() - wall
+        print(f"{name:20s} makespan {result['makespan']:8.1f} s  throughput {result['throughput']:6.2f} msg/s  "
+              f"fairness {result['fairness']:.3f}  HOT p50/p99 {percentile(result['hot'], .5):6.1f}/"
+              f"{percentile(result['hot'], .99):6.1f} s  follow-up p50/p99 {percentile(result['followup'], .5):6.1f}/"
+              f"{percentile(result['followup'], .99):6.1f} s  rate scale {result['scale']:.2f}  (wall {wall:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Микро-бенчмарк VacancyDatabase: соединение на каждый вызов vs общий пул.
+
+Запуск: python scripts/benchmarks/bench_vacancy_db_pool.py [--rows N] [--calls N]
+На временной базе с N строками печатает ops/sec и среднюю латентность для
+is_processed (без fuzzy), add_accepted и get_leads_since. «connect per call» —
+прежняя реализация методов (aiosqlite.connect + PRAGMA/commit на каждый вызов).
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import aiosqlite
+
+from core.database.sqlite_pool import close_all_pools
+from systems.parser.vacancy_db import VacancyDatabase
+
+
+class PerCallVacancyDatabase(VacancyDatabase):
+    """Прежнее поведение: новое соединение (и поток) на каждый запрос."""
+
+    async def is_processed(self, text: str, fuzzy: bool = True) -> bool:
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute("SELECT id FROM vacancies WHERE hash = ?", (self._generate_hash(text),)) as cursor:
+                return await cursor.fetchone() is not None
+
+    async def add_accepted(self, text, source, direction=None, contact_link=None, date=None,
+                           message_id=None, chat_id=None) -> bool:
+        vacancy_hash = self._generate_hash(text)
+        date = date or datetime.now().isoformat()
+        async with aiosqlite.connect(self.db_path) as db:
+            try:
+                await db.execute("""
+                    INSERT INTO vacancies (hash, status, text, source, direction, contact_link, response, rejection_reason, first_seen, last_seen, message_id, chat_id)
+                    VALUES (?, 'accepted', ?, ?, ?, ?, NULL, NULL, ?, ?, ?, ?)
+                """, (vacancy_hash, text, source, direction, contact_link, date, date, message_id, chat_id))
+                await db.commit()
+            except aiosqlite.IntegrityError:
+                await db.execute("UPDATE vacancies SET last_seen = ? WHERE hash = ?", (date, vacancy_hash))
+                await db.commit()
+                return False
+        return True
+
+    async def get_leads_since(self, cutoff_time: datetime, limit: int = 500):
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute("""
+                SELECT id, hash, text, source, last_seen, message_id, chat_id, tier,
+                       informativeness_score, needs_review, manual_label, embedding
+                FROM vacancies
+                WHERE last_seen > ?
+                ORDER BY last_seen DESC
+                LIMIT ?
+            """, (cutoff_time.isoformat(), limit)) as cursor:
+                return await cursor.fetchall()
+
+
+async def _seed(db: VacancyDatabase, rows: int):
+    now = datetime.now()
+    async with db.pool.writer() as conn:
+        await conn.executemany("""
+            INSERT INTO vacancies (hash, status, text, source, first_seen, last_seen)
+            VALUES (?, 'accepted', ?, 'bench', ?, ?)
+        """, [
+            (f"seed{i}", f"Нужен специалист по SEO, задача {i}", (now - timedelta(minutes=i)).isoformat(),
+             (now - timedelta(minutes=i)).isoformat())
+            for i in range(rows)
+        ])
+
+
+async def _measure(label: str, calls: int, fn):
+    start = time.perf_counter()
+    for i in range(calls):
+        await fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<16} {calls / elapsed:9.1f} ops/sec   {elapsed / calls * 1000:7.3f} ms/op")
+
+
+async def run(rows: int, calls: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench_vacancies.db")
+        pooled = VacancyDatabase(db_path)
+        await pooled.init_db()
+        await _seed(pooled, rows)
+        per_call = PerCallVacancyDatabase(db_path)
+        cutoff = datetime.now() - timedelta(hours=24)
+
+        for name, db in (("connect per call", per_call), ("pool", pooled)):
+            print(f"{name}:")
+            await _measure("is_processed", calls, lambda i: db.is_processed(f"Нужен специалист по SEO, задача {i}", fuzzy=False))
+            await _measure("add_accepted", calls, lambda i: db.add_accepted(f"{name} новая вакансия {i}", "bench"))
+            await _measure("get_leads_since", max(calls // 10, 1), lambda i: db.get_leads_since(cutoff, limit=100))
+
+        await close_all_pools()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.calls))
+
+
+if __name__ == "__main__":
+    main()
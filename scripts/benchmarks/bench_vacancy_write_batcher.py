@@ -0,0 +1,75 @@
+"""
+Пропускная способность записи вакансий: построчный commit vs group commit.
+
+Запуск: python scripts/benchmarks/bench_vacancy_write_batcher.py [--rows N] [--dup-ratio R]
+Печатает rows/sec для add_accepted/add_rejected напрямую (commit на строку)
+и через VacancyWriteBatcher. Доля dup-ratio строк — повторы уже записанных
+текстов (ветка обновления last_seen).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from core.database.sqlite_pool import close_all_pools
+from systems.parser.vacancy_db import VacancyDatabase
+
+
+def _make_texts(n: int, dup_ratio: float):
+    rng = random.Random(42)
+    texts = []
+    for i in range(n):
+        if texts and rng.random() < dup_ratio:
+            texts.append(rng.choice(texts))
+        else:
+            texts.append(f"Нужен специалист по настройке Яндекс Директ, проект {i}, бюджет {rng.randint(5, 90)}к")
+    return texts
+
+
+async def _write_all(db: VacancyDatabase, texts):
+    for i, text in enumerate(texts):
+        if i % 3:
+            await db.add_rejected(text, "bench", reason="bench", message_id=i, chat_id=-100)
+        else:
+            await db.add_accepted(text, "bench", direction="Директ", message_id=i, chat_id=-100)
+
+
+async def run(rows: int, dup_ratio: float):
+    texts = _make_texts(rows, dup_ratio)
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, batched in (("commit per row", False), ("group commit", True)):
+            db = VacancyDatabase(os.path.join(tmp, f"{'batched' if batched else 'direct'}.db"))
+            await db.init_db()
+            if batched:
+                db.enable_write_batching()
+
+            start = time.perf_counter()
+            await _write_all(db, texts)
+            await db.flush_writes()
+            elapsed = time.perf_counter() - start
+
+            extra = ""
+            if batched:
+                stats = db.write_batcher.stats
+                extra = f" (batches={stats['batches']}, avg={stats['rows'] / max(stats['batches'], 1):.0f} rows)"
+                await db.close()
+            print(f"{label:<15} {rows / elapsed:10.1f} rows/sec{extra}")
+        await close_all_pools()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dup-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.dup_ratio))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Профиль холодного старта точек входа main.py (python -X importtime).
+
+Запуск: python scripts/benchmarks/profile_cold_start.py [--top N]
+Для каждой команды (monitor, parse today, gwen, worker) в отдельном процессе
+импортирует её модуль и печатает время импорта, пиковый RSS, самые медленные
+модули (self time) и какие тяжёлые ML-библиотеки оказались загружены.
+Бюджеты проверяет tests/unit/test_cold_start.py.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+ENTRY_POINTS = {
+    "monitor": "apps.unified_monitor",
+    "parse today": "apps.today_parser",
+    "gwen": "systems.alexey.main",
+    "worker": "systems.parser.celery_config",
+}
+HEAVY_MODULES = ("torch", "transformers", "sentence_transformers", "sklearn", "pandas", "whisper")
+
+_ROW = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+_SNIPPET = "import resource, sys; import {module}; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+
+def profile(module: str):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _SNIPPET.format(module=module)],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    rows = [m for m in map(_ROW.match, proc.stderr.splitlines()) if m]
+    total = next((int(m.group(2)) for m in rows if m.group(4) == module and not m.group(3)), 0)
+    self_times = sorted(((int(m.group(1)), m.group(4)) for m in rows), reverse=True)
+    loaded = {m.group(4).split(".")[0] for m in rows}
+    rss_mb = int(proc.stdout.strip().splitlines()[-1]) / 1024
+    return total / 1e6, rss_mb, self_times, [h for h in HEAVY_MODULES if h in loaded]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    for command, module in ENTRY_POINTS.items():
+        result = profile(module)
+        if result is None:
+            print(f"{command:<12} {module}: import failed (missing dependency?)")
+            continue
+        total, rss_mb, self_times, heavy = result
+        print(f"{command:<12} {module}: {total:.2f} s, peak RSS {rss_mb:.0f} MB, heavy: {heavy or 'none'}")
+        for us, name in self_times[:args.top]:
+            print(f"    {us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Replay сохранённых вакансий через filter_lead_advanced: исходный порядок
+стадий (lead_cascade.legacy_plan) против плана планировщика.
+
+Запуск: python scripts/benchmarks/replay_lead_filter.py [--db data/db/vacancies.db]
+        [--limit 1000] [--llm] [--no-dedup]
+
+Печатает время прогона, число расхождений is_lead (должно быть 0) и счётчики
+стадий: сколько раз запускались дедуп/BERT/LLM и сколько вызовов удалось не делать.
+LLM по умолчанию выключен — его ответы недетерминированы (--llm включает).
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from core.config.settings import settings
+from systems.parser.lead_filter_advanced import filter_lead_advanced, get_cascade_stats, lead_cascade
+
+
+def load_vacancies(db_path: str, limit: int):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("""
+            SELECT text, source, COALESCE(direction, '') FROM vacancies
+            WHERE text IS NOT NULL AND text != '' ORDER BY id DESC LIMIT ?
+        """, (limit,)).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        conn.close()
+
+
+async def replay(rows, plan, use_llm: bool, use_dedup: bool):
+    lead_cascade.reset_stats()
+    start = time.perf_counter()
+    decisions = []
+    for text, source, direction in rows:
+        result = await filter_lead_advanced(text, source, direction, use_llm_for_uncertain=use_llm,
+                                            use_deduplication=use_dedup, plan=plan)
+        decisions.append(result["is_lead"])
+    return decisions, time.perf_counter() - start, get_cascade_stats()
+
+
+def print_stats(title: str, elapsed: float, stats):
+    print(f"{title}: {elapsed:.2f} s  plan: {stats['plan']}")
+    for name, s in stats["stages"].items():
+        print(f"    {name:<14} runs={s['runs']:6d}  skipped={s['skipped']:6d}  rejected={s['rejected']:6d}  "
+              f"cost={s['cost_ms']:9.3f} ms  total={s['total_ms']:10.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=str(settings.VACANCY_DB_PATH))
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--llm", action="store_true")
+    parser.add_argument("--no-dedup", action="store_true")
+    args = parser.parse_args()
+
+    rows = load_vacancies(args.db, args.limit)
+    if not rows:
+        print(f"{args.db}: нет сохранённых вакансий")
+        return
+    print(f"{len(rows)} вакансий из {args.db}")
+
+    legacy, legacy_time, legacy_stats = await replay(rows, lead_cascade.legacy_plan(), args.llm, not args.no_dedup)
+    # Прогрев: планировщик набирает замеры на тех же данных
+    await replay(rows, None, args.llm, not args.no_dedup)
+    plan = lead_cascade.compute_plan()
+    planned, planned_time, planned_stats = await replay(rows, plan, args.llm, not args.no_dedup)
+
+    print_stats("legacy ", legacy_time, legacy_stats)
+    print_stats("planned", planned_time, planned_stats)
+    mismatches = sum(a != b for a, b in zip(legacy, planned))
+    print(f"is_lead mismatches: {mismatches}  accepted: {sum(planned)}/{len(planned)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
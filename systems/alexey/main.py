@@ -1,5 +1,6 @@
 from datetime import datetime
 from pyrogram import Client, filters
+from pyrogram.handlers import MessageHandler
 from pyrogram.types import Message
 from pyrogram.errors import FloodWait
 from core.config.settings import settings
@@ -10,6 +11,8 @@ from sqlalchemy import select
 from core.utils.logger import logger
 from systems.gwen.commander import GwenCommander
 from core.utils.handover import handover_manager
+from core.telegram.session_pool import get_session_pool
+from systems.alexey.vacancy_stream import get_vacancy_stream
 import asyncio
 import os
 
@@ -82,6 +85,13 @@ async def on_new_message(client: Client, message: Message):
     text_preview = (message.text or "[voice]")[:50]
     logger.info(f"✅ Processing message in chat {chat_id}: {text_preview}...")
 
+    # Диалог остаётся за аккаунтом, на который написал лид (follow-up пойдут с него же)
+    if message.from_user:
+        session_pool = get_session_pool()
+        await session_pool.bind(message.from_user.id, client)
+        if message.from_user.username:
+            await session_pool.bind(message.from_user.username, client)
+
     try:
         await handle_incoming_message(message, client)
     except Exception as e:
@@ -125,8 +135,9 @@ async def on_outgoing_message(client: Client, message: Message):
 
 @client.on_message(filters.incoming & ~filters.private)
 async def on_channel_message(client: Client, message: Message):
-    """Логируем события из каналов/групп (для мониторинга вакансий Gwen)."""
+    """Новые сообщения каналов/групп: сразу в очередь авто-outreach (VacancyStream)."""
     logger.info(f"📩 New event from {message.chat.id}. is_private=False")
+    get_vacancy_stream(client).submit(message)
 
 
 async def main():
@@ -140,6 +151,16 @@ async def main():
     gwen_commander = GwenCommander(client)
     await gwen_commander.start(start_bot=False)
 
+    # Пул аккаунтов для исходящих: у дополнительных аккаунтов те же обработчики личных сообщений,
+    # ответ уходит с клиента, получившего сообщение
+    session_pool = get_session_pool(client)
+    for account in session_pool.accounts.values():
+        if account.client is not client:
+            account.client.add_handler(MessageHandler(on_new_message, filters.incoming & filters.private & not_blacklisted))
+            account.client.add_handler(MessageHandler(on_outgoing_message, filters.outgoing & filters.private))
+    await session_pool.start()
+    logger.info(f"Session pool: {', '.join(session_pool.accounts)}")
+
     me = await client.get_me()
     logger.info(f"Logged in as: {me.first_name} (@{me.username})")
 
@@ -151,7 +172,7 @@ async def main():
     logger.info("Userbot is running. Press Ctrl+C to stop.")
 
     # Start background tasks (обёртка ловит исключения, иначе они теряются в create_task)
-    from systems.alexey.tasks import run_follow_ups
+    from systems.alexey.tasks import run_automated_outreach, run_follow_ups
 
     async def _safe_follow_ups():
         try:
@@ -159,11 +180,25 @@ async def main():
         except Exception as e:
             logger.error(f"Background task run_follow_ups crashed: {e}")
 
+    async def _safe_outreach():
+        try:
+            await run_automated_outreach(client)
+        except Exception as e:
+            logger.error(f"Background task run_automated_outreach crashed: {e}")
+
     asyncio.create_task(_safe_follow_ups())
+    # Поток вакансий: после разрыва соединения пропущенное дочитывается get_chat_history
+    get_vacancy_stream(client).attach()
+    asyncio.create_task(_safe_outreach())
 
     # Keep running (client.idle() removed in newer Pyrogram)
     stop_event = asyncio.Event()
-    await stop_event.wait()
+    try:
+        await stop_event.wait()
+    finally:
+        from core.ai_engine.http_pool import close_http_clients
+        await close_http_clients()
+        await session_pool.stop()
 
 
 if __name__ == "__main__":
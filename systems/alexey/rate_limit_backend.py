@@ -0,0 +1,234 @@
+"""
+Общее хранилище token bucket для всех процессов, пишущих от одного аккаунта Telegram.
+
+alexey, today_parser и Гвен — отдельные процессы, и у каждого
+свой TelegramRateLimiter. Чтобы вместе они не превышали лимиты аккаунта,
+окончательное решение «можно отправлять» принимает общий backend:
+
+- RedisBucketBackend — Lua-скрипт на settings.REDIS_URL: пополнение и списание
+  всех buckets заявки одной атомарной операцией, время — redis TIME;
+- SQLiteBucketBackend — файл в DB_DIR для запуска на одной машине без Redis:
+  BEGIN IMMEDIATE берёт файловую блокировку SQLite на время списания.
+
+take() списывает tokens со всех переданных buckets или не списывает ничего и
+возвращает, сколько ждать и какой bucket мешает. pause() ставит общую паузу
+аккаунта (FloodWait/PeerFlood, полученный любым процессом).
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Optional, Sequence, Tuple
+
+from core.config.settings import settings
+from core.utils.structured_logger import get_logger
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+# (ключ, capacity, токенов в секунду)
+Bucket = Tuple[str, float, float]
+
+# Индекс «мешающего» bucket в ответе take(): пауза аккаунта
+PAUSED = -1
+
+# Погрешность float, как в TokenBucket.EPSILON
+EPSILON = 1e-9
+
+_TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local requested = tonumber(ARGV[1])
+local paused = tonumber(redis.call('GET', KEYS[1]) or '0')
+if paused > now then
+    return {tostring(paused - now), 0}
+end
+local current = {}
+local wait, blocker = 0, -1
+for i = 1, #KEYS - 1 do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    local state = redis.call('HMGET', KEYS[i + 1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    current[i] = tokens
+    if tokens + 1e-9 < requested and (requested - tokens) / rate > wait then
+        wait, blocker = (requested - tokens) / rate, i
+    end
+end
+if wait > 0 then
+    return {tostring(wait), blocker}
+end
+for i = 1, #KEYS - 1 do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    redis.call('HSET', KEYS[i + 1], 'tokens', tostring(math.max(0, current[i] - requested)), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[i + 1], math.ceil(capacity / rate) + 60)
+end
+return {'0', -1}
+"""
+
+_PAUSE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local until_ts = now + tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if until_ts > current then
+    redis.call('SET', KEYS[1], tostring(until_ts), 'EX', math.ceil(tonumber(ARGV[1])) + 1)
+    return tostring(until_ts - now)
+end
+return tostring(current - now)
+"""
+
+
+class BucketBackend:
+    """Атомарные общие buckets: take() списывает со всех или ни с одного."""
+
+    name = "base"
+
+    def take(self, buckets: Sequence[Bucket], tokens: float = 1.0,
+             pause_key: Optional[str] = None) -> Tuple[float, Optional[int]]:
+        """
+        Returns:
+            (0.0, None) — токены списаны; иначе (секунд ожидания, индекс мешающего
+            bucket в buckets или PAUSED, если аккаунт на общей паузе).
+        """
+        raise NotImplementedError
+
+    def pause(self, pause_key: str, seconds: float) -> None:
+        """Общая пауза отправок до now + seconds (более длинная существующая не сокращается)."""
+        raise NotImplementedError
+
+
+class RedisBucketBackend(BucketBackend):
+    """Buckets в Redis: один EVALSHA на заявку."""
+
+    name = "redis"
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis package is not installed")
+            client = redis.Redis.from_url(url or settings.REDIS_URL, socket_timeout=1.0, socket_connect_timeout=1.0)
+        self.client = client
+        self._take = client.register_script(_TAKE_SCRIPT)
+        self._pause = client.register_script(_PAUSE_SCRIPT)
+
+    def ping(self) -> bool:
+        return bool(self.client.ping())
+
+    def take(self, buckets, tokens=1.0, pause_key=None):
+        keys = [pause_key or f"{buckets[0][0]}:pause"] + [key for key, _, _ in buckets]
+        args = [tokens]
+        for _, capacity, rate in buckets:
+            args += [capacity, rate]
+        wait, blocker = self._take(keys=keys, args=args)
+        wait = float(wait)
+        if wait <= 0:
+            return 0.0, None
+        return wait, PAUSED if int(blocker) == 0 else int(blocker) - 1
+
+    def pause(self, pause_key, seconds):
+        self._pause(keys=[pause_key], args=[seconds])
+
+
+class SQLiteBucketBackend(BucketBackend):
+    """Buckets в SQLite-файле: общие для процессов одной машины."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = str(path or settings.DB_DIR / "rate_limits.db")
+        self._local = threading.local()  # take() вызывается из asyncio.to_thread — соединение на поток
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, ts REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_pauses (key TEXT PRIMARY KEY, until REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, buckets, tokens=1.0, pause_key=None):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            if pause_key:
+                row = conn.execute("SELECT until FROM rate_pauses WHERE key = ?", (pause_key,)).fetchone()
+                if row and row[0] > now:
+                    conn.execute("COMMIT")
+                    return row[0] - now, PAUSED
+
+            current = []
+            wait, blocker = 0.0, None
+            for index, (key, capacity, rate) in enumerate(buckets):
+                row = conn.execute("SELECT tokens, ts FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+                available = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                current.append(available)
+                if available + EPSILON < tokens and (tokens - available) / rate > wait:
+                    wait, blocker = (tokens - available) / rate, index
+            if blocker is not None:
+                conn.execute("COMMIT")
+                return wait, blocker
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, ts) VALUES (?, ?, ?)",
+                [(key, max(0.0, available - tokens), now) for (key, _, _), available in zip(buckets, current)],
+            )
+            conn.execute("COMMIT")
+            return 0.0, None
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def pause(self, pause_key, seconds):
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO rate_pauses (key, until) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET until = MAX(until, excluded.until)",
+            (pause_key, time.time() + seconds),
+        )
+
+
+_backend: Optional[BucketBackend] = None
+_backend_resolved = False
+_backend_lock = threading.Lock()
+
+
+def get_bucket_backend() -> Optional[BucketBackend]:
+    """
+    Backend по settings.RATE_LIMIT_BACKEND: auto (Redis, при недоступности SQLite),
+    redis, sqlite или local (None — только лимиты процесса).
+    """
+    global _backend, _backend_resolved
+    if _backend_resolved:
+        return _backend
+    with _backend_lock:
+        if _backend_resolved:
+            return _backend
+        mode = settings.RATE_LIMIT_BACKEND.lower()
+        backend = None
+        if mode in ("auto", "redis"):
+            try:
+                backend = RedisBucketBackend(settings.REDIS_URL)
+                backend.ping()
+            except Exception as e:
+                backend = None
+                logger.warning("rate_limit_redis_unavailable", mode=mode, error=str(e)[:200])
+        if backend is None and mode in ("auto", "redis", "sqlite"):
+            backend = SQLiteBucketBackend()
+        if backend is not None:
+            logger.info("rate_limit_backend_selected", backend=backend.name)
+        _backend, _backend_resolved = backend, True
+        return _backend
@@ -1,12 +1,25 @@
 """
 Telegram Rate Limiter - улучшенная реализация Token Bucket алгоритма.
 Основано на best practices 2026 года.
+
+Отправки планирует один диспетчер на event loop: вызывающий только ставит
+заявку в очередь и ждёт свой future, общий lock со sleep внутри больше не
+держится. Поэтому ожидание лимита одного получателя (1 msg/s) не задерживает
+остальных, а из готовых к отправке первой уходит заявка с высшим приоритетом
+(HOT-лиды из lead_scoring раньше follow-up).
+
+Все процессы одного аккаунта (alexey, today_parser, Гвен) делят лимиты
+через общий backend (systems/alexey/rate_limit_backend.py): перед выдачей
+токена диспетчер атомарно списывает его из общих buckets в Redis или SQLite,
+а FloodWait/PeerFlood ставит паузу, которую видят все процессы.
 """
 import time
 import asyncio
+import heapq
+import itertools
 import os
 import sys
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
 from dataclasses import dataclass, field
 from collections import defaultdict
 
@@ -18,6 +31,27 @@ from core.utils.structured_logger import get_logger
 logger = get_logger("rate_limiter")
 
 
+# Приоритеты отправки: меньше — раньше
+PRIORITY_HOT = 0
+PRIORITY_WARM = 1
+PRIORITY_COLD = 2
+PRIORITY_FOLLOWUP = 3
+PRIORITY_NORMAL = PRIORITY_WARM
+
+_TIER_PRIORITY = {"HOT": PRIORITY_HOT, "WARM": PRIORITY_WARM, "COLD": PRIORITY_COLD}
+
+
+def priority_for_tier(tier: Optional[str]) -> int:
+    """Приоритет отправки по tier лида (HOT/WARM/COLD из calculate_lead_priority)."""
+    return _TIER_PRIORITY.get((tier or "").upper(), PRIORITY_NORMAL)
+
+
+def shared_key(account: str, *parts) -> str:
+    """Ключ общего bucket: tg_rl:<аккаунт>:<part>... (username без @ и в нижнем регистре)."""
+    normalized = [str(p).lstrip("@").lower() if isinstance(p, str) else str(p) for p in parts]
+    return ":".join(["tg_rl", account, *normalized])
+
+
 @dataclass
 class TokenBucket:
     """
@@ -25,19 +59,24 @@ class TokenBucket:
     Использует монотонное время для предотвращения проблем с системными часами.
     """
     
+    # Погрешность float: остаток вида 0.9999999999999998 считаем целым токеном,
+    # иначе ожидание в 1e-17 с крутит диспетчер вхолостую
+    EPSILON = 1e-9
+
     capacity: float  # Максимальное количество токенов
     refill_rate: float  # Токенов в секунду
+    clock: Callable[[], float] = field(default=time.monotonic, repr=False)  # Источник времени (в бенчмарках — виртуальный)
     tokens: float = field(init=False)
     last_refill: float = field(init=False)
     
     def __post_init__(self):
         """Инициализация с полным bucket."""
         self.tokens = float(self.capacity)
-        self.last_refill = time.monotonic()  # Монотонное время защищает от изменений системных часов
+        self.last_refill = self.clock()  # Монотонное время защищает от изменений системных часов
     
     def refill(self) -> None:
         """Пополняет токены на основе прошедшего времени."""
-        now = time.monotonic()
+        now = self.clock()
         elapsed = now - self.last_refill
         
         if elapsed <= 0:
@@ -62,14 +101,26 @@ class TokenBucket:
         """
         self.refill()
         
-        if self.tokens >= tokens:
-            self.tokens -= tokens
+        if self.tokens + self.EPSILON >= tokens:
+            self.tokens = max(0.0, self.tokens - tokens)
             return True, 0.0
         
         # Вычисляем время ожидания
         tokens_needed = tokens - self.tokens
         wait_time = tokens_needed / self.refill_rate
         return False, wait_time
+
+    def time_until(self, tokens: float = 1.0) -> float:
+        """Секунды до появления tokens токенов без потребления (0 — доступны сейчас)."""
+        self.refill()
+        if self.tokens + self.EPSILON >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.refill_rate
+
+    def set_rate(self, refill_rate: float) -> None:
+        """Меняет скорость пополнения; накопленное до этого момента считается по старой."""
+        self.refill()
+        self.refill_rate = refill_rate
     
     def peek(self) -> float:
         """Возвращает текущее количество токенов без потребления."""
@@ -79,7 +130,18 @@ class TokenBucket:
     def reset(self) -> None:
         """Сбрасывает bucket до полного состояния."""
         self.tokens = self.capacity
-        self.last_refill = time.monotonic()
+        self.last_refill = self.clock()
+
+
+@dataclass(order=True)
+class _SendRequest:
+    """Заявка на отправку; порядок — (приоритет, номер поступления)."""
+    priority: int
+    seq: int
+    key: Hashable = field(compare=False)
+    tokens: float = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
 
 
 class TelegramRateLimiter:
@@ -88,10 +150,11 @@ class TelegramRateLimiter:
     
     Особенности:
     - Соответствие официальным лимитам Telegram
+    - Bucket на каждого получателя и на каждый чат плюс общий бюджет аккаунта
+    - Приоритетная очередь: ожидающие заявки выдаются по приоритету, затем FIFO
+    - Один получатель, упёршийся в свой лимит, не задерживает остальных
+    - Адаптивное снижение общего темпа после FloodWait/PeerFlood и плавное восстановление
     - Автоматическая очистка неактивных buckets
-    - Thread-safe операции
-    - Детальное логирование для отладки
-    - Graceful handling при превышении лимитов
     
     Официальные лимиты Telegram:
     - Личные сообщения: 30 сообщений в секунду (глобально)
@@ -113,127 +176,137 @@ class TelegramRateLimiter:
     CLEANUP_INTERVAL = 300  # Очистка каждые 5 минут
     INACTIVE_THRESHOLD = 600  # Удаляем buckets неактивные 10 минут
     
-    def __init__(self):
-        """Инициализация rate limiter."""
-        # Глобальный лимит для личных сообщений
-        self.global_pm_bucket = TokenBucket(
-            capacity=self.PM_GLOBAL_CAPACITY,
-            refill_rate=self.PM_GLOBAL_RATE
-        )
-        
-        # Глобальный лимит для групп
-        self.global_group_bucket = TokenBucket(
-            capacity=self.GROUP_CAPACITY,
-            refill_rate=self.GROUP_RATE
+    # Адаптация к FloodWait/PeerFlood: общий темп умножается на BACKOFF (не ниже MIN_RATE_SCALE),
+    # затем каждые RECOVERY_INTERVAL секунд без инцидентов растёт на RECOVERY_STEP
+    BACKOFF_FACTOR = 0.5
+    MIN_RATE_SCALE = 0.1
+    RECOVERY_INTERVAL = 120
+    RECOVERY_STEP = 0.1
+    PEER_FLOOD_COOLDOWN = 60  # Пауза всех отправок после PeerFlood, сек
+
+    def __init__(
+        self,
+        clock: Optional[Callable[[], float]] = None,
+        global_rate: Optional[float] = None,
+        global_capacity: Optional[float] = None,
+        user_rate: Optional[float] = None,
+        group_rate: Optional[float] = None,
+        backend=None,
+        account: str = "default",
+    ):
+        """
+        Инициализация rate limiter (параметры переопределяют лимиты по умолчанию).
+
+        backend — общий BucketBackend аккаунта (None — лимиты только этого процесса),
+        account — префикс общих ключей: процессы одного аккаунта должны совпадать.
+        """
+        self._clock = clock or time.monotonic
+        self.backend = backend
+        self.account = account
+        self.global_rate = global_rate or self.PM_GLOBAL_RATE
+        self.user_rate = user_rate or self.USER_RATE
+        self.group_rate = group_rate or self.GROUP_RATE
+
+        # Общий бюджет аккаунта: личные сообщения и группы
+        self.global_bucket = TokenBucket(
+            capacity=global_capacity or self.PM_GLOBAL_CAPACITY,
+            refill_rate=self.global_rate,
+            clock=self._clock,
         )
         
-        # Индивидуальные лимиты для пользователей
-        self.user_buckets: Dict[int, TokenBucket] = {}
+        # Индивидуальные лимиты: ("pm", user_id) и ("chat", chat_id)
+        self.key_buckets: Dict[Hashable, TokenBucket] = {}
         
         # Отслеживание последнего использования для cleanup
-        self.user_last_access: Dict[int, float] = defaultdict(float)
+        self.key_last_access: Dict[Hashable, float] = defaultdict(float)
         
-        # Блокировка для thread-safety
-        self._lock = asyncio.Lock()
+        # Очередь: заявки по ключам (heap), готовые ключи по приоритету головы
+        # и отложенные ключи по времени готовности их bucket. Запись в heap
+        # с устаревшей версией ключа пропускается (ленивое удаление).
+        self._pending: Dict[Hashable, List[_SendRequest]] = {}
+        self._ready: List[Tuple[int, int, int, Hashable]] = []
+        self._delayed: List[Tuple[float, int, Hashable]] = []
+        self._slot_version: Dict[Hashable, int] = {}
+        self._seq = itertools.count()
+
+        self._rate_scale = 1.0
+        self._paused_until = 0.0
+        self._last_incident = 0.0
+
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         
         # Время последней очистки
-        self._last_cleanup = time.monotonic()
+        self._last_cleanup = self._clock()
         
         # Статистика (для мониторинга)
         self.stats = {
             'total_requests': 0,
             'rejected_requests': 0,
-            'total_wait_time': 0.0
+            'total_wait_time': 0.0,
+            'flood_events': 0,
         }
         
         logger.info(
             "TelegramRateLimiter initialized",
             extra={
-                'pm_limit': f"{self.PM_GLOBAL_RATE}/sec",
-                'group_limit': f"{self.GROUP_RATE * 60}/min",
-                'user_limit': f"{self.USER_RATE}/sec"
+                'pm_limit': f"{self.global_rate}/sec",
+                'group_limit': f"{self.group_rate * 60}/min",
+                'user_limit': f"{self.user_rate}/sec"
             }
         )
     
-    def _get_user_bucket(self, user_id: int) -> TokenBucket:
-        """Получает или создает bucket для пользователя."""
-        if user_id not in self.user_buckets:
-            self.user_buckets[user_id] = TokenBucket(
-                capacity=self.USER_CAPACITY,
-                refill_rate=self.USER_RATE
-            )
-            logger.debug(f"Created new bucket for user {user_id}")
+    # ---------- buckets ----------
+
+    def _get_bucket(self, key: Hashable) -> TokenBucket:
+        """Получает или создает bucket получателя/чата."""
+        bucket = self.key_buckets.get(key)
+        if bucket is None:
+            if key[0] == "chat":
+                bucket = TokenBucket(capacity=self.GROUP_CAPACITY, refill_rate=self.group_rate, clock=self._clock)
+            else:
+                bucket = TokenBucket(capacity=self.USER_CAPACITY, refill_rate=self.user_rate, clock=self._clock)
+            self.key_buckets[key] = bucket
+            logger.debug(f"Created new bucket for {key}")
         
         # Обновляем время последнего доступа
-        self.user_last_access[user_id] = time.monotonic()
-        return self.user_buckets[user_id]
+        self.key_last_access[key] = self._clock()
+        return bucket
     
-    async def acquire_pm(self, user_id: int, tokens: float = 1.0) -> float:
+    def _global_wait(self, tokens: float) -> float:
+        """Секунды до разрешения общего бюджета (с учётом паузы после flood)."""
+        return max(self._paused_until - self._clock(), self.global_bucket.time_until(tokens), 0.0)
+
+    # ---------- публичный API ----------
+
+    async def acquire_pm(self, user_id: int, tokens: float = 1.0, priority: int = PRIORITY_NORMAL) -> float:
         """
         Ожидает доступности для отправки личного сообщения.
         
         Args:
-            user_id: ID пользователя
+            user_id: ID (или username) пользователя
             tokens: Количество токенов (по умолчанию 1)
+            priority: Приоритет заявки (PRIORITY_HOT ... PRIORITY_FOLLOWUP)
         
         Returns:
             float: Фактическое время ожидания в секундах
         """
-        async with self._lock:
-            self.stats['total_requests'] += 1
-            total_wait = 0.0
-            
-            # Проверяем глобальный лимит
-            success, wait_time = self.global_pm_bucket.consume(tokens)
-            if not success:
-                logger.debug(f"Global PM rate limit reached, waiting {wait_time:.2f}s")
-                await asyncio.sleep(wait_time)
-                total_wait += wait_time
-                self.global_pm_bucket.consume(tokens)  # Повторная попытка после ожидания
-            
-            # Проверяем лимит для пользователя
-            user_bucket = self._get_user_bucket(user_id)
-            success, wait_time = user_bucket.consume(tokens)
-            if not success:
-                logger.debug(f"User {user_id} rate limit reached, waiting {wait_time:.2f}s")
-                await asyncio.sleep(wait_time)
-                total_wait += wait_time
-                user_bucket.consume(tokens)
+        return await self._acquire(("pm", user_id), tokens, priority)
             
-            if total_wait > 0:
-                self.stats['rejected_requests'] += 1
-                self.stats['total_wait_time'] += total_wait
-            
-            # Периодическая очистка
-            await self._maybe_cleanup()
-            
-            return total_wait
-    
-    async def acquire_group(self, chat_id: int, tokens: float = 1.0) -> float:
+    async def acquire_group(self, chat_id: int, tokens: float = 1.0, priority: int = PRIORITY_NORMAL) -> float:
         """
         Ожидает доступности для отправки сообщения в группу.
         
         Args:
             chat_id: ID чата
             tokens: Количество токенов
+            priority: Приоритет заявки
         
         Returns:
             float: Фактическое время ожидания в секундах
         """
-        async with self._lock:
-            self.stats['total_requests'] += 1
-            
-            success, wait_time = self.global_group_bucket.consume(tokens)
-            if not success:
-                logger.debug(f"Group rate limit reached for {chat_id}, waiting {wait_time:.2f}s")
-                await asyncio.sleep(wait_time)
-                self.stats['rejected_requests'] += 1
-                self.stats['total_wait_time'] += wait_time
-                self.global_group_bucket.consume(tokens)
-                return wait_time
-            
-            await self._maybe_cleanup()
-            return 0.0
+        return await self._acquire(("chat", chat_id), tokens, priority)
     
     async def can_send_pm(self, user_id: int) -> Tuple[bool, float]:
         """
@@ -245,43 +318,261 @@ class TelegramRateLimiter:
         Returns:
             Tuple[bool, float]: (можно_отправить, время_ожидания)
         """
-        async with self._lock:
-            # Проверяем глобальный лимит
-            global_ok, global_wait = self.global_pm_bucket.consume(0)  # Peek без потребления
-            if not global_ok:
-                return False, global_wait
+        key = ("pm", user_id)
+        wait = self._global_wait(1.0)
+        if key in self.key_buckets:
+            wait = max(wait, self.key_buckets[key].time_until(1.0))
+        if self._pending.get(key):
+            wait = max(wait, 1.0 / self.user_rate)
+        return wait <= 0, wait
             
-            # Проверяем лимит пользователя
-            user_bucket = self._get_user_bucket(user_id)
-            user_ok, user_wait = user_bucket.consume(0)
-            if not user_ok:
-                return False, user_wait
+    def report_flood_wait(self, seconds: float) -> None:
+        """FloodWait от Telegram: пауза всех отправок на seconds и снижение общего темпа."""
+        self._register_incident("flood_wait", seconds)
             
-            return True, 0.0
+    def report_peer_flood(self) -> None:
+        """PeerFlood (лимит на новые контакты): пауза PEER_FLOOD_COOLDOWN и снижение общего темпа."""
+        self._register_incident("peer_flood", self.PEER_FLOOD_COOLDOWN)
     
-    async def _maybe_cleanup(self) -> None:
-        """Периодически удаляет неактивные user buckets для экономии памяти."""
-        now = time.monotonic()
+    # ---------- очередь ----------
+
+    async def _acquire(self, key: Hashable, tokens: float, priority: int) -> float:
+        self.stats['total_requests'] += 1
+        self._maybe_cleanup()
+        bucket = self._get_bucket(key)
+
+        # Быстрый путь: никто не ждёт, лимиты свободны — отдаём токен сразу.
+        # С общим backend решение за ним, поэтому заявка всегда идёт через диспетчер
+        self._promote(self._clock())
+        if self.backend is None and not self._pending.get(key) and self._peek_ready() is None \
+                and self._global_wait(tokens) <= 0 and bucket.time_until(tokens) <= 0:
+            self._grant_tokens(key, tokens)
+            return 0.0
+
+        self._ensure_dispatcher()
+        request = _SendRequest(priority, next(self._seq), key, tokens, self._clock(), self._loop.create_future())
+        queue = self._pending.setdefault(key, [])
+        head = queue[0] if queue else None
+        heapq.heappush(queue, request)
+        if head is None or request < head:
+            self._schedule(key)
+        self._wakeup.set()
+        return await request.future
+
+    def _ensure_dispatcher(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._dispatcher is None or self._dispatcher.done():
+            if self._loop is not loop:
+                # Заявки прежнего loop уже никто не ждёт
+                self._pending.clear()
+                self._ready.clear()
+                self._delayed.clear()
+                self._slot_version.clear()
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._run_dispatcher())
+
+    def _head(self, key: Hashable) -> Optional[_SendRequest]:
+        """Первая неотменённая заявка ключа."""
+        queue = self._pending.get(key)
+        while queue and queue[0].future.done():
+            heapq.heappop(queue)
+        if not queue:
+            self._pending.pop(key, None)
+            return None
+        return queue[0]
+
+    def _schedule(self, key: Hashable):
+        """Ставит ключ в ready/delayed по готовности его bucket (старые записи становятся устаревшими)."""
+        head = self._head(key)
+        if head is None:
+            return
+        version = self._slot_version.get(key, 0) + 1
+        self._slot_version[key] = version
+        wait = self._get_bucket(key).time_until(head.tokens)
+        if wait <= 0:
+            heapq.heappush(self._ready, (head.priority, head.seq, version, key))
+        else:
+            heapq.heappush(self._delayed, (self._clock() + wait, version, key))
+
+    def _defer(self, key: Hashable, wait: float):
+        """Откладывает ключ на wait секунд: общий bucket получателя израсходован другим процессом."""
+        version = self._slot_version.get(key, 0) + 1
+        self._slot_version[key] = version
+        heapq.heappush(self._delayed, (self._clock() + wait, version, key))
+
+    def _promote(self, now: float):
+        """Переносит ключи, чей bucket уже пополнился, из delayed в ready."""
+        while self._delayed and self._delayed[0][0] <= now:
+            _, version, key = heapq.heappop(self._delayed)
+            if self._slot_version.get(key) == version:
+                head = self._head(key)
+                if head is not None:
+                    heapq.heappush(self._ready, (head.priority, head.seq, version, key))
+
+    def _peek_ready(self) -> Optional[Tuple[int, int, int, Hashable]]:
+        """Актуальная готовая запись с высшим приоритетом."""
+        while self._ready:
+            _, seq, version, key = entry = self._ready[0]
+            head = self._head(key)
+            if self._slot_version.get(key) == version and head is not None and head.seq == seq:
+                return entry
+            heapq.heappop(self._ready)
+            if head is not None and self._slot_version.get(key) == version:
+                # Голова ключа сменилась (отмена) — переставляем ключ
+                self._schedule(key)
+        return None
+
+    async def _wait(self, timeout: Optional[float]):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run_dispatcher(self):
+        """Выдаёт токены ожидающим заявкам; спит только вне общего состояния."""
+        while True:
+            self._wakeup.clear()
+            now = self._clock()
+            self._promote(now)
+            entry = self._peek_ready()
+            if entry is None:
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                await self._wait(timeout)
+                continue
+
+            key = entry[3]
+            request = self._head(key)
+            pause = self._global_wait(request.tokens)
+            if pause > 0:
+                # Ждём общий бюджет; новая заявка с высшим приоритетом будет учтена на следующем круге
+                await self._wait(pause)
+                continue
+
+            if self.backend is not None:
+                wait, blocker = await self._take_shared(key, request.tokens)
+                if wait > 0:
+                    if blocker == 1:
+                        self._defer(key, wait)
+                    else:
+                        # Общий бюджет или пауза аккаунта заняты другими процессами
+                        await self._wait(wait)
+                    continue
+                # Пока шёл запрос к backend, голова ключа могла смениться (отмена, более срочная заявка)
+                request = self._head(key)
+                if request is None:
+                    continue
+
+            # Запись ключа в ready устаревает при _schedule ниже
+            heapq.heappop(self._pending[key])
+            self._grant_tokens(key, request.tokens)
+            waited = self._clock() - request.enqueued_at
+            if waited > 0:
+                self.stats['rejected_requests'] += 1
+                self.stats['total_wait_time'] += waited
+            request.future.set_result(waited)
+            self._schedule(key)
+            self._maybe_cleanup()
+
+    async def _take_shared(self, key: Hashable, tokens: float) -> Tuple[float, Optional[int]]:
+        """Списывает токены из общих buckets аккаунта и получателя; при сбое backend — только локальные лимиты."""
+        bucket = self._get_bucket(key)
+        buckets = [
+            (shared_key(self.account, "global"), self.global_bucket.capacity, self.global_bucket.refill_rate),
+            (shared_key(self.account, *key), bucket.capacity, bucket.refill_rate),
+        ]
+        try:
+            return await asyncio.to_thread(self.backend.take, buckets, tokens, shared_key(self.account, "pause"))
+        except Exception as e:
+            logger.warning("rate_limit_backend_failed", backend=self.backend.name, error=str(e)[:200])
+            return 0.0, None
+
+    def _share_pause(self, seconds: float):
+        """Передаёт паузу после flood остальным процессам аккаунта."""
+        try:
+            self.backend.pause(shared_key(self.account, "pause"), seconds)
+        except Exception as e:
+            logger.warning("rate_limit_backend_failed", backend=self.backend.name, error=str(e)[:200])
+
+    def _grant_tokens(self, key: Hashable, tokens: float):
+        self.global_bucket.consume(tokens)
+        self._get_bucket(key).consume(tokens)
+        self._maybe_recover()
+
+    # ---------- адаптация к flood ----------
+
+    def _register_incident(self, kind: str, pause: float):
+        now = self._clock()
+        self.stats['flood_events'] += 1
+        self._paused_until = max(self._paused_until, now + pause)
+        self._last_incident = now
+        self._rate_scale = max(self.MIN_RATE_SCALE, self._rate_scale * self.BACKOFF_FACTOR)
+        self.global_bucket.set_rate(self.global_rate * self._rate_scale)
+        self.global_bucket.tokens = 0.0  # без всплеска сразу после паузы
+        logger.warning("rate_limiter_backoff", kind=kind, pause_s=pause, rate_scale=round(self._rate_scale, 3))
+        if self.backend is not None:
+            try:
+                asyncio.get_running_loop().run_in_executor(None, self._share_pause, pause)
+            except RuntimeError:
+                self._share_pause(pause)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _maybe_recover(self):
+        if self._rate_scale >= 1.0:
+            return
+        now = self._clock()
+        if now - self._last_incident >= self.RECOVERY_INTERVAL:
+            self._rate_scale = min(1.0, self._rate_scale + self.RECOVERY_STEP)
+            self._last_incident = now
+            self.global_bucket.set_rate(self.global_rate * self._rate_scale)
+            logger.info("rate_limiter_recover", rate_scale=round(self._rate_scale, 3))
+
+    # ---------- обслуживание ----------
+
+    def _maybe_cleanup(self) -> None:
+        """Периодически удаляет неактивные buckets без ожидающих заявок."""
+        now = self._clock()
         
         if now - self._last_cleanup < self.CLEANUP_INTERVAL:
             return
         
         # Находим неактивные buckets
-        inactive_users = [
-            user_id for user_id, last_access in self.user_last_access.items()
-            if (now - last_access) > self.INACTIVE_THRESHOLD
+        inactive = [
+            key for key, last_access in self.key_last_access.items()
+            if (now - last_access) > self.INACTIVE_THRESHOLD and not self._pending.get(key)
         ]
         
         # Удаляем
-        for user_id in inactive_users:
-            if user_id in self.user_buckets:
-                del self.user_buckets[user_id]
-            del self.user_last_access[user_id]
+        for key in inactive:
+            self.key_buckets.pop(key, None)
+            self._slot_version.pop(key, None)
+            del self.key_last_access[key]
         
-        if inactive_users:
-            logger.info(f"Cleaned up {len(inactive_users)} inactive user buckets")
+        if inactive:
+            logger.info(f"Cleaned up {len(inactive)} inactive buckets")
         
         self._last_cleanup = now
+
+    async def close(self) -> None:
+        """Останавливает диспетчер (ожидающие заявки отменяются)."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for queue in self._pending.values():
+            for request in queue:
+                request.future.cancel()
+        self._pending.clear()
+        self._ready.clear()
+        self._delayed.clear()
+
+    def queue_depth(self) -> int:
+        """Сколько заявок ждут отправки."""
+        return sum(1 for queue in self._pending.values() for r in queue if not r.future.done())
     
     def get_stats(self) -> dict:
         """Возвращает статистику использования rate limiter."""
@@ -298,9 +589,12 @@ class TelegramRateLimiter:
                 if self.stats['total_requests'] > 0 else 0.0
             ),
             'avg_wait_time': avg_wait,
-            'active_user_buckets': len(self.user_buckets),
-            'global_pm_tokens': self.global_pm_bucket.peek(),
-            'global_group_tokens': self.global_group_bucket.peek(),
+            'active_user_buckets': sum(1 for key in self.key_buckets if key[0] == "pm"),
+            'active_chat_buckets': sum(1 for key in self.key_buckets if key[0] == "chat"),
+            'queue_depth': self.queue_depth(),
+            'global_pm_tokens': self.global_bucket.peek(),
+            'rate_scale': self._rate_scale,
+            'flood_events': self.stats['flood_events'],
         }
     
     def reset_stats(self) -> None:
@@ -308,7 +602,8 @@ class TelegramRateLimiter:
         self.stats = {
             'total_requests': 0,
             'rejected_requests': 0,
-            'total_wait_time': 0.0
+            'total_wait_time': 0.0,
+            'flood_events': 0,
         }
 
 
@@ -317,10 +612,13 @@ _rate_limiter: Optional[TelegramRateLimiter] = None
 
 
 def get_rate_limiter() -> TelegramRateLimiter:
-    """Возвращает singleton instance rate limiter."""
+    """Возвращает singleton instance rate limiter (с общим backend аккаунта из settings)."""
     global _rate_limiter
     if _rate_limiter is None:
-        _rate_limiter = TelegramRateLimiter()
+        from core.config.settings import settings
+        from systems.alexey.rate_limit_backend import get_bucket_backend
+
+        _rate_limiter = TelegramRateLimiter(backend=get_bucket_backend(), account=settings.RATE_LIMIT_ACCOUNT)
     return _rate_limiter
 
 
@@ -2,13 +2,16 @@ import asyncio
 import os
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_
 from core.database.connection import async_session
 from core.database.models import Lead, MessageLog
 from core.ai_engine.llm_client import llm_client
 from core.ai_engine.prompt_builder import prompt_builder
 from core.utils.logger import logger
-from core.utils.smart_sender import smart_send_message
+from core.telegram.peer_cache import lead_filter
+from core.telegram.session_pool import get_session_pool
+from systems.alexey.rate_limiter import PRIORITY_FOLLOWUP, priority_for_tier
+from systems.alexey.vacancy_stream import contact_data, get_vacancy_stream, message_text
 from telethon import TelegramClient  # noqa: F401 — remove after full migration
 from pyrogram import Client
 from systems.gwen import create_interceptor
@@ -25,15 +28,17 @@ from systems.parser.vacancy_analyzer import VacancyScorer, ContactExtractor, Nic
 from core.cases import CaseMatcher
 
 # Настройки для автоматизации
-AUTOMATED_OUTREACH_INTERVAL = 3600 # 1 hour
 DRY_RUN = False # Реальная отправка включена
 
 async def run_automated_outreach(client: Client):
     """
     Фоновая задача для автоматического поиска вакансий и отправки откликов.
+    Сообщения каналов приходят потоком из on_channel_message (VacancyStream),
+    пропущенное за время простоя дочитывается get_chat_history.
     """
-    # Создаём перехватчик с супервизором
-    interceptor = create_interceptor(client)
+    # Создаём перехватчик с супервизором; исходящие распределяются по аккаунтам пула
+    session_pool = get_session_pool(client)
+    interceptor = create_interceptor(client, session_pool)
     
     logger.info(f"Automated outreach task started. Dry-run: {DRY_RUN}")
     
@@ -42,198 +47,152 @@ async def run_automated_outreach(client: Client):
     contact_extractor = ContactExtractor()
     niche_detector = NicheDetector()
     case_matcher = CaseMatcher()
-    
-    while True:
-        try:
-            # 1. Получаем список диалогов для мониторинга
-            # Проверка главного рубильника
-            if not settings.OUTREACH_ENABLED:
-                logger.info("Automated outreach is DISABLED in settings. Skipping cycle.")
-                await asyncio.sleep(AUTOMATED_OUTREACH_INTERVAL)
-                continue
-
-            logger.info("Starting new automated outreach cycle...")
-            dialogs = await client.get_dialogs()
-            monitored_chats = []
-            
-            # Проверка тестового режима
-            if settings.OUTREACH_TEST_MODE and settings.OUTREACH_TEST_CHAT_ID:
-                logger.info(f"Outreach TEST MODE is ON. Only monitoring chat ID: {settings.OUTREACH_TEST_CHAT_ID}")
-                for d in dialogs:
-                    if d.id == settings.OUTREACH_TEST_CHAT_ID:
-                        monitored_chats.append(d)
-                        break
-            else:
-                # Обычный режим
-                monitored_ids = settings.monitored_chat_ids
-                for d in dialogs:
-                    if monitored_ids:
-                        if d.id in monitored_ids:
-                            monitored_chats.append(d)
-                    elif d.is_channel or d.is_group:
-                        monitored_chats.append(d)
-            
-            logger.info(f"Monitoring {len(monitored_chats)} chats for vacancies.")
-            
-            for chat in monitored_chats:
-                try:
-                    # Извлекаем последние 10 сообщений
-                    messages = await client.get_messages(chat.id, limit=10)
-                    
-                    for msg in messages:
-                        if not msg.text or len(msg.text) < 20:
-                            continue
-                            
-                        # 2. Анализ релевантности
-                        analysis = scorer.analyze_message(msg.text, msg.date)
-                        
-                        if not analysis['is_vacancy'] or analysis['relevance_score'] < 3:
-                            continue
-                            
-                        logger.info(f"Found relevant vacancy in {chat.name} (score: {analysis['relevance_score']}): {analysis['specialization']}")
-                        
-                        # Проверяем, не писали ли мы уже этому человеку сегодня
-                        contact_data = contact_extractor.extract_contact({
-                            'text': msg.text,
-                            'buttons': msg.buttons,
-                            'sender_id': msg.sender_id
-                        })
-                        
-                        if contact_data['contact_type'] == 'not_found':
-                            continue
-                            
-                        recipient = contact_data['contact_value']
-                        
-                        # Проверка в БД (чтобы не спамить)
-                        async with async_session() as session:
-                            # Ищем лид по username или telegram_id
-                            clean_recipient = recipient.replace('@', '') if isinstance(recipient, str) else recipient
-                            
-                            lead_stmt = select(Lead).where(
-                                or_(
-                                    Lead.username == clean_recipient,
-                                    Lead.telegram_id.cast(Lead.telegram_id.type.__class__) == clean_recipient
-                                )
-                            )
-                            l_result = await session.execute(lead_stmt)
-                            existing_lead = l_result.scalars().first()
-                            
-                            now = datetime.utcnow()
-                            
-                            if existing_lead:
-                                # ПРОВЕРКА: Если диалогом уже управляет человек - пропускаем
-                                if getattr(existing_lead, 'is_human_managed', False):
-                                    logger.info(f"Lead {recipient} is human managed. Skipping.")
-                                    continue
-                                
-                                # ПРОВЕРКА: Если мы уже делали outreach в последние 24 часа — пропускаем
-                                if existing_lead.last_outreach_at and (now - existing_lead.last_outreach_at).total_seconds() < 86400:
-                                    logger.info(f"Lead {recipient} already contacted recently. Skipping.")
-                                    continue
-
-                                # Если мы уже общались с ним последние 24 часа (живое общение) — пропускаем
-                                if existing_lead.last_interaction and (now - existing_lead.last_interaction).total_seconds() < 86400:
-                                    logger.info(f"Lead {recipient} has recent interaction. Skipping.")
-                                    continue
-                                    
-                                # РЕЗЕРВИРОВАНИЕ: бронируем лида прямо сейчас
-                                existing_lead.last_outreach_at = now
-                                await session.commit()
-                            else:
-                                # Создаем нового лида и сразу бронируем
-                                existing_lead = Lead(
-                                    username=clean_recipient if isinstance(recipient, str) and not clean_recipient.isdigit() else None,
-                                    telegram_id=int(clean_recipient) if str(clean_recipient).isdigit() else None,
-                                    full_name=str(recipient),
-                                    last_outreach_at=now
-                                )
-                                session.add(existing_lead)
-                                await session.commit()
-                                await session.refresh(existing_lead)
-                        
-                        logger.info(f"Targeting recipient: {recipient}")
-                        
-                        # 3. Подбор кейса
-                        niche_data = niche_detector.detect_niche(msg.text)
-                        case_data = case_matcher.find_matching_case(
-                            analysis['specialization'],
-                            niche_data if niche_data['niche_found'] else None
-                        )
-                        
-                        # 4. Генерация отклика через ИИ
-                        o_prompt = prompt_builder.build_outreach_prompt(
-                            vacancy_text=msg.text,
-                            specialization=analysis['specialization'],
-                            case_data=case_data
-                        )
-                        
-                        task_instr = "Ты — Алексей, пишешь первый отклик на вакансию. Будь честным, экспертным и живым."
-                        full_system_prompt = prompt_builder.build_system_prompt(task_instr)
-                        response_text = await llm_client.generate_response(o_prompt, full_system_prompt)
-                        
-                        if not response_text:
-                            logger.error(f"Failed to generate outreach for {recipient}. All models failed.")
-                            continue
 
-                        if DRY_RUN:
-                            logger.info(f"[DRY-RUN] Would send to {recipient}:\n{response_text}")
-                            continue
-
-                        # 5. ✨ Умная отправка (username → ID hash=0 → участники чатов → телефон)
-                        # Определяем ключ получателя: int если числовой ID, иначе строка
-                        clean_recipient_str = str(clean_recipient)
-                        recipient_key = int(clean_recipient) if clean_recipient_str.isdigit() else clean_recipient
-                        
-                        # Собираем список чатов для стратегии 3 (поиск участника)
-                        chat_ids_for_lookup = [d.id for d in dialogs if d.is_channel or d.is_group]
-                        
-                        try:
-                            sent = await smart_send_message(
-                                client=client,
-                                recipient=recipient_key,
-                                text=response_text,
-                                simulate_typing=True,
-                                typing_duration=humanity_manager.get_typing_duration(response_text),
-                                monitored_chats_ids=chat_ids_for_lookup[:20]
-                            )
-                            if sent:
-                                logger.info(f"Outreach sent to {recipient}")
-                            else:
-                                logger.error(f"All strategies failed for {recipient}")
-                        except Exception as e:
-                            logger.error(f"Failed to send outreach to {recipient}: {e}")
-
-                    
-                    # Помечаем чат как прочитанный после обработки
-                    try:
-                        await client.send_read_acknowledge(chat)
-                    except Exception as e:
-                        logger.warning(f"Failed to mark chat {chat.id} as read: {e}")
-                            
-                except Exception as e:
-                    logger.error(f"Error parsing chat {chat.id}: {e}")
-                    await asyncio.sleep(5)
-            
-            logger.info(f"Outreach cycle finished. Sleeping for {AUTOMATED_OUTREACH_INTERVAL}s")
-            await asyncio.sleep(AUTOMATED_OUTREACH_INTERVAL)
-            
+    async def handle(msg) -> bool:
+        try:
+            return await process_vacancy_message(
+                msg, session_pool, scorer, contact_extractor, niche_detector, case_matcher
+            )
         except Exception as e:
-            logger.error(f"Error in automated outreach task: {e}")
-            # Уведомить администратора о критической ошибке в фоновой задаче
+            logger.error(f"Error processing message {msg.id} from chat {msg.chat.id}: {e}")
+            # Уведомить администратора о сбое в фоновой задаче
             try:
                 from core.utils.admin_notifier import AdminNotifier
                 notifier = AdminNotifier(client)
                 await notifier.notify_error(e, "Фоновая задача: автоматическая рассылка откликов")
-            except Exception as e:  
+            except Exception:
                 pass
-            await asyncio.sleep(300)
+            return False
+
+    await get_vacancy_stream(client).run(handle)
+
+
+async def process_vacancy_message(msg, session_pool, scorer, contact_extractor, niche_detector, case_matcher) -> bool:
+    """
+    Одно сообщение канала: релевантность → контакт → бронь лида → отклик.
+
+    Returns:
+        True если отклик отправлен
+    """
+    text = message_text(msg)
+
+    # 2. Анализ релевантности
+    analysis = scorer.analyze_message(text, msg.date)
+    
+    if not analysis['is_vacancy'] or analysis['relevance_score'] < 3:
+        return False
+        
+    chat_name = msg.chat.title or msg.chat.username or msg.chat.id
+    logger.info(f"Found relevant vacancy in {chat_name} (score: {analysis['relevance_score']}): {analysis['specialization']}")
+    
+    # Проверяем, не писали ли мы уже этому человеку сегодня
+    contact = contact_extractor.extract_contact(contact_data(msg))
+    
+    if contact['contact_type'] == 'not_found':
+        return False
+        
+    recipient = contact['contact_value']
+    
+    # Проверка в БД (чтобы не спамить)
+    async with async_session() as session:
+        # Ищем лид по username или telegram_id
+        clean_recipient = recipient.replace('@', '') if isinstance(recipient, str) else recipient
+        
+        lead_stmt = select(Lead).where(lead_filter(clean_recipient))
+        l_result = await session.execute(lead_stmt)
+        existing_lead = l_result.scalars().first()
+        
+        now = datetime.utcnow()
+        
+        if existing_lead:
+            # ПРОВЕРКА: Если диалогом уже управляет человек - пропускаем
+            if getattr(existing_lead, 'is_human_managed', False):
+                logger.info(f"Lead {recipient} is human managed. Skipping.")
+                return False
+            
+            # ПРОВЕРКА: Если мы уже делали outreach в последние 24 часа — пропускаем
+            if existing_lead.last_outreach_at and (now - existing_lead.last_outreach_at).total_seconds() < 86400:
+                logger.info(f"Lead {recipient} already contacted recently. Skipping.")
+                return False
+
+            # Если мы уже общались с ним последние 24 часа (живое общение) — пропускаем
+            if existing_lead.last_interaction and (now - existing_lead.last_interaction).total_seconds() < 86400:
+                logger.info(f"Lead {recipient} has recent interaction. Skipping.")
+                return False
+                
+            # РЕЗЕРВИРОВАНИЕ: бронируем лида прямо сейчас
+            existing_lead.last_outreach_at = now
+            await session.commit()
+        else:
+            # Создаем нового лида и сразу бронируем
+            existing_lead = Lead(
+                username=clean_recipient if isinstance(recipient, str) and not clean_recipient.isdigit() else None,
+                telegram_id=int(clean_recipient) if str(clean_recipient).isdigit() else None,
+                full_name=str(recipient),
+                last_outreach_at=now
+            )
+            session.add(existing_lead)
+            await session.commit()
+            await session.refresh(existing_lead)
+    
+    logger.info(f"Targeting recipient: {recipient}")
+    
+    # 3. Подбор кейса
+    niche_data = niche_detector.detect_niche(text)
+    case_data = case_matcher.find_matching_case(
+        analysis['specialization'],
+        niche_data if niche_data['niche_found'] else None
+    )
+    
+    # 4. Генерация отклика через ИИ
+    o_prompt = prompt_builder.build_outreach_prompt(
+        vacancy_text=text,
+        specialization=analysis['specialization'],
+        case_data=case_data
+    )
+    
+    task_instr = "Ты — Алексей, пишешь первый отклик на вакансию. Будь честным, экспертным и живым."
+    full_system_prompt = prompt_builder.build_system_prompt(task_instr)
+    response_text = await llm_client.generate_response(o_prompt, full_system_prompt)
+    
+    if not response_text:
+        logger.error(f"Failed to generate outreach for {recipient}. All models failed.")
+        return False
+
+    if DRY_RUN:
+        logger.info(f"[DRY-RUN] Would send to {recipient}:\n{response_text}")
+        return False
+
+    # 5. ✨ Умная отправка (username → ID hash=0 → участники чатов → телефон)
+    # Определяем ключ получателя: int если числовой ID, иначе строка
+    clean_recipient_str = str(clean_recipient)
+    recipient_key = int(clean_recipient) if clean_recipient_str.isdigit() else clean_recipient
+    
+    try:
+        sent = await session_pool.send(
+            recipient_key,
+            response_text,
+            simulate_typing=True,
+            typing_duration=humanity_manager.get_typing_duration(response_text),
+            monitored_chats_ids=[msg.chat.id],
+            priority=priority_for_tier(existing_lead.tier)
+        )
+        if sent:
+            logger.info(f"Outreach sent to {recipient}")
+        else:
+            logger.error(f"All strategies failed for {recipient}")
+        return sent
+    except Exception as e:
+        logger.error(f"Failed to send outreach to {recipient}: {e}")
+        return False
 
 async def run_follow_ups(client: TelegramClient):
     """
     Background task to check and send follow-ups.
     """
-    # Создаём перехватчик с супервизором
-    interceptor = create_interceptor(client)
+    # Создаём перехватчик с супервизором; follow-up уходит с аккаунта, за которым закреплён диалог
+    session_pool = get_session_pool(client)
+    interceptor = create_interceptor(client, session_pool)
     
     while True:
         try:
@@ -301,17 +260,17 @@ async def run_follow_ups(client: TelegramClient):
                             status = "sent"
                             error_msg = None
 
-                            # ПРОВЕРКА: только физлица — выполняется внутри smart_send_message
+                            # ПРОВЕРКА: только физлица — выполняется внутри smart_send_message (через пул)
                             recipient = lead.username or lead.telegram_id
 
                             try:
-                                # Use smart_send_message for follow-ups as well
-                                sent = await smart_send_message(
-                                    client=client,
-                                    recipient=recipient,
-                                    text=follow_up_text,
+                                # Use smart_send_message for follow-ups as well (через пул аккаунтов)
+                                sent = await session_pool.send(
+                                    recipient,
+                                    follow_up_text,
                                     simulate_typing=True,
-                                    typing_duration=humanity_manager.get_typing_duration(follow_up_text)
+                                    typing_duration=humanity_manager.get_typing_duration(follow_up_text),
+                                    priority=PRIORITY_FOLLOWUP
                                 )
                                 if not sent:
                                     status = "failed"
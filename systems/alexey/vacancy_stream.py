@@ -0,0 +1,358 @@
+"""
+Потоковый приём вакансий из каналов и групп для автоматического outreach.
+
+Вместо почасового get_dialogs + get_messages(limit=10) по каждому чату
+on_channel_message кладёт новое сообщение в ограниченную asyncio.Queue, а
+воркеры прогоняют его через VacancyScorer → ContactExtractor → отклик.
+
+- Переполнение очереди не блокирует обработчик апдейтов: сообщение
+  отбрасывается, а чат помечается для дозагрузки.
+- Для каждого чата хранится message_id, до которого включительно всё
+  обработано (data/db/vacancy_stream.db): чекпоинт не обгоняет сообщения,
+  ещё стоящие в очереди или в работе у другого воркера. При старте, после
+  разрыва соединения и после переполнения пропущенное дочитывается через
+  get_chat_history до этого id.
+- Задержка «пост → отклик» (от message.date до успешной отправки) копится
+  в статистике: p50/p95 в get_stats().
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import aiosqlite
+
+from core.config.settings import settings
+from core.database.sqlite_pool import get_pool
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+MessageHandlerFn = Callable[[Any], Awaitable[bool]]
+
+_CHAT_TYPES = {"CHANNEL", "GROUP", "SUPERGROUP"}
+
+
+async def _init_schema(db: aiosqlite.Connection):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS stream_checkpoints (
+            chat_id INTEGER PRIMARY KEY,
+            last_id INTEGER NOT NULL,
+            updated_at TEXT
+        )
+    """)
+
+
+def is_monitored_chat(chat) -> bool:
+    """Чат участвует в авто-outreach: тестовый режим, MONITORED_CHATS или любой канал/группа."""
+    if settings.OUTREACH_TEST_MODE and settings.OUTREACH_TEST_CHAT_ID:
+        return chat.id == settings.OUTREACH_TEST_CHAT_ID
+    if settings.monitored_chat_ids:
+        return chat.id in settings.monitored_chat_ids
+    return getattr(chat.type, "name", str(chat.type)).upper() in _CHAT_TYPES
+
+
+def message_text(message) -> str:
+    return message.text or message.caption or ""
+
+
+def contact_data(message) -> Dict:
+    """Pyrogram Message → вход ContactExtractor.extract_contact (кнопки, отправитель, пересылка)."""
+    buttons_text = ""
+    markup = getattr(message, "reply_markup", None)
+    if markup and hasattr(markup, "inline_keyboard"):
+        buttons_text = "🔘 КНОПКИ:\n"
+        for row in markup.inline_keyboard:
+            for button in row:
+                link = getattr(button, "url", None)
+                buttons_text += f"• {button.text} → {link}\n" if link else f"• {button.text} (инлайн/кнопка)\n"
+
+    fwd_from = None
+    if getattr(message, "forward_from", None):
+        fwd_from = {'from_id': message.forward_from.id, 'from_username': message.forward_from.username, 'channel_id': None}
+    elif getattr(message, "forward_from_chat", None):
+        fwd_from = {'from_id': None, 'from_username': message.forward_from_chat.username,
+                    'channel_id': message.forward_from_chat.id}
+
+    sender = getattr(message, "from_user", None)
+    return {
+        'text': message_text(message),
+        'buttons': buttons_text,
+        'sender_id': sender.id if sender else None,
+        'sender_username': sender.username if sender else None,
+        'fwd_from': fwd_from,
+    }
+
+
+def _timestamp(date: Optional[datetime]) -> Optional[float]:
+    if date is None:
+        return None
+    if date.tzinfo is None:
+        return date.timestamp()  # Pyrogram отдаёт локальное naive-время
+    return date.astimezone(timezone.utc).timestamp()
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class VacancyStream:
+    """Очередь новых сообщений каналов → обработчик outreach, с дозагрузкой пропусков."""
+
+    def __init__(
+        self,
+        client,
+        queue_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        db_path: Optional[str] = None,
+        gap_limit: Optional[int] = None,
+        gap_max_age_hours: Optional[float] = None,
+    ):
+        self.client = client
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or settings.VACANCY_STREAM_QUEUE_SIZE)
+        self.workers = workers or settings.VACANCY_STREAM_WORKERS
+        self.gap_limit = gap_limit or settings.VACANCY_STREAM_GAP_LIMIT
+        self.gap_max_age = timedelta(hours=gap_max_age_hours or settings.VACANCY_STREAM_GAP_MAX_AGE_HOURS)
+        self.pool = get_pool(str(db_path or settings.DB_DIR / "vacancy_stream.db"), readers=1, init_fn=_init_schema)
+
+        self._handler: Optional[MessageHandlerFn] = None
+        self._checkpoints: Dict[int, int] = {}
+        self._floors: Dict[int, int] = {}  # чат → id, ниже которого есть отброшенные сообщения
+        self._pending: Dict[int, Set[int]] = {}  # чат → id в очереди и в обработке
+        self._finished: Dict[int, int] = {}  # чат → максимальный обработанный id
+        self._seen: Set[Tuple[int, int]] = set()
+        self._seen_order: Deque[Tuple[int, int]] = deque()
+        self._gap_requested: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._latencies: Deque[float] = deque(maxlen=500)
+
+        self.stats = {
+            'received': 0,
+            'gap_filled': 0,
+            'dropped': 0,
+            'processed': 0,
+            'outreach_sent': 0,
+            'errors': 0,
+        }
+
+    # ---------- вход ----------
+
+    def submit(self, message) -> bool:
+        """
+        Из on_channel_message: не ждёт, при переполнении очереди отбрасывает сообщение.
+
+        Returns:
+            True если сообщение поставлено в очередь
+        """
+        if not settings.OUTREACH_ENABLED or not is_monitored_chat(message.chat):
+            return False
+        if len(message_text(message)) < 20:
+            return False
+        self.stats['received'] += 1
+        return self._enqueue(message)
+
+    def _enqueue(self, message) -> bool:
+        key = (message.chat.id, message.id)
+        if key in self._seen:
+            return False
+        try:
+            self.queue.put_nowait((message, time.time()))
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            chat_id = message.chat.id
+            self._floors[chat_id] = min(self._floors.get(chat_id, message.id - 1), message.id - 1)
+            self.request_gap_fill()
+            return False
+        self._remember(key)
+        self._pending.setdefault(message.chat.id, set()).add(message.id)
+        return True
+
+    def _remember(self, key: Tuple[int, int]):
+        self._seen.add(key)
+        self._seen_order.append(key)
+        if len(self._seen_order) > 10000:
+            self._seen.discard(self._seen_order.popleft())
+
+    def request_gap_fill(self):
+        """Дочитать пропущенное (после разрыва соединения или переполнения очереди)."""
+        if self._gap_requested is not None:
+            self._gap_requested.set()
+
+    # ---------- дозагрузка ----------
+
+    async def load_checkpoints(self):
+        await self.pool.open()
+        async with self.pool.reader() as db:
+            async with db.execute("SELECT chat_id, last_id FROM stream_checkpoints") as cursor:
+                self._checkpoints.update({row[0]: row[1] async for row in cursor})
+
+    async def gap_fill(self) -> int:
+        """
+        Для каждого известного чата читает get_chat_history (от новых к старым) до
+        последнего обработанного id и ставит пропущенное в очередь в хронологическом порядке.
+        """
+        if not settings.OUTREACH_ENABLED:
+            return 0
+        chats = set(self._checkpoints) | set(self._floors)
+        oldest = datetime.now(timezone.utc) - self.gap_max_age
+        queued = 0
+        for chat_id in chats:
+            last_id = self._checkpoints.get(chat_id, 0)
+            floor = self._floors.get(chat_id)
+            if floor is not None:
+                last_id = min(last_id, floor) if last_id else floor
+            dropped_before = self.stats['dropped']
+            missed = []
+            try:
+                async for message in self.client.get_chat_history(chat_id, limit=self.gap_limit):
+                    stamp = _timestamp(message.date)
+                    if message.id <= last_id or (stamp is not None and stamp < oldest.timestamp()):
+                        break
+                    if len(message_text(message)) >= 20 and (chat_id, message.id) not in self._seen:
+                        missed.append(message)
+            except Exception as e:
+                logger.warning("vacancy_stream_gap_fill_failed", chat_id=chat_id, error=str(e)[:200])
+                continue
+            for message in reversed(missed):
+                self._remember((chat_id, message.id))
+                self._pending.setdefault(chat_id, set()).add(message.id)
+                await self.queue.put((message, time.time()))
+            # Пол снимаем, только когда пропущенное уже в _pending: до этого чекпоинт
+            # не должен его перескочить. Новые отбросы за время дочитки — следующий проход.
+            if floor is not None and self._floors.get(chat_id) == floor and self.stats['dropped'] == dropped_before:
+                del self._floors[chat_id]
+            queued += len(missed)
+            await asyncio.sleep(settings.PARSER_REQUEST_INTERVAL)
+        self.stats['gap_filled'] += queued
+        if queued:
+            logger.info("vacancy_stream_gap_filled", chats=len(chats), messages=queued)
+        return queued
+
+    async def _run_gap_fill(self):
+        while True:
+            await self._gap_requested.wait()
+            self._gap_requested.clear()
+            while not getattr(self.client, "is_connected", True):
+                await asyncio.sleep(1)  # ждём переподключения
+            try:
+                await self.gap_fill()
+            except Exception as e:
+                logger.error("vacancy_stream_gap_fill_error", error=str(e)[:200])
+
+    # ---------- обработка ----------
+
+    async def _run_worker(self):
+        while True:
+            message, received_at = await self.queue.get()
+            try:
+                try:
+                    sent = await self._handler(message)
+                    self.stats['processed'] += 1
+                    if sent:
+                        self._record_latency(message, received_at)
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.error("vacancy_stream_handler_failed", chat_id=message.chat.id, message_id=message.id,
+                                 error=str(e)[:200])
+                await self._save_checkpoint(message.chat.id, message.id)
+            except Exception as e:
+                logger.error("vacancy_stream_checkpoint_failed", chat_id=message.chat.id, error=str(e)[:200])
+            finally:
+                self.queue.task_done()
+
+    def _record_latency(self, message, received_at: float):
+        self.stats['outreach_sent'] += 1
+        posted = _timestamp(message.date)
+        now = time.time()
+        latency = now - posted if posted is not None else now - received_at
+        self._latencies.append(latency)
+        logger.info("vacancy_outreach_latency", chat_id=message.chat.id, message_id=message.id,
+                    post_to_outreach_s=round(latency, 2), queue_s=round(now - received_at, 2))
+
+    async def _save_checkpoint(self, chat_id: int, message_id: int):
+        """
+        Отмечает message_id обработанным. Чекпоинт двигается только до первого
+        необработанного id чата: при нескольких воркерах более раннее сообщение
+        может быть ещё в работе, и после падения его нужно перечитать.
+        """
+        pending = self._pending.get(chat_id)
+        if pending is not None:
+            pending.discard(message_id)
+            if not pending:
+                del self._pending[chat_id]
+                pending = None
+        done = self._finished[chat_id] = max(self._finished.get(chat_id, 0), message_id)
+        safe_id = min(done, min(pending) - 1) if pending else done
+        if chat_id in self._floors:
+            safe_id = min(safe_id, self._floors[chat_id])  # отброшенные ещё не дочитаны
+        if safe_id <= self._checkpoints.get(chat_id, 0):
+            return
+        self._checkpoints[chat_id] = safe_id
+        await self.pool.open()
+        async with self.pool.writer() as db:
+            await db.execute(
+                "INSERT INTO stream_checkpoints (chat_id, last_id, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(chat_id) DO UPDATE SET last_id = MAX(last_id, excluded.last_id), updated_at = excluded.updated_at",
+                (chat_id, safe_id, datetime.now().isoformat()),
+            )
+
+    # ---------- жизненный цикл ----------
+
+    def attach(self):
+        """Дозагрузка после разрыва соединения клиента (DisconnectHandler Pyrogram)."""
+        from pyrogram.handlers import DisconnectHandler
+
+        # Pyrogram ждёт колбэк (await client.disconnect_handler(client)) — только корутина
+        self.client.add_handler(DisconnectHandler(self._on_disconnect))
+
+    async def _on_disconnect(self, _client):
+        self.request_gap_fill()
+
+    async def start(self, handler: MessageHandlerFn):
+        """Загружает чекпоинты, запускает воркеры и дозагрузку пропущенного за время простоя."""
+        self._handler = handler
+        await self.load_checkpoints()
+        self._gap_requested = asyncio.Event()
+        self._gap_requested.set()
+        self._tasks = [asyncio.create_task(self._run_worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._run_gap_fill()))
+        logger.info("vacancy_stream_started", workers=self.workers, chats=len(self._checkpoints))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run(self, handler: MessageHandlerFn):
+        """start() и ожидание до отмены."""
+        await self.start(handler)
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    def get_stats(self) -> dict:
+        latencies = list(self._latencies)
+        return {
+            **self.stats,
+            'queue_depth': self.queue.qsize(),
+            'tracked_chats': len(self._checkpoints),
+            'post_to_outreach_p50_s': _percentile(latencies, 0.5),
+            'post_to_outreach_p95_s': _percentile(latencies, 0.95),
+        }
+
+
+# Singleton instance
+_vacancy_stream: Optional[VacancyStream] = None
+
+
+def get_vacancy_stream(client=None) -> VacancyStream:
+    """Поток вакансий процесса alexey (client — основной Pyrogram клиент)."""
+    global _vacancy_stream
+    if _vacancy_stream is None:
+        _vacancy_stream = VacancyStream(client)
+    return _vacancy_stream
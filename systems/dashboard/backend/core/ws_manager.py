@@ -10,6 +10,7 @@ class ConnectionManager:
             "leads": [],
             "dialogs": [],
             "pipeline": [],
+            "vacancies": [],
         }
 
     async def connect(self, websocket: WebSocket, channel: str):
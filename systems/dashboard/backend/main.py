@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import os
 
@@ -11,12 +12,15 @@ from contextlib import asynccontextmanager
 from db.connection import run_migrations
 from routers import leads, dialogs, pipeline, prompts, analytics, ws
 from core.config import CORS_ORIGINS
+from services.vacancy_feed import broadcast_vacancy_events
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await run_migrations()
+    vacancy_events = asyncio.create_task(broadcast_vacancy_events())
     yield
+    vacancy_events.cancel()
 
 
 app = FastAPI(title="Harmonic Trifid Dashboard", version="2.0.0", lifespan=lifespan)
@@ -6,7 +6,7 @@ router = APIRouter()
 
 @router.websocket("/ws/{channel}")
 async def websocket_endpoint(websocket: WebSocket, channel: str):
-    if channel not in ("leads", "dialogs", "pipeline"):
+    if channel not in manager.channels:
         await websocket.close(code=4004)
         return
     await manager.connect(websocket, channel)
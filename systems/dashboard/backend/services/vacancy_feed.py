@@ -0,0 +1,32 @@
+"""
+Трансляция change feed vacancies.db в websocket-канал "vacancies":
+дашборд получает новые вакансии, черновики и смены статусов рассылки сразу,
+без опроса БД.
+"""
+import asyncio
+import sys
+
+from core.config import BASE_DIR, VACANCY_DB_PATH
+from core.ws_manager import manager
+
+# systems.* — из корня репозитория; в конец sys.path, чтобы core оставался пакетом backend
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from systems.parser.change_feed import get_change_feed  # noqa: E402
+
+
+async def broadcast_vacancy_events():
+    events = await get_change_feed(VACANCY_DB_PATH).subscribe()
+    try:
+        async for event in events:
+            await manager.broadcast("vacancies", {
+                "event": event.topic,
+                "id": event.vacancy_id,
+                "hash": event.hash,
+                "value": event.value,
+                "ts": event.created_at,
+            })
+    except asyncio.CancelledError:
+        events.close()
+        raise
@@ -6,7 +6,6 @@ import asyncio
 import re
 import os
 import random
-import sqlite3
 from typing import Optional
 from datetime import datetime, timedelta, timezone
 from pyrogram import Client, errors
@@ -24,8 +23,12 @@ from core.config.settings import settings
 from core.utils.logger import logger
 from core.utils.health import health_monitor
 from systems.gwen.gwen_supervisor import gwen_supervisor
+from systems.gwen.gwen_repository import GwenRepository
+from core.telegram.peer_cache import peer_cache
+from systems.alexey.rate_limiter import PRIORITY_FOLLOWUP, PRIORITY_HOT, get_rate_limiter, priority_for_tier
 from systems.parser.duplicate_detector import get_duplicate_detector
 from core.utils.handover import handover_manager
+from core.utils.loop_monitor import loop_monitor
 
 class GwenCommander:
     """
@@ -34,6 +37,7 @@ class GwenCommander:
     
     def __init__(self, main_client: Client, db_path: str = None):
         self.db_path = db_path or str(settings.VACANCY_DB_PATH)
+        self.repo = GwenRepository(self.db_path)  # async-доступ к SQLite без блокировки event loop
         self.bot_token = settings.SUPERVISOR_BOT_TOKEN
         self.chat_id = settings.SUPERVISOR_CHAT_ID
         self.main_client = main_client # Основной юзербот для рассылок
@@ -41,7 +45,6 @@ class GwenCommander:
         self.enabled = bool(self.bot_token)
         self.waiting_for_reason = {} # user_id -> v_hash
         self.is_running = False
-        self._chat_name_to_id = {} # Cache for metadata resolution
         self._blocked_ids: set = set()       # Кеш заблокированных user_id из TG
         self._blocked_cache_ts: float = 0.0  # Время последнего обновления кеша
         
@@ -64,6 +67,7 @@ class GwenCommander:
                     break
                 for u in users:
                     new_ids.add(u.id)
+                    await peer_cache.remember_user(u)  # username заблокированных — без get_users при проверке
                 if len(users) < limit:
                     break
                 offset += len(users)
@@ -78,26 +82,13 @@ class GwenCommander:
         await self._refresh_blocked_cache()
         if not self._blocked_ids:
             return False
-        try:
-            user = await self.main_client.get_users(target)
-            return user.id in self._blocked_ids
-        except Exception:
-            return False
+        peer = await peer_cache.resolve_user(self.main_client, target)
+        return peer is not None and peer.peer_id in self._blocked_ids
 
     async def _resolve_chat_by_name(self, name: str) -> Optional[int]:
-        """Пытается найти ID чата по его экранному имени среди диалогов."""
+        """Пытается найти ID чата по его экранному имени (peer_cache; диалоги — только при промахе)."""
         if not name: return None
-        if name in self._chat_name_to_id:
-            return self._chat_name_to_id[name]
-            
-        logger.info(f"🔄 Поиск Chat ID для имени: {name}")
-        async for dialog in self.main_client.get_dialogs():
-            d_title = getattr(dialog.chat, 'title', None) or getattr(dialog.chat, 'first_name', None)
-            if d_title == name:
-                self._chat_name_to_id[name] = dialog.chat.id
-                return dialog.chat.id
-        
-        return None
+        return await peer_cache.resolve_chat_title(self.main_client, name)
 
     async def start(self, start_bot=True):
         """Запуск бота-командира."""
@@ -107,6 +98,10 @@ class GwenCommander:
 
         try:
             logger.info("🧠 Gwen Commander starting in Orchestrator mode (tasks only).")
+
+            # Детектор колбэков, блокирующих event loop дольше LOOP_SLOW_CALLBACK_MS
+            if settings.LOOP_MONITOR_ENABLED:
+                loop_monitor.start()
             
             # Фоновый мониторинг здоровья (ВСЕГДА ЗАПУСКАЕМ)
             self.service_states = {"database": True, "openrouter": True}
@@ -115,6 +110,9 @@ class GwenCommander:
             # Фоновый мониторинг бэклога задач
             asyncio.create_task(self._run_backlog_check())
             
+            # Черновики откликов для новых вакансий (по событиям change feed)
+            asyncio.create_task(self._run_draft_worker())
+
             # Фоновый мониторинг новых вакансий для Outreach
             asyncio.create_task(self._run_outreach_monitor())
 
@@ -159,53 +157,64 @@ class GwenCommander:
             logger.error(f"Failed to check SpamBot: {e}")
             return f"Не удалось связаться с @SpamBot: {str(e)}"
 
+    async def _run_draft_worker(self):
+        """Генерация черновиков для новых вакансий (outreach_generator.run_draft_worker)."""
+        from systems.parser.outreach_generator import outreach_generator
+        try:
+            await outreach_generator.run_draft_worker()
+        except Exception as e:
+            logger.error(f"Gwen draft worker crashed: {e}")
+
+    async def _wait_for_vacancy_events(self, events, topics=None):
+        """
+        Ждёт событие change feed (из topics, если заданы) вместо опроса таблицы.
+        Пришедшие пачкой события схлопываются в один проход монитора; без
+        событий монитор всё равно просыпается раз в CHANGE_FEED_RESCAN_SEC
+        (отложенные вне рабочего времени лиды, повтор после PEER_FLOOD).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.CHANGE_FEED_RESCAN_SEC
+        while True:
+            event = await events.get(timeout=max(0.0, deadline - loop.time()))
+            if event is None:
+                return
+            batch = [event] + events.drain()
+            await events.ack(batch[-1])
+            if topics is None or any(e.topic in topics for e in batch):
+                return
+
     async def _run_outreach_monitor(self):
-        """Мониторинг новых вакансий, генерация черновиков и уведомление пользователя."""
+        """Мониторинг вакансий с готовым черновиком и уведомление пользователя."""
         from systems.parser.outreach_generator import outreach_generator
+        from systems.parser.change_feed import VACANCY_DRAFT_READY, VACANCY_RESPONSE, VACANCY_STATUS
         from systems.gwen.notifier import supervisor_notifier
-        import sqlite3
+
+        # Монитор просыпается на события vacancies.db: готов черновик (новая вакансия),
+        # сменился статус рассылки (в т.ч. реакция пользователя на 'notified') или статус вакансии
+        vacancy_db = self.repo.vacancies
+        await vacancy_db.init_db()
+        events = await vacancy_db.change_feed.subscribe(
+            {VACANCY_DRAFT_READY, VACANCY_RESPONSE, VACANCY_STATUS}, consumer="gwen_outreach_monitor"
+        )
         
         while True:
             try:
-                # DEBUG START
-                # logger.info(f"DEBUG: Gwen Loop Start. Auto: {settings.AUTO_OUTREACH}")
-                
-                # 1. Генерируем черновики для новых вакансий (те, что упали из парсера)
-                generated_count = await outreach_generator.process_new_vacancies()
-                if generated_count > 0:
-                    logger.info(f"🎨 Гвен подготовила {generated_count} новых черновиков.")
-                
                 # 0. Проверка: не ждет ли уже отправленный лид ответа от человека?
                 # Если AUTO_OUTREACH выключен, мы работаем в режиме "по одному лиду на подтверждение"
                 if not settings.AUTO_OUTREACH:
-                    # Используем одно соединение для проверки и возможных действий (избегаем race condition)
-                    conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT COUNT(*) FROM vacancies WHERE response = 'notified'")
-                    pending_count = cursor.fetchone()[0]
-                    conn.close()
+                    pending_count = await self.repo.count_notified()
 
                     if pending_count > 0:
-                        # Лид уже отправлен на подтверждение — ждём реакции пользователя.
+                        # Лид уже отправлен на подтверждение — ждём реакции пользователя
+                        # (событие смены response), а не опрашиваем таблицу.
                         # Таймаут сброса можно добавить отдельной кнопкой в боте.
-                        await asyncio.sleep(1)
+                        await self._wait_for_vacancy_events(events, {VACANCY_RESPONSE})
                         continue
 
                 # 2. Находим вакансии, о которых еще не уведомляли
-                conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT hash, text, direction, source, contact_link, draft_response, last_seen, tier, priority, message_id, chat_id
-                    FROM vacancies 
-                    WHERE status = 'accepted' AND (response IS NULL OR response = "")
-                    ORDER BY last_seen ASC LIMIT 20
-                """)
-                new_vacancies = cursor.fetchall()
-                conn.close()
+                new_vacancies = await self.repo.get_outreach_queue(limit=20)
                 
-                for v in new_vacancies:
-                    v_dict = dict(v)
+                for v_dict in new_vacancies:
                     v_hash = v_dict['hash']
                     v_draft = v_dict['draft_response']
                     v_contact = v_dict['contact_link']
@@ -234,11 +243,7 @@ class GwenCommander:
                                         v_contact = user.username if user.username else str(user.id)
                                         logger.info(f"✨ Контакт восстановлен! {v_contact}")
                                         # Сохраняем для будущего
-                                        conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                                        cursor = conn.cursor()
-                                        cursor.execute("UPDATE vacancies SET contact_link = ?, chat_id = ? WHERE hash = ?", (v_contact, chat_id if isinstance(chat_id, int) else None, v_hash))
-                                        conn.commit()
-                                        conn.close()
+                                        await self.repo.set_contact(v_hash, v_contact, chat_id if isinstance(chat_id, int) else None)
                                     else:
                                         raise Exception("Message or user not found")
                                 except Exception as e:
@@ -250,11 +255,7 @@ class GwenCommander:
 
                     if not v_contact:
                         logger.info(f"⏭ Пропуск лида без контакта: {v_hash[:8]}...")
-                        conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                        cursor = conn.cursor()
-                        cursor.execute("UPDATE vacancies SET response = 'no_contact_skip' WHERE hash = ?", (v_hash,))
-                        conn.commit()
-                        conn.close()
+                        await self.repo.set_response(v_hash, 'no_contact_skip')
                         # Не спамим уведомлениями если их много (только для горячих)
                         if v_priority > 0:
                             try:
@@ -274,27 +275,15 @@ class GwenCommander:
                                 v_dict.get('text', ''), v_dict.get('direction', 'Digital Marketing')
                             )
                             if v_draft:
-                                conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                                cursor = conn.cursor()
-                                cursor.execute("UPDATE vacancies SET draft_response = ? WHERE hash = ?", (v_draft, v_hash))
-                                conn.commit()
-                                conn.close()
+                                await self.repo.set_draft(v_hash, v_draft)
                                 logger.info(f"✅ Черновик сгенерирован для {v_hash[:8]}")
                             else:
                                 logger.info(f"⏭ Не удалось сгенерировать черновик: {v_hash[:8]}")
-                                conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                                cursor = conn.cursor()
-                                cursor.execute("UPDATE vacancies SET response = 'no_draft_skip' WHERE hash = ?", (v_hash,))
-                                conn.commit()
-                                conn.close()
+                                await self.repo.set_response(v_hash, 'no_draft_skip')
                                 continue
                         except Exception as draft_err:
                             logger.error(f"Draft generation failed for {v_hash[:8]}: {draft_err}")
-                            conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                            cursor = conn.cursor()
-                            cursor.execute("UPDATE vacancies SET response = 'no_draft_skip' WHERE hash = ?", (v_hash,))
-                            conn.commit()
-                            conn.close()
+                            await self.repo.set_response(v_hash, 'no_draft_skip')
                             continue
 
                     # ПРОВЕРКА РАБОЧЕГО ВРЕМЕНИ (8:00 - 23:00)
@@ -310,18 +299,15 @@ class GwenCommander:
                             # ПРОВЕРКА ЧС (заблокированные в TG)
                             if await self._is_tg_blocked(target):
                                 logger.info(f"🚫 ЧС: {v_contact} — пропускаем")
-                                conn = sqlite3.connect(self.db_path, timeout=30)
-                                conn.execute("UPDATE vacancies SET response = 'blacklist_skip' WHERE hash = ?", (v_hash,))
-                                conn.commit()
-                                conn.close()
+                                await self.repo.set_response(v_hash, 'blacklist_skip')
                                 continue
 
                             # ПРОВЕРКА НА ДУБЛИКАТЫ В ЧАТЕ (Схожесть с прошлыми откликами)
                             is_duplicate = False
                             try:
                                 async with async_session() as session:
-                                    entity = await self.main_client.get_users(target)
-                                    entity_id = entity.id if entity else None
+                                    entity = await peer_cache.resolve_user(self.main_client, target)
+                                    entity_id = entity.peer_id if entity else None
                                     if not entity_id:
                                         raise Exception(f"User not found: {target}")
                                     
@@ -353,32 +339,25 @@ class GwenCommander:
 
                             if is_duplicate:
                                 # Помечаем как пропущенный дубликат
-                                conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                                cursor = conn.cursor()
-                                cursor.execute("UPDATE vacancies SET response = 'skipped_duplicate' WHERE hash = ?", (v_hash,))
-                                conn.commit()
-                                conn.close()
+                                await self.repo.set_response(v_hash, 'skipped_duplicate')
                                 await asyncio.sleep(2)
                                 continue
 
                             logger.info(f"🚀 Гвен автоматически отправляет отклик в {v_contact}")
+                            await get_rate_limiter().acquire_pm(target, priority=priority_for_tier(v_tier))
                             sent_msg = await self.main_client.send_message(target, v_draft)
                             if sent_msg:
                                 handover_manager.mark_as_automated(sent_msg.id)
 
                             # Успешная отправка
-                            conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                            cursor = conn.cursor()
-                            cursor.execute("UPDATE vacancies SET response = ? WHERE hash = ?", (v_draft, v_hash))
-                            conn.commit()
-                            conn.close()
+                            await self.repo.set_response(v_hash, v_draft)
                             
                             # ЛОГИРОВАНИЕ В ОСНОВНУЮ БД (для Дашборда)
                             try:
                                 async with async_session() as session:
-                                    # Получаем сущность для ID (Pyrogram)
-                                    entity = await self.main_client.get_users(target)
-                                    entity_id = entity.id if entity else None
+                                    # Получаем сущность для ID (peer_cache)
+                                    entity = await peer_cache.resolve_user(self.main_client, target)
+                                    entity_id = entity.peer_id if entity else None
                                     if not entity_id:
                                         raise Exception(f"User not found: {target}")
                                     
@@ -392,7 +371,7 @@ class GwenCommander:
                                         lead = Lead(
                                             telegram_id=entity_id,
                                             username=target if not target.isdigit() else None,
-                                            full_name=getattr(entity, 'first_name', target),
+                                            full_name=entity.title or target,
                                             tier=v_tier,
                                             priority=v_priority,
                                             last_interaction=now,
@@ -440,6 +419,7 @@ class GwenCommander:
 
                         except errors.FloodWait as e:
                             logger.warning(f"⏳ FloodWait: нужно подождать {e.value} сек.")
+                            get_rate_limiter().report_flood_wait(e.value)
                             if e.value > 180: # Если ждать больше 3 минут
                                 await supervisor_notifier.send_error(f"⏳ Гвен взяла паузу. Telegram просит подождать {e.value} секунд.")
                             await asyncio.sleep(e.value)
@@ -448,6 +428,7 @@ class GwenCommander:
                         except errors.PeerFlood as e:
                             # PEER_FLOOD = временный rate limit на новые контакты
                             logger.warning(f"⏳ PEER_FLOOD для {v_contact}: {e}")
+                            get_rate_limiter().report_peer_flood()
                             # НЕ помечаем как failed — оставляем для повторной попытки
                             # Пишем /start дважды в SpamBot и читаем ответ
                             spambot_reply = await self.check_account_health()
@@ -492,22 +473,14 @@ class GwenCommander:
                                 return # Выходим из цикла
                             else:
                                 # Ограничений нет, значит это просто приватность пользователя или невалидный ID
-                                conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                                cursor = conn.cursor()
-                                cursor.execute("UPDATE vacancies SET response = 'failed_privacy' WHERE hash = ?", (v_hash,))
-                                conn.commit()
-                                conn.close()
+                                await self.repo.set_response(v_hash, 'failed_privacy')
                                 continue
 
                         except Exception as e:
                             logger.error(f"Auto-outreach failed for {v_contact}: {e}")
                             # Помечаем лид как failed чтобы не зациклиться
                             try:
-                                conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                                cursor = conn.cursor()
-                                cursor.execute("UPDATE vacancies SET response = 'failed' WHERE hash = ?", (v_hash,))
-                                conn.commit()
-                                conn.close()
+                                await self.repo.set_response(v_hash, 'failed')
                             except Exception as db_err:
                                 logger.error(f"Failed to mark lead as failed: {db_err}")
                             try:
@@ -521,17 +494,13 @@ class GwenCommander:
                         await supervisor_notifier.notify_new_vacancy(v_dict)
 
                         # Помечаем как "уведомлен"
-                        conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                        cursor = conn.cursor()
-                        cursor.execute("UPDATE vacancies SET response = 'notified' WHERE hash = ?", (v_hash,))
-                        conn.commit()
-                        conn.close()
+                        await self.repo.set_response(v_hash, 'notified')
                         await asyncio.sleep(2)
                     
             except Exception as e:
                 logger.error(f"Gwen outreach monitor error: {e}")
             
-            await asyncio.sleep(30) # Пауза между проверками новых лидов (30 сек)
+            await self._wait_for_vacancy_events(events)
 
     async def _run_learning_loop(self):
         """Периодическое обучение Гвен."""
@@ -691,23 +660,15 @@ class GwenCommander:
         # 0. Проверка: ждем ли мы комментарий к лиду?
         if event.sender_id in self.waiting_for_reason:
             v_hash = self.waiting_for_reason.pop(event.sender_id)
-            import sqlite3
-            conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-            cursor = conn.cursor()
-            
             # Получаем текст вакансии для анализа
-            cursor.execute("SELECT text FROM vacancies WHERE hash = ?", (v_hash,))
-            v_row = cursor.fetchone()
-            v_text = v_row[0] if v_row else ""
+            v_text = await self.repo.get_vacancy_text(v_hash) or ""
             
             # Обучение Гвен на основе фидбека
             from systems.gwen.learning_engine import gwen_learning_engine
             learning_report = await gwen_learning_engine.analyze_spam_with_feedback(v_text, text)
             
             # Обновляем причину и помечаем как обработанное, чтобы разблокировать очередь
-            cursor.execute("UPDATE vacancies SET status = 'rejected', rejection_reason = ?, response = 'rejected' WHERE hash = ?", (f"USER_REJECT: {text}", v_hash))
-            conn.commit()
-            conn.close()
+            await self.repo.reject_vacancy(v_hash, f"USER_REJECT: {text}", response='rejected')
 
             # --- ЭТАП 2: РЕВАЛИДАЦИЯ ОЧЕРЕДИ ---
             # После того как Гвен выучила новые стоп-слова, нужно пройтись по ожидающим лидам
@@ -862,16 +823,10 @@ class GwenCommander:
                 msg_today = await session.scalar(select(func.count(MessageLog.id)).where(MessageLog.created_at > today))
             
             # 2. Статистика по парсеру (SQLite)
-            import sqlite3
-            conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-            cursor = conn.cursor()
-            cursor.execute("SELECT status, COUNT(*) FROM vacancies GROUP BY status")
-            v_stats = dict(cursor.fetchall())
+            v_stats = await self.repo.get_status_counts()
             
             # Проверяем кол-во черновиков
-            cursor.execute("SELECT COUNT(*) FROM vacancies WHERE draft_response IS NOT NULL AND response IS NULL")
-            new_drafts = cursor.fetchone()[0]
-            conn.close()
+            new_drafts = await self.repo.count_unsent_drafts()
             
             stats_text = (
                 f"📊 <b>Статистика системы:</b>\n\n"
@@ -920,7 +875,8 @@ class GwenCommander:
             success_count = 0
             for tg_id in leads_ids:
                 try:
-                    # Используем основной клиент для отправки
+                    # Используем основной клиент для отправки (в общем бюджете аккаунта)
+                    await get_rate_limiter().acquire_pm(tg_id, priority=PRIORITY_FOLLOWUP)
                     sent_msg = await self.main_client.send_message(tg_id, message)
                     if sent_msg:
                         handover_manager.mark_as_automated(sent_msg.id)
@@ -949,20 +905,14 @@ class GwenCommander:
             # Анализ причины спама (ЛОКАЛЬНО)
             from systems.gwen.learning_engine import gwen_learning_engine
             # Пытаемся найти текст сообщения в базе для анализа
-            import sqlite3
-            conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-            cursor = conn.cursor()
-            cursor.execute("SELECT text FROM vacancies WHERE contact_link LIKE ? ORDER BY last_seen DESC LIMIT 1", (f'%{target}%',))
-            row = cursor.fetchone()
+            spam_text = await self.repo.find_text_by_contact(target)
             
             reason = "Ручная блокировка"
-            if row:
-                reason = await gwen_learning_engine.analyze_spam_reason(row[0])
+            if spam_text:
+                reason = await gwen_learning_engine.analyze_spam_reason(spam_text)
 
             # Также помечаем в базе если есть такие вакансии
-            cursor.execute("UPDATE vacancies SET status = 'rejected', rejection_reason = ? WHERE contact_link LIKE ?", (f"MANUAL_SPAM: {reason}", f'%{target}%'))
-            conn.commit()
-            conn.close()
+            await self.repo.reject_by_contact(target, f"MANUAL_SPAM: {reason}")
             
             await event.respond(f"🚫 <b>{target}</b> отправлен в бан.\n🧐 <b>Анализ Гвен:</b> <i>{reason}</i>", parse_mode='html')
         except Exception as e:
@@ -990,20 +940,14 @@ class GwenCommander:
         v_hash = parts[2]
         
         if action in ["ignore", "block", "duplicate"]:
-            import sqlite3
-            conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-            cursor = conn.cursor()
-            
             # Получаем данные вакансии
-            cursor.execute("SELECT text, contact_link FROM vacancies WHERE hash = ?", (v_hash,))
-            row = cursor.fetchone()
+            vacancy = await self.repo.get_vacancy(v_hash)
             
-            if not row:
+            if not vacancy:
                 await event.answer("❌ Вакансия не найдена", alert=True)
-                conn.close()
                 return
 
-            v_text, v_contact_link = row
+            v_contact_link = vacancy["contact_link"]
             status_text = ""
             rejection_reason = "MANUAL_REJECT"
 
@@ -1034,36 +978,27 @@ class GwenCommander:
                 self.waiting_for_reason[event.sender_id] = v_hash
                 await event.answer("🗑 Напиши причину!")
                 await event.edit("📩 <b>Помечено как СПАМ.</b>\n\n💬 Напиши кратко, <b>почему</b> этот лид не подходит? (Просто отправь текст следующим сообщением)", parse_mode='html')
-                conn.close()
                 return
 
             # Обновляем БД (для block/duplicate) - помечаем response как 'processed', чтобы очередь шла дальше
-            cursor.execute("UPDATE vacancies SET status = 'rejected', rejection_reason = ?, response = 'processed' WHERE hash = ?", (rejection_reason, v_hash))
-            conn.commit()
-            conn.close()
+            await self.repo.reject_vacancy(v_hash, rejection_reason, response='processed')
 
             await event.edit(status_text, parse_mode='html')
             return
 
         # Для Send и Edit нужна информация из БД
-        import sqlite3
         try:
-            conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-            cursor = conn.cursor()
-            cursor.execute("SELECT text, draft_response, contact_link FROM vacancies WHERE hash = ?", (v_hash,))
-            vacancy = cursor.fetchone()
+            vacancy = await self.repo.get_vacancy(v_hash)
         except Exception as e:
             logger.error(f"DB Error in callback: {e}")
             await event.answer("❌ Ошибка базы данных", alert=True)
             return
-        finally:
-             if 'conn' in locals(): conn.close()
         
         if not vacancy:
             await event.answer("❌ Вакансия не найдена в базе", alert=True)
             return
             
-        v_text, v_draft, v_contact = vacancy
+        v_text, v_draft, v_contact = vacancy["text"], vacancy["draft_response"], vacancy["contact_link"]
         
         if action == "send":
             # Попытка найти ЧЕЛОВЕЧЕСКИЙ контакт (@username) в тексте
@@ -1084,11 +1019,7 @@ class GwenCommander:
             if not v_contact or v_contact == "Не найден":
                 await event.answer("⚠️ Контакт не найден.", alert=True)
                 # Помечаем как accepted, но без отправки
-                conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE vacancies SET status = 'accepted', response = 'no_contact_skip' WHERE hash = ?", (v_hash,))
-                conn.commit()
-                conn.close()
+                await self.repo.approve_without_contact(v_hash)
                 await event.edit(f"✅ <b>Одобрено (без отправки)</b>\n\nЯ запомнила твой выбор, но отправить отклик некуда (нет контакта).", parse_mode='html')
                 return
 
@@ -1106,20 +1037,14 @@ class GwenCommander:
                     
                     # Проверка на старость
                     is_old = False
+                    direction = vacancy["direction"] or "Digital Marketing"
                     try:
-                        cursor.execute("SELECT last_seen, direction FROM vacancies WHERE hash = ?", (v_hash,))
-                        ls_row = cursor.fetchone()
-                        if ls_row:
-                            last_seen, v_dir = ls_row
-                            dt = dateutil.parser.isoparse(last_seen)
-                            if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
-                            if (datetime.now(timezone.utc) - dt).total_seconds() > 43200:
-                                is_old = True
-                            direction = v_dir or "Digital Marketing"
-                        else:
-                            direction = "Digital Marketing"
+                        dt = dateutil.parser.isoparse(vacancy["last_seen"])
+                        if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
+                        if (datetime.now(timezone.utc) - dt).total_seconds() > 43200:
+                            is_old = True
                     except Exception as e:  
-                        direction = "Digital Marketing"
+                        pass
 
                     await event.edit("⏳ <i>Гвен пишет черновик...</i>", parse_mode='html')
                     v_draft = await outreach_generator.generate_draft(v_text, direction, is_old=is_old)
@@ -1129,11 +1054,7 @@ class GwenCommander:
                         return
                     
                     # Сохраняем черновик
-                    conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                    cursor = conn.cursor()
-                    cursor.execute("UPDATE vacancies SET draft_response = ? WHERE hash = ?", (v_draft, v_hash))
-                    conn.commit()
-                    conn.close()
+                    await self.repo.set_draft(v_hash, v_draft)
 
                 # Определяем получателя (username или ID)
                 destination = None
@@ -1147,6 +1068,7 @@ class GwenCommander:
                     destination = v_contact.split('/')[-1].replace('@', '').strip()
                 
                 try:
+                    await get_rate_limiter().acquire_pm(destination, priority=PRIORITY_HOT)
                     sent_msg = await self.main_client.send_message(destination, v_draft)
                     if sent_msg:
                         handover_manager.mark_as_automated(sent_msg.id)
@@ -1161,11 +1083,7 @@ class GwenCommander:
                 await event.edit(f"✅ <b>Отправлено в {v_contact}</b>\n🧐 <b>Анализ Гвен:</b> {analysis_reason}\n\n{v_draft}", parse_mode='html')
                 
                 # Помечаем в базе как отправленное
-                conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE vacancies SET response = ? WHERE hash = ?", (v_draft, v_hash))
-                conn.commit()
-                conn.close()
+                await self.repo.set_response(v_hash, v_draft)
                 
             except Exception as e:
                 logger.error(f"Failed to send outreach via userbot: {e}")
@@ -1187,57 +1105,16 @@ class GwenCommander:
             since = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
 
             # --- vacancies.db ---
-            conn_v = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-            cur = conn_v.cursor()
-
-            cur.execute("SELECT COUNT(*) FROM vacancies WHERE status='accepted' AND last_seen >= ?", (since,))
-            accepted_24h = (cur.fetchone() or [0])[0]
-
-            cur.execute("""
-                SELECT COUNT(*) FROM vacancies
-                WHERE status='accepted'
-                  AND response IS NOT NULL AND response != ''
-                  AND response NOT IN ('no_contact_skip','no_draft_skip','notified','failed','failed_privacy','skipped_duplicate')
-                  AND last_seen >= ?
-            """, (since,))
-            sent_24h = (cur.fetchone() or [0])[0]
-
-            cur.execute("""
-                SELECT COUNT(*) FROM vacancies
-                WHERE status='accepted'
-                  AND draft_response IS NOT NULL AND draft_response != ''
-                  AND (response IS NULL OR response = '')
-            """)
-            pending_drafts = (cur.fetchone() or [0])[0]
-
-            cur.execute("""
-                SELECT COUNT(*) FROM vacancies
-                WHERE status='accepted'
-                  AND response = 'no_contact_skip'
-            """)
-            no_contact = (cur.fetchone() or [0])[0]
-
-            cur.execute("""
-                SELECT direction, text, contact_link
-                FROM vacancies
-                WHERE status='accepted'
-                  AND (response IS NULL OR response = '')
-                ORDER BY priority DESC, last_seen DESC
-                LIMIT 5
-            """)
-            top_orders = cur.fetchall()
-            conn_v.close()
+            summary = await self.repo.get_daily_summary(since)
+            accepted_24h = summary["accepted"]
+            sent_24h = summary["sent"]
+            pending_drafts = summary["pending_drafts"]
+            no_contact = summary["no_contact"]
+            top_orders = summary["top_orders"]
 
             # --- bot_data.db ---
             try:
-                conn_b = sqlite3.connect(str(settings.DATABASE_PATH), timeout=10)
-                cur_b = conn_b.cursor()
-                cur_b.execute(
-                    "SELECT COUNT(*) FROM message_logs WHERE direction='incoming' AND created_at >= ?",
-                    (since,)
-                )
-                incoming_msgs = (cur_b.fetchone() or [0])[0]
-                conn_b.close()
+                incoming_msgs = await self.repo.count_incoming_messages(since)
             except Exception:
                 incoming_msgs = "—"
 
@@ -1290,7 +1167,6 @@ class GwenCommander:
     async def _run_history_leads_outreach(self):
         """Рассылка по старым лидам из history_buyer_leads.db (ретроспективные отклики)."""
         from systems.parser.outreach_generator import outreach_generator
-        HISTORY_DB = str(settings.DB_DIR / "history_buyer_leads.db")
         MAX_PER_DAY = 15
         WORK_HOURS = (9, 21)
 
@@ -1301,37 +1177,14 @@ class GwenCommander:
                     await asyncio.sleep(1800)
                     continue
 
-                # Идемпотентно добавляем колонку
-                conn = sqlite3.connect(HISTORY_DB, timeout=30)
-                try:
-                    conn.execute("ALTER TABLE history_leads ADD COLUMN outreach_sent_at TEXT")
-                    conn.commit()
-                except Exception:
-                    pass
-
                 # Считаем отправленные сегодня
-                today = now.strftime('%Y-%m-%d')
-                row = conn.execute(
-                    "SELECT COUNT(*) FROM history_leads WHERE outreach_sent_at LIKE ?",
-                    (f"{today}%",)
-                ).fetchone()
-                sent_today = row[0] if row else 0
+                sent_today = await self.repo.count_history_sent_on(now.strftime('%Y-%m-%d'))
 
                 if sent_today >= MAX_PER_DAY:
-                    conn.close()
                     await asyncio.sleep(3600)
                     continue
 
-                leads = conn.execute("""
-                    SELECT id, text, direction, contact_link, source, date
-                    FROM history_leads
-                    WHERE contact_link IS NOT NULL AND contact_link != ''
-                      AND outreach_sent_at IS NULL
-                      AND score >= 3
-                    ORDER BY score DESC, found_at DESC
-                    LIMIT 3
-                """).fetchall()
-                conn.close()
+                leads = await self.repo.get_history_leads_for_outreach(limit=3)
 
                 if not leads:
                     await asyncio.sleep(7200)
@@ -1355,35 +1208,21 @@ class GwenCommander:
                     ) and _re.match(r'^[a-zA-Z][a-zA-Z0-9_]{3,31}$', target)
                     if not _is_tg:
                         logger.info(f"⏭ Пропуск невалидного контакта: {contact_link}")
-                        conn = sqlite3.connect(HISTORY_DB, timeout=30)
-                        conn.execute("UPDATE history_leads SET outreach_sent_at = 'invalid_contact' WHERE id = ?", (lead_id,))
-                        conn.commit()
-                        conn.close()
+                        await self.repo.mark_history_lead(lead_id, 'invalid_contact')
                         continue
 
                     # ПРОВЕРКА ЧС
                     if await self._is_tg_blocked(target):
                         logger.info(f"🚫 ЧС (history): {contact_link} — пропускаем")
-                        conn = sqlite3.connect(HISTORY_DB, timeout=30)
-                        conn.execute(
-                            "UPDATE history_leads SET outreach_sent_at = 'blacklist_skip' WHERE id = ?",
-                            (lead_id,)
-                        )
-                        conn.commit()
-                        conn.close()
+                        await self.repo.mark_history_lead(lead_id, 'blacklist_skip')
                         continue
 
                     try:
+                        await get_rate_limiter().acquire_pm(target, priority=PRIORITY_FOLLOWUP)
                         sent_msg = await self.main_client.send_message(target, draft)
                         if sent_msg:
                             handover_manager.mark_as_automated(sent_msg.id)
-                        conn = sqlite3.connect(HISTORY_DB, timeout=30)
-                        conn.execute(
-                            "UPDATE history_leads SET outreach_sent_at = ? WHERE id = ?",
-                            (now_msk().isoformat(), lead_id)
-                        )
-                        conn.commit()
-                        conn.close()
+                        await self.repo.mark_history_lead(lead_id, now_msk().isoformat())
                         logger.info(f"✅ History outreach → {contact_link}")
                         try:
                             _login = contact_link.split('/')[-1].replace('@', '').strip()
@@ -1451,17 +1290,7 @@ class GwenCommander:
         from core.ai_engine.llm_client import llm_client
 
         try:
-            conn = sqlite3.connect(str(settings.VACANCY_DB_PATH), timeout=30)
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT hash, text, direction, source
-                FROM vacancies
-                WHERE status = 'accepted'
-                  AND DATE(last_seen) >= DATE('now', '-7 days')
-                ORDER BY last_seen DESC
-            """)
-            rows = cursor.fetchall()
-            conn.close()
+            rows = await self.repo.get_accepted_for_review(days=7)
         except Exception as e:
             logger.error(f"_analyze_lead_quality: DB error: {e}")
             return
@@ -0,0 +1,235 @@
+"""
+Репозиторий Гвен: все запросы GwenCommander к SQLite через пулы aiosqlite.
+
+Раньше обработчики открывали sqlite3.connect(..., timeout=30) прямо в event
+loop: блокировка записи парсером замораживала весь Telegram-клиент до 30 с.
+Здесь каждый запрос — typed async-метод поверх core.database.sqlite_pool
+(соединения живут в своих потоках, loop только ждёт результат):
+
+- vacancies.db — общий пул VacancyDatabase (схема, триггеры change feed);
+  после записи будится change feed, подписчики видят изменение сразу;
+- bot_data.db — только чтение (утренний отчёт);
+- history_buyer_leads.db — ретроспективная рассылка, колонка outreach_sent_at
+  добавляется один раз при открытии пула.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from core.config.settings import settings
+from core.database.sqlite_pool import get_pool
+from systems.parser.vacancy_db import VacancyDatabase
+
+# response, которые означают «отклик не отправлен» (для счётчика отправленных за сутки)
+NOT_SENT_RESPONSES = (
+    "no_contact_skip", "no_draft_skip", "notified", "failed", "failed_privacy", "skipped_duplicate",
+)
+
+OUTREACH_QUEUE_COLUMNS = (
+    "hash", "text", "direction", "source", "contact_link", "draft_response",
+    "last_seen", "tier", "priority", "message_id", "chat_id",
+)
+
+
+async def _init_history_schema(db: aiosqlite.Connection):
+    """Идемпотентно добавляет outreach_sent_at (таблицу history_leads создаёт парсер истории)."""
+    async with db.execute("PRAGMA table_info(history_leads)") as cursor:
+        columns = {row[1] for row in await cursor.fetchall()}
+    if columns and "outreach_sent_at" not in columns:
+        await db.execute("ALTER TABLE history_leads ADD COLUMN outreach_sent_at TEXT")
+
+
+class GwenRepository:
+    """Async-запросы Гвен к vacancies.db, bot_data.db и history_buyer_leads.db."""
+
+    def __init__(self, vacancy_db_path: str = None, bot_db_path: str = None, history_db_path: str = None):
+        self.vacancies = VacancyDatabase(vacancy_db_path)
+        self.pool = self.vacancies.pool
+        self.bot_pool = get_pool(str(bot_db_path or settings.DATABASE_PATH), readers=1)
+        self.history_pool = get_pool(
+            str(history_db_path or settings.DB_DIR / "history_buyer_leads.db"),
+            readers=1, init_fn=_init_history_schema,
+        )
+
+    async def _fetchone(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        async with self.pool.reader() as db:
+            async with db.execute(sql, params) as cursor:
+                return await cursor.fetchone()
+
+    async def _fetchall(self, sql: str, params: tuple = ()) -> List[tuple]:
+        async with self.pool.reader() as db:
+            async with db.execute(sql, params) as cursor:
+                return list(await cursor.fetchall())
+
+    async def _count(self, sql: str, params: tuple = ()) -> int:
+        row = await self._fetchone(sql, params)
+        return row[0] if row else 0
+
+    async def _write(self, sql: str, params: tuple = ()) -> int:
+        """UPDATE в vacancies.db; возвращает число затронутых строк."""
+        async with self.pool.writer() as db:
+            async with db.execute(sql, params) as cursor:
+                changed = cursor.rowcount
+        self.vacancies.change_feed.notify()
+        return changed
+
+    # ---------- очередь outreach ----------
+
+    async def count_notified(self) -> int:
+        """Сколько лидов ждут решения пользователя (response = 'notified')."""
+        return await self._count("SELECT COUNT(*) FROM vacancies WHERE response = 'notified'")
+
+    async def get_outreach_queue(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Принятые вакансии без отклика, самые старые первыми."""
+        rows = await self._fetchall(f"""
+            SELECT {', '.join(OUTREACH_QUEUE_COLUMNS)}
+            FROM vacancies
+            WHERE status = 'accepted' AND (response IS NULL OR response = '')
+            ORDER BY last_seen ASC LIMIT ?
+        """, (limit,))
+        return [dict(zip(OUTREACH_QUEUE_COLUMNS, row)) for row in rows]
+
+    async def set_response(self, v_hash: str, response: str):
+        await self._write("UPDATE vacancies SET response = ? WHERE hash = ?", (response, v_hash))
+
+    async def set_draft(self, v_hash: str, draft: str):
+        await self._write("UPDATE vacancies SET draft_response = ? WHERE hash = ?", (draft, v_hash))
+
+    async def set_contact(self, v_hash: str, contact: str, chat_id: Optional[int]):
+        await self._write("UPDATE vacancies SET contact_link = ?, chat_id = ? WHERE hash = ?", (contact, chat_id, v_hash))
+
+    # ---------- решения пользователя ----------
+
+    async def get_vacancy(self, v_hash: str) -> Optional[Dict[str, Any]]:
+        """Поля вакансии, нужные обработчикам кнопок."""
+        row = await self._fetchone("""
+            SELECT text, draft_response, contact_link, last_seen, direction
+            FROM vacancies WHERE hash = ?
+        """, (v_hash,))
+        if row is None:
+            return None
+        return dict(zip(("text", "draft_response", "contact_link", "last_seen", "direction"), row))
+
+    async def get_vacancy_text(self, v_hash: str) -> Optional[str]:
+        row = await self._fetchone("SELECT text FROM vacancies WHERE hash = ?", (v_hash,))
+        return row[0] if row else None
+
+    async def reject_vacancy(self, v_hash: str, reason: str, response: str):
+        """Отклонение пользователем; response разблокирует очередь уведомлений."""
+        await self._write(
+            "UPDATE vacancies SET status = 'rejected', rejection_reason = ?, response = ? WHERE hash = ?",
+            (reason, response, v_hash),
+        )
+
+    async def approve_without_contact(self, v_hash: str):
+        await self._write(
+            "UPDATE vacancies SET status = 'accepted', response = 'no_contact_skip' WHERE hash = ?", (v_hash,)
+        )
+
+    async def find_text_by_contact(self, contact: str) -> Optional[str]:
+        """Текст последней вакансии с этим контактом."""
+        row = await self._fetchone(
+            "SELECT text FROM vacancies WHERE contact_link LIKE ? ORDER BY last_seen DESC LIMIT 1", (f"%{contact}%",)
+        )
+        return row[0] if row else None
+
+    async def reject_by_contact(self, contact: str, reason: str) -> int:
+        return await self._write(
+            "UPDATE vacancies SET status = 'rejected', rejection_reason = ? WHERE contact_link LIKE ?",
+            (reason, f"%{contact}%"),
+        )
+
+    # ---------- статистика и отчёты ----------
+
+    async def get_status_counts(self) -> Dict[str, int]:
+        return dict(await self._fetchall("SELECT status, COUNT(*) FROM vacancies GROUP BY status"))
+
+    async def count_unsent_drafts(self) -> int:
+        return await self._count("SELECT COUNT(*) FROM vacancies WHERE draft_response IS NOT NULL AND response IS NULL")
+
+    async def get_daily_summary(self, since: str) -> Dict[str, Any]:
+        """Счётчики утреннего отчёта (since — ISO-время начала суток) и топ-5 ожидающих заказов."""
+        not_sent = ",".join("?" * len(NOT_SENT_RESPONSES))
+        async with self.pool.reader() as db:
+            async def scalar(sql: str, params: tuple = ()) -> int:
+                async with db.execute(sql, params) as cursor:
+                    return ((await cursor.fetchone()) or [0])[0]
+
+            summary = {
+                "accepted": await scalar(
+                    "SELECT COUNT(*) FROM vacancies WHERE status='accepted' AND last_seen >= ?", (since,)),
+                "sent": await scalar(f"""
+                    SELECT COUNT(*) FROM vacancies
+                    WHERE status='accepted'
+                      AND response IS NOT NULL AND response != ''
+                      AND response NOT IN ({not_sent})
+                      AND last_seen >= ?
+                """, (*NOT_SENT_RESPONSES, since)),
+                "pending_drafts": await scalar("""
+                    SELECT COUNT(*) FROM vacancies
+                    WHERE status='accepted'
+                      AND draft_response IS NOT NULL AND draft_response != ''
+                      AND (response IS NULL OR response = '')
+                """),
+                "no_contact": await scalar(
+                    "SELECT COUNT(*) FROM vacancies WHERE status='accepted' AND response = 'no_contact_skip'"),
+            }
+            async with db.execute("""
+                SELECT direction, text, contact_link
+                FROM vacancies
+                WHERE status='accepted'
+                  AND (response IS NULL OR response = '')
+                ORDER BY priority DESC, last_seen DESC
+                LIMIT 5
+            """) as cursor:
+                summary["top_orders"] = list(await cursor.fetchall())
+        return summary
+
+    async def count_incoming_messages(self, since: str) -> int:
+        """Входящие сообщения клиентов из bot_data.db с момента since."""
+        async with self.bot_pool.reader() as db:
+            async with db.execute(
+                "SELECT COUNT(*) FROM message_logs WHERE direction='incoming' AND created_at >= ?", (since,)
+            ) as cursor:
+                return ((await cursor.fetchone()) or [0])[0]
+
+    async def get_accepted_for_review(self, days: int = 7) -> List[Tuple[str, str, str, str]]:
+        """(hash, text, direction, source) принятых вакансий за days дней — для анализа качества фильтра."""
+        return await self._fetchall("""
+            SELECT hash, text, direction, source
+            FROM vacancies
+            WHERE status = 'accepted'
+              AND DATE(last_seen) >= DATE('now', ?)
+            ORDER BY last_seen DESC
+        """, (f"-{days} days",))
+
+    # ---------- history_buyer_leads.db ----------
+
+    async def count_history_sent_on(self, day: str) -> int:
+        """Сколько ретроспективных откликов отправлено в день day (YYYY-MM-DD)."""
+        async with self.history_pool.reader() as db:
+            async with db.execute(
+                "SELECT COUNT(*) FROM history_leads WHERE outreach_sent_at LIKE ?", (f"{day}%",)
+            ) as cursor:
+                row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    async def get_history_leads_for_outreach(self, limit: int = 3) -> List[tuple]:
+        """(id, text, direction, contact_link, source, date) старых лидов без отклика, лучшие первыми."""
+        async with self.history_pool.reader() as db:
+            async with db.execute("""
+                SELECT id, text, direction, contact_link, source, date
+                FROM history_leads
+                WHERE contact_link IS NOT NULL AND contact_link != ''
+                  AND outreach_sent_at IS NULL
+                  AND score >= 3
+                ORDER BY score DESC, found_at DESC
+                LIMIT ?
+            """, (limit,)) as cursor:
+                return list(await cursor.fetchall())
+
+    async def mark_history_lead(self, lead_id: int, outreach_sent_at: str):
+        """outreach_sent_at — время отправки или причина пропуска ('invalid_contact', 'blacklist_skip')."""
+        async with self.history_pool.writer() as db:
+            await db.execute("UPDATE history_leads SET outreach_sent_at = ? WHERE id = ?", (outreach_sent_at, lead_id))
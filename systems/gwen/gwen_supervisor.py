@@ -1,7 +1,7 @@
 """
 AI Supervisor - Проверяет исходящие сообщения бота на наличие технических ошибок.
 """
-import httpx
+from core.ai_engine.http_pool import get_http_client
 from typing import Dict
 from core.utils.logger import logger
 
@@ -10,6 +10,9 @@ from core.utils.health import health_monitor
 
 from core.ai_engine.llm_client import llm_client
 from core.config.settings import settings
+from core.utils.llm_cache import llm_cache, make_cache_key
+
+_ALL_MODELS_FAILED = "All models failed, skipping check"
 
 class GwenSupervisor:
     """
@@ -111,9 +114,6 @@ class GwenSupervisor:
         """
         Оценка качества ответа через OpenRouter (быстрая модель-супервизор).
         """
-        import json
-        import re
-
         system_prompt = (
             "Ты — Гвен, супервизор цифрового агентства Evium (SEO, контекстная реклама, Авито, SMM, сайты). "
             "Алексей — менеджер-бот, ведёт холодные продажи через Telegram. "
@@ -145,6 +145,20 @@ class GwenSupervisor:
 Ответь строго JSON:
 {{"verdict": "ALLOW" | "BLOCK" | "RETRY", "reason": "одна фраза", "correction": "что исправить (только для RETRY)"}}"""
 
+        # Одинаковый текст проверяем один раз (повторы RETRY/дубли рассылки)
+        models_to_try = [settings.SUPERVISOR_MODEL, settings.OPENROUTER_MODEL]
+        key = make_cache_key("gwen_check", "|".join(models_to_try), system_prompt, prompt)
+        return await llm_cache.get_or_compute(
+            key,
+            lambda: self._ai_check_models(models_to_try, system_prompt, prompt),
+            namespace="gwen_check",
+            cacheable=lambda result: result.get("reason") != _ALL_MODELS_FAILED,
+        )
+
+    async def _ai_check_models(self, models_to_try: list, system_prompt: str, prompt: str) -> Dict:
+        import json
+        import re
+
         headers = {
             "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
             "Content-Type": "application/json",
@@ -157,8 +171,6 @@ class GwenSupervisor:
         ]
 
         # Пробуем бесплатную модель, при неудаче — основную платную
-        models_to_try = [settings.SUPERVISOR_MODEL, settings.OPENROUTER_MODEL]
-
         for model in models_to_try:
             try:
                 payload = {
@@ -167,14 +179,11 @@ class GwenSupervisor:
                     "max_tokens": 200,
                     "temperature": 0.1
                 }
-                async with httpx.AsyncClient(timeout=15.0) as client:
-                    response = await client.post(
-                        "https://openrouter.ai/api/v1/chat/completions",
-                        json=payload,
-                        headers=headers
-                    )
-                    response.raise_for_status()
-                    raw = response.json()["choices"][0]["message"]["content"].strip()
+                url = "https://openrouter.ai/api/v1/chat/completions"
+                client = get_http_client(url)
+                response = await client.post(url, json=payload, headers=headers, timeout=15.0)
+                response.raise_for_status()
+                raw = response.json()["choices"][0]["message"]["content"].strip()
 
                 json_match = re.search(r'\{.*\}', raw, re.DOTALL)
                 if not json_match:
@@ -195,7 +204,7 @@ class GwenSupervisor:
             except Exception as e:
                 logger.warning(f"Gwen: model {model} failed: {e}, trying next...")
 
-        return {"verdict": "ALLOW", "reason": "All models failed, skipping check"}
+        return {"verdict": "ALLOW", "reason": _ALL_MODELS_FAILED}
             
     async def generate_chat_response(self, user_message: str, history: list = None) -> str:
         """
@@ -14,10 +14,12 @@ from core.utils.handover import handover_manager
 class MessageInterceptor:
     """
     Обёртка вокруг Pyrogram Client.send_message для перехвата и проверки Гвен.
+    С пулом аккаунтов сообщение уходит с аккаунта, за которым закреплён диалог.
     """
     
-    def __init__(self, client: Client):
+    def __init__(self, client: Client, pool=None):
         self.client = client
+        self.pool = pool
         self.blocked_count = 0
         self.allowed_count = 0
         
@@ -39,7 +41,14 @@ class MessageInterceptor:
         logger.info(f"✅ SUPERVISOR ALLOWED message to {chat_id}")
         self.allowed_count += 1
         
-        sent_msg = await self.client.send_message(chat_id, message)
+        account = self.pool.account_for(chat_id) if self.pool is not None else None
+        if account is not None:
+            await account.limiter.acquire_pm(chat_id)
+            sent_msg = await account.client.send_message(chat_id, message)
+            if sent_msg:
+                await self.pool.bind(chat_id, account.name)
+        else:
+            sent_msg = await self.client.send_message(chat_id, message)
         if sent_msg:
             handover_manager.mark_as_automated(sent_msg.id)
         return sent_msg
@@ -74,6 +83,6 @@ class MessageInterceptor:
         }
 
 
-def create_interceptor(client: Client) -> MessageInterceptor:
-    """Создаёт и возвращает перехватчик сообщений."""
-    return MessageInterceptor(client)
+def create_interceptor(client: Client, pool=None) -> MessageInterceptor:
+    """Создаёт и возвращает перехватчик сообщений (pool — SessionPool для маршрутизации по аккаунтам)."""
+    return MessageInterceptor(client, pool)
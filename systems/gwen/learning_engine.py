@@ -289,6 +289,10 @@ class GwenLearningEngine:
         
         with open(self.filters_path, 'w', encoding='utf-8') as f:
             json.dump(current, f, ensure_ascii=False, indent=4)
+
+        # Пересобираем скомпилированные матчеры, чтобы новые правила применились сразу
+        from systems.parser.rule_matcher import rebuild_all
+        rebuild_all()
             
         return added
 
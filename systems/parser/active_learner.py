@@ -3,17 +3,20 @@ Active Learning Pipeline для автоматического отбора ин
 Использует Uncertainty Sampling и Query by Committee для минимизации ручной разметки.
 """
 
-from systems.parser.bert_classifier import bert_classifier
-from systems.parser.ml_classifier import ml_classifier
+import asyncio
+
+from core.config.settings import settings
 from systems.parser.vacancy_db import VacancyDatabase, Lead
 from core.utils.structured_logger import get_logger
 from typing import List, Dict, Tuple
 import numpy as np
 from datetime import datetime, timedelta
-import torch
 
 logger = get_logger(__name__)
 
+# Заглушки вместо предсказания (модель не обучена / упала) — в committee_predictions не пишем
+_PLACEHOLDER_METHODS = {"ML_NONE", "ML_ERROR"}
+
 
 class ActiveLearningPipeline:
     """
@@ -23,64 +26,131 @@ class ActiveLearningPipeline:
     def __init__(self):
         self.db = VacancyDatabase()
         
-        # Committee из моделей (используем существующие инстансы если возможно)
-        self.bert_tiny = bert_classifier
-        self.ml_classifier = ml_classifier
         
         self.uncertainty_threshold = 0.4 
         self.weekly_batch_size = 50
+
+        if settings.ML_ONLINE_LEARNING:
+            # ML-классификатор дообучается на каждой ручной разметке, без полного переобучения
+            from systems.parser.ml_classifier import learn_from_label
+            VacancyDatabase.register_label_hook(learn_from_label)
         
         logger.info(
             "active_learner_initialized",
             weekly_batch_size=self.weekly_batch_size
         )
     
-    def calculate_informativeness(self, text: str) -> Dict[str, float]:
-        """Расчет informativeness score для текста."""
-        predictions = []
-        
-        # BERT prediction
-        bert_pred = self.bert_tiny.predict(text)
-        predictions.append(bert_pred["confidence"])
-        
-        # ML prediction
-        ml_pred = self.ml_classifier.predict(text)
-        predictions.append(ml_pred["confidence"])
-        
-        predictions = np.array(predictions)
-        
+    @property
+    def bert_tiny(self):
+        """Committee из моделей: общие инстансы, грузятся при первом обращении."""
+        from systems.parser.bert_classifier import get_bert_classifier
+        return get_bert_classifier()
+
+    @property
+    def ml_classifier(self):
+        from systems.parser.ml_classifier import get_ml_classifier
+        return get_ml_classifier()
+
+    @staticmethod
+    def committee_metrics(predictions: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Метрики неопределённости по матрице предсказаний (n_текстов, n_моделей):
+        все формулы считаются по строкам сразу для всей пачки.
+        """
+        predictions = np.asarray(predictions, dtype=np.float64)
+
         # 1. Least Confidence: 1 - max(P(y))
-        least_confidence = 1 - np.max(predictions)
-        
+        least_confidence = 1 - predictions.max(axis=1)
+
         # 2. Margin Sampling
-        margin = min([abs(p - 0.5) for p in predictions])
-        margin_score = 1 - (margin * 2) 
-        
+        margin_score = 1 - np.abs(predictions - 0.5).min(axis=1) * 2
+
         # 3. Entropy
-        def binary_entropy(p):
-            p = np.clip(p, 1e-10, 1 - 1e-10)
-            return -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
-        
-        avg_entropy = np.mean([binary_entropy(p) for p in predictions])
-        
+        p = np.clip(predictions, 1e-10, 1 - 1e-10)
+        avg_entropy = (-(p * np.log2(p) + (1 - p) * np.log2(1 - p))).mean(axis=1)
+
         # 4. Committee Variance
-        committee_variance = np.var(predictions)
-        
+        committee_variance = predictions.var(axis=1)
+
         informativeness = (
             0.25 * least_confidence +
             0.35 * margin_score +
             0.20 * avg_entropy +
             0.20 * committee_variance
         )
-        
         return {
-            "informativeness": float(informativeness),
-            "least_confidence": float(least_confidence),
-            "margin": float(margin_score),
-            "entropy": float(avg_entropy),
-            "committee_variance": float(committee_variance),
-            "predictions": predictions.tolist()
+            "informativeness": informativeness,
+            "least_confidence": least_confidence,
+            "margin": margin_score,
+            "entropy": avg_entropy,
+            "committee_variance": committee_variance,
         }
+
+    def _bert_results(self, texts: List[str]) -> List[Dict]:
+        """BERT пачками по BERT_MAX_BATCH_SIZE (padding до самого длинного в пачке)."""
+        batch_size = max(1, settings.BERT_MAX_BATCH_SIZE)
+        return [p for i in range(0, len(texts), batch_size)
+                for p in self.bert_tiny.predict_batch(texts[i:i + batch_size])]
+
+    def _ml_results(self, texts: List[str]) -> List[Dict]:
+        """ML одной разреженной матрицей."""
+        return self.ml_classifier.predict_batch(texts)
+
+    def _predict_bert(self, texts: List[str]) -> List[float]:
+        return [p["confidence"] for p in self._bert_results(texts)]
+
+    def _predict_ml(self, texts: List[str]) -> List[float]:
+        return [p["confidence"] for p in self._ml_results(texts)]
+
+    def _committee_predict(self, texts: List[str]) -> np.ndarray:
+        """Матрица (n, 2): столбцы — BERT и ML."""
+        if not texts:
+            return np.empty((0, 2))
+        return np.column_stack([self._predict_bert(texts), self._predict_ml(texts)])
+
+    @staticmethod
+    def _score_dicts(predictions: np.ndarray) -> List[Dict]:
+        metrics = ActiveLearningPipeline.committee_metrics(predictions)
+        names = list(metrics)
+        columns = [metrics[name].tolist() for name in names]
+        return [
+            {**dict(zip(names, values)), "predictions": row}
+            for values, row in zip(zip(*columns), predictions.tolist())
+        ]
+
+    def calculate_informativeness_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        """Расчет informativeness score для пачки текстов (один проход committee)."""
+        return self._score_dicts(self._committee_predict(list(texts)))
+
+    def calculate_informativeness(self, text: str) -> Dict[str, float]:
+        """Расчет informativeness score для текста."""
+        return self.calculate_informativeness_batch([text])[0]
+
+    async def _cached_committee_predict(self, leads: List[Lead]) -> np.ndarray:
+        """
+        Предсказания committee для лидов с кэшем в committee_predictions:
+        модель считает только лиды, для которых нет предсказания её текущей версии.
+        Заглушки (ML_NONE/ML_ERROR) участвуют в отборе, но не кэшируются.
+        """
+        ids = [lead.id for lead in leads]
+        predictions = np.zeros((len(leads), 2))
+        models = (("bert", self.bert_tiny, self._bert_results), ("ml", self.ml_classifier, self._ml_results))
+        for column, (name, model, predict) in enumerate(models):
+            version = model.model_version
+            cached = await self.db.get_committee_predictions(ids, name, version)
+            missing = [i for i, lead_id in enumerate(ids) if lead_id not in cached]
+            fresh = await asyncio.to_thread(predict, [leads[i].text for i in missing]) if missing else []
+            await self.db.save_committee_predictions(name, version, {
+                ids[i]: float(result["confidence"]) for i, result in zip(missing, fresh)
+                if result.get("method") not in _PLACEHOLDER_METHODS
+            })
+            for i, lead_id in enumerate(ids):
+                if lead_id in cached:
+                    predictions[i, column] = cached[lead_id]
+            for i, result in zip(missing, fresh):
+                predictions[i, column] = result["confidence"]
+            logger.info("committee_scored", model=name, cached=len(cached), computed=len(missing))
+        return predictions
     
     async def select_informative_samples(self, time_window_hours: int = 168) -> List[Dict]:
         """Отбор самых информативных неразмеченных лидов."""
@@ -95,41 +165,35 @@ class ActiveLearningPipeline:
         
         # Если WARM мало, берем все неразмеченные
         candidates = warm_leads if len(warm_leads) >= 10 else unlabeled_leads
+        candidates = [lead for lead in candidates[:200] if lead.text]
+        if not candidates:
+            return []
+        
+        try:
+            scores = self._score_dicts(await self._cached_committee_predict(candidates))
+        except Exception as e:
+            logger.error("informativeness_failed", error=str(e), candidates=len(candidates))
+            return []
         
         scored_leads = []
-        for lead in candidates[:200]:
-            try:
-                # В VacancyDatabase.get_unlabeled_leads_since мы получаем объекты Lead
-                text = lead.text
-                if not text:
-                  continue
-                
-                scores_dict = self.calculate_informativeness(text)
-                # scores_dict возвращает dict с ключами "informativeness", "least_confidence", etc.
-                
-                # Добавляем метаданные
-                item = {
-                    "lead_id": lead.id,
-                    "message_id": lead.message_id,
-                    "text": text,
-                    "source": lead.source_channel,
-                    "timestamp": lead.timestamp,
-                }
-                item.update(scores_dict) # Merge scores into item
-                
-                scored_leads.append(item)
-            except Exception as e:
-                logger.error(f"informativeness_failed for lead {lead.id}: {e}")
+        for lead, scores_dict in zip(candidates, scores):
+            item = {
+                "lead_id": lead.id,
+                "message_id": lead.message_id,
+                "text": lead.text,
+                "source": lead.source_channel,
+                "timestamp": lead.timestamp,
+            }
+            item.update(scores_dict) # Merge scores into item
+            scored_leads.append(item)
         
         scored_leads.sort(key=lambda x: x["informativeness"], reverse=True)
         top_samples = scored_leads[:self.weekly_batch_size]
         
-        for sample in top_samples:
-            await self.db.update_lead_informativeness(
-                lead_id=sample["lead_id"],
-                informativeness=sample["informativeness"],
-                needs_review=True
-            )
+        await self.db.update_leads_informativeness(
+            [(sample["lead_id"], sample["informativeness"]) for sample in top_samples],
+            needs_review=True
+        )
             
         return top_samples
     
@@ -137,15 +201,35 @@ class ActiveLearningPipeline:
         """Запуск переобучения при накоплении данных."""
         await self.db.init_db()
         new_labeled_count = await self.db.get_new_labeled_count_since_last_train()
+        ml_status = await self.sync_ml_classifier()
         
         if new_labeled_count >= 50:
-            return await self.retrain_pipeline()
+            return {**await self.retrain_pipeline(), "ml": ml_status}
         
         return {
             "retrain_triggered": False,
             "new_labeled_count": new_labeled_count,
-            "reason": f"Need {50 - new_labeled_count} more labeled samples"
+            "reason": f"Need {50 - new_labeled_count} more labeled samples",
+            "ml": ml_status
         }
+
+    async def sync_ml_classifier(self) -> Dict:
+        """
+        Online ML-модель уже актуальна (дообучается label-хуком): здесь только
+        начальный потоковый проход по таблице, если его ещё не было, и чекпоинт.
+        """
+        try:
+            ml = await asyncio.to_thread(lambda: self.ml_classifier)
+            if not ml.online:
+                return {"online": False}
+            if not ml.bootstrapped:
+                metrics = await asyncio.to_thread(ml.bootstrap_from_database, self.db.db_path)
+                return {"online": True, "bootstrapped": True, **metrics}
+            await asyncio.to_thread(ml.save)
+            return {"online": True, "bootstrapped": False, "samples_seen": ml.samples_seen}
+        except Exception as e:
+            logger.error("ml_sync_failed", error=str(e))
+            return {"online": True, "error": str(e)}
     
     async def retrain_pipeline(self) -> Dict:
         """Пайплайн переобучения."""
@@ -1,49 +1,147 @@
+import os
+import threading
 import torch
 import time
-from typing import Dict, Any
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from typing import Dict, Any, List
+from core.ai_engine.model_registry import model_registry
 from core.config.settings import settings
+from core.utils.micro_batcher import MicroBatcher
 from core.utils.structured_logger import logger
 
+
+class PooledClassifierHead(torch.nn.Module):
+    """
+    Голова BertForSequenceClassification (dropout + linear по pooler_output)
+    поверх общего backbone из model_registry — веса энкодера не копируются.
+    """
+    def __init__(self, backbone, num_labels: int = 2):
+        super().__init__()
+        self.backbone = backbone
+        config = backbone.config
+        self.dropout = torch.nn.Dropout(getattr(config, "classifier_dropout", None) or config.hidden_dropout_prob)
+        self.classifier = torch.nn.Linear(config.hidden_size, num_labels)
+        # Фиксированный seed: голова одинакова во всех процессах и бэкендах (torch/int8/onnx)
+        generator = torch.Generator().manual_seed(0)
+        self.classifier.weight.data.normal_(mean=0.0, std=config.initializer_range, generator=generator)
+        self.classifier.bias.data.zero_()
+
+    def forward(self, **inputs):
+        pooled = self.backbone(**inputs).pooler_output
+        return self.classifier(self.dropout(pooled))
+
+
 class BERTLeadClassifier:
     """
     Классификатор лидов на базе BERT (ruBERT-tiny).
+
+    predict_batch() гоняет один forward pass на пачку текстов с паддингом
+    до самой длинной последовательности в пачке, а не до max_length.
+    predict_async() — micro-batching фронт: конкурентные вызовы из пайплайна
+    склеиваются в один батч за BERT_BATCH_WAIT_MS.
+
+    Модель грузится при первом предсказании через model_registry: для базового
+    чекпоинта голова ставится на общий с дедупом backbone, дообученный
+    чекпоинт (BERT_CLASSIFIER_MODEL = путь) грузится целиком. Бэкенд
+    инференса (torch | int8 | onnx) — settings.MODEL_INFERENCE_BACKEND.
     """
-    def __init__(self, model_name: str = "cointegrated/rubert-tiny"):
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(model_name, num_labels=2)
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
-        self.model.eval()
+    def __init__(self, model_name: str = None, backend: str = None):
+        self.model_name = model_name or settings.BERT_CLASSIFIER_MODEL
+        self.backend = backend  # None — settings.MODEL_INFERENCE_BACKEND
+        self.device = model_registry.device
+        self.max_length = 512
+        self._tokenizer = None
+        self._model = None
+        self._load_lock = threading.Lock()
+        self.batcher = MicroBatcher(
+            self.predict_batch,
+            max_batch_size=settings.BERT_MAX_BATCH_SIZE,
+            max_wait_ms=settings.BERT_BATCH_WAIT_MS,
+            name="bert_batcher",
+        )
 
-    def predict(self, text: str) -> Dict[str, Any]:
+    def _ensure_model(self):
+        if self._model is not None:
+            return
+        with self._load_lock:
+            if self._model is None:
+                self._load_model()
+
+    def _load_model(self):
+        if model_registry.is_fine_tuned_classifier(self.model_name):
+            tokenizer, classifier = model_registry.sequence_classifier(self.model_name, num_labels=2, backend=self.backend)
+            model = lambda **inputs: classifier(**inputs).logits
+        else:
+            tokenizer, backbone = model_registry.backbone(self.model_name, backend=self.backend)
+            model = PooledClassifierHead(backbone, num_labels=2).to(self.device)
+            model.eval()
+        self._tokenizer = tokenizer
+        self._model = model
+
+    @property
+    def tokenizer(self):
+        self._ensure_model()
+        return self._tokenizer
+
+    @property
+    def model(self):
+        self._ensure_model()
+        return self._model
+
+    @property
+    def model_version(self) -> str:
+        """Имя чекпоинта + бэкенд (+ mtime, если чекпоинт локальный и его перезаписывает переобучение)."""
+        version = f"{self.model_name}:{self.backend or settings.MODEL_INFERENCE_BACKEND}"
+        if os.path.exists(self.model_name):
+            version += f":{int(os.path.getmtime(self.model_name))}"
+        return version
+
+    def predict_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Классифицирует пачку текстов одним forward pass."""
+        if not texts:
+            return []
+        self._ensure_model()
         start_time = time.time()
-        
-        # Токенизация
+
+        # Токенизация: padding="longest" — паддинг до самого длинного текста в батче
         inputs = self.tokenizer(
-            text, 
-            return_tensors="pt", 
-            truncation=True, 
-            max_length=512, 
-            padding=True
+            list(texts),
+            return_tensors="pt",
+            truncation=True,
+            max_length=self.max_length,
+            padding="longest"
         ).to(self.device)
-        
+
         # Инференс
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            probabilities = torch.softmax(outputs.logits, dim=1)
-            confidence = probabilities[0][1].item()
-            
+        with torch.inference_mode():
+            logits = self.model(**inputs)
+            confidences = torch.softmax(logits, dim=1)[:, 1].tolist()
+
         inference_time = int((time.time() - start_time) * 1000)
-        
-        result = {
-            "is_lead": confidence > 0.5,
-            "confidence": confidence,
-            "method": "bert",
-            "inference_time_ms": inference_time
-        }
-        
-        return result
-
-# Singleton
-bert_classifier = BERTLeadClassifier()
+
+        return [
+            {
+                "is_lead": confidence > 0.5,
+                "confidence": confidence,
+                "method": "bert",
+                "inference_time_ms": inference_time,
+                "batch_size": len(texts)
+            }
+            for confidence in confidences
+        ]
+
+    def predict(self, text: str) -> Dict[str, Any]:
+        return self.predict_batch([text])[0]
+
+    async def predict_async(self, text: str) -> Dict[str, Any]:
+        """Предсказание через micro-batching очередь (для конкурентных вызовов из asyncio)."""
+        return await self.batcher.submit(text)
+
+_bert_classifier = None
+
+
+def get_bert_classifier() -> BERTLeadClassifier:
+    """Общий экземпляр (создаётся при первом обращении, а не при импорте модуля)."""
+    global _bert_classifier
+    if _bert_classifier is None:
+        _bert_classifier = BERTLeadClassifier()
+    return _bert_classifier
@@ -2,10 +2,9 @@
 Named Entity Recognition (NER) на базе RuBERT-tiny2.
 Извлекает сущности (БЮДЖЕТ, ДЕДЛАЙН, СТЕК) из текста вакансий.
 """
-import torch
 import time
 from typing import Dict, List, Any
-from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
+from core.ai_engine.model_registry import model_registry
 from core.config.settings import settings
 from core.utils.structured_logger import get_logger
 
@@ -21,15 +20,22 @@ class BERTEntityExtractor:
     """
     
     def __init__(self, model_name: str = "cointegrated/rubert-tiny2"):
-        self.device = 0 if torch.cuda.is_available() else -1
-        try:
-            # Используем pipeline для ner, если модель поддерживает
-            # Для tiny2 может потребоваться fine-tuning, но мы попробуем стандартный pipeline
-            self.nlp = pipeline("ner", model=model_name, tokenizer=model_name, device=self.device, aggregation_strategy="simple")
-            logger.info(f"BERT NER loaded: {model_name}")
-        except Exception as e:
-            logger.warning(f"Failed to load BERT NER: {e}. Using fallback.")
-            self.nlp = None
+        self.model_name = model_name
+        self._nlp = None
+        self._load_failed = False
+
+    @property
+    def nlp(self):
+        """NER pipeline из model_registry — грузится при первом обращении."""
+        if self._nlp is None and not self._load_failed:
+            try:
+                # Для tiny2 может потребоваться fine-tuning, но мы попробуем стандартный pipeline
+                self._nlp = model_registry.pipeline("ner", self.model_name, aggregation_strategy="simple")
+                logger.info(f"BERT NER loaded: {self.model_name}")
+            except Exception as e:
+                logger.warning(f"Failed to load BERT NER: {e}. Using fallback.")
+                self._load_failed = True
+        return self._nlp
 
     
     def extract_all(self, text: str) -> Dict[str, Any]:
@@ -5,8 +5,13 @@ Celery configuration для distributed task queue.
 
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_init
 import os
 
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
 # Celery app instance
 app = Celery(
     "harmonic_trifid",
@@ -75,4 +80,8 @@ app.conf.task_routes = {
     "systems.parser.tasks.cleanup_old_leads": {"queue": "maintenance"},
 }
 
-print(f"[Celery] Initialized with broker: redis://localhost:6379/0")
+
+@worker_init.connect
+def _log_worker_init(**kwargs):
+    # Лог только при старте worker-а: импорт модуля (beat, flower, tasks) остаётся без side effects
+    logger.info("celery_worker_init", broker=app.conf.broker_url)
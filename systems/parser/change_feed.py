@@ -0,0 +1,358 @@
+"""
+Change feed vacancies.db: подписка на изменения вакансий вместо опроса таблицы.
+
+Источник событий — outbox-таблица vacancy_events. Её заполняют триггеры
+SQLite (install_outbox, вызывается из схемы VacancyDatabase) в той же
+транзакции, что и сама запись: событие не теряется при падении процесса и
+появляется при записи откуда угодно — VacancyDatabase, sqlite3.connect в
+Гвен, miniapp, другой процесс.
+
+Доставка подписчикам процесса:
+- VacancyDatabase после своих записей вызывает feed.notify() — хвост outbox
+  читается сразу;
+- записи других соединений и процессов замечаются по PRAGMA data_version
+  (меняется, когда БД изменило другое соединение): раз в poll_interval один
+  pragma без чтения страниц таблиц, SELECT по outbox — только при изменении.
+
+Подписка с именем consumer — durable: позиция сохраняется в
+vacancy_event_offsets при ack(), после рестарта подписчик получает
+пропущенные события (в пределах срока хранения outbox).
+
+    feed = get_change_feed(settings.VACANCY_DB_PATH)
+    events = await feed.subscribe({"vacancy.accepted"}, consumer="outreach_drafts")
+    async for event in events:
+        ...
+        await events.ack(event)
+
+Модуль не импортирует core.* — его подключает и backend дашборда, у которого
+свой пакет core.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+import aiosqlite
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Темы событий
+VACANCY_ACCEPTED = "vacancy.accepted"
+VACANCY_DRAFT_READY = "vacancy.draft_ready"
+VACANCY_RESPONSE = "vacancy.response"
+VACANCY_STATUS = "vacancy.status"
+VACANCY_LABELED = "vacancy.labeled"
+
+_NOW = "(julianday('now') - 2440587.5) * 86400.0"
+
+_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS vacancy_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        topic TEXT NOT NULL,
+        vacancy_id INTEGER,
+        hash TEXT,
+        value TEXT,
+        created_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_vacancy_events_created ON vacancy_events(created_at)",
+    """
+    CREATE TABLE IF NOT EXISTS vacancy_event_offsets (
+        consumer TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL
+    )
+    """,
+)
+
+# Статусы новых строк, о которых пишется событие: у отклонённых (большая часть
+# потока) подписчиков нет — outreach_generator и дашборд ждут принятые
+INSERT_EVENT_STATUSES = ("accepted",)
+
+# (имя, событие, условие WHEN, тема, значение)
+_TRIGGERS = (
+    ("vacancy_events_insert", "INSERT",
+     "NEW.status IN (" + ", ".join(f"'{status}'" for status in INSERT_EVENT_STATUSES) + ")",
+     "'vacancy.' || NEW.status", "NEW.status"),
+    ("vacancy_events_draft", "UPDATE OF draft_response",
+     "COALESCE(OLD.draft_response, '') = '' AND COALESCE(NEW.draft_response, '') != ''", f"'{VACANCY_DRAFT_READY}'", "NULL"),
+    # response — статус рассылки ('notified', 'failed', ...) или текст отправленного отклика
+    ("vacancy_events_response", "UPDATE OF response", "OLD.response IS NOT NEW.response",
+     f"'{VACANCY_RESPONSE}'", "substr(NEW.response, 1, 64)"),
+    ("vacancy_events_status", "UPDATE OF status", "OLD.status IS NOT NEW.status", f"'{VACANCY_STATUS}'", "NEW.status"),
+    ("vacancy_events_label", "UPDATE OF manual_label", "OLD.manual_label IS NOT NEW.manual_label",
+     f"'{VACANCY_LABELED}'", "CAST(NEW.manual_label AS TEXT)"),
+)
+
+
+async def _create_tables(db: aiosqlite.Connection):
+    for statement in _TABLES:
+        await db.execute(statement)
+
+
+async def install_outbox(db: aiosqlite.Connection, retention_days: Optional[float] = None):
+    """Таблицы outbox и триггеры на vacancies; события старше retention_days удаляются."""
+    await _create_tables(db)
+    async with db.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'vacancies'") as cursor:
+        installed = {row[0]: row[1] async for row in cursor}
+    for name, event, condition, topic, value in _TRIGGERS:
+        if name in installed and f"WHEN {condition}\n" not in installed[name]:
+            await db.execute(f"DROP TRIGGER {name}")  # условие изменилось — пересоздаём
+        await db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON vacancies
+            WHEN {condition}
+            BEGIN
+                INSERT INTO vacancy_events (topic, vacancy_id, hash, value, created_at)
+                VALUES ({topic}, NEW.id, NEW.hash, {value}, {_NOW});
+            END
+        """)
+    if retention_days:
+        await db.execute(f"DELETE FROM vacancy_events WHERE created_at < {_NOW} - ?", (retention_days * 86400,))
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    id: int
+    topic: str
+    vacancy_id: Optional[int]
+    hash: Optional[str]
+    value: Optional[str]  # новый status / response / manual_label — по теме
+    created_at: float
+
+
+class Subscription:
+    """Очередь событий одного подписчика (topics=None — все темы)."""
+
+    def __init__(self, feed: "ChangeFeed", topics: Optional[Set[str]], consumer: Optional[str], position: int):
+        self.feed = feed
+        self.topics = topics
+        self.consumer = consumer
+        self.position = position  # id последнего события, доставленного в очередь
+        self.closed = False
+        self._queue: "asyncio.Queue[ChangeEvent]" = asyncio.Queue()
+
+    def _deliver(self, event: ChangeEvent):
+        if event.id <= self.position:
+            return
+        self.position = event.id
+        if self.topics is None or event.topic in self.topics:
+            self._queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[ChangeEvent]:
+        """Следующее событие; None, если за timeout секунд ничего не пришло."""
+        if timeout is None:
+            return await self._queue.get()
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self) -> List[ChangeEvent]:
+        """Уже пришедшие события без ожидания (чтобы обработать пачку одним проходом)."""
+        events = []
+        while not self._queue.empty():
+            events.append(self._queue.get_nowait())
+        return events
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ChangeEvent:
+        if self.closed:
+            raise StopAsyncIteration
+        return await self._queue.get()
+
+    async def ack(self, event: ChangeEvent):
+        """Фиксирует позицию durable-подписчика: после рестарта доставка продолжится с event.id."""
+        if self.consumer is not None:
+            await self.feed._save_offset(self.consumer, event.id)
+
+    def close(self):
+        self.closed = True
+        self.feed._unsubscribe(self)
+
+
+class ChangeFeed:
+    """Хвост outbox одного файла БД и раздача событий подписчикам процесса."""
+
+    def __init__(self, db_path: str, poll_interval: float = 0.2, batch_size: int = 500):
+        self.db_path = str(db_path)
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._subs: List[Subscription] = []
+        self._last_id = 0  # id последнего события, прочитанного из outbox
+        self._data_version: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {"polls": 0, "reads": 0, "events": 0}
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._task = None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        if self._conn is None:
+            conn = aiosqlite.connect(self.db_path)
+            getattr(conn, "_thread", conn).daemon = True
+            await conn
+            await conn.execute("PRAGMA busy_timeout=5000")
+            await _create_tables(conn)
+            await conn.commit()
+            self._conn = conn
+        return self._conn
+
+    # ---------- подписка ----------
+
+    async def subscribe(self, topics: Optional[Iterable[str]] = None, consumer: Optional[str] = None) -> Subscription:
+        """
+        Новая подписка. Без consumer — события с текущего момента; с consumer —
+        с сохранённой позиции (новый consumer начинает с текущего момента).
+        """
+        self._bind_loop()
+        conn = await self._connect()
+        async with self._lock:
+            if not self._subs:
+                self._last_id = await self._head(conn)
+                self._data_version = await self._read_data_version(conn)
+            start = self._last_id
+            if consumer is not None:
+                stored = await self._load_offset(conn, consumer)
+                if stored is None:
+                    await self._save_offset(consumer, start)
+                else:
+                    start = stored
+            sub = Subscription(self, set(topics) if topics is not None else None, consumer, start)
+            # Догоняем durable-подписчика по уже прочитанной части outbox
+            if start < self._last_id:
+                for event in await self._read_events(conn, start, self._last_id):
+                    sub._deliver(event)
+            sub.position = max(sub.position, self._last_id)
+            self._subs.append(sub)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return sub
+
+    def _unsubscribe(self, sub: Subscription):
+        if sub in self._subs:
+            self._subs.remove(sub)
+
+    def notify(self):
+        """Сигнал «в outbox могли появиться события» от записи в этом процессе."""
+        if self._wake is not None and self._loop is not None:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is self._loop:
+                self._wake.set()
+            else:
+                self._loop.call_soon_threadsafe(self._wake.set)
+
+    # ---------- хвост outbox ----------
+
+    async def _run(self):
+        while self._subs:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                woken = True
+            except asyncio.TimeoutError:
+                woken = False
+            self._wake.clear()
+            try:
+                conn = await self._connect()
+                # Версию читаем до outbox: коммит после неё снова поменяет data_version
+                version = await self._read_data_version(conn)
+                if not woken:
+                    self.stats["polls"] += 1
+                    if version == self._data_version:
+                        continue
+                self._data_version = version
+                await self._dispatch_new(conn)
+            except Exception as e:
+                logger.error("change_feed_failed", db=self.db_path, error=str(e))
+                await asyncio.sleep(self.poll_interval)
+
+    async def _dispatch_new(self, conn: aiosqlite.Connection):
+        async with self._lock:
+            while True:
+                self.stats["reads"] += 1
+                events = await self._read_events(conn, self._last_id, None)
+                for event in events:
+                    for sub in list(self._subs):
+                        sub._deliver(event)
+                    self._last_id = event.id
+                self.stats["events"] += len(events)
+                if len(events) < self.batch_size:
+                    break
+
+    async def _read_events(self, conn: aiosqlite.Connection, after_id: int,
+                           up_to: Optional[int]) -> List[ChangeEvent]:
+        query = "SELECT id, topic, vacancy_id, hash, value, created_at FROM vacancy_events WHERE id > ?"
+        params = [after_id]
+        if up_to is not None:
+            query += " AND id <= ?"
+            params.append(up_to)
+        query += " ORDER BY id LIMIT ?"
+        params.append(self.batch_size if up_to is None else -1)
+        async with conn.execute(query, params) as cursor:
+            return [ChangeEvent(*row) for row in await cursor.fetchall()]
+
+    @staticmethod
+    async def _head(conn: aiosqlite.Connection) -> int:
+        async with conn.execute("SELECT COALESCE(MAX(id), 0) FROM vacancy_events") as cursor:
+            return (await cursor.fetchone())[0]
+
+    @staticmethod
+    async def _read_data_version(conn: aiosqlite.Connection) -> int:
+        async with conn.execute("PRAGMA data_version") as cursor:
+            return (await cursor.fetchone())[0]
+
+    # ---------- позиции durable-подписчиков ----------
+
+    @staticmethod
+    async def _load_offset(conn: aiosqlite.Connection, consumer: str) -> Optional[int]:
+        async with conn.execute("SELECT last_id FROM vacancy_event_offsets WHERE consumer = ?", (consumer,)) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def _save_offset(self, consumer: str, last_id: int):
+        conn = await self._connect()
+        await conn.execute("""
+            INSERT INTO vacancy_event_offsets (consumer, last_id) VALUES (?, ?)
+            ON CONFLICT(consumer) DO UPDATE SET last_id = MAX(last_id, excluded.last_id)
+        """, (consumer, last_id))
+        await conn.commit()
+
+    async def close(self):
+        for sub in list(self._subs):
+            sub.close()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+
+_feeds: Dict[str, ChangeFeed] = {}
+
+
+def get_change_feed(db_path: str, **kwargs) -> ChangeFeed:
+    """Общий feed на файл БД для всего процесса (kwargs учитываются при первом вызове)."""
+    key = str(db_path)
+    feed = _feeds.get(key)
+    if feed is None:
+        feed = ChangeFeed(key, **kwargs)
+        _feeds[key] = feed
+    return feed
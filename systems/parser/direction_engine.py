@@ -0,0 +1,202 @@
+"""
+Скомпилированный детектор ниши (detect_direction).
+
+Наборы ключевиков ниш, паттернов отрицания и сигналов запроса компилируются
+один раз, дальше текст обрабатывается за один проход каждого вида:
+
+- все ключевики всех ниш и все сигналы запроса — один автомат Aho-Corasick
+  (pyahocorasick; без него — str.find по уникальным строкам), который выдаёт
+  позиции всех вхождений, включая перекрывающиеся;
+- паттерны отрицания вида «<префикс>{kw}» — одна альтернация префиксов под
+  lookahead: множество позиций, с которых ключевик стоит в отрицании;
+  паттерны «{kw}<суффикс>» — аналогично, множество позиций конца ключевика.
+
+Дальше всё — арифметика интервалов: ключевик отрицается, если какое-то его
+вхождение начинается в позиции конца префикса (или кончается перед суффиксом);
+сигнал запроса «рядом», если хотя бы одно его вхождение целиком лежит в окне
+±window символов вокруг первого вхождения ключевика. Результат — тот же, что у
+поштучной проверки _score_keyword (сверка — tests/unit/test_direction_engine.py,
+скорость — scripts/benchmarks/bench_direction_detector.py).
+
+Альтернативы префиксов в одной позиции текста должны быть взаимоисключающими
+(lookahead берёт первую сработавшую) — для _NEGATION_PATTERNS это так: они
+расходятся на первом же слове. Паттерн с {kw} в середине проверяется
+поштучно регэкспом, как раньше.
+"""
+
+import re
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from systems.parser.rule_matcher import PYAHOCORASICK_AVAILABLE
+
+if PYAHOCORASICK_AVAILABLE:
+    import ahocorasick
+
+_KEYWORD, _SIGNAL = 0, 1
+
+NEGATED_SCORE = -10.0
+REQUEST_SCORE = 2.5
+NEUTRAL_SCORE = 1.0
+
+
+class DirectionEngine:
+    """
+    detect(text_lower) -> ниша с максимальным счётом или "Unknown".
+    Результаты мемоизируются по тексту (LRU на memo_size записей): один и тот
+    же текст определяется при сканировании и ещё раз в LeadFilterAdvanced.analyze.
+    """
+
+    def __init__(
+        self,
+        keywords: Dict[str, Sequence[str]],
+        negation_patterns: Sequence[str],
+        request_signals: Sequence[str],
+        window: int = 80,
+        memo_size: int = 4096,
+    ):
+        self.window = window
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, str]" = OrderedDict()
+
+        self.directions: List[str] = list(keywords)
+        self.keywords: List[str] = []
+        # уникальный ключевик -> [(индекс ниши, сколько раз он в её списке)]
+        self.owners: List[List[Tuple[int, int]]] = []
+        kw_index: Dict[str, int] = {}
+        for d_idx, direction in enumerate(self.directions):
+            counts: Dict[str, int] = {}
+            for kw in keywords[direction]:
+                counts[kw] = counts.get(kw, 0) + 1
+            for kw, count in counts.items():
+                if kw not in kw_index:
+                    kw_index[kw] = len(self.keywords)
+                    self.keywords.append(kw)
+                    self.owners.append([])
+                self.owners[kw_index[kw]].append((d_idx, count))
+        self.signals: List[str] = list(dict.fromkeys(request_signals))
+
+        prefixes, suffixes, self._other_negations = [], [], []
+        for pattern in negation_patterns:
+            before, _, after = pattern.partition("{kw}")
+            if not after:
+                prefixes.append(before)
+            elif not before:
+                suffixes.append(after)
+            else:
+                self._other_negations.append(pattern)
+        self._prefix_re = re.compile(f"(?=({'|'.join(f'(?:{p})' for p in prefixes)}))") if prefixes else None
+        self._suffix_re = re.compile(f"(?={'|'.join(f'(?:{s})' for s in suffixes)})") if suffixes else None
+
+        self._automaton = None
+        if PYAHOCORASICK_AVAILABLE:
+            automaton = ahocorasick.Automaton()
+            entries: Dict[str, List[Tuple[int, int]]] = {}
+            for idx, kw in enumerate(self.keywords):
+                if kw:
+                    entries.setdefault(kw, []).append((_KEYWORD, idx))
+            for idx, sig in enumerate(self.signals):
+                if sig:
+                    entries.setdefault(sig, []).append((_SIGNAL, idx))
+            for word, ids in entries.items():
+                automaton.add_word(word, (len(word), tuple(ids)))
+            automaton.make_automaton()
+            self._automaton = automaton
+
+    # ---------- один проход ----------
+
+    def _occurrences(self, text: str) -> Tuple[Dict[int, List[int]], List[Tuple[int, int]]]:
+        """({id ключевика: начала вхождений по возрастанию}, [(начало, конец) сигналов])."""
+        keyword_starts: Dict[int, List[int]] = {}
+        signal_spans: List[Tuple[int, int]] = []
+        if self._automaton is not None:
+            for end, (length, ids) in self._automaton.iter(text):
+                start = end + 1 - length
+                for kind, idx in ids:
+                    if kind == _KEYWORD:
+                        keyword_starts.setdefault(idx, []).append(start)
+                    else:
+                        signal_spans.append((start, end + 1))
+            return keyword_starts, signal_spans
+
+        for kinds, words in ((_KEYWORD, self.keywords), (_SIGNAL, self.signals)):
+            for idx, word in enumerate(words):
+                pos = text.find(word) if word else -1
+                while pos != -1:
+                    if kinds == _KEYWORD:
+                        keyword_starts.setdefault(idx, []).append(pos)
+                    else:
+                        signal_spans.append((pos, pos + len(word)))
+                    pos = text.find(word, pos + 1)
+        return keyword_starts, signal_spans
+
+    def score_keywords(self, text: str) -> Dict[str, float]:
+        """Вес каждого найденного ключевика (как _score_keyword)."""
+        keyword_starts, signal_spans = self._occurrences(text)
+        return {self.keywords[idx]: score for idx, score in self._scores(text, keyword_starts, signal_spans).items()}
+
+    def _scores(self, text: str, keyword_starts, signal_spans) -> Dict[int, float]:
+        if not keyword_starts:
+            return {}
+        negated_starts = {m.end(1) for m in self._prefix_re.finditer(text)} if self._prefix_re else set()
+        negated_ends = {m.start() for m in self._suffix_re.finditer(text)} if self._suffix_re else set()
+
+        # Сигналы по началу + суффиксный минимум концов: есть ли сигнал целиком в [lo, hi]
+        signal_spans.sort()
+        sig_starts = [s for s, _ in signal_spans]
+        min_end: List[float] = [float("inf")] * (len(signal_spans) + 1)
+        for i in range(len(signal_spans) - 1, -1, -1):
+            min_end[i] = min(signal_spans[i][1], min_end[i + 1])
+
+        scores: Dict[int, float] = {}
+        for idx, starts in keyword_starts.items():
+            kw = self.keywords[idx]
+            starts.sort()
+            if self._is_negated(text, kw, starts, negated_starts, negated_ends):
+                scores[idx] = NEGATED_SCORE
+                continue
+            first = starts[0]
+            lo, hi = max(0, first - self.window), first + len(kw) + self.window
+            near = min_end[bisect_left(sig_starts, lo)] <= hi
+            scores[idx] = REQUEST_SCORE if near else NEUTRAL_SCORE
+        return scores
+
+    def _is_negated(self, text: str, kw: str, starts: List[int], negated_starts, negated_ends) -> bool:
+        for start in starts:
+            if start in negated_starts or start + len(kw) in negated_ends:
+                return True
+        if self._other_negations:
+            escaped = re.escape(kw)
+            return any(re.search(p.format(kw=escaped), text) for p in self._other_negations)
+        return False
+
+    # ---------- ниша ----------
+
+    def _detect(self, text_lower: str) -> str:
+        keyword_starts, signal_spans = self._occurrences(text_lower)
+        totals = [0.0] * len(self.directions)
+        for idx, score in self._scores(text_lower, keyword_starts, signal_spans).items():
+            for d_idx, count in self.owners[idx]:
+                totals[d_idx] += score * count
+        best: Optional[int] = None
+        for d_idx, total in enumerate(totals):
+            # Как max() по словарю: при равенстве побеждает ниша, объявленная раньше
+            if total > 0 and (best is None or total > totals[best]):
+                best = d_idx
+        return self.directions[best] if best is not None else "Unknown"
+
+    def detect(self, text_lower: str) -> str:
+        memo = self._memo
+        cached = memo.get(text_lower)
+        if cached is not None:
+            memo.move_to_end(text_lower)
+            return cached
+        direction = self._detect(text_lower)
+        memo[text_lower] = direction
+        if len(memo) > self.memo_size:
+            memo.popitem(last=False)
+        return direction
+
+    def clear_memo(self):
+        self._memo.clear()
@@ -1,19 +1,26 @@
 """
 Semantic Duplicate Detection через sentence embeddings.
 Hybrid approach: semantic similarity + exact match fallback.
+
+Эмбеддинги принятых лидов за окно держатся в in-process векторном индексе
+(systems/parser/vector_index.py): строится один раз из колонки embedding,
+догружается инкрементально на add_accepted и отвечает на top-k запрос одним
+матрично-векторным произведением.
 """
 
 from difflib import SequenceMatcher
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import pickle
 import asyncio
 import threading
+import time
 from typing import Tuple, Optional, List
 from datetime import datetime, timedelta
 
+from core.ai_engine.model_registry import model_registry
+from core.config.settings import settings
 from core.utils.structured_logger import get_logger
+from systems.parser.vector_index import create_embedding_index
 
 logger = get_logger(__name__)
 
@@ -55,28 +62,61 @@ class DuplicateDetector:
         self.exact_threshold = 0.85      # SequenceMatcher для exact match
         self.semantic_low_bound = 0.60   # Ниже этого → fallback на exact match
         
-        # Sentence encoder для semantic similarity
-        try:
-            self.encoder = SentenceTransformer("cointegrated/rubert-tiny")
-            self.semantic_enabled = True
-            logger.info(
-                "semantic_dedup_initialized",
-                model="cointegrated/rubert-tiny",
-                semantic_threshold=self.semantic_threshold,
-                exact_threshold=self.exact_threshold
-            )
-        except Exception as e:
-            logger.error("encoder_load_failed", error=str(e))
-            self.encoder = None
-            self.semantic_enabled = False
+        # Sentence encoder для semantic similarity: общий с BERT-классификатором,
+        # грузится из model_registry при первом encode
+        self.encoder_name = settings.ENCODER_MODEL
+        self._encoder = None
+        self.semantic_enabled = True
+        logger.info(
+            "semantic_dedup_initialized",
+            model=self.encoder_name,
+            semantic_threshold=self.semantic_threshold,
+            exact_threshold=self.exact_threshold
+        )
         
         # LRU Cache для embeddings (OrderedDict для эффективного LRU)
         from collections import OrderedDict
         self.embeddings_cache = OrderedDict()
         self.cache_max_size = 1000
         
+        # Векторный индекс окна: строится лениво при первом is_duplicate
+        self.index = None
+        if self.semantic_enabled:
+            dim = model_registry.embedding_dim(self.encoder_name)
+            self.index = create_embedding_index(settings.DEDUP_INDEX_BACKEND, dim=dim)
+        self.index_top_k = 5
+        self.index_refresh_seconds = 30  # догрузка строк, записанных другими процессами
+        self._index_ready = False
+        self._index_max_id = 0
+        self._index_synced_at = 0.0
+        self._index_lock = asyncio.Lock()
+        self._unsaved_embeddings: List[Tuple[int, bytes]] = []  # пишутся пачкой в _sync_index
+        
+        if self.index is not None:
+            from systems.parser.vacancy_db import VacancyDatabase
+            VacancyDatabase.register_insert_hook(self._on_lead_inserted)
+        
         self._initialized = True
     
+    @property
+    def encoder(self):
+        """SentenceTransformer из model_registry (None, если загрузить не удалось)."""
+        if self._encoder is None and self.semantic_enabled:
+            try:
+                self._encoder = model_registry.sentence_encoder(self.encoder_name)
+            except Exception as e:
+                logger.error("encoder_load_failed", error=str(e))
+                self.semantic_enabled = False
+        return self._encoder
+
+    def cached_embedding(self, text: str) -> Optional[np.ndarray]:
+        """Embedding из LRU-кэша encode_text без кодирования (None при промахе)."""
+        text_key = text.lower().strip()[:500]
+        embedding = self.embeddings_cache.get(text_key)
+        if embedding is not None:
+            self.embeddings_cache.move_to_end(text_key)
+        return embedding
+    
     def encode_text(self, text: str) -> Optional[np.ndarray]:
         """
         Получить sentence embedding для текста.
@@ -88,7 +128,7 @@ class DuplicateDetector:
         Returns:
             numpy array embedding или None при ошибке
         """
-        if not self.semantic_enabled:
+        if not self.semantic_enabled or self.encoder is None:
             return None
         
         # Нормализация текста для cache key
@@ -176,12 +216,10 @@ class DuplicateDetector:
             return 0.0
         
         # Cosine similarity
-        similarity = cosine_similarity(
-            [embedding1],
-            [embedding2]
-        )[0][0]
-        
-        return float(similarity)
+        norm = np.linalg.norm(embedding1) * np.linalg.norm(embedding2)
+        if norm == 0:
+            return 0.0
+        return float(np.dot(embedding1, embedding2) / norm)
     
     def calculate_exact_similarity(self, text1: str, text2: str) -> float:
         """
@@ -199,6 +237,82 @@ class DuplicateDetector:
         
         return SequenceMatcher(None, text1_lower, text2_lower).ratio()
     
+    def _window_cutoff(self) -> datetime:
+        return datetime.now() - timedelta(hours=self.time_window_hours)
+
+    async def _index_rows(self, leads: List) -> int:
+        """Кладёт строки БД в индекс; недостающие embeddings считает батчем и сохраняет."""
+        missing = [lead for lead in leads if not lead.embedding and lead.id not in self.index]
+        computed = {}
+        if missing:
+            texts = [lead.text for lead in missing]
+            try:
+                vectors = await asyncio.to_thread(self.encoder.encode, texts, batch_size=32)
+                computed = {lead.id: vec for lead, vec in zip(missing, vectors)}
+                await self.db.update_lead_embeddings_batch(
+                    [(lead_id, self.serialize_embedding(vec)) for lead_id, vec in computed.items()]
+                )
+            except Exception as e:
+                logger.error("index_backfill_failed", error=str(e)[:200])
+
+        added = 0
+        for lead in leads:
+            embedding = computed.get(lead.id)
+            if embedding is None:
+                embedding = self.deserialize_embedding(lead.embedding)
+            if embedding is not None and self.index.add(lead.id, embedding, lead.timestamp, lead.message_id):
+                added += 1
+            self._index_max_id = max(self._index_max_id, lead.id)
+        return added
+
+    async def _sync_index(self):
+        """
+        Первый вызов строит индекс по всему окну, дальше раз в index_refresh_seconds
+        догружает только строки с id > последнего проиндексированного.
+        """
+        now = time.monotonic()
+        if self._index_ready and now - self._index_synced_at < self.index_refresh_seconds:
+            return
+
+        async with self._index_lock:
+            if self._index_ready and time.monotonic() - self._index_synced_at < self.index_refresh_seconds:
+                return
+            if self._unsaved_embeddings:
+                unsaved, self._unsaved_embeddings = self._unsaved_embeddings, []
+                try:
+                    await self.db.update_lead_embeddings_batch(unsaved)
+                except Exception as e:
+                    logger.error("embedding_save_failed", rows=len(unsaved), error=str(e)[:200])
+            cutoff = self._window_cutoff()
+            rows = await self.db.get_embeddings_since(cutoff, after_id=self._index_max_id)
+            added = await self._index_rows(rows)
+            evicted = self.index.evict_older_than(cutoff.timestamp())
+
+            if not self._index_ready:
+                logger.info("dedup_index_built", size=len(self.index), rows=len(rows))
+            elif added or evicted:
+                logger.debug("dedup_index_synced", added=added, evicted=evicted, size=len(self.index))
+            self._index_ready = True
+            self._index_synced_at = time.monotonic()
+
+    async def _on_lead_inserted(self, lead):
+        """
+        Хук VacancyDatabase: принятая вакансия из окна сразу попадает в индекс с
+        embedding, уже посчитанным is_duplicate для этого текста. Без кодирования
+        на event loop: промахи кэша досчитает батчем следующий _sync_index, он же
+        одной транзакцией сохранит embeddings в БД.
+        """
+        if not self._index_ready or lead.id is None or lead.status != 'accepted' or lead.id in self.index:
+            return
+        timestamp = lead.timestamp or time.time()
+        if timestamp < self._window_cutoff().timestamp():
+            return  # догрузка истории — вне окна дедупликации
+        embedding = self.cached_embedding(lead.text)
+        if embedding is None:
+            return
+        self.index.add(lead.id, embedding, timestamp, lead.message_id)
+        self._unsaved_embeddings.append((lead.id, self.serialize_embedding(embedding)))
+
     async def is_duplicate(
         self,
         text: str,
@@ -209,8 +323,8 @@ class DuplicateDetector:
         Проверка является ли текст дубликатом существующих лидов.
         
         Hybrid approach:
-        1. Semantic similarity (primary) - для перефразировок
-        2. Exact match (fallback) - для копипаста
+        1. Semantic similarity (primary) - top-k по векторному индексу окна
+        2. Exact match (fallback) - для копипаста среди кандидатов с низкой близостью
         
         Args:
             text: текст лида для проверки
@@ -224,103 +338,103 @@ class DuplicateDetector:
             logger.warning("duplicate_check_skipped", reason="no_db_manager")
             return False, 0.0, "no_db"
         
-        # Получить recent leads (48 часов)
-        cutoff_time = datetime.now() - timedelta(hours=self.time_window_hours)
+        new_embedding = self.encode_text(text)
+        if new_embedding is None:
+            return await self._is_duplicate_linear(text, message_id, source_channel)
         
         try:
-            recent_leads = await self.db.get_leads_since(
-                cutoff_time,
-                limit=500
-            )
+            await self._sync_index()
         except Exception as e:
             logger.error("db_query_failed", error=str(e)[:200])
             return False, 0.0, "db_error"
         
-        if not recent_leads:
+        if len(self.index) == 0:
             return False, 0.0, "no_recent_leads"
         
-        # Кодировать новый текст
-        new_embedding = self.encode_text(text)
+        hits = self.index.query(
+            new_embedding,
+            k=self.index_top_k,
+            min_timestamp=self._window_cutoff().timestamp(),
+            exclude_message_id=message_id
+        )
+        if not hits:
+            return False, 0.0, "no_recent_leads"
+        
+        best = hits[0]
+        if best.similarity > self.semantic_threshold:
+            logger.info(
+                "semantic_duplicate_found",
+                new_message_id=message_id,
+                duplicate_message_id=best.message_id,
+                similarity=best.similarity,
+                source=source_channel
+            )
+            return True, best.similarity, "semantic"
         
-        # Проверка каждого recent lead
-        max_semantic_sim = 0.0
+        # Стратегия 2: Exact match (fallback) — только если даже ближайший сосед далеко
         max_exact_sim = 0.0
-        duplicate_found = False
-        matching_lead_id = None
         method = "none"
-        
-        for lead in recent_leads:
-            # Пропустить самого себя
-            if lead.message_id == message_id:
-                continue
-            
-            # Стратегия 1: Semantic similarity
-            if self.semantic_enabled and new_embedding is not None:
-                # Получить embedding из БД или вычислить
-                lead_embedding = None
-                
-                if hasattr(lead, 'embedding') and lead.embedding:
-                    lead_embedding = self.deserialize_embedding(lead.embedding)
-                
-                if lead_embedding is None:
-                    lead_embedding = self.encode_text(lead.text)
-                
-                if lead_embedding is not None:
-                    semantic_sim = self.calculate_semantic_similarity(
-                        text, lead.text,
-                        embedding1=new_embedding,
-                        embedding2=lead_embedding
-                    )
-                    
-                    max_semantic_sim = max(max_semantic_sim, semantic_sim)
-                    
-                    # Проверка threshold
-                    if semantic_sim > self.semantic_threshold:
-                        duplicate_found = True
-                        matching_lead_id = lead.id
-                        method = "semantic"
-                        
-                        logger.info(
-                            "semantic_duplicate_found",
-                            new_message_id=message_id,
-                            duplicate_message_id=lead.message_id,
-                            similarity=semantic_sim,
-                            source=source_channel
-                        )
-                        
-                        return True, semantic_sim, method
-            
-            # Стратегия 2: Exact match (fallback)
-            # Применяется если semantic similarity низкая или unavailable
-            if not self.semantic_enabled or max_semantic_sim < self.semantic_low_bound:
-                exact_sim = self.calculate_exact_similarity(text, lead.text)
+        if best.similarity < self.semantic_low_bound:
+            texts = await self.db.get_texts_by_ids([hit.lead_id for hit in hits])
+            for hit in hits:
+                lead_text = texts.get(hit.lead_id)
+                if not lead_text:
+                    continue
+                exact_sim = self.calculate_exact_similarity(text, lead_text)
                 max_exact_sim = max(max_exact_sim, exact_sim)
-                
                 if exact_sim > self.exact_threshold:
-                    duplicate_found = True
-                    matching_lead_id = lead.id
-                    method = "exact_match"
-                    
                     logger.info(
                         "exact_duplicate_found",
                         new_message_id=message_id,
-                        duplicate_message_id=lead.message_id,
+                        duplicate_message_id=hit.message_id,
                         similarity=exact_sim,
                         source=source_channel
                     )
-                    
-                    return True, exact_sim, method
+                    return True, exact_sim, "exact_match"
         
-        # Дубликат не найден
         logger.debug(
             "duplicate_check_passed",
             message_id=message_id,
-            max_semantic_sim=max_semantic_sim,
+            max_semantic_sim=best.similarity,
             max_exact_sim=max_exact_sim,
-            recent_leads_count=len(recent_leads)
+            index_size=len(self.index)
         )
         
-        return False, max(max_semantic_sim, max_exact_sim), method
+        return False, max(best.similarity, max_exact_sim), method
+
+    async def _is_duplicate_linear(
+        self,
+        text: str,
+        message_id: int,
+        source_channel: Optional[str] = None
+    ) -> Tuple[bool, float, str]:
+        """Exact-match проход по окну, когда encoder недоступен."""
+        try:
+            recent_leads = await self.db.get_leads_since(self._window_cutoff(), limit=500)
+        except Exception as e:
+            logger.error("db_query_failed", error=str(e)[:200])
+            return False, 0.0, "db_error"
+        
+        if not recent_leads:
+            return False, 0.0, "no_recent_leads"
+        
+        max_exact_sim = 0.0
+        for lead in recent_leads:
+            if lead.message_id == message_id:
+                continue
+            exact_sim = self.calculate_exact_similarity(text, lead.text)
+            max_exact_sim = max(max_exact_sim, exact_sim)
+            if exact_sim > self.exact_threshold:
+                logger.info(
+                    "exact_duplicate_found",
+                    new_message_id=message_id,
+                    duplicate_message_id=lead.message_id,
+                    similarity=exact_sim,
+                    source=source_channel
+                )
+                return True, exact_sim, "exact_match"
+        
+        return False, max_exact_sim, "none"
     
     def get_statistics(self) -> dict:
         """
@@ -329,6 +443,7 @@ class DuplicateDetector:
         Returns:
             {
                 "semantic_enabled": bool,
+                "index_size": int,
                 "cache_size": int,
                 "time_window_hours": int,
                 "semantic_threshold": float,
@@ -337,6 +452,7 @@ class DuplicateDetector:
         """
         return {
             "semantic_enabled": self.semantic_enabled,
+            "index_size": len(self.index) if self.index is not None else 0,
             "cache_size": len(self.embeddings_cache),
             "cache_max_size": self.cache_max_size,
             "time_window_hours": self.time_window_hours,
@@ -360,7 +476,7 @@ class DuplicateDetector:
         Returns:
             количество обработанных leads
         """
-        if not self.semantic_enabled:
+        if not self.semantic_enabled or self.encoder is None:
             logger.warning("precompute_skipped", reason="semantic_disabled")
             return 0
         
@@ -0,0 +1,278 @@
+"""
+Декларативный каскад стадий фильтра лидов с планировщиком порядка.
+
+Стадии двух видов:
+
+- gate (вето) — может только отклонить сообщение (дедуп, жёсткие блоки,
+  чёрный список источников). Вето коммутативны: сообщение — лид, только если
+  его не отклонило ни одно из них, поэтому порядок вето и их место среди
+  решающих стадий не меняют итоговое is_lead.
+- decision — решающие стадии в фиксированном порядке (эвристика → BERT → LLM).
+  Стадия либо выносит окончательный вердикт, либо предварительный (следующая
+  может уточнить), либо пропускает сообщение дальше.
+
+Планировщик по замеренной стоимости (EWMA, мс) и доле отклонений каждой стадии
+выбирает, перед какой решающей стадией запускать каждое вето (или только перед
+принятием лида), а внутри одного места сортирует вето по стоимости на одно
+отклонение. Если решающая стадия отклонила сообщение, оставшиеся вето не
+запускаются; если приняла — запускаются все оставшиеся.
+
+Причина отказа при нескольких сработавших фильтрах зависит от плана (первым
+отвечает тот, что запущен раньше); множество принятых/отклонённых сообщений —
+нет. Проверка — tests/unit/test_filter_cascade.py (replay против исходного
+порядка).
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+GATE = "gate"
+DECISION = "decision"
+
+
+@dataclass
+class Verdict:
+    """Решение стадии. final=False — предварительное, следующая решающая стадия может его заменить."""
+
+    is_lead: bool
+    confidence: float
+    reason: str
+    stage: str
+    final: bool = True
+
+
+@dataclass
+class CascadeStage:
+    """
+    Описание стадии: run(ctx) -> Verdict | None. Для gate None означает «пропустить»,
+    для decision — «не решила, дальше». enabled(ctx) — применима ли стадия к сообщению.
+    prior_* — априорные оценки, пока замеров мало (весят как prior_weight наблюдений).
+    """
+
+    name: str
+    kind: str
+    run: Callable[[Any], Awaitable[Optional[Verdict]]]
+    prior_cost_ms: float
+    prior_reject_rate: float = 0.0
+    prior_resolve_rate: float = 1.0
+    prior_accept_rate: float = 0.5
+    enabled: Optional[Callable[[Any], bool]] = None
+
+
+class StageStats:
+    """Счётчики стадии: запуски, отклонения/принятия, пропуски, ошибки, стоимость (EWMA)."""
+
+    def __init__(self, stage: CascadeStage, prior_weight: float = 20.0, alpha: float = 0.1):
+        self.stage = stage
+        self.prior_weight = prior_weight
+        self.alpha = alpha
+        self.runs = 0
+        self.rejected = 0
+        self.accepted = 0
+        self.resolved = 0
+        self.skipped = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.cost_ms = stage.prior_cost_ms
+
+    def observe(self, elapsed_ms: float, verdict: Optional[Verdict]):
+        self.runs += 1
+        self.total_ms += elapsed_ms
+        self.cost_ms += self.alpha * (elapsed_ms - self.cost_ms)
+        if verdict is None:
+            return
+        if verdict.final:
+            self.resolved += 1
+        if verdict.is_lead:
+            self.accepted += 1
+        else:
+            self.rejected += 1
+
+    def _smoothed(self, count: int, prior: float, runs: Optional[int] = None) -> float:
+        runs = self.runs if runs is None else runs
+        return (count + prior * self.prior_weight) / (runs + self.prior_weight)
+
+    @property
+    def reject_rate(self) -> float:
+        return self._smoothed(self.rejected, self.stage.prior_reject_rate)
+
+    @property
+    def resolve_rate(self) -> float:
+        return self._smoothed(self.resolved, self.stage.prior_resolve_rate)
+
+    @property
+    def accept_rate(self) -> float:
+        """Доля принятий среди окончательных вердиктов стадии."""
+        return self._smoothed(self.accepted, self.stage.prior_accept_rate, self.resolved)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "kind": self.stage.kind,
+            "runs": self.runs,
+            "rejected": self.rejected,
+            "accepted": self.accepted,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "cost_ms": round(self.cost_ms, 3),
+            "total_ms": round(self.total_ms, 1),
+            "reject_rate": round(self.reject_rate, 4),
+        }
+
+
+class FilterCascade:
+    """
+    Исполнитель каскада. План — список из len(decisions)+1 мест: plan[i] — вето,
+    запускаемые перед decisions[i], plan[-1] — только перед принятием лида.
+    """
+
+    def __init__(
+        self,
+        gates: Sequence[CascadeStage],
+        decisions: Sequence[CascadeStage],
+        fallback: Callable[[Any], Verdict],
+        replan_every: int = 100,
+    ):
+        self.gates = list(gates)
+        self.decisions = list(decisions)
+        self.fallback = fallback
+        self.replan_every = replan_every
+        self.stats: Dict[str, StageStats] = {s.name: StageStats(s) for s in self.gates + self.decisions}
+        self.messages = 0
+        self._plan: Optional[List[List[str]]] = None
+        self._planned_at = 0
+
+    # ---------- планирование ----------
+
+    def legacy_plan(self) -> List[List[str]]:
+        """Исходный фиксированный порядок: все вето до первой решающей стадии."""
+        return [[g.name for g in self.gates]] + [[] for _ in self.decisions]
+
+    def plan(self) -> List[List[str]]:
+        """Текущий план; пересчитывается раз в replan_every сообщений."""
+        if self._plan is None or self.messages - self._planned_at >= self.replan_every:
+            previous, self._plan = self._plan, self.compute_plan()
+            self._planned_at = self.messages
+            if previous is not None and previous != self._plan:
+                logger.info("filter_cascade_replanned", plan=self.describe_plan())
+        return self._plan
+
+    def compute_plan(self) -> List[List[str]]:
+        """
+        Для каждого вето — место с минимальной ожидаемой стоимостью обработки
+        сообщения (в предположении независимости стадий):
+
+            E(i) = c_g · P(дойти до i) + Σ_{j<i} c_j·P_j + (1 − r_g) · Σ_{j≥i} c_j·P_j
+
+        где P_j — вероятность дойти до решающей стадии j, r_g — доля отклонений
+        вето. Для места «перед принятием» P — доля принятых. Внутри места вето
+        идут по возрастанию c_g / r_g (стоимость на одно отклонение).
+        """
+        n = len(self.decisions)
+        reach = [1.0]
+        accept = 0.0
+        for stage in self.decisions:
+            s = self.stats[stage.name]
+            accept += reach[-1] * s.resolve_rate * s.accept_rate
+            reach.append(reach[-1] * (1.0 - s.resolve_rate))
+        weighted = [self.stats[d.name].cost_ms * reach[j] for j, d in enumerate(self.decisions)]
+        tail = [sum(weighted[i:]) for i in range(n)] + [0.0]
+        reach_slot = reach[:n] + [accept]
+
+        slots: List[List[str]] = [[] for _ in range(n + 1)]
+        for gate in self.gates:
+            s = self.stats[gate.name]
+            costs = [
+                s.cost_ms * reach_slot[i] + (tail[0] - tail[i]) + (1.0 - s.reject_rate) * tail[i]
+                for i in range(n + 1)
+            ]
+            slots[costs.index(min(costs))].append(gate.name)
+        for slot in slots:
+            slot.sort(key=lambda name: self.stats[name].cost_ms / max(self.stats[name].reject_rate, 1e-6))
+        return slots
+
+    def describe_plan(self, plan: Optional[List[List[str]]] = None) -> str:
+        plan = plan or self.plan()
+        parts = []
+        for i, slot in enumerate(plan):
+            parts.extend(slot)
+            parts.append(self.decisions[i].name if i < len(self.decisions) else "accept")
+        return " → ".join(parts)
+
+    # ---------- исполнение ----------
+
+    @staticmethod
+    def _enabled(stage: CascadeStage, ctx) -> bool:
+        return stage.enabled is None or stage.enabled(ctx)
+
+    async def _run_stage(self, stage: CascadeStage, ctx, executed: set) -> Optional[Verdict]:
+        stats = self.stats[stage.name]
+        executed.add(stage.name)
+        start = time.perf_counter()
+        try:
+            verdict = await stage.run(ctx)
+        except Exception:
+            stats.errors += 1
+            raise
+        stats.observe((time.perf_counter() - start) * 1000, verdict)
+        return verdict
+
+    async def run(self, ctx, plan: Optional[List[List[str]]] = None) -> Verdict:
+        """Прогоняет сообщение через каскад; plan=None — план планировщика."""
+        plan = plan or self.plan()
+        gates = {g.name: g for g in self.gates}
+        executed: set = set()
+        self.messages += 1
+        try:
+            return await self._execute(ctx, plan, gates, executed)
+        finally:
+            for name, stats in self.stats.items():
+                if name not in executed:
+                    stats.skipped += 1
+
+    async def _execute(self, ctx, plan, gates, executed) -> Verdict:
+        pending: List[CascadeStage] = []
+        verdict: Optional[Verdict] = None
+        for i, decision in enumerate(self.decisions):
+            pending.extend(g for name in plan[i] if self._enabled(g := gates[name], ctx))
+            if not self._enabled(decision, ctx):
+                continue  # вето этого места переезжают к следующей применимой стадии
+            while pending:
+                rejection = await self._run_stage(pending.pop(0), ctx, executed)
+                if rejection is not None:
+                    return rejection
+            result = await self._run_stage(decision, ctx, executed)
+            if result is None:
+                continue
+            verdict = result
+            if result.final:
+                break
+
+        verdict = verdict or self.fallback(ctx)
+        if not verdict.is_lead:
+            return verdict
+        # Лид принимается только после всех вето, которые ещё не запускались
+        pending.extend(g for slot in plan for name in slot
+                       if (g := gates[name]) not in pending and name not in executed and self._enabled(g, ctx))
+        for gate in pending:
+            rejection = await self._run_stage(gate, ctx, executed)
+            if rejection is not None:
+                return rejection
+        return verdict
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "plan": self.describe_plan(),
+            "stages": {name: stats.snapshot() for name, stats in self.stats.items()},
+        }
+
+    def reset_stats(self):
+        self.stats = {s.name: StageStats(s) for s in self.gates + self.decisions}
+        self.messages = 0
+        self._plan = None
+        self._planned_at = 0
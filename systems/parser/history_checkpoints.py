@@ -0,0 +1,189 @@
+"""
+Чекпоинты исторического сканирования (history_parser) по чатам.
+
+Для каждого чата в history_raw_messages.db хранится непрерывный диапазон уже
+обработанных message_id [oldest_id, newest_id] и незавершённый проход «сверху»
+[pass_cursor, pass_top]. Повторный запуск дочитывает только то, чего ещё нет:
+
+1. head — новые сообщения выше newest_id (или вся история при первом запуске);
+   после сбоя продолжается с pass_cursor, а не с начала;
+2. backfill — сообщения старше oldest_id до stop_date, если история не дочитана.
+
+Страницы запрашиваются явно через offset_id (GetHistory отдаёт id < offset_id),
+чекпоинт сохраняется после каждой обработанной страницы.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+import aiosqlite
+
+from core.database.sqlite_pool import get_pool
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+PAGE_SIZE = 100
+
+
+async def _init_schema(db: aiosqlite.Connection):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS chat_checkpoints (
+            chat_id INTEGER PRIMARY KEY,
+            chat_name TEXT,
+            newest_id INTEGER,
+            oldest_id INTEGER,
+            backfill_done INTEGER DEFAULT 0,
+            pass_top INTEGER,
+            pass_cursor INTEGER,
+            messages_seen INTEGER DEFAULT 0,
+            updated_at TEXT
+        )
+    """)
+
+
+@dataclass
+class ChatCheckpoint:
+    chat_id: int
+    chat_name: str = ""
+    newest_id: Optional[int] = None
+    oldest_id: Optional[int] = None
+    backfill_done: bool = False
+    pass_top: Optional[int] = None
+    pass_cursor: Optional[int] = None
+    messages_seen: int = 0
+
+
+class ChatCheckpointStore:
+    """Таблица chat_checkpoints через общий пул соединений."""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self.pool = get_pool(self.db_path, init_fn=_init_schema)
+
+    async def load(self, chat_id: int, chat_name: str = "") -> ChatCheckpoint:
+        await self.pool.open()
+        async with self.pool.reader() as db:
+            async with db.execute("""
+                SELECT chat_name, newest_id, oldest_id, backfill_done, pass_top, pass_cursor, messages_seen
+                FROM chat_checkpoints WHERE chat_id = ?
+            """, (chat_id,)) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return ChatCheckpoint(chat_id=chat_id, chat_name=chat_name)
+        return ChatCheckpoint(chat_id, row[0], row[1], row[2], bool(row[3]), row[4], row[5], row[6])
+
+    async def save(self, cp: ChatCheckpoint):
+        await self.pool.open()
+        async with self.pool.writer() as db:
+            await db.execute("""
+                INSERT INTO chat_checkpoints
+                    (chat_id, chat_name, newest_id, oldest_id, backfill_done, pass_top, pass_cursor, messages_seen, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(chat_id) DO UPDATE SET
+                    chat_name = excluded.chat_name, newest_id = excluded.newest_id,
+                    oldest_id = excluded.oldest_id, backfill_done = excluded.backfill_done,
+                    pass_top = excluded.pass_top, pass_cursor = excluded.pass_cursor,
+                    messages_seen = excluded.messages_seen, updated_at = excluded.updated_at
+            """, (cp.chat_id, cp.chat_name, cp.newest_id, cp.oldest_id, int(cp.backfill_done),
+                  cp.pass_top, cp.pass_cursor, cp.messages_seen, datetime.now().isoformat()))
+
+
+def _naive(date: datetime) -> datetime:
+    return date.replace(tzinfo=None) if date.tzinfo else date
+
+
+PageHandler = Callable[[List], Awaitable[None]]
+
+
+class ResumableChatScanner:
+    """
+    Инкрементальный обход истории одного чата по чекпоинту.
+
+    handle_page(messages) обязан довести сообщения страницы до БД (или
+    flush) до возврата — после него чекпоинт считает их обработанными.
+    """
+
+    def __init__(self, client, store: ChatCheckpointStore, stop_date: datetime, page_size: int = PAGE_SIZE):
+        self.client = client
+        self.store = store
+        self.stop_date = _naive(stop_date)
+        self.page_size = page_size
+
+    async def _page(self, chat_id: int, offset_id: int) -> List:
+        return [m async for m in self.client.get_chat_history(chat_id, limit=self.page_size, offset_id=offset_id)]
+
+    async def scan(self, chat_id: int, chat_name: str, handle_page: PageHandler) -> int:
+        """Возвращает число новых (ранее не обработанных) сообщений."""
+        cp = await self.store.load(chat_id, chat_name)
+        cp.chat_name = chat_name
+        resumed = cp.pass_top is not None
+        fetched = await self._scan_head(cp, handle_page)
+        if not cp.backfill_done and cp.oldest_id is not None:
+            fetched += await self._scan_backfill(cp, handle_page)
+        logger.info("history_chat_scanned", chat_id=chat_id, chat=chat_name, fetched=fetched,
+                    resumed=resumed, newest_id=cp.newest_id, oldest_id=cp.oldest_id,
+                    backfill_done=cp.backfill_done)
+        return fetched
+
+    async def _scan_head(self, cp: ChatCheckpoint, handle_page: PageHandler) -> int:
+        offset_id = cp.pass_cursor if cp.pass_top is not None else 0
+        fetched = 0
+        reached_end = False
+        while True:
+            page = await self._page(cp.chat_id, offset_id)
+            if not page:
+                reached_end = True
+                break
+            batch = []
+            merged = False
+            for message in page:
+                if cp.newest_id is not None and message.id <= cp.newest_id:
+                    merged = True
+                    break
+                if _naive(message.date) < self.stop_date:
+                    reached_end = True
+                    break
+                batch.append(message)
+            if batch:
+                await handle_page(batch)
+                if cp.pass_top is None:
+                    cp.pass_top = batch[0].id
+                cp.pass_cursor = batch[-1].id
+                cp.messages_seen += len(batch)
+                fetched += len(batch)
+                await self.store.save(cp)
+            if merged or reached_end:
+                break
+            offset_id = page[-1].id
+
+        if cp.pass_top is not None:
+            # Проход сомкнулся с диапазоном (или дошёл до stop_date) — расширяем диапазон
+            if cp.newest_id is None:
+                cp.oldest_id = cp.pass_cursor
+                cp.backfill_done = reached_end
+            cp.newest_id = cp.pass_top
+            cp.pass_top = cp.pass_cursor = None
+            await self.store.save(cp)
+        elif cp.newest_id is None and reached_end:
+            # Пустой чат (или ничего новее stop_date)
+            cp.backfill_done = True
+            await self.store.save(cp)
+        return fetched
+
+    async def _scan_backfill(self, cp: ChatCheckpoint, handle_page: PageHandler) -> int:
+        fetched = 0
+        while True:
+            page = await self._page(cp.chat_id, cp.oldest_id)
+            batch = [m for m in page if _naive(m.date) >= self.stop_date]
+            if batch:
+                await handle_page(batch)
+                cp.oldest_id = batch[-1].id
+                cp.messages_seen += len(batch)
+                fetched += len(batch)
+            if len(batch) < len(page) or not page:
+                cp.backfill_done = True
+            await self.store.save(cp)
+            if cp.backfill_done:
+                return fetched
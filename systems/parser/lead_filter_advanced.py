@@ -8,6 +8,10 @@ from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Any
 from urllib.parse import urlparse
 
+import numpy as np
+
+from systems.parser import rule_matcher
+
 # ── Динамические фразы стоп-листа (добавляются через Гвен без перезапуска) ──
 _CUSTOM_PHRASES_FILE = Path(__file__).parents[2] / "data" / "db" / "custom_filter_phrases.json"
 
@@ -36,6 +40,7 @@ def add_custom_phrases(phrases: List[str]) -> int:
         _CUSTOM_PHRASES_FILE.write_text(
             json.dumps(_custom_irrelevant, ensure_ascii=False, indent=2), encoding="utf-8"
         )
+        rule_matcher.rebuild_all()
     return added
 
 # Таблица замен Unicode-омоглифов → ASCII/кириллица
@@ -59,19 +64,29 @@ _UNICODE_HOMOGLYPHS = str.maketrans({
     'ᴛ': 'т', 'ᴜ': 'у', 'ᴠ': 'в',
 })
 
+# str.translate с таблицей-словарём идёт по каждому символу не-ASCII текста;
+# регэксп по классу омоглифов проскакивает текст без них почти бесплатно
+_UNICODE_HOMOGLYPHS_RE = re.compile(
+    "[" + "".join(re.escape(chr(code)) for code, repl in _UNICODE_HOMOGLYPHS.items() if chr(code) != repl) + "]"
+)
+
+
+def _replace_homoglyph(match: "re.Match") -> str:
+    return _UNICODE_HOMOGLYPHS[ord(match.group())]
+
+
 def _normalize_text(text: str) -> str:
     """Нормализует Unicode-омоглифы и диакритику для надёжного матчинга."""
     text = unicodedata.normalize('NFC', text)
-    text = text.translate(_UNICODE_HOMOGLYPHS)
+    text = _UNICODE_HOMOGLYPHS_RE.sub(_replace_homoglyph, text)
     return text
 
 from core.ai_engine.resilient_llm import resilient_llm_client
+from systems.parser.direction_engine import DirectionEngine
 from systems.parser.duplicate_detector import DuplicateDetector
 from systems.parser.entity_extractor import EntityExtractor, extract_entities_hybrid
+from systems.parser.filter_cascade import DECISION, GATE, CascadeStage, FilterCascade, Verdict
 from systems.parser.lead_scoring import calculate_lead_priority
-from systems.parser.ml_classifier import ml_classifier
-from systems.parser.bert_classifier import bert_classifier
-from systems.parser.workflow import LeadWorkflow
 from systems.parser.vacancy_db import VacancyDatabase
 from core.utils.structured_logger import logger
 
@@ -88,12 +103,11 @@ HOMOGLYPH_MAP = {
     'Α': 'А', 'Β': 'В', 'Ε': 'Е', 'Η': 'Н', 'Κ': 'К', 'Μ': 'М', 'Ο': 'О', 'Π': 'П', 'Ρ': 'Р', 'Τ': 'Т', 'Υ': 'У', 'Χ': 'Х',
 }
 
+_HOMOGLYPH_TABLE = str.maketrans(HOMOGLYPH_MAP)
+
 def normalize_homoglyphs(text: str) -> str:
     """Заменяет визуально похожие латинские и греческие символы на кириллицу."""
-    res = ""
-    for char in text:
-        res += HOMOGLYPH_MAP.get(char, char)
-    return res
+    return text.translate(_HOMOGLYPH_TABLE)
 
 # ==========================================
 # КОНФИГУРАЦИЯ
@@ -823,11 +837,27 @@ def _score_keyword(text_lower: str, keyword: str) -> float:
     return 1.0
 
 
+_direction_engine: Optional[DirectionEngine] = None
+
+
+def _get_direction_engine() -> DirectionEngine:
+    global _direction_engine
+    if _direction_engine is None:
+        _direction_engine = DirectionEngine(DIRECTION_KEYWORDS, _NEGATION_PATTERNS, _REQUEST_SIGNALS)
+    return _direction_engine
+
+
 def detect_direction(text: str) -> str:
     """
     Определяет нишу вакансии по ключевым словам в тексте.
     Учитывает контекст: отрицания снижают счёт, сигналы запроса — повышают.
+    Считается скомпилированным DirectionEngine за один проход (с мемоизацией).
     """
+    return _get_direction_engine().detect(text.lower())
+
+
+def _detect_direction_reference(text: str) -> str:
+    """Поштучная проверка каждого ключевика — эталон для сверки DirectionEngine."""
     text_lower = text.lower()
     scores: Dict[str, float] = {}
     for direction, keywords in DIRECTION_KEYWORDS.items():
@@ -877,10 +907,11 @@ async def detect_direction_with_llm_fallback(text: str) -> str:
         return direction
 
     try:
-        from core.ai_engine.llm_client import LLMClient
-        llm = LLMClient()
+        from core.ai_engine.llm_client import llm_client
         prompt = _LLM_DIRECTION_PROMPT.format(text=text[:400])
-        raw = await llm.generate_response(prompt, system_prompt=_LLM_DIRECTION_SYSTEM)
+        raw = await llm_client.generate_response(
+            prompt, system_prompt=_LLM_DIRECTION_SYSTEM, cache_namespace="direction"
+        )
         if raw:
             candidate = raw.strip().lower().rstrip(".")
             mapped = _DIRECTION_ALIASES.get(candidate)
@@ -896,6 +927,38 @@ async def detect_direction_with_llm_fallback(text: str) -> str:
 # УРОВЕНЬ 0: НОРМАЛИЗАЦИЯ
 # ==========================================
 
+_URL_RE = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+_EMOJI_RE = re.compile("["
+    u"\U0001F600-\U0001F64F"  # emoticons
+    u"\U0001F300-\U0001F5FF"  # symbols & pictographs
+    u"\U0001F680-\U0001F6FF"  # transport & map
+    u"\U0001F1E0-\U0001F1FF"  # flags
+    u"\U00002702-\U000027B0"
+    u"\U000024C2-\U0001F251"
+    "]+", flags=re.UNICODE)
+_HASHTAG_RE = re.compile(r'#\w+')
+_MENTION_RE = re.compile(r'@\w+')
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+_BUDGET_RE = re.compile(r'(\d+)\s*(?:₽|руб|rub|\$|usd|евро|eur)')
+
+# Поля extract_features_batch()
+FEATURES_DTYPE = np.dtype([
+    ("word_count", np.int32),
+    ("emoji_density", np.float32),
+    ("caps_ratio", np.float32),
+    ("has_budget", np.bool_),
+    ("avg_budget", np.float64),
+    ("url_count", np.int32),
+    ("hashtag_count", np.int32),
+    ("mention_count", np.int32),
+])
+
+
+def _budget_values(text_lower: str) -> List[int]:
+    # Бюджетные упоминания: первое число перед валютой
+    return [int(num) for num in _BUDGET_RE.findall(text_lower)]
+
+
 def normalize_and_extract_features(text: str) -> Dict[str, Any]:
     """
     Нормализует текст и извлекает структурные признаки.
@@ -904,45 +967,29 @@ def normalize_and_extract_features(text: str) -> Dict[str, Any]:
     text_lower = text.lower()
 
     # 1. Извлекаем URL
-    urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', text)
+    urls = _URL_RE.findall(text) if "http" in text else []
     domains = [urlparse(url).netloc for url in urls]
     
     # 2. Считаем эмодзи (часто в спаме много)
-    emoji_pattern = re.compile("["
-        u"\U0001F600-\U0001F64F"  # emoticons
-        u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-        u"\U0001F680-\U0001F6FF"  # transport & map
-        u"\U0001F1E0-\U0001F1FF"  # flags
-        u"\U00002702-\U000027B0"
-        u"\U000024C2-\U0001F251"
-        "]+", flags=re.UNICODE)
-    emoji_count = len(emoji_pattern.findall(text))
+    emoji_count = len(_EMOJI_RE.findall(text))
     
     # 3. Хештеги
-    hashtags = re.findall(r'#\w+', text_lower)
+    hashtags = _HASHTAG_RE.findall(text_lower) if "#" in text else []
     
     # 4. Упоминания пользователей/ботов
-    mentions = re.findall(r'@\w+', text)
+    mentions = _MENTION_RE.findall(text) if "@" in text else []
     
     # 5. Длина текста
-    text_clean = re.sub(r'[^\w\s]', '', text_lower)
+    text_clean = _NON_WORD_RE.sub('', text_lower)
     words = text_clean.split()
     word_count = len(words)
     
     # 6. Caps Lock ratio (спам часто в CAPS)
-    caps_ratio = sum(1 for c in text if c.isupper()) / len(text) if len(text) > 0 else 0
+    caps_ratio = sum(map(str.isupper, text)) / len(text) if len(text) > 0 else 0
     
     # 7. Бюджетные упоминания
-    budget_matches = re.findall(r'(\d+[\s]*(?:₽|руб|rub|\$|usd|евро|eur))', text_lower)
-    has_budget = len(budget_matches) > 0
-    
-    # Извлекаем числа из бюджета
-    budget_values = []
-    for match in budget_matches:
-        nums = re.findall(r'\d+', match)
-        if nums:
-            budget_values.append(int(nums[0]))
-    
+    budget_values = _budget_values(text_lower)
+    has_budget = len(budget_values) > 0
     avg_budget = sum(budget_values) / len(budget_values) if budget_values else 0
     
     return {
@@ -962,6 +1009,164 @@ def normalize_and_extract_features(text: str) -> Dict[str, Any]:
         "avg_budget": avg_budget,
     }
 
+
+# Диапазоны _EMOJI_RE для векторной проверки кодов символов
+_EMOJI_RANGES = (
+    (0x1F600, 0x1F64F), (0x1F300, 0x1F5FF), (0x1F680, 0x1F6FF),
+    (0x1F1E0, 0x1F1FF), (0x2702, 0x27B0), (0x24C2, 0x1F251),
+)
+
+_CHAR_FLAGS: Optional[np.ndarray] = None
+_UPPER, _WORD, _SPACE, _EMOJI = 1, 2, 4, 8
+
+
+def _char_flags() -> np.ndarray:
+    """
+    Флаги по всем кодам Unicode: str.isupper, \\w и \\s в смысле re, символ
+    из _EMOJI_RE (строится при первом вызове пачки, ~0.5 с).
+    """
+    global _CHAR_FLAGS
+    if _CHAR_FLAGS is None:
+        flags = np.fromiter(
+            ((ch.isupper() * _UPPER) | ((ch.isalnum() or ch == "_") * _WORD) | (ch.isspace() * _SPACE)
+             for ch in map(chr, range(0x110000))),
+            dtype=np.uint8, count=0x110000,
+        )
+        for lo, hi in _EMOJI_RANGES:
+            flags[lo:hi + 1] |= _EMOJI
+        _CHAR_FLAGS = flags
+    return _CHAR_FLAGS
+
+
+def _codes(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Коды символов всей пачки подряд (UTF-32) и номер текста для каждого символа."""
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer("".join(texts).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    return codes, np.repeat(np.arange(len(texts)), lengths)
+
+
+def _run_starts(mask: np.ndarray, owner: np.ndarray) -> np.ndarray:
+    """Начала серий True в mask; серия не переходит через границу текстов."""
+    starts = mask.copy()
+    starts[1:] &= ~mask[:-1] | (owner[1:] != owner[:-1])
+    return starts
+
+
+def _count_by_owner(regex: "re.Pattern", joined: str, starts: np.ndarray) -> np.ndarray:
+    """Число совпадений regex в каждом тексте склеенной пачки (starts — начала текстов)."""
+    positions = np.fromiter((m.start() for m in regex.finditer(joined)), dtype=np.int64)
+    owners = np.searchsorted(starts, positions, side="right") - 1
+    return np.bincount(owners, minlength=len(starts))
+
+
+def _text_starts(texts: List[str]) -> np.ndarray:
+    """Начала текстов в склейке через односимвольный разделитель."""
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    starts = np.zeros(len(texts), dtype=np.int64)
+    np.cumsum(lengths[:-1] + 1, out=starts[1:])
+    return starts
+
+
+def extract_features_batch(texts: List[str]) -> np.ndarray:
+    """
+    Числовые признаки normalize_and_extract_features для пачки текстов —
+    структурированный массив FEATURES_DTYPE (по строке на текст).
+
+    CAPS, эмодзи и слова считаются векторно по кодам символов (UTF-32) всей
+    пачки; URL, упоминания, хештеги и бюджеты — одним проходом каждого
+    регэкспа по склейке текстов, совпадения раскладываются по текстам через
+    searchsorted по началам. Для бэкфилла истории, ML-классификатора и
+    отчётов на десятках тысяч сообщений.
+    """
+    n = len(texts)
+    out = np.zeros(n, dtype=FEATURES_DTYPE)
+    if n == 0:
+        return out
+    normalized = [_normalize_text(text or "") for text in texts]
+    lowered = [text.lower() for text in normalized]
+
+    # Посимвольные признаки — векторно по кодам символов
+    lengths = np.fromiter(map(len, normalized), dtype=np.int64, count=n)
+    flags = _char_flags()
+    codes, owner = _codes(normalized)
+    char_flags = flags[codes]
+    caps = np.bincount(owner[(char_flags & _UPPER) > 0], minlength=n)
+    emoji = np.bincount(owner[_run_starts((char_flags & _EMOJI) > 0, owner)], minlength=n)
+
+    # Слова: пунктуация (не \w и не \s) выкидывается, слово — серия \w между пробелами
+    lower_codes, lower_owner = _codes(lowered)
+    lower_flags = flags[lower_codes]
+    kept = (lower_flags & (_WORD | _SPACE)) > 0
+    is_word, kept_owner = (lower_flags[kept] & _WORD) > 0, lower_owner[kept]
+    word_count = np.bincount(kept_owner[_run_starts(is_word, kept_owner)], minlength=n)
+    out["word_count"] = word_count
+
+    # Регэкспы — один проход по склейке; разделитель \x00 не матчится ни одним паттерном
+    raw_joined, lower_joined = "\x00".join(normalized), "\x00".join(lowered)
+    raw_starts, lower_starts = _text_starts(normalized), _text_starts(lowered)
+    out["url_count"] = _count_by_owner(_URL_RE, raw_joined, raw_starts)
+    out["mention_count"] = _count_by_owner(_MENTION_RE, raw_joined, raw_starts)
+    out["hashtag_count"] = _count_by_owner(_HASHTAG_RE, lower_joined, lower_starts)
+
+    budget_pos, budget_val = [], []
+    for match in _BUDGET_RE.finditer(lower_joined):
+        budget_pos.append(match.start())
+        budget_val.append(int(match.group(1)))
+    budget_owner = np.searchsorted(lower_starts, np.asarray(budget_pos, dtype=np.int64), side="right") - 1
+    budget_count = np.bincount(budget_owner, minlength=n)
+    budget_sum = np.bincount(budget_owner, weights=np.asarray(budget_val, dtype=np.float64), minlength=n)
+
+    out["emoji_density"] = np.where(word_count > 0, emoji / np.maximum(word_count, 1), 0.0)
+    out["caps_ratio"] = np.where(lengths > 0, caps / np.maximum(lengths, 1), 0.0)
+    out["avg_budget"] = np.where(budget_count > 0, budget_sum / np.maximum(budget_count, 1), 0.0)
+    out["has_budget"] = budget_count > 0
+    return out
+
+
+# ==========================================
+# СКОМПИЛИРОВАННЫЕ ПРАВИЛА (уровни 1-2)
+# ==========================================
+
+# Категории, участвующие в жёстких блокировках (spam_strong — для Unicode-проверки)
+_HARD_BLOCK_CATEGORIES = (
+    "domains", "bots", "scam_patterns", "scam_keywords",
+    "irrelevant_hard", "custom_irrelevant", "spam_strong",
+)
+
+
+def _lead_rules_source() -> Dict[str, Dict]:
+    """Стоп-листы и скоринг в едином формате для RuleMatcher. Читается при каждой пересборке."""
+    rules = {
+        "domains": {"keywords": BLACKLIST_CONFIG["domains"]},
+        "bots": {"keywords": BLACKLIST_CONFIG["bots"]},
+        "scam_patterns": {"patterns": BLACKLIST_CONFIG["scam_patterns"]},
+        "scam_keywords": {"keywords": BLACKLIST_CONFIG["scam_keywords"]},
+        "irrelevant_hard": {"keywords": BLACKLIST_CONFIG["irrelevant_hard"]},
+        "custom_irrelevant": {"keywords": list(_custom_irrelevant)},
+        "bot_username_patterns": {"patterns": BLACKLIST_CONFIG.get("bot_username_patterns", [])},
+    }
+    rules.update(SCORING_CONFIG)
+    return rules
+
+
+_lead_rules = rule_matcher.RuleMatcher(_lead_rules_source, name="lead_filter")
+
+
+def _first_hits(hits: List[rule_matcher.RuleHit]) -> Dict[str, rule_matcher.RuleHit]:
+    """Первое по порядку в списке сработавшее правило каждой категории."""
+    first = {}
+    for hit in hits:
+        current = first.get(hit.category)
+        if current is None or hit.order < current.order:
+            first[hit.category] = hit
+    return first
+
+
+def _earliest(*hits: Optional[rule_matcher.RuleHit]) -> Optional[rule_matcher.RuleHit]:
+    found = [hit for hit in hits if hit is not None]
+    return min(found, key=lambda hit: hit.order) if found else None
+
+
 # ==========================================
 # УРОВЕНЬ 1: ЖЁСТКИЕ БЛОКИРОВКИ
 # ==========================================
@@ -970,39 +1175,40 @@ def check_hard_blocks(text: str, features: Dict[str, Any]) -> Tuple[bool, str]:
     """
     Проверяет жёсткие блокировки.
     Returns: (is_blocked, reason)
+
+    Все стоп-листы проверяются одним проходом скомпилированного матчера по тексту;
+    при нескольких совпадениях причина — первое правило по порядку категорий и списков.
     """
     text_raw_lower = features["text_lower"]
     # Нормализуем хомоглифы для проверки стоп-слов
     text_norm_lower = normalize_homoglyphs(text_raw_lower)
-    
-    # 1. Блокировка по доменам
-    for domain in BLACKLIST_CONFIG["domains"]:
-        if domain in text_raw_lower:
-            return (True, f"BLACKLIST_DOMAIN: {domain}")
-    
-    # 2. Блокировка по ботам
-    for bot in BLACKLIST_CONFIG["bots"]:
-        if bot in text_raw_lower:
-            return (True, f"BLACKLIST_BOT: {bot}")
-    
-    # 3. Мошеннические паттерны (проверяем и в сыром, и в нормализованном)
-    for pattern in BLACKLIST_CONFIG["scam_patterns"]:
-        if re.search(pattern, text_raw_lower) or re.search(pattern, text_norm_lower):
-            return (True, f"SCAM_PATTERN: {pattern}")
-    
-    # 4. Ключевые слова мошенничества
-    for keyword in BLACKLIST_CONFIG["scam_keywords"]:
-        if keyword in text_raw_lower or keyword in text_norm_lower:
-            return (True, f"SCAM_KEYWORD: {keyword}")
-    
-    # 5. Нерелевантные ниши (статические + динамически добавленные Гвен)
-    for niche in BLACKLIST_CONFIG["irrelevant_hard"]:
-        if niche in text_raw_lower or niche in text_norm_lower:
-            return (True, f"IRRELEVANT_NICHE: {niche}")
-    for phrase in _custom_irrelevant:
-        if phrase in text_raw_lower or phrase in text_norm_lower:
-            return (True, f"CUSTOM_PHRASE: {phrase}")
-    
+
+    raw = _first_hits(_lead_rules.match(text_raw_lower, _HARD_BLOCK_CATEGORIES))
+    if text_norm_lower != text_raw_lower:
+        norm = _first_hits(_lead_rules.match(text_norm_lower, _HARD_BLOCK_CATEGORIES))
+    else:
+        norm = raw
+
+    # 1-2. Домены и боты — только в сыром тексте
+    hit = raw.get("domains")
+    if hit:
+        return (True, f"BLACKLIST_DOMAIN: {hit.rule}")
+    hit = raw.get("bots")
+    if hit:
+        return (True, f"BLACKLIST_BOT: {hit.rule}")
+
+    # 3-5. Мошенничество и нерелевантные ниши (проверяем и в сыром, и в нормализованном;
+    # статические ниши + динамически добавленные Гвен фразы)
+    for category, label in (
+        ("scam_patterns", "SCAM_PATTERN"),
+        ("scam_keywords", "SCAM_KEYWORD"),
+        ("irrelevant_hard", "IRRELEVANT_NICHE"),
+        ("custom_irrelevant", "CUSTOM_PHRASE"),
+    ):
+        hit = _earliest(raw.get(category), norm.get(category))
+        if hit:
+            return (True, f"{label}: {hit.rule}")
+
     # 6. Слишком много эмодзи (spam indicator)
     if features["emoji_density"] > 0.3:
         return (True, f"EMOJI_SPAM: density={features['emoji_density']:.2f}")
@@ -1017,25 +1223,24 @@ def check_hard_blocks(text: str, features: Dict[str, Any]) -> Tuple[bool, str]:
 
     # 9. Bot-username в mentions (FreelancerVacancii_Bot и подобные)
     for mention in features.get("mentions", []):
-        for pattern in BLACKLIST_CONFIG.get("bot_username_patterns", []):
-            if re.search(pattern, mention):
-                return (True, f"BOT_ACCOUNT: {mention}")
+        if _lead_rules.first_hit(mention, "bot_username_patterns"):
+            return (True, f"BOT_ACCOUNT: {mention}")
 
     # 10. Unicode-омоглифы в тексте — признак обхода фильтров (спам)
     normalized = _normalize_text(text_raw_lower)
     if normalized != text_raw_lower:
-        # Проверяем scam-паттерны на нормализованном тексте
-        for pattern in BLACKLIST_CONFIG["scam_patterns"]:
-            if re.search(pattern, normalized):
-                return (True, f"UNICODE_SCAM_PATTERN: {pattern}")
-        for keyword in BLACKLIST_CONFIG["scam_keywords"]:
-            if keyword in normalized:
-                return (True, f"UNICODE_SCAM_KEYWORD: {keyword}")
-        for niche in BLACKLIST_CONFIG["irrelevant_hard"]:
-            if niche in normalized:
-                return (True, f"UNICODE_IRRELEVANT: {niche}")
-        # Если в нормализованном тексте >= 3 спам-ключей из spam_strong — блок
-        spam_hits = sum(1 for kw in SCORING_CONFIG["spam_strong"]["keywords"] if kw in normalized)
+        hits = _lead_rules.match(normalized, _HARD_BLOCK_CATEGORIES)
+        unicode_first = _first_hits(hits)
+        for category, label in (
+            ("scam_patterns", "UNICODE_SCAM_PATTERN"),
+            ("scam_keywords", "UNICODE_SCAM_KEYWORD"),
+            ("irrelevant_hard", "UNICODE_IRRELEVANT"),
+        ):
+            hit = unicode_first.get(category)
+            if hit:
+                return (True, f"{label}: {hit.rule}")
+        # Если в нормализованном тексте >= 2 спам-ключей из spam_strong — блок
+        spam_hits = sum(1 for hit in hits if hit.category == "spam_strong")
         if spam_hits >= 2:
             return (True, f"UNICODE_SPAM: {spam_hits} spam keywords after normalization")
 
@@ -1045,74 +1250,31 @@ def check_hard_blocks(text: str, features: Dict[str, Any]) -> Tuple[bool, str]:
 # УРОВЕНЬ 2: ЭВРИСТИЧЕСКИЙ СКОРИНГ
 # ==========================================
 
+# Метки категорий в списке hits (остальные категории — просто правило)
+_SCORING_LABELS = {
+    "spam_strong": "SPAM - ",
+    "spam_medium": "SPAM_MED - ",
+    "quality_indicators": "QUALITY - ",
+}
+
+
 def calculate_heuristic_score(text: str, features: Dict[str, Any]) -> Dict[str, Any]:
     """
     Рассчитывает эвристический score.
+
+    Паттерны дают weight за каждое совпадение, ключевые слова — weight один раз.
     """
     text_lower = features["text_lower"]
     score = 0
     hits = []
-    
-    # Проверяем CLIENT markers
-    for pattern in SCORING_CONFIG["client_strong"]["patterns"]:
-        matches = re.findall(pattern, text_lower)
-        if matches:
-            weight = SCORING_CONFIG["client_strong"]["weight"]
-            score += weight * len(matches)
-            hits.append(f"+{weight}: {pattern}")
-    
-    for keyword in SCORING_CONFIG["client_medium"]["keywords"]:
-        if keyword in text_lower:
-            weight = SCORING_CONFIG["client_medium"]["weight"]
-            score += weight
-            hits.append(f"+{weight}: {keyword}")
-    
-    for keyword in SCORING_CONFIG["client_weak"]["keywords"]:
-        if keyword in text_lower:
-            weight = SCORING_CONFIG["client_weak"]["weight"]
-            score += weight
-            hits.append(f"+{weight}: {keyword}")
-    
-    # Проверяем SELLER markers
-    for pattern in SCORING_CONFIG["seller_strong"]["patterns"]:
-        matches = re.findall(pattern, text_lower)
-        if matches:
-            weight = SCORING_CONFIG["seller_strong"]["weight"]
-            score += weight * len(matches)
-            hits.append(f"{weight}: {pattern}")
-    
-    for keyword in SCORING_CONFIG["seller_medium"]["keywords"]:
-        if keyword in text_lower:
-            weight = SCORING_CONFIG["seller_medium"]["weight"]
-            score += weight
-            hits.append(f"{weight}: {keyword}")
-    
-    for keyword in SCORING_CONFIG["seller_weak"]["keywords"]:
-        if keyword in text_lower:
-            weight = SCORING_CONFIG["seller_weak"]["weight"]
-            score += weight
-            hits.append(f"{weight}: {keyword}")
-    
-    # SPAM markers
-    for keyword in SCORING_CONFIG["spam_strong"]["keywords"]:
-        if keyword in text_lower:
-            weight = SCORING_CONFIG["spam_strong"]["weight"]
-            score += weight
-            hits.append(f"{weight}: SPAM - {keyword}")
-    
-    for keyword in SCORING_CONFIG["spam_medium"]["keywords"]:
-        if keyword in text_lower:
-            weight = SCORING_CONFIG["spam_medium"]["weight"]
-            score += weight
-            hits.append(f"{weight}: SPAM_MED - {keyword}")
-    
-    # QUALITY indicators
-    for keyword in SCORING_CONFIG["quality_indicators"]["keywords"]:
-        if keyword in text_lower:
-            weight = SCORING_CONFIG["quality_indicators"]["weight"]
-            score += weight
-            hits.append(f"+{weight}: QUALITY - {keyword}")
-    
+
+    # CLIENT / SELLER / SPAM / QUALITY markers — в порядке категорий SCORING_CONFIG
+    for hit in _lead_rules.match(text_lower, tuple(SCORING_CONFIG)):
+        weight = hit.weight
+        score += weight * hit.count
+        sign = "+" if weight > 0 else ""
+        hits.append(f"{sign}{weight}: {_SCORING_LABELS.get(hit.category, '')}{hit.rule}")
+
     # Дополнительные модификаторы
     # Если есть бюджет больше 5000₽ → +1
     if features["avg_budget"] > 5000:
@@ -1245,131 +1407,176 @@ async def llm_deep_analysis(text: str, features: Dict[str, Any], score: int) ->
 # MAIN PIPELINE
 # ==========================================
 
+class _LeadContext:
+    """Состояние одного сообщения в каскаде: признаки и скоринг считаются лениво и один раз."""
+
+    def __init__(self, text: str, source: str, direction: str, message_id: int,
+                 use_llm_for_uncertain: bool, use_deduplication: bool):
+        self.text = text
+        self.source = source
+        self.direction = direction
+        self.message_id = message_id
+        self.use_llm_for_uncertain = use_llm_for_uncertain
+        self.use_deduplication = use_deduplication
+        self.details: Dict[str, Any] = {}
+        self.hard_block: Optional[Tuple[bool, str]] = None
+        self.dedup: Optional[Tuple[bool, float, str]] = None
+        self._context: Optional[Dict[str, Any]] = None
+
+    @property
+    def features(self) -> Dict[str, Any]:
+        # Уровень 0: Нормализация
+        if "features" not in self.details:
+            self.details["features"] = normalize_and_extract_features(self.text)
+        return self.details["features"]
+
+    @property
+    def context(self) -> Dict[str, Any]:
+        # Уровни 2-3: эвристический скоринг + контекстная валидация
+        if self._context is None:
+            heuristic = calculate_heuristic_score(self.text, self.features)
+            self.details["heuristic"] = heuristic
+            self._context = apply_context_validation(heuristic["score"], self.source, self.direction, self.features)
+            self.details["context"] = self._context
+        return self._context
+
+    @property
+    def final_score(self) -> int:
+        return self.context["final_score"]
+
+    async def check_duplicate(self) -> Tuple[bool, float, str]:
+        """Результат дедупа кэшируется на сообщение — следующие стадии его не пересчитывают."""
+        if self.dedup is None:
+            # Initialize detector with DB manager (singleton handles reuse)
+            db = VacancyDatabase()
+            await db.init_db()
+            detector = DuplicateDetector(db_manager=db)
+            self.dedup = await detector.is_duplicate(
+                text=self.text,
+                message_id=self.message_id,
+                source_channel=self.source
+            )
+            is_dup, similarity, method = self.dedup
+            self.details["dedup"] = {"is_duplicate": is_dup, "similarity": similarity, "method": method}
+        return self.dedup
+
+
+async def _gate_deduplication(ctx: _LeadContext) -> Optional[Verdict]:
+    is_dup, similarity, method = await ctx.check_duplicate()
+    if is_dup:
+        return Verdict(False, 0.95, f"DUPLICATE: {similarity:.2%} similar (method: {method})", "DEDUPLICATION")
+    return None
+
+
+async def _gate_hard_block(ctx: _LeadContext) -> Optional[Verdict]:
+    # Уровень 1: Жёсткие блокировки
+    ctx.hard_block = check_hard_blocks(ctx.text, ctx.features)
+    is_blocked, block_reason = ctx.hard_block
+    if is_blocked:
+        return Verdict(False, 0.99, block_reason, "LEVEL_1_HARD_BLOCK")
+    return None
+
+
+async def _gate_context_block(ctx: _LeadContext) -> Optional[Verdict]:
+    # Уровень 3: Контекстная валидация (чёрный список источников)
+    if ctx.context.get("is_blocked"):
+        return Verdict(False, 0.99, ctx.context.get("reason", "Context Block"), "LEVEL_3_CONTEXT_BLOCK")
+    return None
+
+
+async def _decide_heuristic(ctx: _LeadContext) -> Optional[Verdict]:
+    final_score = ctx.final_score
+    if final_score >= 3:
+        return Verdict(True, 0.85, f"HEURISTIC_ACCEPT: score={final_score}", "LEVEL_2_HEURISTIC")
+    if final_score <= -2:
+        return Verdict(False, 0.85, f"HEURISTIC_REJECT: score={final_score}", "LEVEL_2_HEURISTIC")
+    return None
+
+
+async def _decide_bert(ctx: _LeadContext) -> Optional[Verdict]:
+    from systems.parser.bert_classifier import get_bert_classifier
+    bert_result = await get_bert_classifier().predict_async(ctx.text)
+    ctx.details["bert"] = bert_result
+    confidence = bert_result["confidence"]
+    # Пограничная уверенность — предварительное решение, уточняет LLM (если включён)
+    return Verdict(bert_result["is_lead"], confidence, f"BERT_ONLY: {bert_result['method']}", "LEVEL_BERT",
+                   final=not (0.4 < confidence < 0.6))
+
+
+async def _decide_llm(ctx: _LeadContext) -> Optional[Verdict]:
+    llm_result = await llm_deep_analysis(ctx.text, ctx.features, ctx.final_score)
+    ctx.details["llm"] = llm_result
+    return Verdict(llm_result.get("is_real_lead", False), llm_result.get("confidence", 0.0),
+                   f"LLM: {llm_result.get('reason', 'No reason')}", "LEVEL_4_LLM")
+
+
+def _uncertain_reject(ctx: _LeadContext) -> Verdict:
+    return Verdict(False, 0.6, f"UNCERTAIN_REJECT: score={ctx.final_score}", "LEVEL_2_CONSERVATIVE")
+
+
+# Априорные стоимость (мс) и доли отклонений — пока нет замеров; дальше планировщик
+# опирается на измеренные значения (get_cascade_stats()).
+lead_cascade = FilterCascade(
+    gates=[
+        CascadeStage("dedup", GATE, _gate_deduplication, prior_cost_ms=25.0, prior_reject_rate=0.05,
+                     enabled=lambda ctx: ctx.use_deduplication),
+        CascadeStage("hard_block", GATE, _gate_hard_block, prior_cost_ms=0.1, prior_reject_rate=0.3),
+        CascadeStage("context_block", GATE, _gate_context_block, prior_cost_ms=0.05, prior_reject_rate=0.02),
+    ],
+    decisions=[
+        CascadeStage("heuristic", DECISION, _decide_heuristic, prior_cost_ms=0.05,
+                     prior_resolve_rate=0.6, prior_accept_rate=0.2),
+        CascadeStage("bert", DECISION, _decide_bert, prior_cost_ms=20.0,
+                     prior_resolve_rate=0.85, prior_accept_rate=0.4),
+        CascadeStage("llm", DECISION, _decide_llm, prior_cost_ms=1500.0,
+                     prior_resolve_rate=1.0, prior_accept_rate=0.5,
+                     enabled=lambda ctx: ctx.use_llm_for_uncertain),
+    ],
+    fallback=_uncertain_reject,
+)
+
+
+_GATE_STAGES = ("DEDUPLICATION", "LEVEL_1_HARD_BLOCK", "LEVEL_3_CONTEXT_BLOCK")
+
+
+def get_cascade_stats() -> Dict[str, Any]:
+    """Счётчики стадий каскада: запуски, отклонения, пропуски (несделанные вызовы), стоимость."""
+    return lead_cascade.get_stats()
+
+
 async def filter_lead_advanced(
     text: str,
     source: str,
     direction: str,
     message_id: int = 0,
     use_llm_for_uncertain: bool = True,
-    use_deduplication: bool = True
+    use_deduplication: bool = True,
+    plan: Optional[List[List[str]]] = None
 ) -> Dict[str, Any]:
     """
     Полный пайплайн фильтрации лида с дедупликацией, ML и скорингом.
+
+    Стадии идут каскадом lead_cascade: дешёвые вето раньше дорогих, дедуп —
+    там, где он окупается (обычно перед LLM или перед принятием лида).
+    plan — явный порядок (например, lead_cascade.legacy_plan() для replay).
     """
-    details = {}
-    
-    # 1. Шаг: Дедупликация
-    if use_deduplication:
-        # Initialize detector with DB manager (singleton handles reuse)
-        db = VacancyDatabase()
-        await db.init_db()
-        detector = DuplicateDetector(db_manager=db)
-        
-        is_dup, similarity, method = await detector.is_duplicate(
-            text=text, 
-            message_id=message_id, 
-            source_channel=source
-        )
-        
-        if is_dup:
-            return {
-                "is_lead": False,
-                "confidence": 0.95,
-                "reason": f"DUPLICATE: {similarity:.2%} similar (method: {method})",
-                "stage": "DEDUPLICATION",
-                "details": {
-                    "similarity": similarity,
-                    "method": method
-                }
-            }
-    
-    # Уровень 0: Нормализация
-    features = normalize_and_extract_features(text)
-    details["features"] = features
-    
-    # Уровень 1: Жёсткие блокировки
-    is_blocked, block_reason = check_hard_blocks(text, features)
-    if is_blocked:
-        return {
-            "is_lead": False,
-            "confidence": 0.99,
-            "reason": block_reason,
-            "stage": "LEVEL_1_HARD_BLOCK",
-            "details": details
-        }
-    
-    # Уровень 2: Эвристический скоринг
-    heuristic = calculate_heuristic_score(text, features)
-    score = heuristic["score"]
-    details["heuristic"] = heuristic
-    
-    # Уровень 3: Контекстная валидация
-    context = apply_context_validation(score, source, direction, features)
-    details["context"] = context
-    
-    if context.get("is_blocked"):
+    ctx = _LeadContext(text, source, direction, message_id, use_llm_for_uncertain, use_deduplication)
+    verdict = await lead_cascade.run(ctx, plan)
+    details = ctx.details
+
+    if verdict.stage in _GATE_STAGES:
+        if verdict.stage == "DEDUPLICATION":
+            details = {"similarity": ctx.dedup[1], "method": ctx.dedup[2], **details}
         return {
             "is_lead": False,
-            "confidence": 0.99,
-            "reason": context.get("reason", "Context Block"),
-            "stage": "LEVEL_3_CONTEXT_BLOCK",
+            "confidence": verdict.confidence,
+            "reason": verdict.reason,
+            "stage": verdict.stage,
             "details": details
         }
-    
-    final_score = context["final_score"]
-    
-    # Решение на основе скоринга и гибридного подхода
-    decision_made = False
-    is_lead = False
-    confidence = 0.0
-    stage = ""
-    reason = ""
-    
-    if final_score >= 3:
-        is_lead = True
-        confidence = 0.85
-        reason = f"HEURISTIC_ACCEPT: score={final_score}"
-        stage = "LEVEL_2_HEURISTIC"
-        decision_made = True
-    elif final_score <= -2:
-        is_lead = False
-        confidence = 0.85
-        reason = f"HEURISTIC_REJECT: score={final_score}"
-        stage = "LEVEL_2_HEURISTIC"
-        decision_made = True
-    
-    # Если решение не принято или уверенность низкая, используем BERT
-    if not decision_made or confidence < 0.8:
-        bert_result = bert_classifier.predict(text)
-        details["bert"] = bert_result
-        
-        # Комбинируем результаты
-        if not decision_made:
-            is_lead = bert_result["is_lead"]
-            confidence = bert_result["confidence"]
-            reason = f"BERT_ONLY: {bert_result['method']}"
-            stage = "LEVEL_BERT"
-        else:
-            # Гибрид (усредняем уверенность эвристики и BERT)
-            confidence = (confidence + bert_result["confidence"]) / 2
-            is_lead = bert_result["is_lead"] if confidence > 0.5 else is_lead
-            reason = f"HYBRID: heuristic={final_score}, bert={bert_result['confidence']:.2f}"
-            stage = "LEVEL_BERT_HYBRID"
-        decision_made = True
-
-    # Если всё еще не уверены, используем LLM
-    if (not decision_made or (0.4 < confidence < 0.6)) and use_llm_for_uncertain:
-        llm_result = await llm_deep_analysis(text, features, final_score)
-        details["llm"] = llm_result
-        is_lead = llm_result.get("is_real_lead", False)
-        confidence = llm_result.get("confidence", 0.0)
-        reason = f"LLM: {llm_result.get('reason', 'No reason')}"
-        stage = "LEVEL_4_LLM"
-    elif not decision_made:
-        is_lead = False
-        confidence = 0.6
-        reason = f"UNCERTAIN_REJECT: score={final_score}"
-        stage = "LEVEL_2_CONSERVATIVE"
+
+    is_lead, confidence, reason, stage = verdict.is_lead, verdict.confidence, verdict.reason, verdict.stage
+    final_score = ctx.final_score if "context" in details else None
 
     # Финальные штрихи для принятых лидов
     if is_lead:
@@ -1379,7 +1586,7 @@ async def filter_lead_advanced(
         
         # Расчет приоритета
         priority_data = calculate_lead_priority(
-            text, source, direction, features, final_score, 
+            text, source, direction, ctx.features, final_score, 
             SOURCE_RELIABILITY, DIRECTION_RELEVANCE
         )
         
@@ -1426,7 +1633,8 @@ async def filter_lead_advanced(
         "source": source,
         "niche": direction,
         "decision_trail": [
-            f"hard_blocks_pass" if not is_blocked else f"hard_blocked: {block_reason}",
+            "hard_blocks_skipped" if ctx.hard_block is None
+            else f"hard_blocked: {ctx.hard_block[1]}" if ctx.hard_block[0] else "hard_blocks_pass",
             f"heuristic_score: {final_score}",
             f"bert_confidence: {details.get('bert', {}).get('confidence', 0):.2f}" if "bert" in details else "bert_skipped",
             f"stage: {stage}"
@@ -1,126 +1,286 @@
 
+import asyncio
 import sqlite3
 import pickle
 import os
+import threading
 import numpy as np
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Sequence
+
+from core.config.settings import settings
 
 try:
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.linear_model import LogisticRegression
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
     from sklearn.model_selection import train_test_split
     SKLEARN_AVAILABLE = True
 except ImportError:
     SKLEARN_AVAILABLE = False
 
+_CLASSES = np.array([0, 1])
+_BOOTSTRAP_CHUNK = 1000
+
+
 class MLLeadClassifier:
     """
     ML-классификатор лидов на основе размеченных данных.
+
+    online=True (settings.ML_ONLINE_LEARNING): HashingVectorizer без словаря +
+    SGDClassifier(log_loss), модель дообучается partial_fit на каждой ручной
+    разметке (label-хук VacancyDatabase, после начального прохода по таблице)
+    и сохраняется раз в ML_CHECKPOINT_EVERY обновлений — стоимость обновления не зависит от размера
+    таблицы. online=False — прежний TF-IDF + LogisticRegression с полным
+    переобучением в train_from_database.
     """
-    
-    def __init__(self, model_path: str = "ml_classifier.pkl"):
+
+    def __init__(self, model_path: Optional[str] = None, online: Optional[bool] = None):
+        self.online = settings.ML_ONLINE_LEARNING if online is None else online
+        if model_path is None:
+            model_path = str(settings.ML_ONLINE_MODEL_PATH) if self.online else "ml_classifier.pkl"
         self.model_path = model_path
         self.vectorizer = None
         self.model = None
         self.is_trained = False
-        
+
+        # Состояние online-режима: счётчики классов для балансировки весов и чекпоинтов
+        self._lock = threading.Lock()
+        self.class_counts = np.zeros(2, dtype=np.int64)
+        self.samples_seen = 0
+        self.bootstrapped = False  # модель прошла по всей размеченной таблице
+        self.checkpoint = 0  # номер сохранённого состояния — версия для кэшей предсказаний
+        self._unsaved_updates = 0
+
         if SKLEARN_AVAILABLE:
-            self.vectorizer = TfidfVectorizer(
-                max_features=1000,
-                ngram_range=(1, 3),  # униграммы, биграммы, триграммы
-                min_df=2
-                # stop_words='russian' # Requires additional data/handling for russian
-            )
-            self.model = LogisticRegression(class_weight='balanced', max_iter=1000)
-        
+            if self.online:
+                self._init_online_model()
+            else:
+                self.vectorizer = TfidfVectorizer(
+                    max_features=1000,
+                    ngram_range=(1, 3),  # униграммы, биграммы, триграммы
+                    min_df=2
+                    # stop_words='russian' # Requires additional data/handling for russian
+                )
+                self.model = LogisticRegression(class_weight='balanced', max_iter=1000)
+
         if os.path.exists(self.model_path):
             self.load(self.model_path)
-    
+
+    def _init_online_model(self):
+        # Хэширование не требует fit: одно и то же пространство признаков для любых будущих текстов
+        self.vectorizer = HashingVectorizer(
+            n_features=settings.ML_HASHING_FEATURES,
+            ngram_range=(1, 3),
+            alternate_sign=False,
+        )
+        self.model = SGDClassifier(loss="log_loss", alpha=1e-5, random_state=42)
+        self.class_counts = np.zeros(2, dtype=np.int64)
+        self.samples_seen = 0
+        self.is_trained = False
+
+    @property
+    def model_version(self) -> str:
+        """
+        Ключ для кэшей предсказаний. Online-модель меняет версию на чекпоинте
+        (bootstrap или каждые ML_CHECKPOINT_EVERY разметок), а не на каждой разметке.
+        """
+        return f"sgd:{self.checkpoint}" if self.online else f"tfidf:{int(self.is_trained)}"
+
+    # ---------- online-обучение ----------
+
+    def partial_fit(self, texts: Sequence[str], labels: Sequence[int], checkpoint: bool = True) -> int:
+        """
+        Дообучение на пачке размеченных текстов. Веса примеров — онлайн-аналог
+        class_weight='balanced' по накопленным счётчикам классов.
+        Возвращает число примеров, которые модель видела всего.
+        """
+        if not self.online:
+            raise RuntimeError("partial_fit доступен только в online-режиме")
+        if not SKLEARN_AVAILABLE:
+            raise ImportError("scikit-learn is not installed.")
+        if not texts:
+            return self.samples_seen
+
+        y = np.asarray(labels, dtype=np.int64)
+        X = self.vectorizer.transform(texts)
+        with self._lock:
+            counts = self.class_counts + np.bincount(y, minlength=2)
+            weights = counts.sum() / (2.0 * np.maximum(counts, 1))
+            self.model.partial_fit(X, y, classes=_CLASSES, sample_weight=weights[y])
+            self.class_counts = counts
+            self.samples_seen += len(y)
+            self._unsaved_updates += len(y)
+            self.is_trained = bool(np.all(counts > 0))
+            checkpoint_due = checkpoint and self._unsaved_updates >= settings.ML_CHECKPOINT_EVERY
+            seen = self.samples_seen
+        if checkpoint_due:
+            self.save()
+        return seen
+
+    def _iter_labeled(self, db_path: str, include_auto: bool):
+        """Размеченные строки пачками по _BOOTSTRAP_CHUNK; ручная разметка важнее статуса."""
+        conn = sqlite3.connect(db_path)
+        try:
+            condition = "manual_label IS NOT NULL"
+            if include_auto:
+                condition += " OR status IN ('accepted', 'rejected')"
+            cursor = conn.execute(f"""
+                SELECT text, COALESCE(manual_label, CASE status WHEN 'accepted' THEN 1 ELSE 0 END)
+                FROM vacancies
+                WHERE ({condition})
+                AND text IS NOT NULL
+                AND text != ''
+                ORDER BY id
+            """)
+            while True:
+                rows = cursor.fetchmany(_BOOTSTRAP_CHUNK)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    def bootstrap_from_database(self, db_path: str, include_auto: bool = True) -> Dict[str, Any]:
+        """
+        Начальное обучение online-модели одним потоковым проходом по таблице
+        (пачки через fetchmany, память — O(размер пачки)). Качество — prequential:
+        каждая пачка сначала предсказывается, потом идёт в partial_fit.
+        """
+        with self._lock:
+            self._init_online_model()
+        rng = np.random.default_rng(42)
+        total = evaluated = correct = 0
+        for rows in self._iter_labeled(db_path, include_auto):
+            # Внутри пачки перемешиваем: SGD плохо переносит длинные серии одного класса
+            order = rng.permutation(len(rows))
+            texts = [rows[i][0] for i in order]
+            labels = np.array([int(rows[i][1]) for i in order], dtype=np.int64)
+            if self.is_trained:
+                predicted = self.predict_proba_batch(texts) > 0.5
+                correct += int(np.sum(predicted == labels.astype(bool)))
+                evaluated += len(labels)
+            self.partial_fit(texts, labels, checkpoint=False)
+            total += len(labels)
+        self.bootstrapped = True
+        self.save()
+        return {
+            "train_size": total,
+            "test_size": evaluated,
+            "test_score": correct / evaluated if evaluated else None,
+            "class_counts": self.class_counts.tolist(),
+        }
+
     def train_from_database(self, db_path: str):
         """
         Обучает модель на размеченных данных из БД.
+        В online-режиме — потоковый bootstrap_from_database.
         """
         if not SKLEARN_AVAILABLE:
             raise ImportError("scikit-learn is not installed.")
-            
+        if self.online:
+            return self.bootstrap_from_database(db_path)
+
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
-        
+
         # Выбираем размеченные примеры (только те, что были одобрены или отклонены человеком/автоматикой)
         cursor.execute("""
-            SELECT text, status 
-            FROM vacancies 
+            SELECT text, status
+            FROM vacancies
             WHERE status IN ('accepted', 'rejected')
             AND text IS NOT NULL
             AND text != ''
         """)
-        
+
         data = cursor.fetchall()
         conn.close()
-        
+
         if len(data) < 50:
             raise ValueError(f"Недостаточно данных для обучения (минимум 50, сейчас {len(data)})")
-        
+
         texts = [row[0] for row in data]
         labels = [1 if row[1] == 'accepted' else 0 for row in data]
-        
+
         # Разделение на train/test
         X_train, X_test, y_train, y_test = train_test_split(
             texts, labels, test_size=0.2, random_state=42, stratify=labels
         )
-        
+
         # Векторизация
         X_train_vec = self.vectorizer.fit_transform(X_train)
         X_test_vec = self.vectorizer.transform(X_test)
-        
+
         # Обучение
         self.model.fit(X_train_vec, y_train)
-        
+
         # Оценка
         train_score = self.model.score(X_train_vec, y_train)
         test_score = self.model.score(X_test_vec, y_test)
-        
+
         self.is_trained = True
-        
+
         return {
             "train_score": train_score,
             "test_score": test_score,
             "train_size": len(X_train),
             "test_size": len(X_test)
         }
-    
-    def predict(self, text: str) -> Dict[str, Any]:
-        """
-        Предсказывает вероятность того, что это лид.
-        """
+
+    # ---------- предсказание ----------
+
+    def predict_proba_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """P(лид) для пачки текстов: одна разреженная CSR-матрица, один predict_proba."""
+        X = self.vectorizer.transform(texts)
+        with self._lock:
+            return self.model.predict_proba(X)[:, 1]
+
+    def predict_batch(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        """Пакетный predict: результаты в том же формате и порядке, что и тексты."""
         if not self.is_trained or not SKLEARN_AVAILABLE:
-            return {"is_lead": False, "confidence": 0.0, "method": "ML_NONE"}
-        
+            return [{"is_lead": False, "confidence": 0.0, "method": "ML_NONE"} for _ in texts]
+        if not texts:
+            return []
         try:
-            vec = self.vectorizer.transform([text])
-            proba = self.model.predict_proba(vec)[0]
-            
-            return {
-                "is_lead": proba[1] > 0.5,
-                "confidence": float(proba[1]),
-                "method": "ML_TFIDF"
-            }
+            probs = self.predict_proba_batch(texts)
         except Exception as e:
             print(f"ML Prediction error: {e}")
-            return {"is_lead": False, "confidence": 0.0, "method": "ML_ERROR"}
-    
+            return [{"is_lead": False, "confidence": 0.0, "method": "ML_ERROR"} for _ in texts]
+        method = "ML_SGD" if self.online else "ML_TFIDF"
+        return [{"is_lead": bool(p > 0.5), "confidence": float(p), "method": method} for p in probs]
+
+    def predict(self, text: str) -> Dict[str, Any]:
+        """
+        Предсказывает вероятность того, что это лид.
+        """
+        return self.predict_batch([text])[0]
+
+    # ---------- сохранение ----------
+
     def save(self, path: Optional[str] = None):
-        """Сохраняет модель."""
+        """Сохраняет модель (через временный файл: чекпоинт не бывает битым)."""
         if not self.is_trained:
             return
         path = path or self.model_path
-        with open(path, 'wb') as f:
-            pickle.dump({
-                'vectorizer': self.vectorizer,
-                'model': self.model,
-                'is_trained': self.is_trained
-            }, f)
-    
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with self._lock:
+            if self._unsaved_updates:
+                self.checkpoint += 1
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({
+                    'vectorizer': self.vectorizer,
+                    'model': self.model,
+                    'is_trained': self.is_trained,
+                    'online': self.online,
+                    'class_counts': self.class_counts,
+                    'samples_seen': self.samples_seen,
+                    'bootstrapped': self.bootstrapped,
+                    'checkpoint': self.checkpoint,
+                }, f)
+            self._unsaved_updates = 0
+        os.replace(tmp_path, path)
+
     def load(self, path: str):
         """Загружает модель."""
         if not os.path.exists(path):
@@ -128,11 +288,41 @@ class MLLeadClassifier:
         try:
             with open(path, 'rb') as f:
                 data = pickle.load(f)
-                self.vectorizer = data['vectorizer']
-                self.model = data['model']
-                self.is_trained = data['is_trained']
+            if data.get('online', False) != self.online:
+                print(f"ML model {path}: другой режим обучения, пропускаем")
+                return
+            self.vectorizer = data['vectorizer']
+            self.model = data['model']
+            self.is_trained = data['is_trained']
+            if self.online:
+                self.class_counts = np.asarray(data['class_counts'], dtype=np.int64)
+                self.samples_seen = data['samples_seen']
+                self.bootstrapped = data.get('bootstrapped', False)
+                self.checkpoint = data.get('checkpoint', 0)
         except Exception as e:
             print(f"Error loading ML model: {e}")
 
-# Singleton
-ml_classifier = MLLeadClassifier()
+
+async def learn_from_label(lead_id: int, text: str, is_lead: bool):
+    """
+    Label-хук VacancyDatabase: дообучает общий классификатор на новой ручной разметке.
+    До bootstrap_from_database разметка не учится — она уже в таблице, и
+    начальный проход прочитает её вместе со всеми остальными строками.
+    """
+    classifier = await asyncio.to_thread(get_ml_classifier)
+    if classifier.online and classifier.bootstrapped and SKLEARN_AVAILABLE:
+        await asyncio.to_thread(classifier.partial_fit, [text], [int(is_lead)])
+
+
+_ml_classifier = None
+_ml_classifier_lock = threading.Lock()
+
+
+def get_ml_classifier() -> MLLeadClassifier:
+    """Общий экземпляр (модель читается с диска при первом обращении)."""
+    global _ml_classifier
+    if _ml_classifier is None:
+        with _ml_classifier_lock:
+            if _ml_classifier is None:
+                _ml_classifier = MLLeadClassifier()
+    return _ml_classifier
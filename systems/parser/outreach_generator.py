@@ -5,7 +5,7 @@ Outreach Generator - генерирует персонализированные
 
 import asyncio
 import sqlite3
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from core.ai_engine.llm_client import llm_client
 from core.utils.logger import logger
 from core.config.settings import settings
@@ -186,7 +186,7 @@ SEO:
 Пиши сразу готовое сообщение для отправки в Telegram.
 """
         try:
-            draft = await llm_client.generate_response(prompt, self.SYSTEM_PROMPT)
+            draft = await llm_client.generate_response(prompt, self.SYSTEM_PROMPT, cache_namespace="outreach_draft")
             return draft
         except Exception as e:
             logger.error(f"Failed to generate outreach draft: {e}")
@@ -204,16 +204,19 @@ SEO:
         finally:
             conn.close()
 
-    async def process_new_vacancies(self):
-        """Находит вакансии без черновиков и генерирует их. Без повторной LLM-валидации — вакансия уже прошла 7-уровневый фильтр."""
+    async def process_new_vacancies(self, hashes: Optional[List[str]] = None):
+        """Находит вакансии без черновиков и генерирует их. Без повторной LLM-валидации — вакансия уже прошла 7-уровневый фильтр.
+        hashes — только эти вакансии (из событий change feed), иначе последние 50 без черновика."""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        cursor.execute("""
+        selection = "ORDER BY last_seen DESC LIMIT 50"
+        if hashes:
+            selection = f"AND hash IN ({','.join('?' * len(hashes))}) ORDER BY last_seen DESC"
+        cursor.execute(f"""
             SELECT hash, text, direction, source, last_seen, message_id, tier, priority
             FROM vacancies
-            WHERE status = 'accepted' AND (draft_response IS NULL OR draft_response = '')
-            ORDER BY last_seen DESC LIMIT 50
-        """)
+            WHERE status = 'accepted' AND (draft_response IS NULL OR draft_response = '') {selection}
+        """, hashes or ())
         pending = cursor.fetchall()
         conn.close()
 
@@ -261,6 +264,30 @@ SEO:
 
         return count
 
+    async def run_draft_worker(self):
+        """
+        Черновики по событиям change feed: новая принятая вакансия получает
+        черновик сразу после вставки, без опроса таблицы. При старте — один
+        проход по накопившимся вакансиям без черновика.
+        """
+        from systems.parser.change_feed import VACANCY_ACCEPTED
+        from systems.parser.vacancy_db import VacancyDatabase
+
+        db = VacancyDatabase(self.db_path)
+        await db.init_db()
+        events = await db.change_feed.subscribe({VACANCY_ACCEPTED}, consumer="outreach_drafts")
+        await self.process_new_vacancies()
+
+        async for event in events:
+            batch = [event] + events.drain()
+            try:
+                count = await self.process_new_vacancies([e.hash for e in batch if e.hash])
+                if count:
+                    logger.info(f"🎨 Подготовлено {count} новых черновиков.")
+            except Exception as e:
+                logger.error(f"Draft worker error: {e}")
+            await events.ack(batch[-1])
+
 
 # Singleton
 outreach_generator = OutreachGenerator()
@@ -0,0 +1,267 @@
+"""
+Скомпилированный мульти-паттерн матчер для правил фильтрации.
+
+Наборы правил (категория → keywords / patterns / weight) компилируются один раз:
+- все литеральные ключевые слова всех категорий — в один автомат Aho-Corasick
+  (pyahocorasick), который за один проход по тексту находит все вхождения;
+  без pyahocorasick — объединённая альтернация ключей на категорию как фильтр;
+- regex-паттерны каждой категории — в одну объединённую альтернацию, которая
+  служит быстрым фильтром: если она не сработала, ни один паттерн категории
+  не совпадёт, и поштучная проверка не нужна.
+
+Пересборка атомарна: новый снапшот строится целиком и подменяет старый одним
+присваиванием, так что параллельные match() видят либо старые, либо новые правила.
+"""
+
+import re
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import ahocorasick
+    PYAHOCORASICK_AVAILABLE = True
+except ImportError:
+    PYAHOCORASICK_AVAILABLE = False
+
+
+# ==========================================
+# AHO-CORASICK
+# ==========================================
+
+class KeywordAutomaton:
+    """
+    Автомат Aho-Corasick (pyahocorasick) над списком строк. find_ids() за один
+    проход возвращает индексы всех ключей, входящих в текст как подстрока,
+    включая перекрывающиеся и повторяющиеся в списке.
+    """
+
+    def __init__(self, keywords: Sequence[str]):
+        self._automaton = None
+        grouped: Dict[str, List[int]] = {}
+        for idx, kw in enumerate(keywords):
+            if kw:
+                grouped.setdefault(kw, []).append(idx)
+        if grouped:
+            automaton = ahocorasick.Automaton()
+            for kw, ids in grouped.items():
+                automaton.add_word(kw, tuple(ids))
+            automaton.make_automaton()
+            self._automaton = automaton
+
+    def find_ids(self, text: str) -> Set[int]:
+        found: Set[int] = set()
+        if self._automaton is not None:
+            for _, ids in self._automaton.iter(text):
+                found.update(ids)
+        return found
+
+
+# ==========================================
+# СНАПШОТ ПРАВИЛ
+# ==========================================
+
+_MEMO_SIZE = 8
+_GLOBAL_FLAGS_RE = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+def _scoped(pattern: str) -> str:
+    """'(?i)foo' → '(?i:foo)': глобальные inline-флаги нельзя ставить внутри альтернации."""
+    match = _GLOBAL_FLAGS_RE.match(pattern)
+    if match:
+        return f"(?{match.group(1)}:{pattern[match.end():]})"
+    return f"(?:{pattern})"
+
+
+@dataclass
+class RuleHit:
+    """Сработавшее правило."""
+    category: str
+    rule: str
+    kind: str          # "keyword" | "pattern"
+    weight: float
+    count: int = 1     # для паттернов — число непересекающихся совпадений (как re.findall)
+    order: int = 0     # позиция правила в своей категории
+
+
+@dataclass
+class _CategoryRules:
+    name: str
+    weight: float
+    keywords: List[str]
+    patterns: List[str]
+    compiled: List[re.Pattern]
+    gate: Optional[re.Pattern]
+    keyword_gate: Optional[re.Pattern] = None
+
+
+@dataclass
+class _CompiledRules:
+    version: int
+    categories: Dict[str, _CategoryRules]
+    automaton: Optional[KeywordAutomaton]
+    keyword_owner: List[tuple] = field(default_factory=list)  # global id -> (category, local idx)
+
+
+class RuleMatcher:
+    """
+    Матчер над динамическим набором правил.
+
+    source() возвращает {category: {"keywords": [...], "patterns": [...], "weight": w}};
+    вызывается при каждой пересборке, поэтому правила можно менять на лету
+    (стоп-лист Гвен, dynamic_filters.json) и звать rebuild() / rebuild_all().
+    Keywords — подстроки с учётом регистра (как `kw in text`), flags применяются к patterns.
+    """
+
+    def __init__(self, source: Callable[[], Dict[str, Dict]], name: str = "rules", flags: int = 0):
+        self.source = source
+        self.name = name
+        self.flags = flags
+        self._build_lock = threading.Lock()
+        self._compiled: Optional[_CompiledRules] = None
+        self._memo: Dict[tuple, List[RuleHit]] = {}
+        _registry.add(self)
+
+    # ---------- сборка ----------
+
+    def _compile(self, version: int) -> _CompiledRules:
+        categories: Dict[str, _CategoryRules] = {}
+        all_keywords: List[str] = []
+        owners: List[tuple] = []
+
+        for name, spec in self.source().items():
+            keywords = list(spec.get("keywords", []))
+            patterns = []
+            compiled = []
+            for pattern in spec.get("patterns", []):
+                try:
+                    compiled.append(re.compile(pattern, self.flags))
+                    patterns.append(pattern)
+                except re.error as e:
+                    logger.warning("rule_pattern_invalid", matcher=self.name, pattern=pattern, error=str(e))
+
+            gate = None
+            if patterns:
+                try:
+                    gate = re.compile("|".join(_scoped(p) for p in patterns), self.flags)
+                except re.error:
+                    gate = None  # редкий случай (обратные ссылки и т.п.) — проверяем поштучно
+
+            keyword_gate = None
+            if keywords and not PYAHOCORASICK_AVAILABLE:
+                alternatives = sorted({re.escape(kw) for kw in keywords}, key=len, reverse=True)
+                keyword_gate = re.compile("|".join(alternatives), self.flags)
+
+            categories[name] = _CategoryRules(
+                name=name,
+                weight=spec.get("weight", 0),
+                keywords=keywords,
+                patterns=patterns,
+                compiled=compiled,
+                gate=gate,
+                keyword_gate=keyword_gate,
+            )
+            for local_idx, kw in enumerate(keywords):
+                all_keywords.append(kw)
+                owners.append((name, local_idx))
+
+        return _CompiledRules(
+            version=version,
+            categories=categories,
+            automaton=KeywordAutomaton(all_keywords) if PYAHOCORASICK_AVAILABLE else None,
+            keyword_owner=owners,
+        )
+
+    def rebuild(self):
+        """Пересобирает правила из source() и атомарно подменяет снапшот."""
+        with self._build_lock:
+            version = (self._compiled.version + 1) if self._compiled else 1
+            compiled = self._compile(version)
+            self._compiled = compiled
+            self._memo = {}
+        logger.debug("rule_matcher_rebuilt", matcher=self.name, version=version)
+
+    @property
+    def compiled(self) -> _CompiledRules:
+        compiled = self._compiled
+        if compiled is None:
+            self.rebuild()
+            compiled = self._compiled
+        return compiled
+
+    # ---------- матчинг ----------
+
+    def match(self, text: str, categories: Optional[Sequence[str]] = None) -> List[RuleHit]:
+        """
+        Все сработавшие правила в порядке (категория, позиция правила).
+        Keywords — один проход автомата по тексту; паттерны категории проверяются
+        поштучно только если сработала объединённая альтернация.
+        """
+        compiled = self.compiled
+        # Один и тот же текст матчится подряд несколькими уровнями фильтра —
+        # держим результаты последних нескольких вызовов
+        memo_key = (compiled.version, text, tuple(categories) if categories is not None else None)
+        memo = self._memo
+        cached = memo.get(memo_key)
+        if cached is not None:
+            return cached
+
+        by_category: Dict[str, List[int]] = {}
+        if compiled.automaton is not None:
+            for gid in compiled.automaton.find_ids(text):
+                category, local_idx = compiled.keyword_owner[gid]
+                by_category.setdefault(category, []).append(local_idx)
+
+        hits: List[RuleHit] = []
+        names = categories if categories is not None else compiled.categories.keys()
+        for name in names:
+            rules = compiled.categories.get(name)
+            if rules is None:
+                continue
+            if rules.compiled and (rules.gate is None or rules.gate.search(text)):
+                for order, (pattern, regex) in enumerate(zip(rules.patterns, rules.compiled)):
+                    count = len(regex.findall(text))
+                    if count:
+                        hits.append(RuleHit(name, pattern, "pattern", rules.weight, count, order))
+            if rules.keyword_gate is not None and rules.keyword_gate.search(text):
+                by_category[name] = [i for i, kw in enumerate(rules.keywords) if kw in text]
+            for local_idx in sorted(by_category.get(name, ())):
+                hits.append(RuleHit(name, rules.keywords[local_idx], "keyword", rules.weight, 1, local_idx))
+
+        if len(memo) >= _MEMO_SIZE:
+            memo.clear()
+        memo[memo_key] = hits
+        return hits
+
+    def first_hit(self, text: str, category: str) -> Optional[RuleHit]:
+        """Первое (по порядку в списке) сработавшее правило категории."""
+        compiled = self.compiled
+        rules = compiled.categories.get(category)
+        if rules is None:
+            return None
+        if rules.compiled and (rules.gate is None or rules.gate.search(text)):
+            for order, (pattern, regex) in enumerate(zip(rules.patterns, rules.compiled)):
+                if regex.search(text):
+                    return RuleHit(category, pattern, "pattern", rules.weight, 1, order)
+        if rules.keywords:
+            for hit in self.match(text):
+                if hit.category == category and hit.kind == "keyword":
+                    return hit
+        return None
+
+
+_registry: "weakref.WeakSet[RuleMatcher]" = weakref.WeakSet()
+
+
+def rebuild_all():
+    """Пересобирает все живые матчеры процесса (после изменения стоп-листов/фильтров)."""
+    for matcher in list(_registry):
+        try:
+            matcher.rebuild()
+        except Exception as e:
+            logger.error("rule_matcher_rebuild_failed", matcher=matcher.name, error=str(e))
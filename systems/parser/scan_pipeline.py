@@ -0,0 +1,186 @@
+"""
+Стадийный конвейер сканирования чатов (today_parser).
+
+    fetch (N чатов параллельно) → cpu (скоринг в пуле) → db (пачками) → outreach
+
+Стадии связаны ограниченными asyncio.Queue: медленная стадия притормаживает
+предыдущие (back-pressure), а не копит сообщения в памяти. Запросы к Telegram
+идут через общий FloodWaitLimiter — FloodWait в одном чате ставит на паузу
+все fetch-воркеры, вместо того чтобы остальные чаты продолжали упираться в лимит.
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class FloodWaitLimiter:
+    """
+    Общий лимитер запросов аккаунта: минимальный интервал между запросами
+    и глобальная пауза после FloodWait (с запасом в несколько секунд).
+    """
+
+    def __init__(self, min_interval: float = 0.25, flood_margin: float = 3.0):
+        self.min_interval = min_interval
+        self.flood_margin = flood_margin
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self.flood_waits = 0
+        self.requests = 0
+
+    @property
+    def paused_for(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            wait = max(self._paused_until, self._next_slot) - now
+            if wait <= 0:
+                # Слот резервируется без await между проверкой и записью — гонки нет
+                self._next_slot = now + self.min_interval
+                self.requests += 1
+                return
+            await asyncio.sleep(wait)
+
+    def report_flood_wait(self, seconds: float):
+        until = time.monotonic() + seconds + self.flood_margin
+        self.flood_waits += 1
+        if until > self._paused_until:
+            self._paused_until = until
+            logger.warning("flood_wait_pause", seconds=seconds, paused_for=round(self.paused_for, 1))
+
+
+class StageMetrics:
+    """Счётчики одной стадии: обработано, ошибки, время работы, глубина входной очереди."""
+
+    def __init__(self, name: str, queue: Optional[asyncio.Queue] = None):
+        self.name = name
+        self.queue = queue
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.started_at = time.monotonic()
+
+    def observe_queue(self):
+        if self.queue is not None:
+            self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+
+    @contextmanager
+    def track(self, items: int = 1):
+        self.observe_queue()
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors += items
+            raise
+        else:
+            self.processed += items
+        finally:
+            self.busy_seconds += time.perf_counter() - start
+
+    def snapshot(self) -> Dict:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "throughput_per_sec": round(self.processed / elapsed, 2),
+            "busy_seconds": round(self.busy_seconds, 2),
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class PipelineMetrics:
+    """Метрики всех стадий конвейера + периодический вывод в лог."""
+
+    def __init__(self):
+        self.stages: Dict[str, StageMetrics] = {}
+        self.started_at = time.monotonic()
+
+    def stage(self, name: str, queue: Optional[asyncio.Queue] = None) -> StageMetrics:
+        metrics = StageMetrics(name, queue)
+        self.stages[name] = metrics
+        return metrics
+
+    def snapshot(self) -> Dict:
+        return {
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 2),
+            "stages": {name: stage.snapshot() for name, stage in self.stages.items()},
+        }
+
+    def format(self) -> str:
+        parts = []
+        for name, s in self.snapshot()["stages"].items():
+            parts.append(
+                f"{name}: {s['processed']} ({s['throughput_per_sec']}/s, "
+                f"q={s['queue_depth']}/max {s['max_queue_depth']}, err={s['errors']})"
+            )
+        return " | ".join(parts)
+
+    async def report_periodically(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            for stage in self.stages.values():
+                stage.observe_queue()
+            logger.info("scan_pipeline_progress", **{
+                f"{name}_{key}": value
+                for name, s in self.snapshot()["stages"].items()
+                for key, value in s.items() if key in ("processed", "queue_depth")
+            })
+
+
+# ==========================================
+# CPU-СТАДИЯ: скоринг сообщения
+# ==========================================
+
+def analyze_payload(scorer, contact_extractor, niche_detector, payload: Dict) -> Dict:
+    """
+    Чистая функция скоринга: VacancyScorer + (для вакансий) ContactExtractor и
+    NicheDetector. Дедупликация VacancyScorer выполняется до отправки в пул,
+    в event loop — порядок и состояние дедупликатора не зависят от числа воркеров.
+    """
+    text = payload["text"]
+    analysis = scorer.analyze_message(text, payload["date"], check_duplicate=False)
+    result = {"analysis": analysis}
+    if analysis["is_vacancy"]:
+        result["contact"] = contact_extractor.extract_contact({
+            "text": text,
+            "buttons": payload["buttons_text"],
+            "sender_id": payload["sender_id"] if payload["sender_is_user"] else None,
+            "fwd_from": payload["fwd_from"],
+            "sender_username": payload["sender_username"],
+        })
+        result["niche"] = niche_detector.detect_niche(text)
+    return result
+
+
+_worker_components = None
+
+
+def _init_process_worker():
+    """Инициализатор процесса пула: свои экземпляры анализаторов (динамические фильтры читаются при старте)."""
+    global _worker_components
+    from systems.parser.vacancy_analyzer import ContactExtractor, NicheDetector, VacancyScorer
+    _worker_components = (VacancyScorer(), ContactExtractor(), NicheDetector())
+
+
+def analyze_in_process(payload: Dict) -> Dict:
+    return analyze_payload(*_worker_components, payload)
+
+
+def create_cpu_executor(kind: str, workers: int) -> Executor:
+    """thread — общие анализаторы парсера; process — по копии в каждом процессе."""
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_process_worker)
+    if kind != "thread":
+        logger.warning("unknown_cpu_executor", kind=kind, fallback="thread")
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan-cpu")
@@ -0,0 +1,422 @@
+"""
+Двухуровневый индекс «уже видели» перед VacancyDatabase.is_processed.
+
+1. Bloom-фильтр по нормализованным hash вакансий (сохраняется на диск рядом
+   с БД). Отрицательный ответ — гарантированно новая вакансия, запрос в БД не
+   нужен; положительный подтверждается точным lookup по hash.
+2. MinHash/LSH по символьным 3-шинглам принятых вакансий за окно find_similar.
+   Кандидаты на near-duplicate достаются за O(bands), точный Жаккар считается
+   только для них — вместо прохода по всем строкам окна.
+
+Изменения из других процессов догружаются инкрементально (по id и last_seen)
+не чаще раза в SEEN_INDEX_SYNC_SECONDS.
+"""
+
+import asyncio
+import math
+import os
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from core.config.settings import settings
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def shingles(text: str, k: int = 3) -> Set[str]:
+    """Символьные k-шинглы по буквам/цифрам/пробелам (как в VacancyDatabase._get_similarity)."""
+    clean = "".join(char for char in text.lower() if char.isalnum() or char.isspace())
+    return set(clean[i:i + k] for i in range(len(clean) - k + 1))
+
+
+def jaccard(set1: Set[str], set2: Set[str]) -> float:
+    if not set1 or not set2:
+        return 0.0
+    return len(set1 & set2) / len(set1 | set2)
+
+
+# ==========================================
+# BLOOM FILTER
+# ==========================================
+
+class BloomFilter:
+    """
+    Bloom-фильтр над hex-хешами (md5). Индексы битов — double hashing по двум
+    64-битным половинам дайджеста, так что повторно хешировать строку не нужно.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, hex_digest: str) -> Iterable[int]:
+        value = int(hex_digest[:32], 16)
+        h1 = value >> 64
+        h2 = (value & 0xFFFFFFFFFFFFFFFF) | 1
+        m = self.num_bits
+        return ((h1 + i * h2) % m for i in range(self.num_hashes))
+
+    def add(self, hex_digest: str):
+        bits = self.bits
+        for pos in self._positions(hex_digest):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, hex_digest: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(hex_digest))
+
+    @property
+    def expected_fp_rate(self) -> float:
+        """Теоретическая вероятность ложного срабатывания при текущем заполнении."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def save(self, path: Path, max_id: int):
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, bits=np.frombuffer(self.bits, dtype=np.uint8), meta=np.array(
+                [self.capacity, self.num_hashes, self.count, max_id], dtype=np.int64
+            ), error_rate=np.array([self.error_rate]))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, capacity: int, error_rate: float):
+        """Возвращает (filter, max_id) или None, если файла нет или параметры не совпадают."""
+        try:
+            with np.load(path) as data:
+                saved_capacity, num_hashes, count, max_id = (int(x) for x in data["meta"])
+                saved_error_rate = float(data["error_rate"][0])
+                bits = data["bits"]
+        except (OSError, KeyError, ValueError) as e:
+            if path.exists():
+                logger.warning("bloom_load_failed", path=str(path), error=str(e))
+            return None
+        bloom = cls(capacity, error_rate)
+        if (saved_capacity, saved_error_rate) != (capacity, error_rate) or bits.size != len(bloom.bits):
+            return None
+        bloom.bits = bytearray(bits.tobytes())
+        bloom.num_hashes = num_hashes
+        bloom.count = count
+        return bloom, max_id
+
+
+# ==========================================
+# MINHASH / LSH
+# ==========================================
+
+_MERSENNE_PRIME = np.uint64(4294967311)  # простое > 2^32: a*x + b не переполняет uint64
+
+
+class MinHashLSH:
+    """
+    MinHash-сигнатуры (num_perm перестановок) + LSH по bands полосам.
+    При 32×4 вероятность стать кандидатом для пары с Жаккаром 0.7 — >99.9%,
+    с Жаккаром 0.3 — ~23%: кандидаты затем проверяются точным Жаккаром.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, Set[int]]] = [{} for _ in range(bands)]
+        self._keys: Dict[int, List[bytes]] = {}
+
+    def signature(self, shingle_set: Set[str]) -> Optional[np.ndarray]:
+        if not shingle_set:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingle_set), dtype=np.uint64, count=len(shingle_set)
+        )
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [band.tobytes() for band in signature.reshape(self.bands, self.rows)]
+
+    def add(self, key: int, signature: np.ndarray):
+        self.remove(key)
+        band_keys = self._band_keys(signature)
+        for bucket, band_key in zip(self._buckets, band_keys):
+            bucket.setdefault(band_key, set()).add(key)
+        self._keys[key] = band_keys
+
+    def remove(self, key: int):
+        band_keys = self._keys.pop(key, None)
+        if band_keys is None:
+            return
+        for bucket, band_key in zip(self._buckets, band_keys):
+            members = bucket.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del bucket[band_key]
+
+    def query(self, signature: np.ndarray) -> Set[int]:
+        candidates: Set[int] = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket.get(band_key)
+            if members:
+                candidates |= members
+        return candidates
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+# ==========================================
+# SEEN INDEX
+# ==========================================
+
+@dataclass
+class _Entry:
+    id: int
+    text: str
+    source: str
+    last_seen: str
+    shingles: Set[str]
+
+
+class SeenIndex:
+    """
+    Индекс для одного файла vacancies.db. Загружается лениво (ensure_loaded),
+    обновляется напрямую из VacancyDatabase при записи и синхронизируется
+    с базой по id/last_seen для записей из других процессов.
+    """
+
+    def __init__(self, db_path: str, window_days: int = 3):
+        self.db_path = db_path
+        self.window_days = window_days
+        self.persist_path = None if db_path == ":memory:" else Path(db_path + ".bloom.npz")
+        self.bloom: Optional[BloomFilter] = None
+        self.lsh = MinHashLSH()
+        self._entries: Dict[int, _Entry] = {}
+        self._max_id = 0
+        self._synced_at = 0.0
+        self._sync_mark = ""  # last_seen, с которого догружаем изменения
+        self._saved_at = 0.0
+        self._dirty = False
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop = None
+        self.stats = {
+            "bloom_negative": 0,
+            "bloom_positive": 0,
+            "bloom_false_positive": 0,
+            "lsh_queries": 0,
+            "lsh_candidates": 0,
+        }
+
+    @property
+    def loaded(self) -> bool:
+        return self.bloom is not None
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _window_cutoff(self) -> str:
+        return (datetime.now() - timedelta(days=self.window_days)).isoformat()
+
+    # ---------- загрузка и синхронизация ----------
+
+    async def ensure_loaded(self, pool):
+        """Первичная загрузка (Bloom с диска или из БД) и периодическая догрузка изменений."""
+        if self.loaded and time.monotonic() - self._synced_at < settings.SEEN_INDEX_SYNC_SECONDS:
+            return
+        async with self._get_lock():
+            if not self.loaded:
+                await self._load(pool)
+            elif time.monotonic() - self._synced_at >= settings.SEEN_INDEX_SYNC_SECONDS:
+                await self._sync(pool)
+
+    async def _load(self, pool):
+        start = time.perf_counter()
+        capacity, error_rate = settings.SEEN_BLOOM_CAPACITY, settings.SEEN_BLOOM_ERROR_RATE
+        loaded = None
+        if self.persist_path is not None:
+            loaded = await asyncio.to_thread(BloomFilter.load, self.persist_path, capacity, error_rate)
+
+        if loaded is not None:
+            bloom, max_id = loaded
+        else:
+            bloom, max_id = BloomFilter(capacity, error_rate), 0
+        # Догружаем хеши, появившиеся после сохранения (или все, если файла не было)
+        async with pool.reader() as db:
+            async with db.execute("SELECT id, hash FROM vacancies WHERE id > ?", (max_id,)) as cursor:
+                rows = await cursor.fetchall()
+        for row_id, vacancy_hash in rows:
+            bloom.add(vacancy_hash)
+            max_id = max(max_id, row_id)
+
+        if bloom.count > capacity:
+            logger.warning("seen_bloom_over_capacity", count=bloom.count, capacity=capacity,
+                           expected_fp_rate=round(bloom.expected_fp_rate, 4))
+
+        self._sync_mark = self._window_cutoff()
+        async with pool.reader() as db:
+            async with db.execute("""
+                SELECT id, text, source, last_seen FROM vacancies
+                WHERE status = 'accepted' AND last_seen > ?
+            """, (self._sync_mark,)) as cursor:
+                window_rows = await cursor.fetchall()
+        self._sync_mark = datetime.now().isoformat()
+        for row in window_rows:
+            self._put_entry(*row)
+
+        self.bloom = bloom
+        self._max_id = max_id
+        self._synced_at = time.monotonic()
+        self._dirty = bool(rows)
+        await self.save()
+        logger.info("seen_index_loaded", from_disk=loaded is not None, hashes=bloom.count,
+                    catch_up=len(rows), lsh=len(self.lsh),
+                    duration_ms=int((time.perf_counter() - start) * 1000))
+
+    async def _sync(self, pool):
+        """Строки из других процессов: новые id и свежие last_seen."""
+        mark = datetime.now().isoformat()
+        async with pool.reader() as db:
+            async with db.execute("""
+                SELECT id, hash, status, text, source, last_seen FROM vacancies
+                WHERE id > ? OR last_seen > ?
+            """, (self._max_id, self._sync_mark)) as cursor:
+                rows = await cursor.fetchall()
+        for row_id, vacancy_hash, status, text, source, last_seen in rows:
+            if row_id > self._max_id:
+                if vacancy_hash not in self.bloom:
+                    self.bloom.add(vacancy_hash)
+                    self._dirty = True
+                self._max_id = row_id
+            if status == "accepted":
+                self._put_entry(row_id, text, source, last_seen)
+        self._sync_mark = mark
+        self._evict()
+        self._synced_at = time.monotonic()
+        if self._dirty and time.monotonic() - self._saved_at > settings.SEEN_INDEX_SAVE_SECONDS:
+            await self.save()
+
+    async def save(self):
+        if self.persist_path is None or self.bloom is None or not self._dirty:
+            return
+        try:
+            await asyncio.to_thread(self.bloom.save, self.persist_path, self._max_id)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        except OSError as e:
+            logger.warning("bloom_save_failed", path=str(self.persist_path), error=str(e))
+
+    # ---------- обновление из VacancyDatabase ----------
+
+    def _put_entry(self, row_id: int, text: str, source: str, last_seen: str):
+        if last_seen <= self._window_cutoff():
+            return
+        entry = self._entries.get(row_id)
+        if entry is not None:
+            entry.last_seen = max(entry.last_seen, last_seen)
+            return
+        shingle_set = shingles(text)
+        signature = self.lsh.signature(shingle_set)
+        if signature is None:
+            return
+        self._entries[row_id] = _Entry(row_id, text, source, last_seen, shingle_set)
+        self.lsh.add(row_id, signature)
+
+    def _evict(self):
+        cutoff = self._window_cutoff()
+        for row_id in [rid for rid, e in self._entries.items() if e.last_seen <= cutoff]:
+            del self._entries[row_id]
+            self.lsh.remove(row_id)
+
+    def record_insert(self, row_id: int, vacancy_hash: str, status: str, text: str, source: str, last_seen: str):
+        """
+        Новая строка, записанная этим процессом. _max_id не двигаем: строки других
+        процессов с меньшими id должны догрузиться при _sync.
+        """
+        if not self.loaded:
+            return
+        if vacancy_hash not in self.bloom:
+            self.bloom.add(vacancy_hash)
+            self._dirty = True
+        if status == "accepted":
+            self._put_entry(row_id, text, source, last_seen)
+
+    # ---------- запросы ----------
+
+    def might_contain(self, vacancy_hash: str) -> bool:
+        if vacancy_hash in self.bloom:
+            self.stats["bloom_positive"] += 1
+            return True
+        self.stats["bloom_negative"] += 1
+        return False
+
+    def record_false_positive(self):
+        self.stats["bloom_false_positive"] += 1
+
+    def covers(self, days: int) -> bool:
+        return self.loaded and days <= self.window_days
+
+    def find_similar(self, text: str, threshold: float, cutoff: str) -> Optional[Dict]:
+        """Первая (по id) принятая вакансия новее cutoff с Жаккаром ≥ threshold."""
+        shingle_set = shingles(text)
+        signature = self.lsh.signature(shingle_set)
+        self.stats["lsh_queries"] += 1
+        if signature is None:
+            return None
+        candidates = self.lsh.query(signature)
+        self.stats["lsh_candidates"] += len(candidates)
+        for row_id in sorted(candidates):
+            entry = self._entries.get(row_id)
+            if entry is None or entry.last_seen <= cutoff:
+                continue
+            similarity = jaccard(shingle_set, entry.shingles)
+            if similarity >= threshold:
+                return {
+                    'id': entry.id,
+                    'text': entry.text,
+                    'last_seen': entry.last_seen,
+                    'source': entry.source,
+                    'similarity': similarity
+                }
+        return None
+
+    def get_stats(self) -> Dict:
+        checked = self.stats["bloom_positive"] + self.stats["bloom_negative"]
+        absent = self.stats["bloom_negative"] + self.stats["bloom_false_positive"]
+        return {
+            **self.stats,
+            "hashes": self.bloom.count if self.bloom else 0,
+            "lsh_entries": len(self.lsh),
+            "observed_fp_rate": self.stats["bloom_false_positive"] / absent if absent else 0.0,
+            "expected_fp_rate": self.bloom.expected_fp_rate if self.bloom else 0.0,
+            "lookups": checked,
+        }
+
+
+_indexes: Dict[str, SeenIndex] = {}
+
+
+def get_seen_index(db_path: str) -> SeenIndex:
+    """Общий индекс на файл БД для всего процесса."""
+    index = _indexes.get(db_path)
+    if index is None:
+        index = SeenIndex(db_path)
+        _indexes[db_path] = index
+    return index
@@ -1,20 +1,24 @@
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Any, Optional
+from core.ai_engine.model_registry import model_registry
 from core.config.settings import settings
 
 class SemanticDuplicateDetector:
     """
     Детектор дубликатов на основе Sentence Embeddings и косинусного сходства.
     """
-    def __init__(self, model_name: str = "cointegrated/rubert-tiny"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name or settings.ENCODER_MODEL
         self.threshold = 0.75  # ТЗ: 0.75
 
     def get_embedding(self, text: str) -> np.ndarray:
         """Генерирует эмбеддинг для текста."""
         return self.model.encode(text)
 
+    @property
+    def model(self):
+        return model_registry.sentence_encoder(self.model_name)
+
     def calculate_similarity(self, emb1: np.ndarray, emb2: np.ndarray) -> float:
         """Вычисляет косинусное сходство между двумя векторами."""
         norm1 = np.linalg.norm(emb1)
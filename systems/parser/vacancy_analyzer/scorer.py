@@ -7,6 +7,8 @@ import hashlib
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta, timezone
 
+from systems.parser.rule_matcher import RuleMatcher
+
 
 class MessageDeduplicator:
     """Fix 10: Дедупликация сообщений по нормализованному тексту"""
@@ -418,7 +420,6 @@ class VacancyScorer:
 
     def __init__(self):
         from core.config.settings import settings
-        import json
         import os
         self.all_specializations = {**self.SPECIALIZATIONS, **self.SPECIALIZATIONS_MEDIUM}
         self.target_keywords = [k.strip().lower() for k in settings.TARGET_KEYWORDS.split(",") if k.strip()]
@@ -426,22 +427,41 @@ class VacancyScorer:
         
         # Загрузка динамических фильтров
         self.dynamic_filters = {"positive": [], "negative": []}
-        dynamic_path = os.path.join(os.path.dirname(__file__), "../../../core/config/dynamic_filters.json")
-        if os.path.exists(dynamic_path):
+        self._dynamic_path = os.path.join(os.path.dirname(__file__), "../../../core/config/dynamic_filters.json")
+        self._load_dynamic_filters()
+
+        # Ключевые слова, стоп-паттерны и выученные Гвен фильтры — в одном скомпилированном
+        # матчере; пересобирается через rule_matcher.rebuild_all() после обновления фильтров
+        self._rules = RuleMatcher(self._rules_source, name="vacancy_scorer", flags=re.IGNORECASE)
+
+    def _load_dynamic_filters(self):
+        import json
+        import os
+        if os.path.exists(self._dynamic_path):
             try:
-                with open(dynamic_path, 'r', encoding='utf-8') as f:
+                with open(self._dynamic_path, 'r', encoding='utf-8') as f:
                     self.dynamic_filters = json.load(f)
             except Exception as e:
                 print(f"Error loading dynamic filters: {e}")
+
+    def _rules_source(self) -> Dict[str, Dict]:
+        self._load_dynamic_filters()
+        return {
+            "target": {"patterns": [rf"\b{re.escape(kw)}\b" for kw in self.target_keywords]},
+            "positive": {"patterns": self.dynamic_filters.get("positive", [])},
+            "spam": {"patterns": self.SPAM_PATTERNS},
+            "negative": {"patterns": self.dynamic_filters.get("negative", [])},
+        }
     
-    def analyze_message(self, text: str, message_date: datetime = None) -> Dict:
+    def analyze_message(self, text: str, message_date: datetime = None, check_duplicate: bool = True) -> Dict:
         """
         Метод анализа сообщения. Теперь ищет и вакансии, и лиды по ключевым словам.
+        check_duplicate=False — дедупликация уже сделана вызывающим (конвейер today_parser).
         """
         text_lower = text.lower()
         
         # Fix 10: Дедупликация
-        if self.deduplicator.is_duplicate(text, message_date):
+        if check_duplicate and self.deduplicator.is_duplicate(text, message_date):
             return self._negative_result("Дубликат")
         
         # 0. Проверка на спам (эфиры, курсы, промо) - ПЕРВООЧЕРЕДНО
@@ -557,14 +577,14 @@ class VacancyScorer:
     def _check_target_keywords(self, text: str) -> Optional[str]:
         """Точная проверка по вашему списку ключевых слов из настроек + динамические позитивы."""
         # 1. Из settings.TARGET_KEYWORDS
-        for kw in self.target_keywords:
-            if re.search(rf"\b{re.escape(kw)}\b", text, re.IGNORECASE):
-                return kw
+        hit = self._rules.first_hit(text, "target")
+        if hit:
+            return self.target_keywords[hit.order]
                 
         # 2. Динамически выученные позитивы
-        for pattern in self.dynamic_filters.get("positive", []):
-            if re.search(pattern, text, re.IGNORECASE):
-                return pattern
+        hit = self._rules.first_hit(text, "positive")
+        if hit:
+            return hit.rule
                 
         return None
     def _detect_vacancy_indicators(self, text: str) -> int:
@@ -615,14 +635,12 @@ class VacancyScorer:
     def _is_spam(self, text: str) -> bool:
         """Проверка на рекламный/промо контент + динамические негативы."""
         # 1. Жесткие паттерны в коде
-        for pattern in self.SPAM_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
+        if self._rules.first_hit(text, "spam"):
+            return True
         
         # 2. Обученные негативы от Гвен
-        for pattern in self.dynamic_filters.get("negative", []):
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
+        if self._rules.first_hit(text, "negative"):
+            return True
                 
         return False
 
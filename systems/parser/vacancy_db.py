@@ -1,8 +1,9 @@
 import aiosqlite
+import asyncio
 import hashlib
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Tuple, Any
-import pandas as pd
+from typing import Optional, Dict, List, Tuple, Any, Callable, Awaitable, TYPE_CHECKING
 from dataclasses import dataclass
 import os
 import sys
@@ -11,6 +12,90 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 from core.config.settings import settings
+from core.database.sqlite_pool import get_pool
+from systems.parser.change_feed import get_change_feed, install_outbox
+from systems.parser.seen_index import get_seen_index, jaccard, shingles
+from core.utils.structured_logger import get_logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = get_logger(__name__)
+
+
+def _parse_timestamp(value: Optional[str]) -> float:
+    """ISO-дата из БД → unix timestamp (0.0 для мусора)."""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except Exception:
+        return 0.0
+
+
+# Колонки, добавленные после первой версии схемы: старые базы догоняем ALTER TABLE
+_MIGRATION_COLUMNS = {
+    "message_id": "INTEGER",
+    "chat_id": "INTEGER",
+    "tier": "TEXT",
+    "priority": "INTEGER DEFAULT 0",
+}
+
+
+async def _init_schema(db: aiosqlite.Connection):
+    """Создание таблицы и индексов (выполняется пулом один раз при открытии)."""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS vacancies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash TEXT UNIQUE NOT NULL,
+            status TEXT NOT NULL,
+            text TEXT NOT NULL,
+            source TEXT NOT NULL,
+            direction TEXT,
+            contact_link TEXT,
+            response TEXT,
+            draft_response TEXT,
+            rejection_reason TEXT,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL,
+            informativeness_score REAL DEFAULT 0.0,
+            needs_review INTEGER DEFAULT 0,
+            manual_label INTEGER,
+            labeled_by TEXT,
+            labeled_at TEXT,
+            embedding BLOB,
+            is_deleted INTEGER DEFAULT 0,
+            deleted_at TEXT,
+            message_id INTEGER,
+            chat_id INTEGER,
+            tier TEXT,
+            priority INTEGER DEFAULT 0
+        )
+    """)
+
+    async with db.execute("PRAGMA table_info(vacancies)") as cursor:
+        existing = {row[1] for row in await cursor.fetchall()}
+    for column, column_type in _MIGRATION_COLUMNS.items():
+        if column not in existing:
+            await db.execute(f"ALTER TABLE vacancies ADD COLUMN {column} {column_type}")
+
+    # Индекс для быстрого поиска по hash
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_hash ON vacancies(hash)")
+    # Окна по времени (дедупликация, active learning, find_similar)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_last_seen ON vacancies(last_seen)")
+
+    # Outbox change feed: триггеры пишут события об изменениях вакансий (systems/parser/change_feed.py)
+    await install_outbox(db, retention_days=settings.CHANGE_FEED_RETENTION_DAYS)
+
+    # Кэш предсказаний committee active learning: одна строка на (лид, модель),
+    # версия модели в строке — при смене версии предсказание считается заново
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS committee_predictions (
+            lead_id INTEGER NOT NULL,
+            model TEXT NOT NULL,
+            version TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            PRIMARY KEY (lead_id, model)
+        )
+    """)
 
 
 @dataclass
@@ -28,52 +113,58 @@ class Lead:
     needs_review: bool = False
     manual_label: bool = None
     embedding: bytes = None
+    status: str = None
 
 
 class VacancyDatabase:
     """Управление базой данных вакансий с поддержкой дедупликации (асинхронно)."""
+
+    # Подписчики на новые записи (например, векторный индекс DuplicateDetector).
+    # Общие для всех инстансов: парсеры создают VacancyDatabase() где попало.
+    _insert_hooks: List[Callable[[Lead], Awaitable[None]]] = []
+    # (lead_id, text, is_lead) после ручной разметки — online-дообучение ML-классификатора
+    _label_hooks: List[Callable[[int, str, bool], Awaitable[None]]] = []
     
     def __init__(self, db_path: str = None):
         """
         Инициализация базы данных.
+        Все инстансы с одним db_path делят общий пул соединений.
         """
         self.db_path = db_path or str(settings.VACANCY_DB_PATH)
+        self.pool = get_pool(self.db_path, init_fn=_init_schema)
+        self.seen_index = get_seen_index(self.db_path)
+        self.write_batcher: Optional["VacancyWriteBatcher"] = None
+        self.change_feed = get_change_feed(self.db_path, poll_interval=settings.CHANGE_FEED_POLL_MS / 1000)
+
+    @classmethod
+    def register_insert_hook(cls, hook: Callable[[Lead], Awaitable[None]]):
+        """Регистрирует async-колбэк, вызываемый после вставки новой вакансии."""
+        if hook not in cls._insert_hooks:
+            cls._insert_hooks.append(hook)
+
+    async def _notify_insert(self, lead: Lead):
+        for hook in list(self._insert_hooks):
+            try:
+                await hook(lead)
+            except Exception as e:
+                logger.warning("vacancy_insert_hook_failed", lead_id=lead.id, error=str(e)[:200])
+
+    @classmethod
+    def register_label_hook(cls, hook: Callable[[int, str, bool], Awaitable[None]]):
+        """Регистрирует async-колбэк, вызываемый после сохранения ручной разметки."""
+        if hook not in cls._label_hooks:
+            cls._label_hooks.append(hook)
+
+    async def _notify_label(self, lead_id: int, text: str, is_lead: bool):
+        for hook in list(self._label_hooks):
+            try:
+                await hook(lead_id, text, is_lead)
+            except Exception as e:
+                logger.warning("vacancy_label_hook_failed", lead_id=lead_id, error=str(e)[:200])
     
     async def init_db(self):
-        """Создание таблицы, если её ещё нет (асинхронно)."""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("PRAGMA journal_mode=WAL;")
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS vacancies (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    hash TEXT UNIQUE NOT NULL,
-                    status TEXT NOT NULL,
-                    text TEXT NOT NULL,
-                    source TEXT NOT NULL,
-                    direction TEXT,
-                    contact_link TEXT,
-                    response TEXT,
-                    draft_response TEXT,
-                    rejection_reason TEXT,
-                    first_seen TEXT NOT NULL,
-                    last_seen TEXT NOT NULL,
-                    informativeness_score REAL DEFAULT 0.0,
-                    needs_review INTEGER DEFAULT 0,
-                    manual_label INTEGER,
-                    labeled_by TEXT,
-                    labeled_at TEXT,
-                    embedding BLOB,
-                    is_deleted INTEGER DEFAULT 0,
-                    deleted_at TEXT
-                )
-            """)
-            
-            # Индекс для быстрого поиска по hash
-            await db.execute("""
-                CREATE INDEX IF NOT EXISTS idx_hash ON vacancies(hash)
-            """)
-            
-            await db.commit()
+        """Открывает пул соединений; схема создаётся один раз на процесс."""
+        await self.pool.open()
     
     def _generate_hash(self, text: str) -> str:
         """Генерирует уникальный hash для текста вакансии."""
@@ -82,26 +173,20 @@ class VacancyDatabase:
 
     def _get_similarity(self, text1: str, text2: str) -> float:
         """Вычисляет коэффициент схожести Жаккара."""
-        def get_shingles(text: str, k: int = 3):
-            clean = "".join(char for char in text.lower() if char.isalnum() or char.isspace())
-            return set(clean[i:i+k] for i in range(len(clean) - k + 1))
-        
-        set1 = get_shingles(text1)
-        set2 = get_shingles(text2)
-        
-        if not set1 or not set2:
-            return 0.0
-            
-        intersection = len(set1.intersection(set2))
-        union = len(set1.union(set2))
-        
-        return intersection / union
+        return jaccard(shingles(text1), shingles(text2))
 
     async def find_similar(self, text: str, threshold: float = 0.7, days: int = 3) -> Optional[Dict]:
-        """Ищет похожую вакансию в базе за последние N дней."""
+        """
+        Ищет похожую вакансию в базе за последние N дней.
+        Для окна, которое покрывает SeenIndex, кандидаты берутся из MinHash/LSH.
+        """
         cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
+
+        if days <= self.seen_index.window_days:
+            await self.seen_index.ensure_loaded(self.pool)
+            return self.seen_index.find_similar(text, threshold, cutoff_date)
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             async with db.execute("""
                 SELECT id, text, last_seen, source 
                 FROM vacancies 
@@ -123,15 +208,23 @@ class VacancyDatabase:
         return None
     
     async def is_processed(self, text: str, fuzzy: bool = True) -> bool:
-        """Проверяет, была ли вакансия уже обработана ранее."""
+        """
+        Проверяет, была ли вакансия уже обработана ранее.
+        Bloom-фильтр отсекает заведомо новые тексты без запроса в БД.
+        """
         vacancy_hash = self._generate_hash(text)
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute("SELECT id FROM vacancies WHERE hash = ?", (vacancy_hash,)) as cursor:
-                result = await cursor.fetchone()
-        
-        if result:
+        # Строка могла ещё не доехать до базы из очереди write batching
+        if self.write_batcher is not None and self.write_batcher.is_pending(vacancy_hash):
             return True
+
+        await self.seen_index.ensure_loaded(self.pool)
+        if self.seen_index.might_contain(vacancy_hash):
+            async with self.pool.reader() as db:
+                async with db.execute("SELECT id FROM vacancies WHERE hash = ?", (vacancy_hash,)) as cursor:
+                    result = await cursor.fetchone()
+            if result:
+                return True
+            self.seen_index.record_false_positive()
             
         if fuzzy:
             similar = await self.find_similar(text)
@@ -143,51 +236,110 @@ class VacancyDatabase:
     async def add_accepted(self, text: str, source: str, direction: str = None, 
                            contact_link: str = None, date: Optional[str] = None,
                            message_id: Optional[int] = None, chat_id: Optional[int] = None) -> bool:
-        """Добавляет принятую вакансию в базу."""
-        vacancy_hash = self._generate_hash(text)
+        """
+        Добавляет принятую вакансию в базу.
+        При включённом write batching строка ставится в очередь и функция возвращает True сразу.
+        """
         if date is None:
             date = datetime.now().isoformat()
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            try:
-                await db.execute("""
-                    INSERT INTO vacancies (hash, status, text, source, direction, contact_link, response, rejection_reason, first_seen, last_seen, message_id, chat_id)
-                    VALUES (?, 'accepted', ?, ?, ?, ?, NULL, NULL, ?, ?, ?, ?)
-                """, (vacancy_hash, text, source, direction, contact_link, date, date, message_id, chat_id))
-                await db.commit()
-                return True
-            except aiosqlite.IntegrityError:
-                await db.execute("""
-                    UPDATE vacancies SET last_seen = ? WHERE hash = ?
-                """, (date, vacancy_hash))
-                await db.commit()
-                return False
+        row = (self._generate_hash(text), 'accepted', text, source, direction, contact_link,
+               None, date, date, message_id, chat_id)
+        if self.write_batcher is not None:
+            await self.write_batcher.put(row)
+            return True
+        return await self._insert_row(row)
     
     async def add_rejected(self, text: str, source: str, reason: str, date: Optional[str] = None,
                            message_id: Optional[int] = None, chat_id: Optional[int] = None) -> bool:
-        """Добавляет отклонённую вакансию в базу."""
-        vacancy_hash = self._generate_hash(text)
+        """
+        Добавляет отклонённую вакансию в базу.
+        При включённом write batching строка ставится в очередь и функция возвращает True сразу.
+        """
         if date is None:
             date = datetime.now().isoformat()
-        
-        async with aiosqlite.connect(self.db_path) as db:
+        row = (self._generate_hash(text), 'rejected', text, source, None, None,
+               reason, date, date, message_id, chat_id)
+        if self.write_batcher is not None:
+            await self.write_batcher.put(row)
+            return True
+        return await self._insert_row(row)
+
+    async def _insert_row(self, row: tuple) -> bool:
+        """Вставка одной строки; для уже известного hash обновляет last_seen и возвращает False."""
+        vacancy_hash, _, text, source, _, _, _, date, _, message_id, chat_id = row
+        async with self.pool.writer() as db:
             try:
-                await db.execute("""
-                    INSERT INTO vacancies (hash, status, text, source, direction, contact_link, response, rejection_reason, first_seen, last_seen, message_id, chat_id)
-                    VALUES (?, 'rejected', ?, ?, NULL, NULL, NULL, ?, ?, ?, ?, ?)
-                """, (vacancy_hash, text, source, reason, date, date, message_id, chat_id))
-                await db.commit()
-                return True
+                async with db.execute("""
+                    INSERT INTO vacancies (hash, status, text, source, direction, contact_link, rejection_reason, first_seen, last_seen, message_id, chat_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, row) as cursor:
+                    lead_id = cursor.lastrowid
             except aiosqlite.IntegrityError:
                 await db.execute("""
                     UPDATE vacancies SET last_seen = ? WHERE hash = ?
                 """, (date, vacancy_hash))
-                await db.commit()
                 return False
 
+        self.seen_index.record_insert(lead_id, vacancy_hash, row[1], text, source, date)
+        self.change_feed.notify()
+
+        await self._notify_insert(Lead(
+            id=lead_id, hash=vacancy_hash, text=text, source_channel=source,
+            timestamp=_parse_timestamp(date), message_id=message_id, chat_id=chat_id, status=row[1]
+        ))
+        return True
+
+    async def _insert_rows(self, rows: List[tuple]):
+        """
+        Group commit: пачка строк одной транзакцией (семантика _insert_row: для
+        известного hash — только last_seen). id новых строк берутся из lastrowid
+        своего INSERT: строки, которые в ту же БД пишут другие процессы, хуки не получат.
+        """
+        inserted: Dict[str, int] = {}
+        async with self.pool.writer() as db:
+            for row in rows:
+                async with db.execute("""
+                    INSERT INTO vacancies (hash, status, text, source, direction, contact_link, rejection_reason, first_seen, last_seen, message_id, chat_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(hash) DO NOTHING
+                """, row) as cursor:
+                    if cursor.rowcount == 1:
+                        inserted[row[0]] = cursor.lastrowid
+                        continue
+                await db.execute("UPDATE vacancies SET last_seen = ? WHERE hash = ?", (row[8], row[0]))
+        if inserted:
+            self.change_feed.notify()
+
+        for vacancy_hash, status, text, source, _, _, _, date, _, message_id, chat_id in rows:
+            lead_id = inserted.pop(vacancy_hash, None)
+            if lead_id is not None:
+                self.seen_index.record_insert(lead_id, vacancy_hash, status, text, source, date)
+                await self._notify_insert(Lead(
+                    id=lead_id, hash=vacancy_hash, text=text, source_channel=source,
+                    timestamp=_parse_timestamp(date), message_id=message_id, chat_id=chat_id, status=status
+                ))
+
+    def enable_write_batching(self, **kwargs) -> "VacancyWriteBatcher":
+        """Включает group commit для add_accepted/add_rejected (см. VacancyWriteBatcher)."""
+        if self.write_batcher is None:
+            self.write_batcher = VacancyWriteBatcher(self, **kwargs)
+        return self.write_batcher
+
+    async def flush_writes(self):
+        """Дожидается записи всех строк из очереди write batching."""
+        if self.write_batcher is not None:
+            await self.write_batcher.flush()
+
+    async def close(self):
+        """Сбрасывает очередь записи, отключает write batching и сохраняет Bloom-фильтр."""
+        if self.write_batcher is not None:
+            await self.write_batcher.close()
+            self.write_batcher = None
+        await self.seen_index.save()
+
     async def get_stats(self) -> Dict[str, int]:
         """Получает статистику по всей базе данных."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             async with db.execute("SELECT COUNT(*) FROM vacancies") as cursor:
                 row = await cursor.fetchone()
                 total = row[0]
@@ -210,16 +362,15 @@ class VacancyDatabase:
         """Удаляет записи старше указанного количества дней."""
         cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             async with db.execute("DELETE FROM vacancies WHERE last_seen < ?", (cutoff_date,)) as cursor:
                 deleted_count = cursor.rowcount
-            await db.commit()
         
         return deleted_count
     
     async def get_recent_accepted(self, limit: int = 100) -> List[Dict]:
         """Получает последние принятые вакансии."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             async with db.execute("""
                 SELECT hash, text, source, direction, contact_link, response, first_seen, last_seen
                 FROM vacancies
@@ -249,27 +400,74 @@ class VacancyDatabase:
 
     async def update_lead_informativeness(self, lead_id: int, informativeness: float, needs_review: bool = True):
         """Обновление score информативности."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             await db.execute("""
                 UPDATE vacancies 
                 SET informativeness_score = ?, needs_review = ?
                 WHERE id = ?
             """, (informativeness, 1 if needs_review else 0, lead_id))
-            await db.commit()
+
+    async def update_leads_informativeness(self, scores: List[Tuple[int, float]], needs_review: bool = True):
+        """Пакетное обновление score информативности [(lead_id, score)] одной транзакцией."""
+        if not scores:
+            return
+        async with self.pool.writer() as db:
+            await db.executemany("""
+                UPDATE vacancies 
+                SET informativeness_score = ?, needs_review = ?
+                WHERE id = ?
+            """, [(score, 1 if needs_review else 0, lead_id) for lead_id, score in scores])
+
+    async def get_committee_predictions(self, lead_ids: List[int], model: str, version: str) -> Dict[int, float]:
+        """Закэшированные confidence модели для лидов (только для текущей версии модели)."""
+        cached: Dict[int, float] = {}
+        async with self.pool.reader() as db:
+            for i in range(0, len(lead_ids), 500):
+                chunk = lead_ids[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                async with db.execute(f"""
+                    SELECT lead_id, confidence FROM committee_predictions
+                    WHERE model = ? AND version = ? AND lead_id IN ({placeholders})
+                """, (model, version, *chunk)) as cursor:
+                    cached.update(await cursor.fetchall())
+        return cached
+
+    async def save_committee_predictions(self, model: str, version: str, confidences: Dict[int, float]):
+        """Сохраняет предсказания модели пачкой (upsert по (lead_id, model))."""
+        if not confidences:
+            return
+        async with self.pool.writer() as db:
+            await db.executemany("""
+                INSERT INTO committee_predictions (lead_id, model, version, confidence) VALUES (?, ?, ?, ?)
+                ON CONFLICT(lead_id, model) DO UPDATE SET version = excluded.version, confidence = excluded.confidence
+            """, [(lead_id, model, version, confidence) for lead_id, confidence in confidences.items()])
 
     async def update_lead_label(self, lead_id: int, is_lead: bool, labeled_by: str, labeled_at: datetime):
-        """Сохранение ручной разметки."""
-        async with aiosqlite.connect(self.db_path) as db:
+        """
+        Сохранение ручной разметки; label-хуки получают текст размеченной вакансии.
+        Повторная разметка тем же значением хуки не вызывает (модель не учит лид дважды).
+        """
+        label = 1 if is_lead else 0
+        text = previous = None
+        async with self.pool.writer() as db:
+            if self._label_hooks:
+                async with db.execute("SELECT text, manual_label FROM vacancies WHERE id = ?", (lead_id,)) as cursor:
+                    row = await cursor.fetchone()
+                if row:
+                    text, previous = row
             await db.execute("""
                 UPDATE vacancies 
                 SET manual_label = ?, labeled_by = ?, labeled_at = ?, needs_review = 0
                 WHERE id = ?
-            """, (1 if is_lead else 0, labeled_by, labeled_at.isoformat(), lead_id))
-            await db.commit()
+            """, (label, labeled_by, labeled_at.isoformat(), lead_id))
+        self.change_feed.notify()
+        if text and previous != label:
+            await self._notify_label(lead_id, text, is_lead)
 
-    async def get_labeled_data(self) -> pd.DataFrame:
+    async def get_labeled_data(self) -> "pd.DataFrame":
         """Получение всех размеченных данных для обучения."""
-        async with aiosqlite.connect(self.db_path) as db:
+        import pandas as pd  # тяжёлый импорт — только для выгрузки датасета
+        async with self.pool.reader() as db:
             async with db.execute("""
                 SELECT text, manual_label as is_lead
                 FROM vacancies
@@ -282,7 +480,7 @@ class VacancyDatabase:
     async def get_recent_leads(self, hours: int = 24) -> List[Lead]:
         """Получение последних лидов за временное окно."""
         cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             async with db.execute("""
                 SELECT id, hash, text, source, last_seen, message_id, chat_id, tier, 
                        informativeness_score, needs_review, manual_label
@@ -307,7 +505,7 @@ class VacancyDatabase:
 
     async def get_unlabeled_leads_since(self, cutoff_time: datetime) -> List[Lead]:
         """Получение неразмеченных лидов."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             async with db.execute("""
                 SELECT id, hash, text, source, last_seen, 0, 0, NULL, 
                        informativeness_score, needs_review, manual_label, embedding
@@ -335,20 +533,64 @@ class VacancyDatabase:
 
     async def get_new_labeled_count_since_last_train(self) -> int:
         """Подсчет новых размеченных примеров."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             async with db.execute("SELECT COUNT(*) FROM vacancies WHERE manual_label IS NOT NULL") as cursor:
                 row = await cursor.fetchone()
                 return row[0]
 
     async def update_lead_embedding(self, lead_id: int, embedding: bytes):
         """Сохранить embedding для лида."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             await db.execute("UPDATE vacancies SET embedding = ? WHERE id = ?", (embedding, lead_id))
-            await db.commit()
+
+    async def update_lead_embeddings_batch(self, items: List[Tuple[int, bytes]]):
+        """Сохранить embeddings пачкой (lead_id, embedding) одной транзакцией."""
+        if not items:
+            return
+        async with self.pool.writer() as db:
+            await db.executemany(
+                "UPDATE vacancies SET embedding = ? WHERE id = ?",
+                [(embedding, lead_id) for lead_id, embedding in items]
+            )
+
+    async def get_texts_by_ids(self, lead_ids: List[int]) -> Dict[int, str]:
+        """Тексты вакансий по списку id."""
+        if not lead_ids:
+            return {}
+        placeholders = ','.join(['?'] * len(lead_ids))
+        async with self.pool.reader() as db:
+            async with db.execute(
+                f"SELECT id, text FROM vacancies WHERE id IN ({placeholders})", lead_ids
+            ) as cursor:
+                rows = await cursor.fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    async def get_embeddings_since(self, cutoff_time: datetime, after_id: int = 0) -> List[Lead]:
+        """
+        Принятые вакансии окна (без LIMIT) с id > after_id — для построения
+        и догрузки векторного индекса дедупликации.
+        """
+        async with self.pool.reader() as db:
+            async with db.execute("""
+                SELECT id, hash, text, source, last_seen, message_id, chat_id, embedding
+                FROM vacancies
+                WHERE last_seen > ? AND id > ? AND status = 'accepted'
+                ORDER BY id
+            """, (cutoff_time.isoformat(), after_id)) as cursor:
+                rows = await cursor.fetchall()
+
+        return [
+            Lead(
+                id=row[0], hash=row[1], text=row[2], source_channel=row[3],
+                timestamp=_parse_timestamp(row[4]), message_id=row[5], chat_id=row[6],
+                embedding=row[7]
+            )
+            for row in rows
+        ]
 
     async def get_leads_without_embeddings(self, limit: int = 1000) -> List[Lead]:
         """Получить leads без embeddings."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             async with db.execute("""
                 SELECT id, hash, text, source, last_seen, message_id, chat_id, tier, 
                        informativeness_score, needs_review, manual_label, embedding
@@ -374,7 +616,7 @@ class VacancyDatabase:
 
     async def get_leads_since(self, cutoff_time: datetime, limit: int = 500) -> List[Lead]:
         """Получение лидов с определенной даты."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             async with db.execute("""
                 SELECT id, hash, text, source, last_seen, message_id, chat_id, tier, 
                        informativeness_score, needs_review, manual_label, embedding
@@ -405,10 +647,9 @@ class VacancyDatabase:
 
     async def delete_vacancy(self, vacancy_id: int) -> bool:
         """Удаляет вакансию по ID."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             async with db.execute("DELETE FROM vacancies WHERE id = ?", (vacancy_id,)) as cursor:
                 count = cursor.rowcount
-            await db.commit()
         return count > 0
 
     async def delete_old_vacancies(self, days: int = 30) -> int:
@@ -423,7 +664,7 @@ class VacancyDatabase:
         success_count = 0
         error_count = 0
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             for i in range(0, len(vacancy_ids), batch_size):
                 batch = vacancy_ids[i:i + batch_size]
                 try:
@@ -432,7 +673,6 @@ class VacancyDatabase:
                         success_count += cursor.rowcount
                 except Exception as e:  
                     error_count += len(batch)
-            await db.commit()
         return success_count, error_count
 
     async def delete_by_criteria(self, status: str = None, source: str = None, older_than_days: int = None) -> int:
@@ -451,25 +691,115 @@ class VacancyDatabase:
             query += " AND last_seen < ?"
             params.append(cutoff)
             
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             async with db.execute(query, params) as cursor:
                 count = cursor.rowcount
-            await db.commit()
         return count
 
     async def soft_delete_vacancy(self, vacancy_id: int) -> bool:
         """Мягкое удаление вакансии."""
         now = datetime.now().isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             async with db.execute("""
                 UPDATE vacancies 
                 SET is_deleted = 1, deleted_at = ? 
                 WHERE id = ?
             """, (now, vacancy_id)) as cursor:
                 count = cursor.rowcount
-            await db.commit()
         return count > 0
 
+class VacancyWriteBatcher:
+    """
+    Write-behind очередь для add_accepted/add_rejected.
+
+    Строки копятся до max_batch_size или max_delay_ms и пишутся одной транзакцией
+    (один fsync на пачку вместо одного на сообщение). Очередь ограничена
+    max_pending: когда запись не успевает, put() ждёт — это back-pressure для
+    парсера. flush()/close() гарантируют, что всё поставленное записано.
+    """
+
+    def __init__(self, db: VacancyDatabase, max_batch_size: Optional[int] = None,
+                 max_delay_ms: Optional[float] = None, max_pending: Optional[int] = None):
+        self.db = db
+        self.max_batch_size = max_batch_size or settings.VACANCY_WRITE_BATCH_SIZE
+        self.max_delay = (max_delay_ms if max_delay_ms is not None else settings.VACANCY_WRITE_MAX_DELAY_MS) / 1000
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending or settings.VACANCY_WRITE_MAX_PENDING)
+        self._pending: Dict[str, int] = {}  # hash -> сколько строк ещё в очереди
+        self._worker: Optional[asyncio.Task] = None
+        self.stats = {"rows": 0, "batches": 0, "write_seconds": 0.0, "failed_batches": 0}
+
+    def is_pending(self, vacancy_hash: str) -> bool:
+        return vacancy_hash in self._pending
+
+    async def put(self, row: tuple):
+        """Ставит строку в очередь; ждёт, если очередь заполнена."""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        vacancy_hash = row[0]
+        self._pending[vacancy_hash] = self._pending.get(vacancy_hash, 0) + 1
+        await self._queue.put(row)
+
+    async def _collect(self) -> List[tuple]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            # Сначала забираем всё, что уже лежит в очереди, без ожидания
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            start = time.perf_counter()
+            try:
+                await self.db._insert_rows(batch)
+            except Exception as e:
+                # Не теряем пачку из-за одной плохой строки: дописываем по одной
+                logger.warning("vacancy_write_batch_failed", rows=len(batch), error=str(e)[:200])
+                self.stats["failed_batches"] += 1
+                for row in batch:
+                    try:
+                        await self.db._insert_row(row)
+                    except Exception as row_error:
+                        logger.error("vacancy_write_row_dropped", error=str(row_error)[:200])
+            finally:
+                self.stats["write_seconds"] += time.perf_counter() - start
+                self.stats["batches"] += 1
+                self.stats["rows"] += len(batch)
+                for row in batch:
+                    left = self._pending.get(row[0], 1) - 1
+                    if left > 0:
+                        self._pending[row[0]] = left
+                    else:
+                        self._pending.pop(row[0], None)
+                    self._queue.task_done()
+
+    async def flush(self):
+        """Ждёт, пока все поставленные строки будут записаны."""
+        await self._queue.join()
+
+    async def close(self):
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+
 if __name__ == "__main__":
     db = VacancyDatabase("test_vacancies.db")
     async def run_test():
@@ -502,5 +832,4 @@ if __name__ == "__main__":
             os.remove("test_vacancies.db")
         print("Tests completed.")
     
-    import asyncio
     asyncio.run(run_test())
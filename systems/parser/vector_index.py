@@ -0,0 +1,277 @@
+"""
+In-process векторный индекс для семантической дедупликации.
+
+Хранит L2-нормализованные float32 эмбеддинги лидов в одной матрице,
+так что top-k поиск по косинусной близости — это одно матрично-векторное
+произведение вместо попарного cosine_similarity по каждому лиду.
+Старые записи вытесняются скользящим окном (48 часов по умолчанию).
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from core.utils.structured_logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import hnswlib
+    HNSW_AVAILABLE = True
+except ImportError:
+    HNSW_AVAILABLE = False
+
+
+@dataclass
+class IndexHit:
+    """Результат поиска по индексу."""
+    lead_id: int
+    message_id: Optional[int]
+    similarity: float
+
+
+def _normalize(vector: np.ndarray) -> Optional[np.ndarray]:
+    """L2-нормализация в float32. Нулевой вектор → None."""
+    vec = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(vec))
+    if norm == 0.0 or not np.isfinite(norm):
+        return None
+    return vec / norm
+
+
+class EmbeddingIndex:
+    """
+    Плотный индекс эмбеддингов: матрица (capacity × dim) + параллельные
+    массивы lead_id / message_id / timestamp.
+
+    - add(): O(dim), матрица растёт удвоением
+    - query(): одно произведение matrix @ vector по живым строкам
+    - evict_older_than(): логическое удаление + компакция, когда мёртвых
+      строк становится больше четверти
+    """
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 1024):
+        self.dim = dim
+        self._capacity = initial_capacity
+        self._size = 0
+        self._live = 0
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._lead_ids = np.zeros(initial_capacity, dtype=np.int64)
+        self._message_ids = np.zeros(initial_capacity, dtype=np.int64)
+        self._timestamps = np.zeros(initial_capacity, dtype=np.float64)
+        self._alive = np.zeros(initial_capacity, dtype=bool)
+        self._positions = {}  # lead_id -> row
+        if dim is not None:
+            self._matrix = np.zeros((initial_capacity, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self._live
+
+    def __contains__(self, lead_id: int) -> bool:
+        return lead_id in self._positions
+
+    def _grow(self):
+        new_capacity = self._capacity * 2
+        matrix = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+        for name in ("_lead_ids", "_message_ids", "_timestamps", "_alive"):
+            old = getattr(self, name)
+            new = np.zeros(new_capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+        self._capacity = new_capacity
+
+    def add(self, lead_id: int, embedding: np.ndarray, timestamp: float,
+            message_id: Optional[int] = None) -> bool:
+        """Добавляет (или обновляет) эмбеддинг лида. Возвращает False для пустого вектора."""
+        vec = _normalize(embedding)
+        if vec is None:
+            return False
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = vec.shape[0]
+                self._matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+            if vec.shape[0] != self.dim:
+                logger.warning("vector_index_dim_mismatch", expected=self.dim, got=vec.shape[0])
+                return False
+
+            row = self._positions.get(lead_id)
+            if row is None:
+                if self._size >= self._capacity:
+                    self._grow()
+                row = self._size
+                self._size += 1
+                self._live += 1
+                self._positions[lead_id] = row
+
+            self._matrix[row] = vec
+            self._lead_ids[row] = lead_id
+            self._message_ids[row] = message_id if message_id is not None else -1
+            self._timestamps[row] = timestamp
+            self._alive[row] = True
+        return True
+
+    def query(self, embedding: np.ndarray, k: int = 5, min_timestamp: float = 0.0,
+              exclude_message_id: Optional[int] = None) -> List[IndexHit]:
+        """Top-k ближайших по косинусу среди записей не старше min_timestamp."""
+        vec = _normalize(embedding)
+        if vec is None or self._live == 0 or vec.shape[0] != self.dim:
+            return []
+
+        with self._lock:
+            n = self._size
+            scores = self._matrix[:n] @ vec
+            mask = self._alive[:n] & (self._timestamps[:n] > min_timestamp)
+            if exclude_message_id is not None:
+                mask &= self._message_ids[:n] != exclude_message_id
+            scores = np.where(mask, scores, -np.inf)
+
+            k = min(k, n)
+            if k < n:
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(n)
+            top = top[np.argsort(-scores[top])]
+
+            hits = []
+            for row in top:
+                if not np.isfinite(scores[row]):
+                    break
+                message_id = int(self._message_ids[row])
+                hits.append(IndexHit(
+                    lead_id=int(self._lead_ids[row]),
+                    message_id=message_id if message_id != -1 else None,
+                    similarity=float(scores[row]),
+                ))
+        return hits
+
+    def evict_older_than(self, cutoff_timestamp: float) -> int:
+        """Вытесняет записи старше cutoff. Возвращает количество удалённых."""
+        with self._lock:
+            n = self._size
+            stale = self._alive[:n] & (self._timestamps[:n] <= cutoff_timestamp)
+            evicted = int(stale.sum())
+            if not evicted:
+                return 0
+            for row in np.nonzero(stale)[0]:
+                self._positions.pop(int(self._lead_ids[row]), None)
+            self._alive[:n] &= ~stale
+            self._live -= evicted
+
+            if self._size - self._live > self._size // 4:
+                self._compact()
+        return evicted
+
+    def _compact(self):
+        keep = np.nonzero(self._alive[:self._size])[0]
+        live = len(keep)
+        self._matrix[:live] = self._matrix[keep]
+        for name in ("_lead_ids", "_message_ids", "_timestamps"):
+            arr = getattr(self, name)
+            arr[:live] = arr[keep]
+        self._alive[:live] = True
+        self._alive[live:] = False
+        self._size = live
+        self._positions = {int(lead_id): row for row, lead_id in enumerate(self._lead_ids[:live])}
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._live = 0
+            self._alive[:] = False
+            self._positions = {}
+
+
+class HNSWEmbeddingIndex:
+    """
+    Опциональный ANN-бэкенд на hnswlib с тем же интерфейсом, что и EmbeddingIndex.
+    Имеет смысл при десятках тысяч лидов в окне; для 48 часов хватает плотной матрицы.
+    """
+
+    def __init__(self, dim: int = 312, max_elements: int = 100_000,
+                 ef_construction: int = 200, m: int = 16, ef: int = 64):
+        if not HNSW_AVAILABLE:
+            raise ImportError("hnswlib is not installed.")
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._index = hnswlib.Index(space="cosine", dim=dim)
+        self._index.init_index(max_elements=max_elements, ef_construction=ef_construction, M=m)
+        self._index.set_ef(ef)
+        self._meta = {}  # lead_id -> (message_id, timestamp)
+        self._deleted = set()
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def __contains__(self, lead_id: int) -> bool:
+        return lead_id in self._meta
+
+    def add(self, lead_id: int, embedding: np.ndarray, timestamp: float,
+            message_id: Optional[int] = None) -> bool:
+        vec = _normalize(embedding)
+        if vec is None or vec.shape[0] != self.dim:
+            return False
+        with self._lock:
+            if self._index.get_current_count() >= self._index.get_max_elements():
+                self._index.resize_index(self._index.get_max_elements() * 2)
+            if lead_id in self._deleted:
+                self._index.unmark_deleted(lead_id)
+                self._deleted.discard(lead_id)
+            self._index.add_items(vec[None, :], np.array([lead_id]))
+            self._meta[lead_id] = (message_id, timestamp)
+        return True
+
+    def query(self, embedding: np.ndarray, k: int = 5, min_timestamp: float = 0.0,
+              exclude_message_id: Optional[int] = None) -> List[IndexHit]:
+        vec = _normalize(embedding)
+        if vec is None or not self._meta:
+            return []
+        with self._lock:
+            # Берём с запасом: часть соседей может отсеяться фильтром по времени
+            fetch = min(len(self._meta), k * 4)
+            labels, distances = self._index.knn_query(vec[None, :], k=fetch)
+        hits = []
+        for lead_id, distance in zip(labels[0], distances[0]):
+            meta = self._meta.get(int(lead_id))
+            if meta is None:
+                continue
+            message_id, timestamp = meta
+            if timestamp <= min_timestamp:
+                continue
+            if exclude_message_id is not None and message_id == exclude_message_id:
+                continue
+            hits.append(IndexHit(lead_id=int(lead_id), message_id=message_id,
+                                 similarity=float(1.0 - distance)))
+            if len(hits) >= k:
+                break
+        return hits
+
+    def evict_older_than(self, cutoff_timestamp: float) -> int:
+        with self._lock:
+            stale = [lead_id for lead_id, (_, ts) in self._meta.items() if ts <= cutoff_timestamp]
+            for lead_id in stale:
+                self._index.mark_deleted(lead_id)
+                self._deleted.add(lead_id)
+                del self._meta[lead_id]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            for lead_id in list(self._meta):
+                self._index.mark_deleted(lead_id)
+                self._deleted.add(lead_id)
+            self._meta = {}
+
+
+def create_embedding_index(backend: str = "numpy", dim: int = 312):
+    """Фабрика индекса по имени бэкенда (numpy | hnsw) с откатом на numpy."""
+    if backend == "hnsw":
+        if HNSW_AVAILABLE:
+            return HNSWEmbeddingIndex(dim=dim)
+        logger.warning("hnsw_backend_unavailable", fallback="numpy")
+    return EmbeddingIndex(dim=dim)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Корень проекта в PYTHONPATH и минимальные обязательные настройки,
+# чтобы core.config.settings импортировался без .env
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("TELEGRAM_API_ID", "1")
+os.environ.setdefault("TELEGRAM_API_HASH", "test")
@@ -0,0 +1,108 @@
+import sqlite3
+import zlib
+
+import numpy as np
+import pytest
+
+from core.database.sqlite_pool import close_all_pools
+from systems.parser import bert_classifier, ml_classifier
+from systems.parser.active_learner import ActiveLearningPipeline
+from systems.parser.vacancy_db import VacancyDatabase
+
+
+def _score(text: str, salt: str) -> float:
+    return (zlib.crc32((salt + text).encode("utf-8")) % 1000) / 1000
+
+
+class FakeModel:
+    def __init__(self, salt: str):
+        self.salt = salt
+        self.model_version = "v1"
+        self.batches = []
+
+    def predict_batch(self, texts):
+        self.batches.append(len(texts))
+        return [{"is_lead": _score(t, self.salt) > 0.5, "confidence": _score(t, self.salt)} for t in texts]
+
+
+def _reference(predictions):
+    """Исходный поштучный расчёт calculate_informativeness."""
+    predictions = np.array(predictions)
+    least_confidence = 1 - np.max(predictions)
+    margin_score = 1 - (min(abs(p - 0.5) for p in predictions) * 2)
+    entropy = np.mean([-(q * np.log2(q) + (1 - q) * np.log2(1 - q))
+                       for q in np.clip(predictions, 1e-10, 1 - 1e-10)])
+    return 0.25 * least_confidence + 0.35 * margin_score + 0.20 * entropy + 0.20 * np.var(predictions)
+
+
+@pytest.fixture
+def committee(monkeypatch):
+    monkeypatch.setattr(VacancyDatabase, "_label_hooks", [])
+    bert, ml = FakeModel("bert"), FakeModel("ml")
+    monkeypatch.setattr(bert_classifier, "get_bert_classifier", lambda: bert)
+    monkeypatch.setattr(ml_classifier, "get_ml_classifier", lambda: ml)
+    return bert, ml
+
+
+def test_batch_metrics_match_per_text_formula(committee):
+    pipeline = ActiveLearningPipeline()
+    texts = [f"нужен таргетолог #{i}" for i in range(40)] + ["", "x"]
+    scores = pipeline.calculate_informativeness_batch(texts)
+    for text, item in zip(texts, scores):
+        expected = [_score(text, "bert"), _score(text, "ml")]
+        assert item["predictions"] == pytest.approx(expected)
+        assert item["informativeness"] == pytest.approx(_reference(expected))
+    assert pipeline.calculate_informativeness(texts[3]) == pytest.approx(scores[3])
+
+
+@pytest.mark.asyncio
+async def test_selection_scores_only_new_leads_and_writes_back(tmp_path, committee):
+    bert, ml = committee
+    pipeline = ActiveLearningPipeline()
+    pipeline.weekly_batch_size = 10
+    pipeline.db = VacancyDatabase(str(tmp_path / "vacancies.db"))
+    for i in range(60):
+        await pipeline.db.add_accepted(f"Ищу подрядчика, заказ #{i}", "chat", message_id=i, chat_id=-1)
+
+    top = await pipeline.select_informative_samples()
+    assert len(top) == 10 and sum(bert.batches) == 60 and ml.batches == [60]
+    assert [s["informativeness"] for s in top] == sorted((s["informativeness"] for s in top), reverse=True)
+
+    with sqlite3.connect(pipeline.db.db_path) as conn:
+        written = dict(conn.execute("SELECT id, informativeness_score FROM vacancies WHERE needs_review = 1"))
+    assert written == pytest.approx({s["lead_id"]: s["informativeness"] for s in top})
+
+    # Повторный отбор: 50 оставшихся кандидатов уже в кэше; новая версия ML считает заново только ML
+    for i in range(60, 65):
+        await pipeline.db.add_accepted(f"Ищу подрядчика, заказ #{i}", "chat", message_id=i, chat_id=-1)
+    ml.model_version = "v2"
+    await pipeline.select_informative_samples()
+    assert sum(bert.batches) == 65 and ml.batches == [60, 55]
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_placeholder_predictions_are_not_cached(tmp_path, committee):
+    bert, ml = committee
+    trained = False
+    predict = ml.predict_batch
+
+    def untrained_then_model(texts):
+        if not trained:
+            ml.batches.append(len(texts))
+            return [{"is_lead": False, "confidence": 0.0, "method": "ML_NONE"} for _ in texts]
+        return predict(texts)
+
+    ml.predict_batch = untrained_then_model
+    pipeline = ActiveLearningPipeline()
+    pipeline.weekly_batch_size = 5
+    pipeline.db = VacancyDatabase(str(tmp_path / "vacancies.db"))
+    for i in range(20):
+        await pipeline.db.add_accepted(f"Ищу подрядчика, заказ #{i}", "chat", message_id=i, chat_id=-1)
+
+    await pipeline.select_informative_samples()
+    trained = True  # модель обучилась, версия та же — заглушки 0.0 не должны отдаваться из кэша
+    top = await pipeline.select_informative_samples()
+    assert ml.batches == [20, 15] and sum(bert.batches) == 20
+    assert top and all(s["predictions"][1] == pytest.approx(_score(s["text"], "ml")) for s in top)
+    await close_all_pools()
@@ -0,0 +1,98 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from core.database.sqlite_pool import close_all_pools
+from systems.parser import change_feed as cf
+from systems.parser.change_feed import ChangeFeed
+from systems.parser.vacancy_db import VacancyDatabase
+
+
+@pytest.fixture
+def vacancy_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(cf, "_feeds", {})
+    monkeypatch.setattr(VacancyDatabase, "_insert_hooks", [])
+    monkeypatch.setattr(VacancyDatabase, "_label_hooks", [])
+    return VacancyDatabase(str(tmp_path / "vacancies.db"))
+
+
+@pytest.mark.asyncio
+async def test_local_writes_and_foreign_connections_reach_subscribers(vacancy_db):
+    await vacancy_db.init_db()
+    feed = vacancy_db.change_feed
+    events = await feed.subscribe({cf.VACANCY_ACCEPTED, cf.VACANCY_RESPONSE, cf.VACANCY_DRAFT_READY})
+
+    await vacancy_db.add_accepted("Нужен таргетолог на проект", "chat", message_id=1, chat_id=-1)
+    await vacancy_db.add_rejected("Продам аккаунт", "chat", reason="spam", message_id=2, chat_id=-1)
+    event = await events.get(timeout=2)
+    assert (event.topic, event.value) == (cf.VACANCY_ACCEPTED, "accepted")
+
+    # Запись «чужим» соединением (как sqlite3.connect в Гвен) — через PRAGMA data_version
+    with sqlite3.connect(vacancy_db.db_path) as conn:
+        conn.execute("UPDATE vacancies SET draft_response = 'Здравствуйте!' WHERE id = ?", (event.vacancy_id,))
+        conn.execute("UPDATE vacancies SET response = 'notified' WHERE id = ?", (event.vacancy_id,))
+    draft = await events.get(timeout=2)
+    response = await events.get(timeout=2)
+    assert draft.topic == cf.VACANCY_DRAFT_READY and draft.hash == event.hash
+    assert (response.topic, response.value) == (cf.VACANCY_RESPONSE, "notified")
+
+    # Без записей — только дешёвые проверки data_version, outbox не читается
+    reads = feed.stats["reads"]
+    await asyncio.sleep(feed.poll_interval * 3)
+    assert feed.stats["reads"] == reads and events.pending() == 0
+
+    await feed.close()
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_durable_consumer_resumes_after_restart(vacancy_db):
+    await vacancy_db.init_db()
+    events = await vacancy_db.change_feed.subscribe({cf.VACANCY_ACCEPTED}, consumer="drafts")
+    await vacancy_db.add_accepted("Ищу SEO специалиста", "chat", message_id=1, chat_id=-1)
+    await events.ack(await events.get(timeout=2))
+    await vacancy_db.change_feed.close()
+
+    # Пока подписчик «лежит», приходят новые вакансии
+    await vacancy_db.add_accepted("Нужен сайт на Tilda", "chat", message_id=2, chat_id=-1)
+    await vacancy_db.add_accepted("Кто настроит Директ?", "chat", message_id=3, chat_id=-1)
+
+    restarted = ChangeFeed(vacancy_db.db_path, poll_interval=0.05)
+    events = await restarted.subscribe({cf.VACANCY_ACCEPTED}, consumer="drafts")
+    missed = [await events.get(timeout=2), await events.get(timeout=2)]
+    assert [e.vacancy_id for e in missed] == [2, 3]
+    assert await events.get(timeout=0.2) is None
+
+    await restarted.close()
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_rejected_inserts_skip_outbox_and_old_trigger_is_replaced(vacancy_db):
+    await vacancy_db.init_db()
+    await vacancy_db.change_feed.close()
+    await close_all_pools()
+    # Как в базе, созданной до WHEN-условия: событие на каждую вставку
+    with sqlite3.connect(vacancy_db.db_path) as conn:
+        conn.execute("DROP TRIGGER vacancy_events_insert")
+        conn.execute("""
+            CREATE TRIGGER vacancy_events_insert AFTER INSERT ON vacancies
+            WHEN 1
+            BEGIN
+                INSERT INTO vacancy_events (topic, vacancy_id, hash, value, created_at)
+                VALUES ('vacancy.' || NEW.status, NEW.id, NEW.hash, NEW.status, 0);
+            END
+        """)
+
+    db = VacancyDatabase(vacancy_db.db_path)
+    await db.init_db()
+    for i in range(5):
+        await db.add_rejected(f"Продам аккаунт #{i}", "chat", reason="spam", message_id=i, chat_id=-1)
+    await db.add_accepted("Нужен таргетолог на проект", "chat", message_id=10, chat_id=-1)
+
+    with sqlite3.connect(db.db_path) as conn:
+        topics = [row[0] for row in conn.execute("SELECT topic FROM vacancy_events")]
+    assert topics == [cf.VACANCY_ACCEPTED]
+    await db.change_feed.close()
+    await close_all_pools()
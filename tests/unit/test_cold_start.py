@@ -0,0 +1,64 @@
+"""
+Холодный старт точек входа main.py: профиль `python -X importtime` в отдельном
+процессе. Тяжёлые ML-библиотеки не должны импортироваться, пока модель не
+понадобилась, а суммарное время импорта укладывается в бюджет.
+"""
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Команда main.py -> (модуль, который она импортирует, бюджет импорта в секундах)
+ENTRY_POINTS = {
+    "monitor": ("apps.unified_monitor", 1.0),
+    "parse today": ("apps.today_parser", 3.0),
+    "gwen": ("systems.alexey.main", 3.5),
+    "worker": ("systems.parser.celery_config", 2.0),
+    "lead filter": ("systems.parser.lead_filter_advanced", 2.5),
+}
+
+HEAVY_MODULES = {"torch", "transformers", "sentence_transformers", "sklearn", "pandas", "whisper"}
+
+_ROW = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def import_profile(module: str):
+    """(cumulative seconds, {имя модуля: self us}) для `import module` в чистом процессе."""
+    env = {**os.environ, "TELEGRAM_API_ID": os.environ.get("TELEGRAM_API_ID", "1"),
+           "TELEGRAM_API_HASH": os.environ.get("TELEGRAM_API_HASH", "x")}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    if proc.returncode != 0:
+        missing = re.search(r"ModuleNotFoundError: No module named '([^'.]+)", proc.stderr)
+        if missing:
+            pytest.skip(f"{module}: dependency {missing.group(1)} is not installed")
+        raise AssertionError(proc.stderr[-2000:])
+
+    modules, total = {}, 0.0
+    for line in proc.stderr.splitlines():
+        match = _ROW.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        modules[name] = int(match.group(1))
+        if name == module and not match.group(3):
+            total = int(match.group(2)) / 1e6
+    return total, modules
+
+
+@pytest.mark.parametrize("command", list(ENTRY_POINTS))
+def test_entry_point_cold_start(command):
+    module, budget = ENTRY_POINTS[command]
+    total, modules = import_profile(module)
+
+    heavy = sorted(HEAVY_MODULES & {name.split(".")[0] for name in modules})
+    assert not heavy, f"{command}: {module} imports {heavy} at startup"
+
+    slowest = sorted(modules.items(), key=lambda item: -item[1])[:5]
+    assert total <= budget, f"{command}: import {total:.2f}s > {budget}s budget; slowest: {slowest}"
@@ -0,0 +1,62 @@
+import random
+
+from systems.parser import lead_filter_advanced as lfa
+
+NEGATIONS = ["не нужно", "не нужна", "не  нужен", "без", "не интересует", "не требуется", "отказываемся от",
+             "сама веду", "сам занимаюсь", "свой", "у нас есть", "уже нашли", "съесть"]
+SUFFIXES = ["не нужно", "не нужен", "не\nтребуется"]
+FILLER = ["привет", "всем", "проект", "срочно", "бюджет 50к", "пишите в лс", "интернет-магазин", "команда",
+          "оплата сдельная", "тз есть", "🔥", "!!!", "созвон", "\n", "  "]
+
+
+def _corpus(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    keywords = [kw for kws in lfa.DIRECTION_KEYWORDS.values() for kw in kws]
+    texts = []
+    for _ in range(n):
+        parts = []
+        for _ in range(rng.randint(1, 12)):
+            roll = rng.random()
+            if roll < 0.35:
+                parts.append(rng.choice(keywords))
+            elif roll < 0.5:
+                parts.append(rng.choice(lfa._REQUEST_SIGNALS))
+            elif roll < 0.62:
+                parts.append(f"{rng.choice(NEGATIONS)} {rng.choice(keywords)}")
+            elif roll < 0.68:
+                parts.append(f"{rng.choice(keywords)} {rng.choice(SUFFIXES)}")
+            elif roll < 0.8:
+                parts.append("x" * rng.randint(60, 90))  # граница окна ±80 символов
+            else:
+                parts.append(rng.choice(FILLER))
+        text = rng.choice([" ", "  ", "\n", ", "]).join(parts)
+        texts.append(text.upper() if rng.random() < 0.1 else text)
+    return texts
+
+
+def test_engine_matches_reference_detector():
+    engine = lfa._get_direction_engine()
+    engine.clear_memo()
+    for text in _corpus(1000) + ["", "seo", "не нужен seo", "seo не нужен", "нужен сео и без директа"]:
+        assert lfa.detect_direction(text) == lfa._detect_direction_reference(text), text
+        text_lower = text.lower()
+        expected = {kw: lfa._score_keyword(text_lower, kw) for kw in engine.keywords if kw in text_lower}
+        assert engine.score_keywords(text_lower) == expected, text
+
+
+def test_detect_direction_is_memoised():
+    engine = lfa._get_direction_engine()
+    engine.clear_memo()
+    text = "Ищем подрядчика на настройку Яндекс Директ"
+    first = lfa.detect_direction(text)
+    assert engine._memo[text.lower()] == first
+    assert lfa.detect_direction(text) == first and len(engine._memo) == 1
+
+
+def test_engine_without_pyahocorasick(monkeypatch):
+    from systems.parser import direction_engine
+
+    monkeypatch.setattr(direction_engine, "PYAHOCORASICK_AVAILABLE", False)
+    engine = direction_engine.DirectionEngine(lfa.DIRECTION_KEYWORDS, lfa._NEGATION_PATTERNS, lfa._REQUEST_SIGNALS)
+    for text in _corpus(200, seed=11):
+        assert engine.detect(text.lower()) == lfa._detect_direction_reference(text), text
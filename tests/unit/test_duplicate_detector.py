@@ -0,0 +1,67 @@
+import sqlite3
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from core.ai_engine.model_registry import model_registry
+from core.database.sqlite_pool import close_all_pools
+from systems.parser.duplicate_detector import DuplicateDetector
+from systems.parser.vacancy_db import VacancyDatabase
+
+
+class FakeEncoder:
+    """SentenceTransformer.encode: детерминированный вектор по тексту, считает тексты."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def _vector(self, text):
+        return np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(8).astype(np.float32)
+
+    def encode(self, texts, batch_size=32):
+        if isinstance(texts, str):
+            self.encoded.append(texts)
+            return self._vector(texts)
+        self.encoded.extend(texts)
+        return np.stack([self._vector(t) for t in texts])
+
+
+@pytest.fixture
+def detector(tmp_path, monkeypatch):
+    monkeypatch.setattr(VacancyDatabase, "_insert_hooks", [])
+    monkeypatch.setattr(DuplicateDetector, "_instance", None)
+    monkeypatch.setattr(model_registry, "embedding_dim", lambda name, default=312: 8)
+    db = VacancyDatabase(str(tmp_path / "vacancies.db"))
+    detector = DuplicateDetector(db)
+    detector._encoder = FakeEncoder()
+    detector.index_refresh_seconds = 0
+    return detector
+
+
+@pytest.mark.asyncio
+async def test_insert_hook_reuses_check_embedding_and_skips_other_rows(detector):
+    db, encoder = detector.db, detector._encoder
+    await db.init_db()
+    text = "Ищем таргетолога на проект, бюджет 50к"
+    assert (await detector.is_duplicate(text, message_id=1))[0] is False
+    await db.add_accepted(text, "chat", message_id=1, chat_id=-1)
+    assert encoder.encoded == [text]  # embedding из проверки, без повторного encode
+    assert len(detector.index) == 1
+
+    old = (datetime.now() - timedelta(days=5)).isoformat()
+    await db.add_rejected("Продам аккаунт недорого, пишите", "chat", reason="spam", message_id=2, chat_id=-1)
+    await db.add_accepted("Старая вакансия из истории чата", "chat", date=old, message_id=3, chat_id=-1)
+    await db.add_accepted("Нужен SEO-специалист на аудит сайта", "chat", message_id=4, chat_id=-1)
+    assert len(encoder.encoded) == 1 and len(detector.index) == 1
+
+    # Следующая проверка: непроверенная принятая строка досчитывается батчем, embeddings пишутся пачкой
+    duplicate, _, method = await detector.is_duplicate(text, message_id=5)
+    assert duplicate and method == "semantic"
+    assert len(detector.index) == 2
+    assert encoder.encoded[1:] == ["Нужен SEO-специалист на аудит сайта"]
+    with sqlite3.connect(db.db_path) as conn:
+        stored = dict(conn.execute("SELECT message_id, embedding IS NOT NULL FROM vacancies"))
+    assert stored == {1: 1, 2: 0, 3: 0, 4: 1}
+    await close_all_pools()
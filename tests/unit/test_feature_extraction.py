@@ -0,0 +1,50 @@
+import random
+
+import numpy as np
+import pytest
+
+from systems.parser.lead_filter_advanced import FEATURES_DTYPE, extract_features_batch, normalize_and_extract_features
+
+TEXTS = [
+    "",
+    "Нужен специалист по SEO. Бюджет 50000 руб и ещё 10 000 ₽, срочно!",
+    "🔥🔥 ПРОДАМ БАЗУ 🔥 пишите @seller_bot #реклама #продажа #база #дешево",
+    "Смотрите https://example.com/page?a=1 и http://t.me/joinchat — 100$ или 200 usd",
+    "Hello wоrld (омоглиф о) — ТЗ есть, 5к",
+    "   \n\t  ",
+    "12 3руб, 7 евро; #Тег @User",
+]
+
+
+def _corpus(n: int, seed: int = 3):
+    rng = random.Random(seed)
+    pieces = TEXTS[1:] + ["ЖИРНЫЙ", "тест", "😀", "#x", "@y", "300 eur", "—", "https://a.b/c", "ⲁⲃⲥ"]
+    return [" ".join(rng.choice(pieces) for _ in range(rng.randint(0, 8))) for _ in range(n)]
+
+
+def test_features_known_values():
+    features = normalize_and_extract_features(TEXTS[1])
+    assert features["has_budget"] and features["budget_values"] == [50000, 0]
+    assert features["avg_budget"] == 25000
+    spam = normalize_and_extract_features(TEXTS[2])
+    assert spam["emoji_count"] == 2 and spam["mentions"] == ["@seller_bot"] and len(spam["hashtags"]) == 4
+    links = normalize_and_extract_features(TEXTS[3])
+    assert links["domains"] == ["example.com", "t.me"] and links["budget_values"] == [100, 200]
+
+
+def test_batch_matches_single_text_features():
+    texts = TEXTS + _corpus(300)
+    batch = extract_features_batch(texts)
+    assert batch.dtype == FEATURES_DTYPE and batch.shape == (len(texts),)
+    for row, text in zip(batch, texts):
+        features = normalize_and_extract_features(text)
+        assert row["word_count"] == features["word_count"]
+        assert row["emoji_density"] == pytest.approx(features["emoji_density"], rel=1e-6)
+        assert row["caps_ratio"] == pytest.approx(features["caps_ratio"], rel=1e-6)
+        assert bool(row["has_budget"]) == features["has_budget"]
+        assert row["avg_budget"] == pytest.approx(features["avg_budget"])
+        assert row["url_count"] == len(features["urls"])
+        assert row["hashtag_count"] == len(features["hashtags"])
+        assert row["mention_count"] == len(features["mentions"])
+    assert extract_features_batch([]).shape == (0,)
+    assert np.all(batch["caps_ratio"] <= 1.0)
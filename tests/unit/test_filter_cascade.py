@@ -0,0 +1,272 @@
+import sqlite3
+import zlib
+
+import pytest
+
+from systems.parser import lead_filter_advanced as lfa
+from systems.parser.filter_cascade import GATE, CascadeStage, FilterCascade, Verdict
+
+STORED = [
+    ("Нужен специалист по SEO для продвижения интернет-магазина. Бюджет 50000 руб. Срочно!",
+     "Разработка и IT - Kwork фриланс заказы", "SEO"),
+    ("Привет! Я таргетолог, настрою вам рекламу. Пишите в ЛС.", "ФРИЛАНС | ВАКАНСИИ INSTAGRAM", "таргетированная реклама"),
+    ("Нужен спец по авито, бюджет 5к", "Таргет | Арбитраж | Вакансии", "авито"),
+    ("Ищем подрядчика на настройку Яндекс Директ для сети стоматологий, ТЗ есть", "VK Freelance All", "контекстная реклама"),
+    ("Требуется разработка лендинга на Tilda под запуск курса, дизайн готов", "Разработка и IT - Kwork фриланс заказы",
+     "разработка сайтов"),
+    ("Открыта вакансия в нашу дружную команду: менеджер маркетплейсов, зп от 60к, официальное трудоустройство",
+     "ЖВБ – Фриланс и отзывы за деньги", "Unknown"),
+    ("Продам аккаунт с отзывами, недорого", "ЖВБ – Фриланс и отзывы за деньги", "Unknown"),
+    ("Кто может сделать сайт? Нужна помощь", "Таргет | Арбитраж | Вакансии", "разработка сайтов"),
+    ("Ищу таргетолога на проект, оплата сдельная", "Таргет | Арбитраж | Вакансии", "таргетированная реклама"),
+    ("Всем привет, как дела?", "ФРИЛАНС | ВАКАНСИИ INSTAGRAM", ""),
+]
+
+
+# Сохранённый корпус (data/db/vacancies.db), сколько строк реплеить
+STORED_CORPUS_LIMIT = 2000
+
+
+def _score(text: str, salt: str) -> float:
+    return (zlib.crc32((salt + text).encode("utf-8")) % 1000) / 1000
+
+
+@pytest.fixture
+def stored_vacancies(tmp_path):
+    db_path = tmp_path / "vacancies.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE vacancies (id INTEGER PRIMARY KEY, text TEXT, source TEXT, direction TEXT)")
+        rows = [(f"{text} #{i}" if i >= len(STORED) else text, source, direction)
+                for i, (text, source, direction) in enumerate(STORED * 6)]
+        conn.executemany("INSERT INTO vacancies (text, source, direction) VALUES (?, ?, ?)", rows)
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT text, source, direction FROM vacancies ORDER BY id").fetchall()
+
+
+@pytest.fixture
+def stored_corpus():
+    """Реальные сохранённые вакансии (vacancies.db), если база есть и не пуста."""
+    from core.config.settings import settings
+
+    db_path = settings.VACANCY_DB_PATH
+    if not db_path.exists():
+        pytest.skip(f"нет {db_path}")
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("""
+            SELECT text, COALESCE(source, ''), COALESCE(direction, '') FROM vacancies
+            WHERE text IS NOT NULL AND text != '' ORDER BY id DESC LIMIT ?
+        """, (STORED_CORPUS_LIMIT,)).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        conn.close()
+    if not rows:
+        pytest.skip(f"в {db_path} нет вакансий")
+    return rows
+
+
+async def baseline_filter_lead_advanced(text, source, direction, message_id=0,
+                                        use_llm_for_uncertain=True, use_deduplication=True):
+    """
+    Замороженная копия монолитного filter_lead_advanced до каскада (без логирования):
+    эталон, с которым сверяется lead_cascade. Стадии — те же функции модуля.
+    """
+    details = {}
+    if use_deduplication:
+        db = lfa.VacancyDatabase()
+        await db.init_db()
+        detector = lfa.DuplicateDetector(db_manager=db)
+        is_dup, similarity, method = await detector.is_duplicate(
+            text=text, message_id=message_id, source_channel=source
+        )
+        if is_dup:
+            return {
+                "is_lead": False,
+                "confidence": 0.95,
+                "reason": f"DUPLICATE: {similarity:.2%} similar (method: {method})",
+                "stage": "DEDUPLICATION",
+                "details": {"similarity": similarity, "method": method},
+            }
+
+    features = lfa.normalize_and_extract_features(text)
+    details["features"] = features
+    is_blocked, block_reason = lfa.check_hard_blocks(text, features)
+    if is_blocked:
+        return {"is_lead": False, "confidence": 0.99, "reason": block_reason,
+                "stage": "LEVEL_1_HARD_BLOCK", "details": details}
+
+    heuristic = lfa.calculate_heuristic_score(text, features)
+    details["heuristic"] = heuristic
+    context = lfa.apply_context_validation(heuristic["score"], source, direction, features)
+    details["context"] = context
+    if context.get("is_blocked"):
+        return {"is_lead": False, "confidence": 0.99, "reason": context.get("reason", "Context Block"),
+                "stage": "LEVEL_3_CONTEXT_BLOCK", "details": details}
+
+    final_score = context["final_score"]
+    decision_made = False
+    is_lead = False
+    confidence = 0.0
+    stage = ""
+    reason = ""
+    if final_score >= 3:
+        is_lead, confidence, decision_made = True, 0.85, True
+        reason, stage = f"HEURISTIC_ACCEPT: score={final_score}", "LEVEL_2_HEURISTIC"
+    elif final_score <= -2:
+        is_lead, confidence, decision_made = False, 0.85, True
+        reason, stage = f"HEURISTIC_REJECT: score={final_score}", "LEVEL_2_HEURISTIC"
+
+    if not decision_made or confidence < 0.8:
+        from systems.parser.bert_classifier import get_bert_classifier
+        bert_result = await get_bert_classifier().predict_async(text)
+        details["bert"] = bert_result
+        if not decision_made:
+            is_lead = bert_result["is_lead"]
+            confidence = bert_result["confidence"]
+            reason = f"BERT_ONLY: {bert_result['method']}"
+            stage = "LEVEL_BERT"
+        else:
+            confidence = (confidence + bert_result["confidence"]) / 2
+            is_lead = bert_result["is_lead"] if confidence > 0.5 else is_lead
+            reason = f"HYBRID: heuristic={final_score}, bert={bert_result['confidence']:.2f}"
+            stage = "LEVEL_BERT_HYBRID"
+        decision_made = True
+
+    if (not decision_made or (0.4 < confidence < 0.6)) and use_llm_for_uncertain:
+        llm_result = await lfa.llm_deep_analysis(text, features, final_score)
+        details["llm"] = llm_result
+        is_lead = llm_result.get("is_real_lead", False)
+        confidence = llm_result.get("confidence", 0.0)
+        reason = f"LLM: {llm_result.get('reason', 'No reason')}"
+        stage = "LEVEL_4_LLM"
+    elif not decision_made:
+        is_lead, confidence = False, 0.6
+        reason, stage = f"UNCERTAIN_REJECT: score={final_score}", "LEVEL_2_CONSERVATIVE"
+
+    if not is_lead:
+        return {"is_lead": False, "confidence": confidence, "reason": reason, "stage": stage, "details": details}
+
+    entities = lfa.extract_entities_hybrid(text)
+    priority_data = lfa.calculate_lead_priority(
+        text, source, direction, features, final_score, lfa.SOURCE_RELIABILITY, lfa.DIRECTION_RELEVANCE
+    )
+    if entities["budget"]["min"] > 50000:
+        priority_data["priority"] += 15
+    if entities["deadline"]["urgency"] in ["urgent", "asap", "today"]:
+        priority_data["priority"] += 20
+    if entities["contact"]["has_contact"]:
+        priority_data["priority"] += 5
+    return {"is_lead": True, "confidence": confidence, "reason": reason, "stage": stage,
+            "priority": max(0, min(100, priority_data["priority"])), "details": details}
+
+
+@pytest.fixture
+def stubbed_models(monkeypatch):
+    """Детерминированные дедуп/BERT/LLM: решение зависит только от текста."""
+    from systems.parser import bert_classifier, bert_ner
+
+    calls = {"dedup": 0, "bert": 0, "llm": 0}
+
+    class FakeDb:
+        async def init_db(self):
+            pass
+
+    class FakeDetector:
+        def __init__(self, db_manager=None):
+            pass
+
+        async def is_duplicate(self, text, message_id, source_channel=None):
+            calls["dedup"] += 1
+            similarity = _score(text, "dup")
+            return similarity > 0.7, similarity, "semantic"
+
+    class FakeBert:
+        async def predict_async(self, text):
+            calls["bert"] += 1
+            confidence = _score(text, "bert")
+            return {"is_lead": confidence > 0.5, "confidence": confidence, "method": "stub"}
+
+    async def fake_llm(text, features, score):
+        calls["llm"] += 1
+        return {"is_real_lead": _score(text, "llm") > 0.5, "confidence": 0.7, "reason": "stub"}
+
+    monkeypatch.setattr(lfa, "VacancyDatabase", FakeDb)
+    monkeypatch.setattr(lfa, "DuplicateDetector", FakeDetector)
+    monkeypatch.setattr(lfa, "llm_deep_analysis", fake_llm)
+    monkeypatch.setattr(bert_classifier, "get_bert_classifier", lambda: FakeBert())
+    monkeypatch.setattr(bert_ner.bert_ner, "extract_all", lambda text: {"budget": {"confidence": 0.0}})
+    lfa.lead_cascade.reset_stats()
+    yield calls
+    lfa.lead_cascade.reset_stats()
+
+
+async def _replay_against_baseline(rows):
+    cascade = lfa.lead_cascade
+    gate_names = [g.name for g in cascade.gates]
+    plans = {
+        "legacy": cascade.legacy_plan(),
+        "planner": cascade.compute_plan(),
+        "accept_only": [[] for _ in cascade.decisions] + [gate_names],
+        "reversed": [[]] + [[name] for name in reversed(gate_names)],
+    }
+    gate_stages = set(lfa._GATE_STAGES)
+
+    for use_llm in (True, False):
+        for text, source, direction in rows:
+            baseline = await baseline_filter_lead_advanced(text, source, direction, use_llm_for_uncertain=use_llm)
+            for name, plan in plans.items():
+                result = await lfa.filter_lead_advanced(text, source, direction, use_llm_for_uncertain=use_llm,
+                                                        plan=plan)
+                assert result["is_lead"] == baseline["is_lead"], (name, text)
+                # Порядок вето меняет только причину отказа, когда срабатывают несколько фильтров
+                if name == "legacy" or (result["stage"] not in gate_stages and baseline["stage"] not in gate_stages):
+                    assert (result["stage"], result["reason"]) == (baseline["stage"], baseline["reason"]), (name, text)
+                if result["is_lead"]:
+                    assert result["priority"] == baseline["priority"], (name, text)
+
+
+@pytest.mark.asyncio
+async def test_replay_matches_baseline_filter(stored_vacancies, stubbed_models):
+    await _replay_against_baseline(stored_vacancies)
+
+
+@pytest.mark.asyncio
+async def test_replay_stored_corpus_matches_baseline_filter(stored_corpus, stubbed_models):
+    await _replay_against_baseline(stored_corpus)
+
+
+@pytest.mark.asyncio
+async def test_planner_defers_dedup_and_counts_skips(stored_vacancies, stubbed_models):
+    cascade = lfa.lead_cascade
+    plan = cascade.compute_plan()
+    assert "dedup" not in plan[0]  # дорогой дедуп не идёт первым
+
+    for text, source, direction in stored_vacancies:
+        await lfa.filter_lead_advanced(text, source, direction)
+
+    stats = lfa.get_cascade_stats()
+    assert stats["messages"] == len(stored_vacancies)
+    dedup = stats["stages"]["dedup"]
+    assert dedup["runs"] == stubbed_models["dedup"]
+    assert dedup["skipped"] > 0 and dedup["runs"] + dedup["skipped"] == len(stored_vacancies)
+    assert stats["stages"]["bert"]["runs"] == stubbed_models["bert"]
+    assert stats["stages"]["llm"]["runs"] + stats["stages"]["llm"]["skipped"] == len(stored_vacancies)
+
+
+@pytest.mark.asyncio
+async def test_planner_moves_cheap_selective_gate_forward():
+    async def never(ctx):
+        return None
+
+    async def decide(ctx):
+        return Verdict(True, 0.9, "ok", "D")
+
+    cheap = CascadeStage("cheap", GATE, never, prior_cost_ms=0.01, prior_reject_rate=0.5)
+    costly = CascadeStage("costly", GATE, never, prior_cost_ms=50.0, prior_reject_rate=0.01)
+    expensive_decision = CascadeStage("model", "decision", decide, prior_cost_ms=100.0, prior_accept_rate=0.1)
+    cascade = FilterCascade([costly, cheap], [expensive_decision], fallback=lambda ctx: Verdict(False, 0.0, "", ""))
+
+    assert cascade.compute_plan() == [["cheap"], ["costly"]]
+    assert (await cascade.run(object())).is_lead
+    assert cascade.get_stats()["stages"]["costly"]["runs"] == 1
@@ -0,0 +1,95 @@
+import asyncio
+import sqlite3
+import time
+from contextlib import closing
+
+import pytest
+
+from core.database.sqlite_pool import close_all_pools
+from core.utils.loop_monitor import LoopLatencyMonitor
+from systems.gwen.gwen_repository import GwenRepository
+from systems.parser import change_feed as cf
+from systems.parser.vacancy_db import VacancyDatabase
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(cf, "_feeds", {})
+    monkeypatch.setattr(VacancyDatabase, "_insert_hooks", [])
+    monkeypatch.setattr(VacancyDatabase, "_label_hooks", [])
+    with closing(sqlite3.connect(tmp_path / "history.db")) as conn, conn:
+        conn.execute("""CREATE TABLE history_leads (id INTEGER PRIMARY KEY, text TEXT, direction TEXT,
+                        contact_link TEXT, source TEXT, date TEXT, score INTEGER, found_at TEXT)""")
+        conn.executemany("INSERT INTO history_leads VALUES (?, ?, 'SEO', ?, 'chat', '2026-01-01', ?, '2026-01-01')",
+                         [(1, "Нужен SEO", "@alice_seo", 5), (2, "Нужен сайт", "@bob_site", 2), (3, "Нужен Директ", "", 9)])
+    with closing(sqlite3.connect(tmp_path / "bot.db")) as conn, conn:
+        conn.execute("CREATE TABLE message_logs (id INTEGER PRIMARY KEY, direction TEXT, created_at TEXT)")
+        conn.executemany("INSERT INTO message_logs (direction, created_at) VALUES (?, ?)",
+                         [("incoming", "2026-10-17T09:00"), ("outgoing", "2026-10-17T09:01"), ("incoming", "2026-10-01")])
+    return GwenRepository(str(tmp_path / "vacancies.db"), str(tmp_path / "bot.db"), str(tmp_path / "history.db"))
+
+
+@pytest.mark.asyncio
+async def test_outreach_queue_and_decisions(repo):
+    db = repo.vacancies
+    await db.init_db()
+    await db.add_accepted("Ищу таргетолога, пишите @client_one", "chat", contact_link="@client_one", message_id=1, chat_id=-1)
+    await db.add_accepted("Нужен сайт на Tilda", "chat", message_id=2, chat_id=-1)
+    events = await db.change_feed.subscribe({cf.VACANCY_RESPONSE})
+
+    queue = await repo.get_outreach_queue()
+    assert [v["text"][:4] for v in queue] == ["Ищу ", "Нуже"] and queue[0]["contact_link"] == "@client_one"
+
+    first, second = queue[0]["hash"], queue[1]["hash"]
+    await repo.set_response(first, "notified")
+    assert await repo.count_notified() == 1
+    event = await events.get(timeout=2)
+    assert (event.hash, event.value) == (first, "notified")
+
+    await repo.reject_vacancy(first, "USER_REJECT: не наш профиль", response="rejected")
+    await repo.set_draft(second, "Здравствуйте!")
+    assert await repo.count_unsent_drafts() == 1
+    assert await repo.get_status_counts() == {"accepted": 1, "rejected": 1}
+    assert (await repo.get_vacancy(second))["draft_response"] == "Здравствуйте!"
+    assert await repo.find_text_by_contact("client_one") == queue[0]["text"]
+
+    summary = await repo.get_daily_summary("2000-01-01")
+    assert (summary["accepted"], summary["pending_drafts"], len(summary["top_orders"])) == (1, 1, 1)
+    assert await repo.count_incoming_messages("2026-10-17") == 1
+    await db.change_feed.close()
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_history_leads_column_added_once_and_marked(repo):
+    assert [lead[0] for lead in await repo.get_history_leads_for_outreach()] == [1]
+    await repo.mark_history_lead(1, "2026-10-17T10:00:00+03:00")
+    assert await repo.count_history_sent_on("2026-10-17") == 1
+    assert await repo.get_history_leads_for_outreach() == []
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_loop_monitor_flags_blocking_coroutine():
+    monitor = LoopLatencyMonitor(threshold_ms=50, heartbeat_interval=0.01)
+
+    async def blocking_handler():
+        await asyncio.sleep(0)
+        time.sleep(0.08)
+        await asyncio.sleep(0)
+
+    async def polite_handler():
+        for _ in range(5):
+            await asyncio.sleep(0.005)
+
+    monitor.start()
+    try:
+        await asyncio.gather(blocking_handler(), polite_handler())
+        await asyncio.sleep(0.03)
+    finally:
+        await monitor.stop()
+
+    assert monitor.stats["slow_callbacks"] == 1
+    assert "blocking_handler" in monitor.recent[0]["callback"] and monitor.recent[0]["duration_ms"] >= 80
+    assert monitor.stats["max_lag_ms"] >= 50
+    assert not monitor.installed
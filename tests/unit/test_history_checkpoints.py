@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from core.database.sqlite_pool import close_all_pools
+from systems.parser.history_checkpoints import ChatCheckpointStore, ResumableChatScanner
+
+STOP = datetime(2024, 1, 1)
+CHAT = -1001
+
+
+class FakeHistoryClient:
+    """История чата: id 1..n, id 1..10 — старше stop_date."""
+
+    def __init__(self, n):
+        self.messages = []
+        self.calls = 0
+        self.extend(n)
+
+    def extend(self, n):
+        start = len(self.messages) + 1
+        for msg_id in range(start, start + n):
+            date = STOP - timedelta(days=1) if msg_id <= 10 else STOP + timedelta(hours=msg_id)
+            self.messages.append(SimpleNamespace(id=msg_id, date=date, text=f"m{msg_id}"))
+
+    async def get_chat_history(self, chat_id, limit=0, offset_id=0):
+        self.calls += 1
+        older = [m for m in reversed(self.messages) if not offset_id or m.id < offset_id]
+        for message in older[:limit]:
+            yield message
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_resume_after_crash_and_incremental_head(tmp_path):
+    client = FakeHistoryClient(500)
+    store = ChatCheckpointStore(str(tmp_path / "history_raw_messages.db"))
+    scanner = ResumableChatScanner(client, store, STOP, page_size=50)
+    seen = []
+
+    async def crash_on_third_page(messages):
+        if len(seen) >= 100:
+            raise Crash()
+        seen.extend(m.id for m in messages)
+
+    with pytest.raises(Crash):
+        await scanner.scan(CHAT, "chat", crash_on_third_page)
+    cp = await store.load(CHAT)
+    assert (cp.pass_top, cp.pass_cursor, cp.newest_id) == (500, 401, None)
+
+    async def collect(messages):
+        seen.extend(m.id for m in messages)
+
+    client.calls = 0
+    assert await scanner.scan(CHAT, "chat", collect) == 390
+    assert sorted(seen) == list(range(11, 501))  # без повторов и до stop_date
+    cp = await store.load(CHAT)
+    assert (cp.newest_id, cp.oldest_id, cp.backfill_done, cp.pass_top) == (500, 11, True, None)
+
+    # Новые сообщения: читается только голова, один-два запроса вместо всей истории
+    client.extend(30)
+    client.calls = 0
+    seen.clear()
+    assert await scanner.scan(CHAT, "chat", collect) == 30
+    assert seen == list(range(530, 500, -1)) and client.calls == 1
+    assert await scanner.scan(CHAT, "chat", collect) == 0
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_backfill_continues_below_oldest(tmp_path):
+    client = FakeHistoryClient(300)
+    store = ChatCheckpointStore(str(tmp_path / "raw.db"))
+    cp = await store.load(CHAT, "chat")
+    # Диапазон из прошлого запуска, история ниже 200 не дочитана
+    cp.newest_id, cp.oldest_id = 300, 200
+    await store.save(cp)
+
+    seen = []
+
+    async def collect(messages):
+        seen.extend(m.id for m in messages)
+
+    await ResumableChatScanner(client, store, STOP, page_size=64).scan(CHAT, "chat", collect)
+    assert seen == list(range(199, 10, -1))
+    cp = await store.load(CHAT)
+    assert (cp.oldest_id, cp.backfill_done) == (11, True)
+    await close_all_pools()
@@ -0,0 +1,54 @@
+import asyncio
+
+import httpx
+import pytest
+
+from core.ai_engine.http_pool import close_http_clients, get_http_client
+from core.ai_engine.llm_client import LLMClient
+
+
+@pytest.mark.asyncio
+async def test_one_client_per_origin_and_reuse_by_llm_client():
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        if request.url.path == "/api/chat":
+            return httpx.Response(200, json={"message": {"content": '{"is_real_lead": true, "role": "CLIENT"}'}})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "SEO"}}]})
+
+    url = "https://llm.test/api/v1/chat/completions"
+    client = get_http_client(url, transport=httpx.MockTransport(handler))
+    assert get_http_client("https://llm.test:443/other") is client
+    assert get_http_client("http://llm.test/") is not client
+
+    llm = LLMClient()
+    llm.base_url = url
+    llm.headers["Authorization"] = "Bearer test"
+    results = await asyncio.gather(*(llm._generate_openrouter("m", f"p{i}", "s") for i in range(5)))
+    assert results == ["SEO"] * 5 and len(requests) == 5
+    assert get_http_client(url) is client
+
+    from core.config.settings import settings
+    get_http_client(f"{settings.OLLAMA_URL}/api/chat", transport=httpx.MockTransport(handler))
+    assert (await llm.call_ollama("prompt", "text"))["role"] == "CLIENT"
+
+    await close_http_clients()
+    assert client.is_closed
+    assert get_http_client(url) is not client
+    await close_http_clients()
+
+
+def test_clients_closed_with_their_event_loop():
+    transport = httpx.MockTransport(lambda request: httpx.Response(200))
+
+    async def use_client():
+        client = get_http_client("https://llm.test/", transport=transport)
+        await client.get("https://llm.test/ping")
+        return client
+
+    # asyncio.run закрывает loop — клиент должен закрыться вместе с ним, а не потеряться
+    first = asyncio.run(use_client())
+    assert first.is_closed
+    second = asyncio.run(use_client())
+    assert second is not first and second.is_closed
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from core.database.sqlite_pool import close_all_pools
+from core.utils.llm_cache import LLMCache, make_cache_key
+
+
+def test_key_covers_full_request():
+    base = make_cache_key("direction", "m1", "system", "prompt " + "x" * 1000)
+    assert base == make_cache_key("direction", "m1", "system", "prompt " + "x" * 1000)
+    assert base != make_cache_key("direction", "m1", "other system", "prompt " + "x" * 1000)
+    assert base != make_cache_key("direction", "m2", "system", "prompt " + "x" * 1000)
+    assert base != make_cache_key("direction", "m1", "system", "prompt " + "x" * 999 + "y")
+    assert base != make_cache_key("outreach_draft", "m1", "system", "prompt " + "x" * 1000)
+
+
+@pytest.mark.asyncio
+async def test_memory_then_disk_and_ttl(tmp_path):
+    db_path = str(tmp_path / "llm_cache.db")
+    cache = LLMCache(db_path, memory_size=2)
+    await cache.set("k1", {"role": "CLIENT"}, namespace="lead_analysis")
+    assert await cache.get("k1", "lead_analysis") == {"role": "CLIENT"}
+    assert cache.stats["memory_hits"] == 1
+
+    fresh = LLMCache(db_path)
+    assert await fresh.get("k1") == {"role": "CLIENT"}
+    assert fresh.stats["disk_hits"] == 1
+
+    await cache.set("short", "value", ttl=-1)
+    assert await cache.get("short") is None
+    assert await cache.clear_old() == 1
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_call_llm_once(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm_cache.db"))
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"direction": "SEO"}
+
+    results = await asyncio.gather(*(cache.get_or_compute("k", compute, namespace="direction") for _ in range(10)))
+    assert results == [{"direction": "SEO"}] * 10 and len(calls) == 1
+    assert await cache.get_or_compute("k", compute) == {"direction": "SEO"} and len(calls) == 1
+    assert cache.get_stats()["namespaces"]["direction"] == {"hits": 9, "misses": 1}
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm_cache.db"))
+
+    async def empty():
+        return None
+
+    async def broken():
+        raise RuntimeError("provider down")
+
+    assert await cache.get_or_compute("none", empty) is None
+    assert await cache.get("none") is None
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("err", broken)
+    assert await cache.get("err") is None
+    assert await cache.get_or_compute("err", lambda: asyncio.sleep(0, "ok")) == "ok"
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_fallback_answers_are_not_cached_as_primary(tmp_path, monkeypatch):
+    from core.ai_engine import resilient_llm
+
+    monkeypatch.setattr(resilient_llm, "llm_cache", LLMCache(str(tmp_path / "llm_cache.db")))
+    client = resilient_llm.ResilientLLMClient()
+    calls = []
+
+    async def openrouter_down(prompt, text, timeout):
+        calls.append("openrouter")
+        raise RuntimeError("provider down")
+
+    async def ollama(prompt, text, timeout):
+        calls.append("ollama")
+        return {"role": "CLIENT", "is_real_lead": True}
+
+    monkeypatch.setattr(client, "_call_openrouter", openrouter_down)
+    monkeypatch.setattr(client, "_call_ollama", ollama)
+    assert (await client.call_with_fallback("prompt", "text"))["method"] == "ollama_fallback"
+
+    async def openrouter(prompt, text, timeout):
+        calls.append("openrouter")
+        return {"role": "AGENCY", "is_real_lead": False}
+
+    monkeypatch.setattr(client, "_call_openrouter", openrouter)
+    assert (await client.call_with_fallback("prompt", "text"))["role"] == "AGENCY"
+    assert (await client.call_with_fallback("prompt", "text"))["method"] == "openrouter_cached"
+    assert calls == ["openrouter", "ollama", "openrouter"]
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_coalesced_waiters_are_not_marked_cached(tmp_path, monkeypatch):
+    from core.ai_engine import resilient_llm
+
+    monkeypatch.setattr(resilient_llm, "llm_cache", LLMCache(str(tmp_path / "llm_cache.db")))
+    client = resilient_llm.ResilientLLMClient()
+
+    async def openrouter(prompt, text, timeout):
+        await asyncio.sleep(0.01)
+        return {"role": "CLIENT", "is_real_lead": True}
+
+    monkeypatch.setattr(client, "_call_openrouter", openrouter)
+    results = await asyncio.gather(*(client.call_with_fallback("prompt", "text") for _ in range(3)))
+    assert [r["method"] for r in results] == ["openrouter"] * 3
+    assert (await client.call_with_fallback("prompt", "text"))["method"] == "openrouter_cached"
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_generate_response_caches_only_primary_model(tmp_path, monkeypatch):
+    from core.ai_engine import llm_client
+
+    monkeypatch.setattr(llm_client, "llm_cache", LLMCache(str(tmp_path / "llm_cache.db")))
+    monkeypatch.setattr(llm_client.settings, "FALLBACK_MODELS", ["backup/model"])
+    client = llm_client.LLMClient()
+    client.model = "primary/model"
+    primary_up = False
+    calls = []
+
+    async def generate(model_name, prompt, system_prompt):
+        calls.append(model_name)
+        if model_name == client.model and not primary_up:
+            raise RuntimeError("HTTP 503")
+        return f"answer from {model_name}"
+
+    monkeypatch.setattr(client, "_generate_openrouter", generate)
+    assert await client.generate_response("p", cache_namespace="t") == "answer from backup/model"
+    primary_up = True
+    assert await client.generate_response("p", cache_namespace="t") == "answer from primary/model"
+    assert await client.generate_response("p", cache_namespace="t") == "answer from primary/model"
+    assert calls == ["primary/model", "backup/model", "primary/model"]
+    await close_all_pools()
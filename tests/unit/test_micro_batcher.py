@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from core.utils.micro_batcher import MicroBatcher
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_coalesced_into_batches():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=20)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+    await batcher.close()
+
+    assert results == [i * 2 for i in range(20)]
+    assert all(len(batch) <= 8 for batch in calls)
+    assert len(calls) < 20
+    assert batcher.stats["items"] == 20
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_propagates_to_every_caller():
+    def batch_fn(items):
+        raise RuntimeError("model crashed")
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=5)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+    await batcher.close()
+
+    assert all(isinstance(r, RuntimeError) for r in results)
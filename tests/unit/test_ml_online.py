@@ -0,0 +1,119 @@
+import random
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from core.config.settings import settings
+from core.database.sqlite_pool import close_all_pools
+from systems.parser import ml_classifier
+from systems.parser.active_learner import ActiveLearningPipeline
+from systems.parser.ml_classifier import MLLeadClassifier, learn_from_label
+from systems.parser.vacancy_db import VacancyDatabase
+
+LEAD = ["нужен таргетолог на проект", "ищем SEO специалиста, бюджет 30к", "требуется разработка лендинга",
+        "кто настроит яндекс директ? оплата сразу"]
+NOISE = ["продам аккаунт недорого", "всем привет, как дела", "подписывайтесь на канал с кейсами",
+         "я таргетолог, пишите в лс"]
+
+
+def _corpus(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        is_lead = i % 3 != 0
+        text = f"{rng.choice(LEAD if is_lead else NOISE)} #{i}"
+        rows.append((text, "accepted" if is_lead else "rejected"))
+    return rows
+
+
+def _accuracy(clf, rows):
+    predictions = clf.predict_batch([text for text, _ in rows])
+    return sum(p["is_lead"] == (status == "accepted") for p, (_, status) in zip(predictions, rows)) / len(rows)
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_then_label_hook_updates_and_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.setattr(VacancyDatabase, "_label_hooks", [])
+    monkeypatch.setattr(settings, "ML_CHECKPOINT_EVERY", 2)
+    model_path = tmp_path / "models" / "ml_online.pkl"
+    clf = MLLeadClassifier(str(model_path), online=True)
+    monkeypatch.setattr(ml_classifier, "_ml_classifier", clf)
+
+    db = VacancyDatabase(str(tmp_path / "vacancies.db"))
+    for i, (text, status) in enumerate(_corpus(300)):
+        if status == "accepted":
+            await db.add_accepted(text, "chat", message_id=i, chat_id=-1)
+        else:
+            await db.add_rejected(text, "chat", reason="spam", message_id=i, chat_id=-1)
+
+    metrics = clf.bootstrap_from_database(db.db_path)
+    assert metrics["train_size"] == 300 and clf.is_trained
+    assert _accuracy(clf, _corpus(60, seed=1)) > 0.9
+    assert model_path.exists()
+
+    VacancyDatabase.register_label_hook(learn_from_label)
+    with sqlite3.connect(db.db_path) as conn:
+        lead_ids = [row[0] for row in conn.execute("SELECT id FROM vacancies ORDER BY id LIMIT 2")]
+    version = clf.model_version
+    for lead_id in lead_ids:
+        await db.update_lead_label(lead_id, True, "tester", datetime.now())
+    assert clf.samples_seen == 302 and clf.model_version != version
+    checkpointed = clf.model_version
+    # Повторная разметка тем же значением не учится второй раз, исправление — учится
+    await db.update_lead_label(lead_ids[0], True, "tester", datetime.now())
+    assert clf.samples_seen == 302
+    await db.update_lead_label(lead_ids[0], False, "tester", datetime.now())
+    # Версия для кэша committee меняется только на чекпоинте, не на каждой разметке
+    assert clf.samples_seen == 303 and clf.model_version == checkpointed
+
+    # Новый экземпляр продолжает с сохранённого состояния
+    clf.save()
+    restored = MLLeadClassifier(str(model_path), online=True)
+    assert restored.samples_seen == 303 and restored.bootstrapped
+    assert restored.model_version == clf.model_version != checkpointed
+    clf.save()
+    assert clf.model_version == restored.model_version  # без новых разметок версия не меняется
+    texts = [text for text, _ in _corpus(20, seed=2)]
+    assert [p["confidence"] for p in restored.predict_batch(texts)] == pytest.approx(
+        [p["confidence"] for p in clf.predict_batch(texts)])
+    await close_all_pools()
+
+
+def test_predict_matches_predict_batch_and_untrained_defaults(tmp_path):
+    clf = MLLeadClassifier(str(tmp_path / "model.pkl"), online=True)
+    assert clf.predict("нужен таргетолог")["method"] == "ML_NONE"
+
+    rows = _corpus(120)
+    clf.partial_fit([text for text, _ in rows], [int(status == "accepted") for _, status in rows])
+    texts = [text for text, _ in _corpus(10, seed=3)]
+    batch = clf.predict_batch(texts)
+    assert [clf.predict(t) for t in texts] == batch
+    assert all(p["method"] == "ML_SGD" for p in batch)
+
+
+@pytest.mark.asyncio
+async def test_sync_bootstraps_table_even_after_hook_labels(tmp_path, monkeypatch):
+    monkeypatch.setattr(VacancyDatabase, "_label_hooks", [])
+    monkeypatch.setattr(settings, "ML_ONLINE_LEARNING", True)
+    clf = MLLeadClassifier(str(tmp_path / "ml_online.pkl"), online=True)
+    monkeypatch.setattr(ml_classifier, "_ml_classifier", clf)
+    pipeline = ActiveLearningPipeline()
+    pipeline.db = VacancyDatabase(str(tmp_path / "vacancies.db"))
+    for i, (text, status) in enumerate(_corpus(90)):
+        if status == "accepted":
+            await pipeline.db.add_accepted(text, "chat", message_id=i, chat_id=-1)
+        else:
+            await pipeline.db.add_rejected(text, "chat", reason="spam", message_id=i, chat_id=-1)
+
+    # Разметка до начального прохода ждёт его: она уже в таблице
+    await pipeline.db.update_lead_label(1, False, "tester", datetime.now())
+    await pipeline.db.update_lead_label(2, True, "tester", datetime.now())
+    assert clf.samples_seen == 0
+
+    clf.partial_fit(["нужен таргетолог", "продам аккаунт"], [1, 0], checkpoint=False)
+    assert clf.is_trained and not clf.bootstrapped
+    status = await pipeline.sync_ml_classifier()
+    assert status["bootstrapped"] and status["train_size"] == 90 and clf.samples_seen == 90
+    assert not (await pipeline.sync_ml_classifier())["bootstrapped"]
+    await close_all_pools()
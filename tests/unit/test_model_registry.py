@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.ai_engine.model_registry import model_registry
+
+
+@pytest.fixture(scope="module")
+def tiny_bert(tmp_path_factory):
+    from transformers import BertConfig, BertForPreTraining, BertTokenizerFast
+
+    path = tmp_path_factory.mktemp("tiny-bert")
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + list("абвгдеёжзийклмнопрстуфхцчшщъыьэюя0123456789")
+    (path / "vocab.txt").write_text("\n".join(vocab), encoding="utf-8")
+    BertTokenizerFast(vocab_file=str(path / "vocab.txt")).save_pretrained(str(path))
+    config = BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2,
+                        num_attention_heads=2, intermediate_size=64, max_position_embeddings=64)
+    BertForPreTraining(config).save_pretrained(str(path))
+    yield str(path)
+    model_registry.clear()
+
+
+def test_classifier_shares_encoder_and_loads_lazily(tiny_bert):
+    from systems.parser.bert_classifier import BERTLeadClassifier
+    from systems.parser.bert_ner import BERTEntityExtractor
+
+    model_registry.clear()
+    classifier = BERTLeadClassifier(tiny_bert)
+    BERTEntityExtractor(tiny_bert).extract_all("бюджет 50к")
+    assert model_registry.memory_report() == {}
+
+    results = classifier.predict_batch(["нужен сео", "привет"])
+    assert len(results) == 2 and all(0.0 <= r["confidence"] <= 1.0 for r in results)
+
+    encoder = model_registry.sentence_encoder(tiny_bert)
+    assert classifier.model.backbone is encoder[0].auto_model
+    report = model_registry.memory_report()
+    assert set(report) == {f"sentence:{tiny_bert}", f"backbone:{tiny_bert}"}
+    assert report[f"sentence:{tiny_bert}"]["params_mb"] > 0
+    assert report[f"backbone:{tiny_bert}"]["shared_with"] == f"sentence:{tiny_bert}"
+    assert model_registry.embedding_dim(tiny_bert) == 32
+
+
+def test_concurrent_first_use_loads_once(tiny_bert):
+    model_registry.clear()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        encoders = list(pool.map(lambda _: model_registry.sentence_encoder(tiny_bert), range(8)))
+    assert all(encoder is encoders[0] for encoder in encoders)
+    assert list(model_registry.memory_report()) == [f"sentence:{tiny_bert}"]
+
+
+def test_int8_backend_matches_float(tiny_bert, tmp_path, monkeypatch):
+    import sqlite3
+
+    import torch
+
+    from core.ai_engine import inference_backends
+    from core.ai_engine.inference_backends import compare_backends, load_holdout, resolve_backend
+    from systems.parser.bert_classifier import BERTLeadClassifier
+
+    model_registry.clear()
+    texts = ["нужен сео специалист", "ищу таргетолога бюджет 50к", "продам гараж", "привет"] * 5
+    float_encoder = model_registry.sentence_encoder(tiny_bert, "torch")
+    int8_encoder = model_registry.sentence_encoder(tiny_bert, "int8")
+    assert float_encoder is not int8_encoder
+    assert isinstance(int8_encoder[0].auto_model.encoder.layer[0].intermediate.dense,
+                      torch.ao.nn.quantized.dynamic.Linear)
+
+    float_conf = [r["confidence"] for r in BERTLeadClassifier(tiny_bert, backend="torch").predict_batch(texts)]
+    int8_conf = [r["confidence"] for r in BERTLeadClassifier(tiny_bert, backend="int8").predict_batch(texts)]
+    report = compare_backends(float_encoder.encode(texts), int8_encoder.encode(texts), float_conf, int8_conf)
+    assert report["embedding_cosine_min"] > 0.99
+    assert report["confidence_max_abs_diff"] < 0.05
+    report_sizes = model_registry.memory_report()
+    assert report_sizes[f"sentence:{tiny_bert}@int8"]["params_mb"] < report_sizes[f"sentence:{tiny_bert}"]["params_mb"]
+
+    monkeypatch.setattr(inference_backends, "ONNXRUNTIME_AVAILABLE", False)
+    assert resolve_backend("onnx") == "torch"
+
+    db_path = tmp_path / "vacancies.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE vacancies (id INTEGER PRIMARY KEY, text TEXT, manual_label INTEGER)")
+        conn.executemany("INSERT INTO vacancies (id, text, manual_label) VALUES (?, ?, ?)",
+                         [(i, f"text {i}", i % 2 if i % 3 else None) for i in range(1, 31)])
+    holdout_texts, holdout_labels = load_holdout(str(db_path), every=5)
+    assert holdout_texts == ["text 5", "text 10", "text 20", "text 25"] and holdout_labels == [1, 0, 0, 1]
+
+    _assert_holdout_accuracy(tiny_bert, "int8", tmp_path)
+
+
+HOLDOUT_TEXTS = [
+    ("нужен сео специалист для магазина", 1), ("ищу таргетолога бюджет 50к", 1),
+    ("требуется настройка директа срочно", 1), ("нужен сайт на тильде под ключ", 1),
+    ("продам гараж недорого", 0), ("привет всем как дела", 0),
+    ("я таргетолог пишите в лс", 0), ("вакансия менеджер зп от 60к", 0),
+]
+
+
+def _assert_holdout_accuracy(model_path, backend, tmp_path):
+    """Точность бэкенда на manual_label-holdout (load_holdout) не ниже float-модели."""
+    import sqlite3
+
+    from core.ai_engine.inference_backends import compare_backends, load_holdout
+    from systems.parser.bert_classifier import BERTLeadClassifier
+
+    db_path = tmp_path / f"holdout_{backend}.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE vacancies (id INTEGER PRIMARY KEY, text TEXT, manual_label INTEGER)")
+        conn.executemany("INSERT INTO vacancies (id, text, manual_label) VALUES (?, ?, ?)",
+                         [(i, f"{text} {i}", label) for i, (text, label) in enumerate(HOLDOUT_TEXTS * 25, start=1)])
+    texts, labels = load_holdout(str(db_path), every=5)
+    assert len(texts) == 40
+
+    encoder = model_registry.sentence_encoder(model_path, "torch")
+    candidate_encoder = model_registry.sentence_encoder(model_path, backend)
+    reference = [r["confidence"] for r in BERTLeadClassifier(model_path, backend="torch").predict_batch(texts)]
+    candidate = [r["confidence"] for r in BERTLeadClassifier(model_path, backend=backend).predict_batch(texts)]
+    report = compare_backends(encoder.encode(texts), candidate_encoder.encode(texts), reference, candidate, labels)
+    assert report["embedding_cosine_min"] > 0.99
+    assert report["accuracy_drop"] <= 1 / len(texts), report
+
+
+def test_onnx_backend_matches_float(tiny_bert, tmp_path, monkeypatch):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from core.ai_engine import inference_backends
+    from core.ai_engine.inference_backends import resolve_backend
+
+    monkeypatch.setattr(inference_backends, "ONNXRUNTIME_AVAILABLE", True)
+    monkeypatch.setattr(type(inference_backends.settings), "DATA_DIR", property(lambda self: tmp_path))
+    model_registry.clear()
+    assert resolve_backend("onnx") == "onnx"
+    encoder = model_registry.sentence_encoder(tiny_bert, "onnx")
+    assert type(encoder[0].auto_model).__name__ == "OnnxBackbone"
+    assert list((tmp_path / "onnx").glob("*.onnx"))
+
+    _assert_holdout_accuracy(tiny_bert, "onnx", tmp_path)
@@ -0,0 +1,170 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core.database.sqlite_pool import close_all_pools
+from core.telegram.peer_cache import PeerCache
+
+
+class FakeClient:
+    """get_users/get_dialogs как в Pyrogram, со счётчиками вызовов API."""
+
+    def __init__(self, users, chats=()):
+        self.users = {u.username.lower(): u for u in users}
+        self.users.update({str(u.id): u for u in users})
+        self.chats = list(chats)
+        self.get_users_calls = 0
+        self.get_dialogs_calls = 0
+        self.offline = False
+
+    async def get_users(self, ref):
+        self.get_users_calls += 1
+        if self.offline:
+            raise ConnectionError("Connection lost")
+        user = self.users.get(str(ref).lower())
+        if user is None:
+            raise Exception('Telegram says: [400 USERNAME_NOT_OCCUPIED]')
+        return user
+
+    async def get_dialogs(self):
+        self.get_dialogs_calls += 1
+        for chat in self.chats:
+            yield SimpleNamespace(chat=chat)
+
+
+def make_user(i, is_bot=False):
+    return SimpleNamespace(id=1000 + i, username=f"Lead_{i}", first_name=f"Лид {i}", last_name=None, is_bot=is_bot)
+
+
+@pytest.mark.asyncio
+async def test_outreach_cycle_api_calls_saved(tmp_path):
+    leads = [make_user(i) for i in range(20)]
+    client = FakeClient(leads + [make_user(99, is_bot=True)])
+    cache = PeerCache(db_path=tmp_path / "peers.db", memory_size=100, ttl_hours=24, negative_ttl_hours=1)
+
+    async def outreach_cycle():
+        # На лида: проверка «живой пользователь» (smart_sender), блок-лист и лог в дашборд (commander)
+        for user in leads:
+            for ref in (f"@{user.username}", user.username, user.id):
+                peer = await cache.resolve_user(client, ref)
+                assert peer.peer_id == user.id and peer.kind == "user"
+
+    await outreach_cycle()
+    first_cycle_calls = client.get_users_calls
+    await outreach_cycle()
+    # Без кэша было бы 3 get_users на лида за цикл
+    assert first_cycle_calls == len(leads)
+    assert client.get_users_calls == first_cycle_calls
+    saved = 2 * 3 * len(leads) - client.get_users_calls
+    assert saved == 100
+    assert (await cache.resolve_user(client, "lead_99")).is_bot
+
+    # Несуществующий username спрашиваем один раз за negative TTL
+    assert await cache.resolve_user(client, "ghost") is None
+    assert await cache.resolve_user(client, "@ghost") is None
+    assert cache.stats["negative_hits"] == 1
+
+    # После перезапуска процесса — из SQLite, без API
+    calls = client.get_users_calls
+    restarted = PeerCache(db_path=tmp_path / "peers.db", memory_size=100, ttl_hours=24, negative_ttl_hours=1)
+    assert (await restarted.resolve_user(client, "LEAD_3")).peer_id == 1003
+    assert await restarted.resolve_user(client, "ghost") is None
+    assert client.get_users_calls == calls
+    assert restarted.stats["disk_hits"] == 1 and restarted.stats["negative_hits"] == 1
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_refreshed_and_chat_titles_scanned_once(tmp_path):
+    user = make_user(1)
+    chats = [
+        SimpleNamespace(id=-1001, title="Вакансии SEO", username=None, type=SimpleNamespace(name="CHANNEL")),
+        SimpleNamespace(id=-1002, title="Маркетинг чат", username="mkt", type=SimpleNamespace(name="SUPERGROUP")),
+    ]
+    client = FakeClient([user], chats)
+    cache = PeerCache(db_path=tmp_path / "peers.db", memory_size=100, ttl_hours=0, negative_ttl_hours=1)
+
+    await cache.resolve_user(client, "lead_1")
+    await cache.resolve_user(client, "lead_1")
+    assert client.get_users_calls == 2 and cache.stats["refreshes"] == 1
+
+    # Telegram недоступен — отдаём устаревшую запись
+    client.offline = True
+    assert (await cache.resolve_user(client, 1001)).username == "Lead_1"
+
+    cache.ttl = 3600
+    assert await cache.resolve_chat_title(client, "Вакансии SEO") == -1001
+    assert await cache.resolve_chat_title(client, "Маркетинг чат") == -1002
+    assert await cache.resolve_chat_title(client, "Нет такого") is None
+    assert client.get_dialogs_calls == 1
+    await close_all_pools()
+
+
+def _dialogs_with_private_chats():
+    return [
+        SimpleNamespace(id=1001, title=None, first_name="Лид 1", username="Lead_1", type=SimpleNamespace(name="PRIVATE")),
+        SimpleNamespace(id=2002, title=None, first_name="Боб", username="bob", type=SimpleNamespace(name="PRIVATE")),
+        SimpleNamespace(id=3003, title=None, first_name="Помощник", username="helper_bot", type=SimpleNamespace(name="BOT")),
+        SimpleNamespace(id=-1001, title="Вакансии SEO", username=None, type=SimpleNamespace(name="CHANNEL")),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_dialog_scan_keeps_private_chats_sendable(tmp_path):
+    client = FakeClient([make_user(1)], _dialogs_with_private_chats())
+    cache = PeerCache(db_path=tmp_path / "peers.db", memory_size=100, ttl_hours=24, negative_ttl_hours=1)
+    assert (await cache.resolve_user(client, "lead_1")).is_person
+
+    await cache.resolve_chat_title(client, "Вакансии SEO")
+    lead = await cache.resolve_user(client, "lead_1")
+    assert lead.is_person and lead.title == "Лид 1"  # запись get_users не перезаписана диалогом
+    assert (await cache.resolve_user(client, "bob")).is_person
+    assert not (await cache.resolve_user(client, "helper_bot")).is_person
+    assert not (await cache.resolve_user(client, -1001)).is_person
+    assert client.get_users_calls == 1
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_smart_sender_accepts_users_after_dialog_scan(tmp_path, monkeypatch):
+    pytest.importorskip("pyrogram")
+    from core.utils import smart_sender
+
+    client = FakeClient([make_user(1)], _dialogs_with_private_chats())
+    cache = PeerCache(db_path=tmp_path / "peers.db", memory_size=100, ttl_hours=24, negative_ttl_hours=1)
+    monkeypatch.setattr(smart_sender, "peer_cache", cache)
+    assert await smart_sender._is_valid_user(client, "lead_1")
+    await cache.resolve_chat_title(client, "Вакансии SEO")
+    assert await smart_sender._is_valid_user(client, "lead_1")
+    assert await smart_sender._is_valid_user(client, "bob")
+    assert not await smart_sender._is_valid_user(client, "helper_bot")
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_dialog_scan_cooldown_and_single_write(tmp_path):
+    client = FakeClient([make_user(1)], _dialogs_with_private_chats())
+    cache = PeerCache(db_path=tmp_path / "peers.db", memory_size=100, ttl_hours=24, negative_ttl_hours=1,
+                      scan_cooldown_minutes=5)
+    await cache.resolve_user(client, "lead_1")
+    pool = await cache._pool()
+    writer, transactions = pool.writer, []
+
+    def counting_writer():
+        transactions.append(1)
+        return writer()
+
+    pool.writer = counting_writer
+    assert await cache.resolve_chat_title(client, "Новый чат") is None
+    assert len(transactions) == 1  # все диалоги — одной транзакцией
+    assert await cache.resolve_chat_title(client, "Новый чат") is None
+    assert client.get_dialogs_calls == 1
+
+    # Бот добавлен в чат: после короткой паузы (а не через TTL записей) чат находится
+    client.chats.append(SimpleNamespace(id=-1003, title="Новый чат", username=None, type=SimpleNamespace(name="GROUP")))
+    cache._dialogs_scanned_at -= 5 * 60
+    assert await cache.resolve_chat_title(client, "Новый чат") == -1003
+    assert client.get_dialogs_calls == 2
+    assert (await cache.resolve_user(client, "lead_1")).title == "Лид 1"
+    del pool.writer
+    await close_all_pools()
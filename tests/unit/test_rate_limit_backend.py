@@ -0,0 +1,65 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from systems.alexey.rate_limit_backend import PAUSED, RedisBucketBackend, SQLiteBucketBackend
+from systems.alexey.rate_limiter import TelegramRateLimiter
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBucketBackend(tmp_path / "rate_limits.db")
+    url = os.environ.get("REDIS_TEST_URL")  # локальный redis-server, иначе fakeredis (Lua нужен lupa)
+    if url:
+        redis = pytest.importorskip("redis")
+        client = redis.Redis.from_url(url)
+        client.flushdb()
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        client = fakeredis.FakeRedis()
+    return RedisBucketBackend(client=client)
+
+
+def test_take_is_all_or_nothing(backend):
+    buckets = [("tg_rl:t:global", 2, 1.0), ("tg_rl:t:pm:1", 1, 1.0)]
+    assert backend.take(buckets) == (0.0, None)
+
+    wait, blocker = backend.take(buckets)
+    assert blocker == 1 and wait == pytest.approx(1.0, abs=0.05)
+
+    # Отказ по получателю не списал общий токен: другому получателю он достаётся
+    assert backend.take([buckets[0], ("tg_rl:t:pm:2", 1, 1.0)]) == (0.0, None)
+    assert backend.take([buckets[0], ("tg_rl:t:pm:3", 1, 1.0)])[1] == 0
+
+
+def test_pause_is_shared(backend):
+    backend.pause("tg_rl:t:pause", 5)
+    wait, blocker = backend.take([("tg_rl:t:global", 30, 30.0)], pause_key="tg_rl:t:pause")
+    assert blocker == PAUSED and 4 < wait <= 5
+
+
+@pytest.mark.asyncio
+async def test_two_processes_share_account_budget(tmp_path):
+    # Два экземпляра limiter с отдельными соединениями — как два процесса одного аккаунта
+    first = TelegramRateLimiter(backend=SQLiteBucketBackend(tmp_path / "rl.db"), account="acc",
+                                global_rate=10.0, global_capacity=1)
+    second = TelegramRateLimiter(backend=SQLiteBucketBackend(tmp_path / "rl.db"), account="acc",
+                                 global_rate=10.0, global_capacity=1)
+    try:
+        await first.acquire_pm(1)
+        start = time.monotonic()
+        await second.acquire_pm(2)
+        assert time.monotonic() - start >= 0.08
+
+        second.report_flood_wait(0.2)
+        await asyncio.sleep(0.05)  # пауза уходит в backend из executor
+        start = time.monotonic()
+        await first.acquire_pm(3)
+        assert time.monotonic() - start >= 0.1
+    finally:
+        await first.close()
+        await second.close()
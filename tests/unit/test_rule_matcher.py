@@ -0,0 +1,66 @@
+import random
+import re
+
+import pytest
+
+from systems.parser import rule_matcher
+from systems.parser.rule_matcher import RuleMatcher
+
+
+KEYWORDS = ["seo", "seo продвижение", "продвижение", "сайт", "сайт под ключ", "айт", "seo"]
+PATTERNS = [r"\bнужен\b", r"(?i)\bbot\b", r"\bищу\s+(?:спец|исполнител)", r"\d+\s*₽"]
+
+
+def _reference(text, rules):
+    """Исходная семантика: поштучный re.findall / `in` в порядке категорий и списков."""
+    hits = []
+    for name, spec in rules.items():
+        for pattern in spec.get("patterns", []):
+            count = len(re.findall(pattern, text))
+            if count:
+                hits.append((name, pattern, count))
+        for keyword in spec.get("keywords", []):
+            if keyword in text:
+                hits.append((name, keyword, 1))
+    return hits
+
+
+def _random_text(rng):
+    vocab = KEYWORDS + ["нужен", "BOT", "ищу спец", "500 ₽", "привет", "и", "ищу", "с", "нужений"]
+    return " ".join(rng.choice(vocab) for _ in range(rng.randint(0, 12)))
+
+
+@pytest.mark.skipif(not rule_matcher.PYAHOCORASICK_AVAILABLE, reason="pyahocorasick is not installed")
+def test_automaton_finds_overlapping_keywords():
+    automaton = rule_matcher.KeywordAutomaton(KEYWORDS)
+    found = automaton.find_ids("делаем seo продвижение и сайт под ключ")
+    assert found == {0, 1, 2, 3, 4, 5, 6}
+    assert automaton.find_ids("ничего нет") == set()
+
+
+@pytest.mark.parametrize("use_automaton", [True, False])
+def test_matcher_equivalent_to_sequential_loops(monkeypatch, use_automaton):
+    if use_automaton and not rule_matcher.PYAHOCORASICK_AVAILABLE:
+        pytest.skip("pyahocorasick is not installed")
+    monkeypatch.setattr(rule_matcher, "PYAHOCORASICK_AVAILABLE", use_automaton)
+    rules = {
+        "a": {"patterns": PATTERNS, "weight": 3},
+        "b": {"keywords": KEYWORDS, "weight": -2},
+    }
+    matcher = RuleMatcher(lambda: rules)
+    rng = random.Random(7)
+    for _ in range(500):
+        text = _random_text(rng)
+        got = [(h.category, h.rule, h.count) for h in matcher.match(text)]
+        assert got == _reference(text, rules), text
+
+
+def test_first_hit_and_rebuild_all():
+    rules = {"stop": {"keywords": ["крипта"]}}
+    matcher = RuleMatcher(lambda: rules)
+    assert matcher.first_hit("обучу крипте", "stop") is None
+
+    rules["stop"]["keywords"].append("крипт")
+    rule_matcher.rebuild_all()
+    hit = matcher.first_hit("обучу крипте", "stop")
+    assert hit is not None and hit.rule == "крипт" and hit.order == 1
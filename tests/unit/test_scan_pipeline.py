@@ -0,0 +1,134 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from pyrogram.enums import ChatType
+from pyrogram.errors import FloodWait
+
+import apps.today_parser as today_parser
+from core.config.settings import settings
+from core.database.sqlite_pool import close_all_pools
+from systems.parser.scan_pipeline import FloodWaitLimiter
+from systems.parser.vacancy_db import VacancyDatabase
+
+VACANCIES = [
+    "Ищем SEO специалиста для продвижения интернет-магазина, бюджет 50000 руб, пишите @seo_shop",
+    "Нужен директолог: настроить Яндекс Директ для стоматологии в Казани. Контакт @dent_clinic",
+    "Требуется авитолог для магазина стройматериалов, оплата сдельная, пишите @stroy_avito",
+    "Ищу SEO-оптимизатора на сайт юридической компании, удалённо, ЛС @law_firm_ru",
+]
+
+
+def _message(chat, msg_id, text, minutes_ago=5):
+    return SimpleNamespace(
+        id=msg_id, text=text, chat=chat, date=datetime.now() - timedelta(minutes=minutes_ago),
+        reply_markup=None, forward_from=None, forward_from_chat=None,
+        from_user=SimpleNamespace(id=1000 + msg_id, username=None),
+    )
+
+
+class FakeClient:
+    def __init__(self, *args, **kwargs):
+        self.chats = []
+        self.history = {}
+        self.flood_once = set()
+        self.read = []
+        self.is_connected = True
+
+    async def start(self):
+        pass
+
+    async def disconnect(self):
+        self.is_connected = False
+
+    async def get_dialogs(self, limit=0):
+        for chat in self.chats:
+            yield SimpleNamespace(chat=chat)
+
+    async def get_chat_history(self, chat_id, limit=100):
+        if chat_id in self.flood_once:
+            self.flood_once.discard(chat_id)
+            raise FloodWait(value=0)
+        await asyncio.sleep(0.01)
+        for message in self.history[chat_id]:
+            yield message
+
+    async def read_chat_history(self, chat_id):
+        self.read.append(chat_id)
+
+
+@pytest.mark.asyncio
+async def test_flood_wait_pauses_all_acquirers():
+    limiter = FloodWaitLimiter(min_interval=0.0, flood_margin=0.0)
+    limiter.report_flood_wait(0.2)
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.acquire() for _ in range(3)))
+    assert time.monotonic() - start >= 0.19
+    assert limiter.flood_waits == 1 and limiter.requests == 3
+
+
+@pytest.mark.asyncio
+async def test_pipeline_scans_chats_concurrently(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(today_parser, "Client", FakeClient)
+    monkeypatch.setattr(settings, "PARSER_REQUEST_INTERVAL", 0.0)
+    monkeypatch.setattr(settings, "PARSER_FETCH_CONCURRENCY", 3)
+
+    parser = today_parser.TelegramVacancyParser()
+    parser.db = VacancyDatabase(str(tmp_path / "vacancies.db"))
+    client = parser.client
+    for n in range(4):
+        chat = SimpleNamespace(id=-100 - n, title=f"chat{n}", first_name=None, type=ChatType.SUPERGROUP)
+        client.chats.append(chat)
+        client.history[chat.id] = [
+            _message(chat, 1, VACANCIES[n]),
+            _message(chat, 2, f"Продам курс по заработку, вебинар и марафон {n}"),
+            _message(chat, 3, "старое сообщение", minutes_ago=60 * 48),
+        ]
+    client.flood_once.add(-101)
+
+    sent = []
+
+    async def fake_outreach(contact_link, text, direction):
+        sent.append(contact_link)
+
+    monkeypatch.setattr(parser, "_send_outreach_to_lead", fake_outreach)
+    await parser.parse_dialogs(hours_ago=24)
+
+    assert parser.results['total_messages_scanned'] == 8
+    assert len(parser.results['all_messages']) == 8
+    assert len(parser.results['relevant_vacancies']) == 4
+    assert sorted(client.read) == [-103, -102, -101, -100]
+    with_contact = [v['contact']['contact_link'] for v in parser.results['relevant_vacancies']
+                    if v['contact'].get('contact_link')]
+    assert sorted(sent) == sorted(with_contact) and len(sent) >= 3
+    stats = await parser.db.get_stats()
+    assert stats['accepted'] == 4
+    metrics = parser.results['pipeline_metrics']
+    assert metrics['flood_waits'] == 1
+    assert metrics['stages']['cpu']['processed'] == 8
+    assert metrics['stages']['outreach']['processed'] == len(sent)
+    assert not client.is_connected
+    await parser.db.close()
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_outreach_workers_reserve_contact(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(today_parser, "Client", FakeClient)
+    parser = today_parser.TelegramVacancyParser()
+    attempts = []
+
+    async def book_and_send(contact_link, text, direction):
+        attempts.append(contact_link)
+        await asyncio.sleep(0.01)
+        return False  # не доставлено — контакт освобождается
+
+    monkeypatch.setattr(parser, "_book_and_send", book_and_send)
+    await asyncio.gather(*(parser._send_outreach_to_lead("@lead", "text", "SEO") for _ in range(3)))
+    assert attempts == ["@lead"] and "@lead" not in parser._contacted_today
+    await parser._send_outreach_to_lead("@lead", "text", "SEO")
+    assert attempts == ["@lead", "@lead"]
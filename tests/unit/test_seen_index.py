@@ -0,0 +1,76 @@
+import hashlib
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.database.sqlite_pool import close_all_pools
+from systems.parser.seen_index import BloomFilter, MinHashLSH, jaccard, shingles
+from systems.parser.vacancy_db import VacancyDatabase
+
+WORDS = "нужен seo директ авито сайт магазин бюджет срочно проект аудит лендинг таргет реклама".split()
+
+
+def _text(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 25))) + f" {rng.randint(0, 10**6)}"
+
+
+def test_bloom_no_false_negatives_and_roundtrip(tmp_path):
+    bloom = BloomFilter(10_000, 0.01)
+    hashes = [hashlib.md5(str(i).encode()).hexdigest() for i in range(5000)]
+    for h in hashes:
+        bloom.add(h)
+    assert all(h in bloom for h in hashes)
+
+    absent = [hashlib.md5(f"x{i}".encode()).hexdigest() for i in range(20000)]
+    assert sum(h in bloom for h in absent) / len(absent) < 0.02
+
+    path = tmp_path / "seen.bloom.npz"
+    bloom.save(path, max_id=42)
+    loaded, max_id = BloomFilter.load(path, 10_000, 0.01)
+    assert max_id == 42 and loaded.bits == bloom.bits and loaded.count == bloom.count
+    # Другие параметры — файл не подходит, индекс будет пересобран
+    assert BloomFilter.load(path, 20_000, 0.01) is None
+
+
+def test_lsh_candidates_match_linear_scan():
+    rng = random.Random(3)
+    texts = [_text(rng) for _ in range(500)]
+    lsh = MinHashLSH()
+    sets = [shingles(t) for t in texts]
+    for i, s in enumerate(sets):
+        lsh.add(i, lsh.signature(s))
+
+    for _ in range(100):
+        query = rng.choice(texts) + " ок"
+        q = shingles(query)
+        exact = {i for i, s in enumerate(sets) if jaccard(q, s) >= 0.7}
+        assert exact <= lsh.query(lsh.signature(q))
+
+
+@pytest.mark.asyncio
+async def test_is_processed_uses_index(tmp_path):
+    db = VacancyDatabase(str(tmp_path / "v.db"))
+    recent = datetime.now().isoformat()
+    old = (datetime.now() - timedelta(days=10)).isoformat()
+    await db.add_accepted("Нужен SEO специалист для интернет-магазина одежды, бюджет 50к", "chat", date=recent)
+    await db.add_accepted("Ищу таргетолога для салона красоты в Москве", "chat", date=old)
+    await db.add_rejected("Продам курс по заработку на крипте", "chat", reason="spam", date=recent)
+
+    assert await db.is_processed("Продам  курс по заработку на крипте")
+    assert await db.is_processed("Нужен SEO-специалист для интернет магазина одежды, бюджет 50к!")
+    assert not await db.is_processed("Ищу таргетолога для салона красоты в Москве!")  # вне окна
+    assert not await db.is_processed("Требуется дизайнер упаковки для косметики")
+
+    similar = await db.find_similar("Нужен SEO специалист для интернет-магазина одежды, бюджет 60к")
+    assert similar is not None and similar["source"] == "chat"
+
+    # Запись после загрузки индекса видна без пересборки
+    await db.add_accepted("Настройка Яндекс Директ для стоматологии, срочно", "chat2", date=recent)
+    assert await db.is_processed("Настройка Яндекс Директ для стоматологии срочно!!")
+
+    stats = db.seen_index.get_stats()
+    assert stats["bloom_negative"] >= 1 and stats["lsh_entries"] == 2
+    await db.close()
+    assert (tmp_path / "v.db.bloom.npz").exists()
+    await close_all_pools()
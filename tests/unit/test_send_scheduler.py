@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import pytest
+
+from systems.alexey.rate_limiter import PRIORITY_COLD, PRIORITY_HOT, TelegramRateLimiter
+
+
+@pytest.mark.asyncio
+async def test_waiting_recipient_does_not_block_others():
+    limiter = TelegramRateLimiter(user_rate=5.0)
+    await limiter.acquire_pm(1)
+
+    start = time.monotonic()
+    same_user = asyncio.create_task(limiter.acquire_pm(1))
+    await asyncio.sleep(0)
+    assert await limiter.acquire_pm(2) == 0.0
+    assert time.monotonic() - start < 0.05
+
+    assert await same_user == pytest.approx(0.2, abs=0.05)
+
+
+@pytest.mark.asyncio
+async def test_hot_lead_overtakes_queued_cold_sends():
+    limiter = TelegramRateLimiter(global_rate=50.0, global_capacity=1)
+    await limiter.acquire_pm(0)  # общий бюджет исчерпан — дальше все встают в очередь
+
+    order = []
+
+    async def send(user_id, priority):
+        await limiter.acquire_pm(user_id, priority=priority)
+        order.append(user_id)
+
+    tasks = [asyncio.create_task(send(uid, PRIORITY_COLD)) for uid in (1, 2, 3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(send(99, PRIORITY_HOT)))
+    await asyncio.gather(*tasks)
+    assert order == [99, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_flood_wait_pauses_and_shrinks_rate():
+    limiter = TelegramRateLimiter()
+    limiter.report_flood_wait(0.1)
+    assert limiter.get_stats()["rate_scale"] == 0.5
+
+    start = time.monotonic()
+    await limiter.acquire_pm(1)
+    assert time.monotonic() - start >= 0.1
+    assert limiter.global_bucket.refill_rate == TelegramRateLimiter.PM_GLOBAL_RATE / 2
@@ -0,0 +1,92 @@
+import pytest
+
+from core.telegram.session_pool import SessionPool
+from systems.alexey.rate_limiter import TelegramRateLimiter
+
+
+class FakeClient:
+    """Минимальный Pyrogram Client: запоминает отправленное, умеет «получить» PeerFlood."""
+
+    def __init__(self, name):
+        self.name = name
+        self.is_connected = True
+        self.flooded = False
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        if self.flooded:
+            raise RuntimeError("PEER_FLOOD")
+        self.sent.append((chat_id, text))
+        return len(self.sent)
+
+
+async def fake_smart_send(client, recipient, text, priority, limiter, **kwargs):
+    # Как smart_send_message: limiter аккаунта, PeerFlood → report_peer_flood и False
+    await limiter.acquire_pm(recipient, priority=priority)
+    try:
+        await client.send_message(recipient, text)
+        return True
+    except RuntimeError:
+        limiter.report_peer_flood()
+        return False
+
+
+def make_pool(tmp_path, names):
+    pool = SessionPool(replicas=64, flood_cooldown=3600, affinity_path=tmp_path / "pool.db", sender=fake_smart_send)
+    for name in names:
+        limiter = TelegramRateLimiter(user_rate=1000.0)
+        limiter.PEER_FLOOD_COOLDOWN = 0.05  # закреплённый диалог ждёт паузу своего аккаунта
+        pool.add_account(name, FakeClient(name), limiter=limiter)
+    return pool
+
+
+def test_consistent_hashing_moves_only_share_of_leads(tmp_path):
+    pool = make_pool(tmp_path, ["a", "b", "c"])
+    leads = [f"lead{i}" for i in range(3000)]
+    before = {lead: pool.account_for(lead).name for lead in leads}
+    assert min(list(before.values()).count(n) for n in "abc") > 600
+
+    pool.add_account("d", FakeClient("d"), limiter=TelegramRateLimiter())
+    after = {lead: pool.account_for(lead).name for lead in leads}
+    moved = [lead for lead in leads if before[lead] != after[lead]]
+    assert all(after[lead] == "d" for lead in moved)
+    assert 0.15 < len(moved) / len(leads) < 0.35
+
+
+@pytest.mark.asyncio
+async def test_flooded_account_fails_over_but_dialogs_keep_affinity(tmp_path):
+    pool = make_pool(tmp_path, ["a", "b", "c"])
+    lead = "alice"
+    home = pool.account_for(lead)
+    assert await pool.send(lead, "привет")
+    assert home.client.sent == [(lead, "привет")]
+
+    home.client.flooded = True
+    # Новый лид с тем же «родным» аккаунтом уходит на следующий по кольцу
+    newcomer = next(f"user{i}" for i in range(1000) if pool.account_for(f"user{i}") is home)
+    assert await pool.send(newcomer, "добрый день")
+    other = pool.account_for(newcomer)
+    assert other is not home and other.client.sent == [(newcomer, "добрый день")]
+    assert pool.get_stats()[home.name]["flood_events"] == 1
+
+    # Закреплённый диалог не переезжает на чужой аккаунт
+    assert not await pool.send(lead, "напоминание")
+    assert pool.account_for(lead) is home
+
+    # Закрепления переживают перезапуск процесса
+    restarted = make_pool(tmp_path, ["a", "b", "c"])
+    await restarted.load_affinity()
+    assert restarted.account_for(newcomer).name == other.name
+
+
+@pytest.mark.asyncio
+async def test_reconnected_client_replaces_stale_one(tmp_path):
+    pool = make_pool(tmp_path, ["a"])
+    stale = pool.accounts["a"].client
+    assert await pool.send("alice", "привет")
+
+    fresh = FakeClient("a")
+    assert pool.add_account("a", fresh) is pool.accounts["a"]
+    assert await pool.send("alice", "ещё раз")
+    assert stale.sent == [("alice", "привет")] and fresh.sent == [("alice", "ещё раз")]
+    assert pool.name_of(stale) is None
@@ -0,0 +1,62 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.database.sqlite_pool import SQLitePool, close_all_pools
+from systems.parser.vacancy_db import VacancyDatabase
+
+
+@pytest.mark.asyncio
+async def test_pool_runs_init_once_and_rolls_back_on_error(tmp_path):
+    calls = []
+
+    async def init(db):
+        calls.append(1)
+        await db.execute("CREATE TABLE IF NOT EXISTS t (x INTEGER)")
+
+    pool = SQLitePool(str(tmp_path / "p.db"), readers=2, init_fn=init)
+    for _ in range(3):
+        await pool.open()
+    assert calls == [1]
+
+    async with pool.writer() as db:
+        await db.execute("INSERT INTO t VALUES (1)")
+    with pytest.raises(RuntimeError):
+        async with pool.writer() as db:
+            await db.execute("INSERT INTO t VALUES (2)")
+            raise RuntimeError("boom")
+
+    async with pool.reader() as db:
+        async with db.execute("SELECT x FROM t") as cursor:
+            assert await cursor.fetchall() == [(1,)]
+        with pytest.raises(sqlite3.OperationalError):
+            await db.execute("INSERT INTO t VALUES (3)")
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_vacancy_db_migrates_legacy_schema(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE vacancies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, hash TEXT UNIQUE NOT NULL, status TEXT NOT NULL,
+            text TEXT NOT NULL, source TEXT NOT NULL, direction TEXT, contact_link TEXT, response TEXT,
+            rejection_reason TEXT, first_seen TEXT NOT NULL, last_seen TEXT NOT NULL,
+            informativeness_score REAL DEFAULT 0.0, needs_review INTEGER DEFAULT 0, manual_label INTEGER,
+            embedding BLOB
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+    db = VacancyDatabase(str(path))
+    await db.init_db()
+    assert await db.add_accepted("Нужен SEO специалист", "chat", message_id=5, chat_id=-100)
+    assert not await db.add_accepted("Нужен  SEO  специалист", "chat")
+    assert await db.is_processed("нужен seo специалист", fuzzy=False)
+
+    leads = await db.get_leads_since(datetime.now() - timedelta(hours=1))
+    assert [(lead.message_id, lead.chat_id) for lead in leads] == [(5, -100)]
+    await close_all_pools()
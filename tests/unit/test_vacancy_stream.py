@@ -0,0 +1,194 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from core.config.settings import settings
+from core.database.sqlite_pool import close_all_pools
+from systems.alexey.vacancy_stream import VacancyStream
+
+CHAT = SimpleNamespace(id=-100500, type=SimpleNamespace(name="CHANNEL"), title="Вакансии", username=None)
+
+
+def make_message(message_id, age_s=5.0):
+    return SimpleNamespace(
+        id=message_id, chat=CHAT, date=datetime.now() - timedelta(seconds=age_s),
+        text=f"Ищем SEO-специалиста, пишите @hr_{message_id}", caption=None,
+        reply_markup=None, forward_from=None, forward_from_chat=None, from_user=None,
+    )
+
+
+class FakeClient:
+    """get_chat_history как в Pyrogram: от новых к старым."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.is_connected = True
+        self.history_calls = 0
+
+    async def get_chat_history(self, chat_id, limit=0):
+        self.history_calls += 1
+        for message in sorted(self.messages, key=lambda m: m.id, reverse=True)[:limit]:
+            yield message
+
+
+@pytest.fixture
+def stream_settings(monkeypatch):
+    monkeypatch.setattr(settings, "OUTREACH_ENABLED", True)
+    monkeypatch.setattr(settings, "OUTREACH_TEST_CHAT_ID", None)
+    monkeypatch.setattr(settings, "MONITORED_CHATS", "")
+    monkeypatch.setattr(settings, "PARSER_REQUEST_INTERVAL", 0.0)
+
+
+async def drain(stream):
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if stream.queue.empty() and not stream._gap_requested.is_set():
+            await stream.queue.join()
+            return
+
+
+@pytest.mark.asyncio
+async def test_live_updates_and_overflow_gap_fill(tmp_path, stream_settings):
+    history = [make_message(i) for i in (10, 11, 12)]
+    client = FakeClient(history)
+    stream = VacancyStream(client, queue_size=1, workers=1, db_path=tmp_path / "stream.db")
+    handled = []
+    release = asyncio.Event()
+
+    async def handler(message):
+        await release.wait()
+        handled.append(message.id)
+        return True
+
+    await stream.start(handler)
+    await drain(stream)  # стартовая дозагрузка: чекпоинтов ещё нет — читать нечего
+
+    assert stream.submit(history[0])
+    await asyncio.sleep(0)  # воркер забрал 10 и ждёт release
+    assert stream.submit(history[1])
+    assert not stream.submit(history[2])  # очередь полна — 12 отброшен, чат помечен к дозагрузке
+    release.set()
+    await drain(stream)
+    await stream.stop()
+
+    assert handled == [10, 11, 12]
+    stats = stream.get_stats()
+    assert stats["dropped"] == 1 and stats["gap_filled"] == 1 and stats["outreach_sent"] == 3
+    assert 4 < stats["post_to_outreach_p50_s"] < 30
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_restart_reads_only_messages_after_checkpoint(tmp_path, stream_settings):
+    first = VacancyStream(FakeClient([]), workers=1, db_path=tmp_path / "stream.db")
+    handled = []
+
+    async def handler(message):
+        handled.append(message.id)
+        return False
+
+    await first.start(handler)
+    first.submit(make_message(5))
+    await drain(first)
+    await first.stop()
+    await close_all_pools()
+
+    # Пока процесс лежал, в канале появились 6..8
+    history = [make_message(i) for i in (3, 4, 5, 6, 7, 8)]
+    client = FakeClient(history)
+    second = VacancyStream(client, workers=1, db_path=tmp_path / "stream.db")
+    await second.start(handler)
+    await drain(second)
+    await second.stop()
+
+    assert handled == [5, 6, 7, 8]
+    assert client.history_calls == 1
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_waits_for_slower_worker(tmp_path, stream_settings):
+    stream = VacancyStream(FakeClient([]), workers=2, db_path=tmp_path / "stream.db")
+    slow = asyncio.Event()
+
+    async def handler(message):
+        if message.id == 20:
+            await slow.wait()
+        return False
+
+    await stream.start(handler)
+    await drain(stream)
+    stream.submit(make_message(20))
+    stream.submit(make_message(21))
+    for _ in range(50):
+        await asyncio.sleep(0.01)
+        if stream.stats["processed"] == 1:
+            break
+    # 21 обработан, 20 ещё в работе — после падения 20 должен перечитаться
+    assert stream._checkpoints.get(CHAT.id, 0) < 20
+    slow.set()
+    await drain(stream)
+    await stream.stop()
+    assert stream._checkpoints[CHAT.id] == 21
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_handler_is_awaitable(tmp_path, stream_settings, monkeypatch):
+    class DisconnectHandler:
+        def __init__(self, callback):
+            self.callback = callback
+
+    handlers = SimpleNamespace(DisconnectHandler=DisconnectHandler)
+    monkeypatch.setitem(sys.modules, "pyrogram", SimpleNamespace(handlers=handlers))
+    monkeypatch.setitem(sys.modules, "pyrogram.handlers", handlers)
+
+    client = FakeClient([])
+    client.add_handler = lambda handler: setattr(client, "disconnect_handler", handler.callback)
+    stream = VacancyStream(client, workers=1, db_path=tmp_path / "stream.db")
+    stream._gap_requested = asyncio.Event()
+    stream.attach()
+    # Как Session.stop в Pyrogram: await client.disconnect_handler(client)
+    await client.disconnect_handler(client)
+    assert stream._gap_requested.is_set()
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_held_until_dropped_message_requeued(tmp_path, stream_settings):
+    history = [make_message(i) for i in (11, 12, 13)]
+    client = FakeClient(history)
+    reading = asyncio.Event()
+    release = asyncio.Event()
+    read_history = client.get_chat_history
+
+    async def slow_history(chat_id, limit=0):
+        reading.set()
+        await release.wait()
+        async for message in read_history(chat_id, limit):
+            yield message
+
+    client.get_chat_history = slow_history
+    stream = VacancyStream(client, queue_size=1, workers=1, db_path=tmp_path / "stream.db")
+    stream._checkpoints[CHAT.id] = 10
+    assert stream.submit(history[0])
+    assert not stream.submit(history[1])  # 12 отброшен
+
+    gap_fill = asyncio.create_task(stream.gap_fill())
+    await reading.wait()
+    # Пока дочитка идёт, воркер обрабатывает 11 и 13 — чекпоинт не должен перескочить 12
+    for message in (history[0], history[2]):
+        if message is history[2]:
+            assert stream.submit(message)
+        await stream._save_checkpoint(CHAT.id, (await stream.queue.get())[0].id)
+    assert stream._checkpoints[CHAT.id] == 11
+
+    release.set()
+    assert await gap_fill == 1
+    assert CHAT.id not in stream._floors
+    await stream._save_checkpoint(CHAT.id, (await stream.queue.get())[0].id)
+    assert stream._checkpoints[CHAT.id] == 13
+    await close_all_pools()
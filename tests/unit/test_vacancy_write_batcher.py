@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+
+from core.database.sqlite_pool import close_all_pools
+from systems.parser.vacancy_db import VacancyDatabase
+
+ROWS = [
+    ("accepted", "Нужен SEO специалист для магазина", "2025-01-01T10:00:00"),
+    ("rejected", "Продам курс по заработку", "2025-01-01T10:01:00"),
+    ("accepted", "Нужен  SEO специалист  для магазина", "2025-01-01T10:02:00"),  # тот же hash
+    ("accepted", "Ищу таргетолога на проект", "2025-01-01T10:03:00"),
+]
+
+
+async def _write(db):
+    for i, (status, text, date) in enumerate(ROWS):
+        if status == "accepted":
+            await db.add_accepted(text, "chat", direction="SEO", date=date, message_id=i, chat_id=-1)
+        else:
+            await db.add_rejected(text, "chat", reason="spam", date=date, message_id=i, chat_id=-1)
+
+
+def _dump(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("""
+            SELECT hash, status, text, direction, rejection_reason, first_seen, last_seen, message_id
+            FROM vacancies ORDER BY id
+        """).fetchall()
+
+
+@pytest.mark.asyncio
+async def test_group_commit_matches_direct_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(VacancyDatabase, "_insert_hooks", [])
+    inserted = []
+    ids = {}
+
+    async def hook(lead):
+        inserted.append(lead.message_id)
+        ids[lead.hash] = lead.id
+
+    VacancyDatabase.register_insert_hook(hook)
+
+    direct = VacancyDatabase(str(tmp_path / "direct.db"))
+    await _write(direct)
+
+    batched = VacancyDatabase(str(tmp_path / "batched.db"))
+    batched.enable_write_batching(max_batch_size=100, max_delay_ms=1000)
+    await batched.init_db()
+    # Строка другого процесса в той же БД — не из этой пачки, хуки её не получают
+    with sqlite3.connect(tmp_path / "batched.db") as conn:
+        conn.execute("INSERT INTO vacancies (hash, status, text, source, first_seen, last_seen) "
+                     "VALUES ('other', 'accepted', 'чужая строка', 'bot', '2025-01-01', '2025-01-01')")
+    ids.clear()
+    await _write(batched)
+    # До flush строка видна как обработанная через очередь
+    assert await batched.is_processed(ROWS[3][1], fuzzy=False)
+    await batched.close()
+
+    assert _dump(tmp_path / "batched.db")[1:] == _dump(tmp_path / "direct.db")
+    assert inserted == [0, 1, 3, 0, 1, 3]
+    with sqlite3.connect(tmp_path / "batched.db") as conn:
+        assert ids == dict(conn.execute("SELECT hash, id FROM vacancies WHERE hash != 'other'"))
+    await close_all_pools()
+
+
+@pytest.mark.asyncio
+async def test_back_pressure_and_flush(tmp_path):
+    db = VacancyDatabase(str(tmp_path / "bp.db"))
+    batcher = db.enable_write_batching(max_batch_size=4, max_delay_ms=5, max_pending=2)
+    for i in range(20):
+        await db.add_rejected(f"сообщение номер {i}", "chat", reason="r")
+        assert batcher._queue.qsize() <= 2
+    await db.flush_writes()
+    assert (await db.get_stats())["rejected"] == 20
+    await db.close()
+    await close_all_pools()
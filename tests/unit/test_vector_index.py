@@ -0,0 +1,72 @@
+import time
+
+import numpy as np
+
+from systems.parser.vector_index import EmbeddingIndex, create_embedding_index
+
+
+def _random_vectors(n, dim=312, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def test_query_matches_brute_force_cosine():
+    vectors = _random_vectors(300)
+    now = time.time()
+    index = EmbeddingIndex()
+    for i, vec in enumerate(vectors):
+        index.add(lead_id=i + 1, embedding=vec, timestamp=now, message_id=1000 + i)
+
+    query = vectors[42] + 0.05 * _random_vectors(1, seed=1)[0]
+    hits = index.query(query, k=3)
+
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = normed @ (query / np.linalg.norm(query))
+    best = int(np.argmax(expected))
+
+    assert hits[0].lead_id == best + 1
+    assert hits[0].message_id == 1000 + best
+    assert abs(hits[0].similarity - float(expected[best])) < 1e-4
+    assert [h.similarity for h in hits] == sorted((h.similarity for h in hits), reverse=True)
+
+
+def test_exclude_message_and_time_window():
+    vectors = _random_vectors(3)
+    now = time.time()
+    index = EmbeddingIndex(initial_capacity=2)  # заодно проверяем рост матрицы
+    index.add(1, vectors[0], timestamp=now - 100 * 3600, message_id=10)
+    index.add(2, vectors[0], timestamp=now, message_id=20)
+    index.add(3, vectors[1], timestamp=now, message_id=30)
+
+    cutoff = now - 48 * 3600
+    hits = index.query(vectors[0], k=5, min_timestamp=cutoff, exclude_message_id=20)
+    assert [h.lead_id for h in hits] == [3]
+
+    assert index.evict_older_than(cutoff) == 1
+    assert len(index) == 2
+    assert 1 not in index
+    assert index.query(vectors[0], k=1)[0].lead_id == 2
+
+
+def test_eviction_compacts_and_keeps_lookup_consistent():
+    vectors = _random_vectors(100)
+    index = EmbeddingIndex()
+    for i, vec in enumerate(vectors):
+        index.add(i, vec, timestamp=float(i))
+
+    assert index.evict_older_than(59.0) == 60
+    assert len(index) == 40
+    for i in (60, 75, 99):
+        assert index.query(vectors[i], k=1)[0].lead_id == i
+
+    # Повторное добавление обновляет строку, а не плодит дубль
+    index.add(75, vectors[0], timestamp=200.0)
+    assert len(index) == 40
+    assert index.query(vectors[0], k=1)[0].lead_id == 75
+
+
+def test_zero_vector_and_unknown_backend_fallback():
+    index = create_embedding_index("unknown", dim=4)
+    assert isinstance(index, EmbeddingIndex)
+    assert index.add(1, np.zeros(4), timestamp=1.0) is False
+    assert index.query(np.ones(4)) == []